@@ -9,6 +9,8 @@ project_root = os.path.dirname(current_dir)
 sys.path.append(project_root)
 
 from src.models.recommendation_engine import RecommendationEngine
+from src.utils.slow_query_log import SlowQueryLog
+from src.utils.query_capture import QueryCapture
 
 # Page Config
 st.set_page_config(
@@ -21,7 +23,25 @@ st.set_page_config(
 # Initialize Engine
 @st.cache_resource
 def get_engine():
-    return RecommendationEngine()
+    # Opt-in slow-query log: UNLOX_SLOW_QUERY_MS=200 streamlit run app/streamlit_app.py
+    slow_query_ms = os.environ.get('UNLOX_SLOW_QUERY_MS')
+    slow_query_log = None
+    if slow_query_ms:
+        slow_query_log = SlowQueryLog(os.path.join(project_root, 'logs', 'slow_queries.log'),
+                                      threshold_ms=float(slow_query_ms))
+    # Opt-in query capture for replay: UNLOX_CAPTURE_RATE=0.1 records 10% of the queries
+    capture_rate = os.environ.get('UNLOX_CAPTURE_RATE')
+    capture = None
+    if capture_rate:
+        capture = QueryCapture(os.path.join(project_root, 'logs', 'queries.jsonl'), sample_rate=float(capture_rate))
+    # Sessions submitting the same form at the same time share one computation; re-submitting
+    # a description with other filters reuses its cached text scores; the bounded search only
+    # scores the rows that can reach the top results
+    return RecommendationEngine(slow_query_log=slow_query_log, capture=capture, single_flight=True,
+                                text_score_cache_mb=64, bound_search=True)
+
+# Opt-in latency bound: UNLOX_TIME_BUDGET_MS=50 returns the best matches found within 50 ms
+time_budget_ms = float(os.environ['UNLOX_TIME_BUDGET_MS']) if os.environ.get('UNLOX_TIME_BUDGET_MS') else None
 
 try:
     engine = get_engine()
@@ -250,7 +270,7 @@ if submitted:
     }
     
     with st.spinner("Analyzing your preferences..."):
-        results = engine.get_recommendations(user_input, top_k=3)
+        results = engine.get_recommendations(user_input, top_k=3, time_budget_ms=time_budget_ms)
     
     if not results:
         st.markdown("""
@@ -283,6 +303,8 @@ if submitted:
             </p>
         </div>
         """, unsafe_allow_html=True)
+        if getattr(results, 'partial', False):
+            st.caption(f"Best matches among {results.coverage:.0%} of the eligible services (time limit reached).")
         
         if len(results) < 5:
             st.info(f"Found {len(results)} service(s) matching all your criteria.")
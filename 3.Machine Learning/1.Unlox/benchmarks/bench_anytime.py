@@ -0,0 +1,77 @@
+"""
+Anytime Search Benchmark
+Runs a query workload with and without a time budget (get_recommendations(time_budget_ms=...))
+on synthetic catalogs. For each budget it reports latency percentiles, the share of calls
+that returned partial results, the mean share of candidates scored, and the top-k agreement
+with the unbudgeted results.
+
+Usage:
+    python benchmarks/bench_anytime.py --rows 200000 1000000 --budgets 50 20 10
+"""
+
+import sys
+import os
+import time
+import argparse
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_engine import build_artifacts, DEFAULT_CACHE_DIR
+from src.models.recommendation_engine import RecommendationEngine
+from src.utils.metrics import MetricsRegistry
+from src.utils.synthetic_catalog import generate_queries
+
+def agreement(results, reference):
+    """Share of the reference top-k service IDs found in ``results`` (1.0 when both are empty)."""
+    if not reference:
+        return 1.0
+    return len({r['Service_ID'] for r in results} & {r['Service_ID'] for r in reference}) / len(reference)
+
+def run_budget(engine, queries, reference, top_k, budget):
+    latencies, coverage, partial, agree = [], [], 0, []
+    for query, expected in zip(queries, reference):
+        start = time.perf_counter()
+        results = engine.get_recommendations(query, top_k=top_k, time_budget_ms=budget)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if budget is not None:
+            coverage.append(results.coverage)
+            partial += results.partial
+        agree.append(agreement(results, expected))
+    p50, p99 = np.percentile(latencies, [50, 99])
+    return {'budget_ms': budget, 'p50_ms': p50, 'p99_ms': p99, 'max_ms': max(latencies),
+            'partial': partial / len(queries), 'coverage': float(np.mean(coverage)) if coverage else 1.0,
+            'agreement': float(np.mean(agree))}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[200_000, 1_000_000])
+    parser.add_argument('--budgets', type=float, nargs='+', default=[50, 20, 10])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--mix', default='skewed')
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args(argv)
+
+    queries = generate_queries(args.queries, mix=args.mix, seed=args.seed)
+    rows_out = []
+    for rows in args.rows:
+        engine = RecommendationEngine(metrics=MetricsRegistry(), **build_artifacts(rows, args.seed, args.cache_dir))
+        reference = [engine.get_recommendations(query, top_k=args.top_k) for query in queries]
+        for budget in [None] + args.budgets:
+            rows_out.append(dict(run_budget(engine, queries, reference, args.top_k, budget), rows=rows))
+        del engine
+
+    print(f"\n{'ROWS':>10} {'BUDGET':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'PARTIAL':>8} "
+          f"{'COVERAGE':>9} {'TOP-K AGREE':>12}")
+    for r in rows_out:
+        budget = f"{r['budget_ms']:g}" if r['budget_ms'] is not None else '-'
+        print(f"{r['rows']:>10,} {budget:>7} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['max_ms']:>8.1f} "
+              f"{r['partial']:>8.0%} {r['coverage']:>9.0%} {r['agreement']:>12.1%}")
+    return rows_out
+
+if __name__ == "__main__":
+    main()
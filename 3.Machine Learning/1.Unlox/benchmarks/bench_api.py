@@ -0,0 +1,153 @@
+"""
+HTTP API Benchmark
+Serves the engine with src/api/server.py in a separate process and loads it over HTTP from
+client threads (keep-alive connections), once per max batch size. A max batch size of 1
+is one-request-per-call serving; larger sizes coalesce concurrent requests into batched
+engine calls. Reports throughput, latency, the mean batch size actually formed and the
+requests rejected with 429.
+
+Load is generated as in load_replay.py (closed loop, or open loop with --rate).
+
+Usage:
+    python benchmarks/bench_api.py --rows 20000 --clients 32 --batch-sizes 1 8 32 --duration 10
+    python benchmarks/bench_api.py --rows 20000 --clients 64 --batch-sizes 1 32 --rate 800 --max-queue 64
+"""
+
+import sys
+import os
+import json
+import argparse
+import threading
+import http.client
+import multiprocessing
+
+# Add project root to path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_engine import build_artifacts, DEFAULT_CACHE_DIR
+from load_replay import load_queries, drive, summarize_run, print_results
+
+class Rejected(Exception):
+    """429: the server's request queue was full."""
+
+class ServerError(Exception):
+    """Any other non-200 response."""
+
+class APIClient:
+    """get_recommendations over HTTP, one keep-alive connection per calling thread."""
+
+    def __init__(self, port, host='127.0.0.1'):
+        self.host, self.port = host, port
+        self._local = threading.local()
+
+    def _request(self, method, path, payload=None):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        body = json.dumps(payload) if payload is not None else None
+        try:
+            connection.request(method, path, body, {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self._local.connection = None
+            connection.close()
+            raise
+        if response.status == 429:
+            raise Rejected(data.decode())
+        if response.status != 200:
+            raise ServerError(f"{response.status}: {data.decode()}")
+        return json.loads(data)
+
+    def get_recommendations(self, query, top_k=5):
+        return self._request('POST', '/recommend', {'query': query, 'top_k': top_k})['results']
+
+    def health(self):
+        return self._request('GET', '/health')
+
+def _server_main(config, ports):
+    import asyncio
+    from src.api.server import parse_args, serve
+
+    argv = ['--port', '0', '--max-batch-size', str(config['max_batch_size']),
+            '--max-wait-ms', str(config['max_wait_ms']), '--max-queue', str(config['max_queue']),
+            '--processed-dir', config['dirs']['processed_dir'],
+            '--cleaned-data-path', config['dirs']['cleaned_data_path'], '--models-dir', config['dirs']['models_dir']]
+    asyncio.run(serve(parse_args(argv), ready=ports.put))
+
+def run_api(dirs, queries, max_batch_size, clients, max_wait_ms=2.0, max_queue=1024, rate=None, duration=None,
+            requests=None, top_k=5):
+    """
+    Start a server with ``max_batch_size``, warm it up, replay ``queries`` from ``clients``
+    threads and stop it. 'cpu_cores_busy' is the client process only; 'mean_batch_size'
+    and 'rejected' come from the server's /health.
+    """
+    context = multiprocessing.get_context('spawn')
+    ports = context.Queue()
+    config = {'dirs': dirs, 'max_batch_size': max_batch_size, 'max_wait_ms': max_wait_ms, 'max_queue': max_queue}
+    server = context.Process(target=_server_main, args=(config, ports), daemon=True)
+    server.start()
+    try:
+        client = APIClient(ports.get(timeout=120))
+        for query in queries[:20]:
+            client.get_recommendations(query, top_k=top_k)
+        before = client.health()
+        raw = drive(client, queries, clients, rate, duration, requests, top_k)
+        after = client.health()
+    finally:
+        server.terminate()
+        server.join()
+    result = summarize_run(raw, f'batch{max_batch_size}', clients, rate)
+    result['off_cpu'] = None
+    batches = after['batches'] - before['batches']
+    result['max_batch_size'] = max_batch_size
+    result['mean_batch_size'] = (result['completed'] + result['errors']
+                                 - (after['rejected'] - before['rejected'])) / batches if batches else None
+    result['rejected'] = after['rejected'] - before['rejected']
+    return result
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20_000, help="Synthetic catalog size")
+    parser.add_argument('--clients', type=int, default=32, help="Client threads")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 32], help="Max batch sizes to compare")
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    parser.add_argument('--max-queue', type=int, default=1024)
+    parser.add_argument('--rate', type=float, default=None, help="Open-loop total queries/sec (default: closed loop)")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds per level")
+    parser.add_argument('--requests', type=int, default=None, help="Requests per level (stops early)")
+    parser.add_argument('--workload', default=None, help="Query capture or workload file (default: synthetic)")
+    parser.add_argument('--mix', default='skewed', help="Synthetic query mix")
+    parser.add_argument('--queries', type=int, default=1_000, help="Synthetic workload size")
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--output', default=None, help="Write the results as JSON")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    dirs = build_artifacts(args.rows, args.seed, args.cache_dir)
+    queries = load_queries(args.workload, args.queries, args.mix, args.seed)
+    load = f"open loop at {args.rate:g} q/s" if args.rate else "closed loop"
+    print(f"\nHTTP load: {len(queries):,} queries on {args.rows:,} rows, {args.clients} clients, {load}, "
+          f"max wait {args.max_wait_ms:g} ms, {os.cpu_count()} CPUs")
+
+    results = [run_api(dirs, queries, size, args.clients, args.max_wait_ms, args.max_queue, args.rate,
+                       args.duration, args.requests, args.top_k) for size in args.batch_sizes]
+    for result in results:
+        result['speedup'] = result['qps'] / results[0]['qps'] if results[0]['qps'] else None
+    print_results(results)
+    for r in results:
+        mean = f"{r['mean_batch_size']:.1f}" if r['mean_batch_size'] else '-'
+        print(f"max batch {r['max_batch_size']}: mean batch {mean}, {r['rejected']} rejected (429)")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'cpu_count': os.cpu_count(), 'results': results}, f, indent=2)
+        print(f"Results written to {args.output}")
+    return results
+
+if __name__ == "__main__":
+    main()
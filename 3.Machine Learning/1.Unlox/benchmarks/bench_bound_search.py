@@ -0,0 +1,76 @@
+"""
+Bounded Search Benchmark
+Compares the exhaustive cosine path with the branch-and-bound search
+(RecommendationEngine(bound_search=True)) on synthetic catalogs. For each catalog size
+and top_k it reports per-query latency, the speedup, the mean share of candidates the
+bounded search scored, and the time and memory to build its index. It checks that both
+engines return identical results.
+
+Usage:
+    python benchmarks/bench_bound_search.py --rows 10000 200000 1000000 --top-k 3 10
+"""
+
+import sys
+import os
+import time
+import argparse
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_engine import build_artifacts, DEFAULT_CACHE_DIR
+from src.models.recommendation_engine import RecommendationEngine
+from src.utils.metrics import MetricsRegistry
+from src.utils.synthetic_catalog import generate_queries
+
+def run(engine, queries, top_k):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(engine.get_recommendations(query, top_k=top_k))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 200_000, 1_000_000])
+    parser.add_argument('--top-k', type=int, nargs='+', default=[3, 10])
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--mix', default='skewed')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args(argv)
+
+    queries = generate_queries(args.queries, mix=args.mix, seed=args.seed)
+    rows_out = []
+    for rows in args.rows:
+        dirs = build_artifacts(rows, args.seed, args.cache_dir)
+        exhaustive = RecommendationEngine(metrics=MetricsRegistry(), **dirs)
+        metrics = MetricsRegistry()
+        bounded = RecommendationEngine(metrics=metrics, bound_search=True, **dirs)
+        index_seconds = metrics.snapshot()['engine_load_seconds']['values'][('bound_index',)]['sum']
+        for top_k in args.top_k:
+            metrics.reset()
+            plain_ms, expected = run(exhaustive, queries, top_k)
+            bound_ms, results = run(bounded, queries, top_k)
+            assert results == expected, "bounded search results differ"
+            scored = metrics.snapshot()['recommendation_bound_scored_fraction']['values'][()]
+            rows_out.append({'rows': rows, 'top_k': top_k,
+                             'plain_p50': np.percentile(plain_ms, 50), 'bound_p50': np.percentile(bound_ms, 50),
+                             'plain_mean': np.mean(plain_ms), 'bound_mean': np.mean(bound_ms),
+                             'scored': scored['sum'] / max(scored['count'], 1),
+                             'index_s': index_seconds, 'index_mb': bounded.bound_index.nbytes / 2**20})
+        del exhaustive, bounded
+
+    print(f"\n{'ROWS':>10} {'TOP-K':>6} {'EXHAUSTIVE p50':>15} {'BOUNDED p50':>12} {'SPEEDUP':>8} "
+          f"{'ROWS SCORED':>12} {'INDEX s':>8} {'INDEX MB':>9}")
+    for r in rows_out:
+        print(f"{r['rows']:>10,} {r['top_k']:>6} {r['plain_p50']:>15.2f} {r['bound_p50']:>12.2f} "
+              f"{r['plain_mean'] / r['bound_mean']:>7.1f}x {r['scored']:>12.1%} {r['index_s']:>8.2f} "
+              f"{r['index_mb']:>9.1f}")
+    return rows_out
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+Recommendation Engine Benchmark Suite
+Measures how ``RecommendationEngine.get_recommendations`` scales, fully offline on
+synthetic catalogs (src/utils/synthetic_catalog.py built with the incremental pipeline).
+
+Sweeps catalog size x filter selectivity x top_k x ranking method and records, per stage
+(init, filter, encode, score, rank, format, explain) and end to end:
+p50/p95/p99 latency, queries/sec and the peak RSS of the process.
+
+Each catalog size is measured in a fresh process, so peak RSS is per catalog.
+Results are written as JSON; ``--baseline`` compares a run with a saved result.
+``--workload`` replays a captured (src/utils/query_capture.py) or generated query file
+instead of the synthetic selectivity levels; its results have selectivity 'workload'.
+
+Usage:
+    python benchmarks/bench_engine.py --rows 10000 100000 --output results.json
+    python benchmarks/bench_engine.py --rows 10000 --baseline results.json
+    python benchmarks/bench_engine.py --compare new.json old.json
+    python benchmarks/bench_engine.py --rows 100000 --workload logs/queries.jsonl --queries 5000
+"""
+
+import sys
+import os
+import json
+import time
+import platform
+import argparse
+import resource
+import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Add project root to path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+STAGES = ['filter', 'encode', 'score', 'rank', 'format', 'explain', 'total']
+# Which hard filters the queries keep: none (whole catalog), location only, or all three
+SELECTIVITY = {
+    'none': (),
+    'location': ('Location_Area',),
+    'full': ('Target_Business_Type', 'Price_Category', 'Location_Area'),
+}
+FILTER_KEYS = ('Target_Business_Type', 'Price_Category', 'Location_Area')
+DEFAULT_CACHE_DIR = os.path.join(PROJECT_ROOT, '.pipeline_cache', 'bench')
+DEFAULT_OUTPUT_DIR = os.path.join(PROJECT_ROOT, 'benchmarks', 'results')
+
+def peak_rss_mb():
+    """High-water mark of the resident set size of this process (Linux reports KB)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def build_artifacts(n_rows, seed, cache_dir):
+    """
+    Generate a synthetic catalog and build its artifacts with the incremental pipeline.
+    Unchanged catalogs are served from the pipeline cache.
+
+    Returns:
+        dict: processed_dir, cleaned_data_path and models_dir for RecommendationEngine.
+    """
+    from src.utils.synthetic_catalog import write_catalog
+    from src.preprocessing.pipeline import parse_args, build_steps, run_pipeline
+
+    root = os.path.join(cache_dir, f'rows_{n_rows}_seed_{seed}')
+    raw = os.path.join(root, 'raw.csv')
+    if not os.path.exists(raw):
+        write_catalog(raw, n_rows, seed=seed)
+    dirs = {'processed_dir': os.path.join(root, 'artifacts'),
+            'cleaned_data_path': os.path.join(root, 'artifacts', 'cleaned.csv'),
+            'models_dir': os.path.join(root, 'artifacts')}
+    args = parse_args(['--raw', raw, '--cache-dir', os.path.join(root, 'cache'),
+                       '--cleaned-path', dirs['cleaned_data_path'],
+                       '--processed-dir', dirs['processed_dir'], '--models-dir', dirs['models_dir']])
+    run_pipeline(build_steps(vars(args)), cache_dir=args.cache_dir,
+                 destinations={'cleaned_path': args.cleaned_path, 'processed_dir': args.processed_dir,
+                               'models_dir': args.models_dir})
+    return dirs
+
+def make_workload(n_queries, selectivity, seed):
+    """Uniform synthetic queries keeping only the hard filters of the selectivity level."""
+    from src.utils.synthetic_catalog import generate_queries
+
+    queries = generate_queries(n_queries, mix='uniform', seed=seed)
+    for query in queries:
+        for key in FILTER_KEYS:
+            if key not in SELECTIVITY[selectivity]:
+                query.pop(key)
+    return queries
+
+def summarize(samples_ms):
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    if len(samples) == 0:
+        return {'count': 0}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {'count': len(samples), 'mean_ms': float(samples.mean()), 'p50_ms': float(p50),
+            'p95_ms': float(p95), 'p99_ms': float(p99)}
+
+class _TimedExplainer:
+    """Wraps the engine's explainer to accumulate the time spent in explanations."""
+
+    def __init__(self, explainer):
+        self.explainer = explainer
+        self.seconds = 0.0
+
+    def generate_explanation(self, user_input, service_row):
+        start = time.perf_counter()
+        try:
+            return self.explainer.generate_explanation(user_input, service_row)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+def time_query(engine, query, top_k, timer):
+    """
+    Run one query stage by stage (the same calls get_recommendations makes).
+
+    Returns:
+        tuple: ({stage: ms}, number of candidates, number of results).
+    """
+    clock = time.perf_counter
+    timer.seconds = 0.0
+    t0 = clock()
+    candidates = engine.filter_candidates(query)
+    t1 = clock()
+    if len(candidates) == 0:
+        return {'filter': (t1 - t0) * 1000, 'total': (t1 - t0) * 1000}, 0, 0
+
+    user_blocks = engine.encode_query(query)
+    t2 = clock()
+    similarities = engine.score_candidates(user_blocks, candidates, engine.block_weights)
+    t3 = clock()
+    positions, scores = engine.rank_candidates(similarities, top_k, user_blocks, candidates, engine.block_weights)
+    t4 = clock()
+    results = engine.format_results(query, candidates, positions, scores)
+    t5 = clock()
+
+    stages = {
+        'filter': t1 - t0, 'encode': t2 - t1, 'score': t3 - t2, 'rank': t4 - t3,
+        'format': (t5 - t4) - timer.seconds, 'explain': timer.seconds, 'total': t5 - t0,
+    }
+    return {name: seconds * 1000 for name, seconds in stages.items()}, len(candidates), len(results)
+
+def run_catalog(config):
+    """
+    Benchmark one catalog size in the current (fresh) process.
+
+    Args:
+        config (dict): rows, dirs, selectivity, top_k, ranking_methods, queries, warmup, seed
+            and optionally workload (a query file replayed instead of the selectivity levels).
+
+    Returns:
+        dict: 'init' measurements and one result per sweep combination.
+    """
+    from src.models.recommendation_engine import RecommendationEngine
+
+    start = time.perf_counter()
+    engine = RecommendationEngine(**config['dirs'])
+    init = {'rows': config['rows'], 'seconds': time.perf_counter() - start, 'peak_rss_mb': peak_rss_mb(),
+            'catalog_rows': len(engine.df)}
+    timer = _TimedExplainer(engine.explainer)
+    engine.explainer = timer
+
+    if config.get('workload'):
+        from src.utils.query_capture import load_workload
+        workloads = {'workload': load_workload(config['workload'])[:config['queries']]}
+    else:
+        workloads = {selectivity: make_workload(config['queries'], selectivity, config['seed'])
+                     for selectivity in config['selectivity']}
+
+    results = []
+    for selectivity, queries in workloads.items():
+        for ranking_method in config['ranking_methods']:
+            engine.ranking_method = ranking_method
+            for top_k in config['top_k']:
+                for query in queries[:config['warmup']]:
+                    time_query(engine, query, top_k, timer)
+
+                samples = {stage: [] for stage in STAGES}
+                candidates, answered = [], 0
+                for query in queries:
+                    stages, n_candidates, n_results = time_query(engine, query, top_k, timer)
+                    for stage, ms in stages.items():
+                        samples[stage].append(ms)
+                    candidates.append(n_candidates)
+                    answered += n_results > 0
+
+                total_seconds = sum(samples['total']) / 1000
+                results.append({
+                    'rows': config['rows'], 'selectivity': selectivity, 'top_k': top_k,
+                    'ranking_method': ranking_method,
+                    'stages': {stage: summarize(values) for stage, values in samples.items()},
+                    'qps': len(queries) / total_seconds if total_seconds else None,
+                    'mean_candidates': float(np.mean(candidates)),
+                    'answered': answered / len(queries),
+                    'peak_rss_mb': peak_rss_mb(),
+                })
+                print(f"  {config['rows']:>9,} rows  {selectivity:<9} {ranking_method:<7} top_k={top_k:<4} "
+                      f"p50 {results[-1]['stages']['total']['p50_ms']:8.2f} ms  "
+                      f"p95 {results[-1]['stages']['total']['p95_ms']:8.2f} ms  "
+                      f"{results[-1]['qps']:9.1f} q/s", flush=True)
+    return {'init': init, 'results': results}
+
+def run_suite(args):
+    runs = {'init': [], 'results': []}
+    # Fresh interpreter per catalog, so peak RSS is not inflated by earlier (or larger) catalogs
+    context = multiprocessing.get_context('spawn')
+    for n_rows in args.rows:
+        print(f"\nBuilding synthetic catalog: {n_rows:,} rows")
+        dirs = build_artifacts(n_rows, args.seed, args.cache_dir)
+        config = {'rows': n_rows, 'dirs': dirs, 'selectivity': args.selectivity, 'top_k': args.top_k,
+                  'ranking_methods': args.ranking_methods, 'queries': args.queries,
+                  'warmup': args.warmup, 'seed': args.seed, 'workload': args.workload}
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            run = pool.submit(run_catalog, config).result()
+        print(f"  init {run['init']['seconds']:.2f}s, peak RSS {run['init']['peak_rss_mb']:.0f} MB after init")
+        runs['init'].append(run['init'])
+        runs['results'].extend(run['results'])
+
+    import numpy, pandas, sklearn
+    runs['meta'] = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(), 'platform': platform.platform(),
+        'numpy': numpy.__version__, 'pandas': pandas.__version__, 'sklearn': sklearn.__version__,
+        'cpu_count': os.cpu_count(), 'args': {k: v for k, v in vars(args).items() if k not in ('compare',)},
+    }
+    return runs
+
+def result_key(result):
+    return (result['rows'], result['selectivity'], result['top_k'], result['ranking_method'])
+
+def compare_results(current, baseline, threshold=0.10):
+    """
+    Compare two result files on p50/p95 total latency and throughput.
+
+    Returns:
+        list: One dict per matching combination with the ratios and a 'regression' flag
+        (p95 latency up or throughput down by more than ``threshold``).
+    """
+    base = {result_key(r): r for r in baseline['results']}
+    rows = []
+    for result in current['results']:
+        old = base.get(result_key(result))
+        if old is None or not result['qps'] or not old['qps']:
+            continue
+        new_total, old_total = result['stages']['total'], old['stages']['total']
+        p50_ratio = new_total['p50_ms'] / old_total['p50_ms']
+        p95_ratio = new_total['p95_ms'] / old_total['p95_ms']
+        qps_ratio = result['qps'] / old['qps']
+        rows.append({'key': result_key(result), 'p50_ratio': p50_ratio, 'p95_ratio': p95_ratio,
+                     'qps_ratio': qps_ratio,
+                     'regression': p95_ratio > 1 + threshold or qps_ratio < 1 - threshold})
+    return rows
+
+def print_comparison(rows, threshold):
+    print("\n" + "=" * 84)
+    print(f"{'ROWS':>9} {'FILTERS':<9} {'METHOD':<7} {'TOP_K':>5} {'p50 new/old':>12} {'p95 new/old':>12} "
+          f"{'qps new/old':>12}")
+    print("=" * 84)
+    for row in rows:
+        n_rows, selectivity, top_k, method = row['key']
+        flag = '  REGRESSION' if row['regression'] else ''
+        print(f"{n_rows:>9,} {selectivity:<9} {method:<7} {top_k:>5} {row['p50_ratio']:>12.2f} "
+              f"{row['p95_ratio']:>12.2f} {row['qps_ratio']:>12.2f}{flag}")
+    regressions = sum(row['regression'] for row in rows)
+    print(f"{len(rows)} combinations compared, {regressions} regressions (threshold {threshold:.0%})")
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000], help="Catalog sizes")
+    parser.add_argument('--selectivity', nargs='+', default=list(SELECTIVITY), choices=list(SELECTIVITY))
+    parser.add_argument('--top-k', type=int, nargs='+', default=[5, 50])
+    parser.add_argument('--ranking-methods', nargs='+', default=['cosine', 'knn'], choices=['cosine', 'knn'])
+    parser.add_argument('--queries', type=int, default=200, help="Measured queries per combination")
+    parser.add_argument('--workload', default=None,
+                        help="Replay this query file (capture or JSON-lines workload) instead of --selectivity")
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="Synthetic catalogs and their artifacts")
+    parser.add_argument('--output', default=None, help="Result JSON (default: benchmarks/results/engine_<time>.json)")
+    parser.add_argument('--baseline', default=None, help="Compare this run with a saved result JSON")
+    parser.add_argument('--compare', nargs=2, metavar=('CURRENT', 'BASELINE'), default=None,
+                        help="Only compare two saved result files")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Allowed p95/throughput regression")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.compare:
+        with open(args.compare[0]) as f, open(args.compare[1]) as g:
+            current, baseline = json.load(f), json.load(g)
+        return 1 if print_comparison(compare_results(current, baseline, args.threshold), args.threshold) else 0
+
+    runs = run_suite(args)
+    output = args.output or os.path.join(
+        DEFAULT_OUTPUT_DIR, f"engine_{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(runs, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        return 1 if print_comparison(compare_results(runs, baseline, args.threshold), args.threshold) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Feature Build Benchmark
+Compares the previous per-row ``.apply`` + ``np.hstack`` feature build with the
+vectorized, preallocated ``process_features`` (serial and thread pool), and checks
+that all variants produce the same matrix.
+
+Usage:
+    python benchmarks/bench_feature_build.py --rows 100000 1000000 --jobs 3
+"""
+
+import sys
+import os
+import time
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import OneHotEncoder
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.preprocessing.feature_engineering import process_features, build_manual_features, TFIDF_BOOST
+
+WORDS = ['social', 'media', 'marketing', 'tax', 'filing', 'compliance', 'payroll', 'salary',
+         'website', 'development', 'seo', 'search', 'engine', 'optimization', 'inventory',
+         'tracking', 'crm', 'customer', 'legal', 'contracts', 'cloud', 'stack', 'bookkeeping',
+         'monthly', 'annual', 'restaurant', 'retail', 'clinic', 'startup', 'design', 'review']
+
+def make_catalog(n_rows, seed=0):
+    """Random cleaned catalog with the columns process_features reads."""
+    rng = np.random.default_rng(seed)
+    pick = lambda values: np.array(values, dtype=object)[rng.integers(0, len(values), size=n_rows)]
+    words = np.array(WORDS)[rng.integers(0, len(WORDS), size=(n_rows, 10))]
+    return pd.DataFrame({
+        'Service_ID': np.arange(1, n_rows + 1),
+        'Description': [' '.join(w) for w in words],
+        'Target_Business_Type': pick(['clinic', 'e-commerce', 'freelancer', 'restaurant', 'retail', 'tech startup']),
+        'Price_Category': pick(['low', 'medium', 'high', 'premium']),
+        'Language_Support': pick(['english', 'hindi', 'both', 'regional']),
+        'Location_Area': pick(['bengaluru', 'chennai', 'delhi', 'mumbai', 'remote']),
+    })
+
+def legacy_manual_features(df):
+    """The original manual block: one Python lambda call per row per feature."""
+    df = df.copy()
+    price_map = {'low': 0.25, 'medium': 0.50, 'high': 0.75, 'premium': 1.0}
+    df['price_score'] = df['Price_Category'].map(price_map).fillna(0.5)
+    df['lang_english'] = df['Language_Support'].apply(lambda x: 1 if x in ['english', 'both'] else 0)
+    df['lang_hindi'] = df['Language_Support'].apply(lambda x: 1 if x in ['hindi', 'both'] else 0)
+    df['lang_regional'] = df['Language_Support'].apply(lambda x: 1 if x == 'regional' else 0)
+    df['is_remote'] = df['Location_Area'].apply(lambda x: 1 if x == 'remote' else 0)
+    return df[['price_score', 'lang_english', 'lang_hindi', 'lang_regional', 'is_remote']].values
+
+def legacy_process_features(df):
+    """The original implementation: per-row lambdas and dense hstack copies."""
+    df = df.copy()
+    price_map = {'low': 0.25, 'medium': 0.50, 'high': 0.75, 'premium': 1.0}
+    df['price_score'] = df['Price_Category'].map(price_map).fillna(0.5)
+    df['lang_english'] = df['Language_Support'].apply(lambda x: 1 if x in ['english', 'both'] else 0)
+    df['lang_hindi'] = df['Language_Support'].apply(lambda x: 1 if x in ['hindi', 'both'] else 0)
+    df['lang_regional'] = df['Language_Support'].apply(lambda x: 1 if x == 'regional' else 0)
+    df['is_remote'] = df['Location_Area'].apply(lambda x: 1 if x == 'remote' else 0)
+    tfidf = TfidfVectorizer(max_features=500, stop_words='english')
+    tfidf_matrix = tfidf.fit_transform(df['Description'].fillna(''))
+    ohe = OneHotEncoder(sparse_output=False, handle_unknown='ignore')
+    ohe_matrix = ohe.fit_transform(df[['Target_Business_Type', 'Location_Area']])
+    manual = df[['price_score', 'lang_english', 'lang_hindi', 'lang_regional', 'is_remote']].values
+    return np.hstack([manual, ohe_matrix, tfidf_matrix.toarray() * 10.0])
+
+def time_call(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def peak_mb(func, *args, **kwargs):
+    """Peak traced allocation (numpy buffers included) of one call, in MB."""
+    tracemalloc.start()
+    func(*args, **kwargs)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--jobs', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} | {'total: legacy':>13} {'vectorized':>10} {'threads':>8} | "
+          f"{'manual: legacy':>14} {'vectorized':>10} | {'peak MB: legacy':>15} {'vectorized':>10} | match")
+    for n_rows in args.rows:
+        df = make_catalog(n_rows)
+        legacy_s, expected = time_call(legacy_process_features, df)
+        serial_s, (matrix, _, _, _) = time_call(process_features, df, boost=TFIDF_BOOST)
+        match = np.array_equal(matrix, expected)
+        del expected
+        threaded_s, (threaded, _, _, _) = time_call(process_features, df, n_jobs=args.jobs, boost=TFIDF_BOOST)
+        match = match and np.array_equal(matrix, threaded)
+        del matrix, threaded
+
+        legacy_manual_s, _ = time_call(legacy_manual_features, df)
+        manual_s, _ = time_call(build_manual_features, df, np.empty((n_rows, 5)))
+
+        legacy_mb = peak_mb(legacy_process_features, df)
+        vectorized_mb = peak_mb(process_features, df)
+        print(f"{n_rows:>10,} | {legacy_s:>12.2f}s {serial_s:>9.2f}s {threaded_s:>7.2f}s | "
+              f"{legacy_manual_s:>13.3f}s {manual_s:>9.3f}s | {legacy_mb:>15.0f} {vectorized_mb:>10.0f} | {match}")
+
+if __name__ == "__main__":
+    main()
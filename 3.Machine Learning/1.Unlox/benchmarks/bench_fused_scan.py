@@ -0,0 +1,85 @@
+"""
+Fused Scan Benchmark
+Compares the staged query path (filter mask -> candidate list -> gathered rows -> scores ->
+top-k) with the fused scan (RecommendationEngine(fused_scan=True)) on synthetic catalogs,
+per filter selectivity: per-query latency, and with tracemalloc the peak memory allocated
+during a query. It checks that both paths return identical results.
+
+Usage:
+    python benchmarks/bench_fused_scan.py --rows 200000 1000000 --selectivity none location full
+"""
+
+import sys
+import os
+import time
+import argparse
+import tracemalloc
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_engine import build_artifacts, make_workload, DEFAULT_CACHE_DIR, SELECTIVITY
+from src.models.recommendation_engine import RecommendationEngine
+from src.utils.metrics import MetricsRegistry
+
+def latencies(engine, queries, top_k):
+    samples, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(engine.get_recommendations(query, top_k=top_k))
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples, results
+
+def allocations(engine, queries, top_k):
+    """Largest tracemalloc peak over the queries, in MB (tracing slows the queries down)."""
+    tracemalloc.start()
+    peak = 0
+    try:
+        for query in queries:
+            tracemalloc.reset_peak()
+            engine.get_recommendations(query, top_k=top_k)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+    return peak / 2**20
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[200_000, 1_000_000])
+    parser.add_argument('--selectivity', nargs='+', default=list(SELECTIVITY), choices=list(SELECTIVITY))
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--traced-queries', type=int, default=10)
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args(argv)
+
+    rows_out = []
+    for rows in args.rows:
+        dirs = build_artifacts(rows, args.seed, args.cache_dir)
+        staged = RecommendationEngine(metrics=MetricsRegistry(), **dirs)
+        fused = RecommendationEngine(metrics=MetricsRegistry(), fused_scan=True, **dirs)
+        for selectivity in args.selectivity:
+            queries = make_workload(args.queries, selectivity, args.seed)
+            staged_ms, expected = latencies(staged, queries, args.top_k)
+            fused_ms, results = latencies(fused, queries, args.top_k)
+            assert results == expected, "fused scan results differ"
+            traced = queries[:args.traced_queries]
+            rows_out.append({'rows': rows, 'selectivity': selectivity,
+                             'staged_p50': np.percentile(staged_ms, 50), 'fused_p50': np.percentile(fused_ms, 50),
+                             'staged_mean': np.mean(staged_ms), 'fused_mean': np.mean(fused_ms),
+                             'staged_peak_mb': allocations(staged, traced, args.top_k),
+                             'fused_peak_mb': allocations(fused, traced, args.top_k)})
+        del staged, fused
+
+    print(f"\n{'ROWS':>10} {'FILTERS':<9} {'STAGED p50':>11} {'FUSED p50':>10} {'SPEEDUP':>8} "
+          f"{'STAGED PEAK MB':>15} {'FUSED PEAK MB':>14}")
+    for r in rows_out:
+        print(f"{r['rows']:>10,} {r['selectivity']:<9} {r['staged_p50']:>11.2f} {r['fused_p50']:>10.2f} "
+              f"{r['staged_mean'] / r['fused_mean']:>7.2f}x {r['staged_peak_mb']:>15.1f} {r['fused_peak_mb']:>14.1f}")
+    return rows_out
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+LSA Compression Benchmark
+Compares scoring against the full TF-IDF block with scoring against its truncated-SVD
+projection: per-query latency, text-block memory and top-k agreement with the full path.
+
+Usage:
+    python benchmarks/bench_lsa.py --rows 200000 --components 32 64 128
+"""
+
+import sys
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.preprocessing.feature_engineering import process_features, MANUAL_FEATURE_NAMES
+from src.preprocessing.lsa_compression import fit_lsa, project_block
+from src.models.feature_blocks import FeatureBlocks, DEFAULT_BLOCK_WEIGHTS
+
+def make_catalog(n_rows, n_topics=50, words_per_topic=30, seed=0):
+    """Topic-structured descriptions so the vocabulary fills all 500 TF-IDF columns."""
+    rng = np.random.default_rng(seed)
+    vocab = np.array([f"w{t}x{w}" for t in range(n_topics) for w in range(words_per_topic)]).reshape(n_topics, -1)
+    topics = rng.integers(0, n_topics, size=n_rows)
+    on_topic = vocab[topics[:, None], rng.integers(0, words_per_topic, size=(n_rows, 12))]
+    noise = vocab.ravel()[rng.integers(0, vocab.size, size=(n_rows, 3))]
+    pick = lambda values: np.array(values, dtype=object)[rng.integers(0, len(values), size=n_rows)]
+    return pd.DataFrame({
+        'Service_ID': np.arange(n_rows),
+        'Description': [' '.join(w) for w in np.hstack([on_topic, noise])],
+        'Target_Business_Type': pick(['clinic', 'e-commerce', 'freelancer', 'restaurant', 'retail', 'tech startup']),
+        'Price_Category': pick(['low', 'medium', 'high', 'premium']),
+        'Language_Support': pick(['english', 'hindi', 'both', 'regional']),
+        'Location_Area': pick(['bengaluru', 'chennai', 'delhi', 'mumbai', 'remote']),
+    })
+
+def top_k(blocks, user_blocks, k):
+    """Indices of the k best rows by weighted cosine, best first."""
+    dots = blocks.block_dots(user_blocks)
+    scores = blocks.weighted_cosine(dots, blocks.user_sq_norms(user_blocks), blocks.row_sq_norms(), DEFAULT_BLOCK_WEIGHTS)
+    best = np.argpartition(-scores, k)[:k]
+    return best[np.argsort(-scores[best])]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--components', type=int, nargs='+', default=[32, 64, 128])
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--top-k', type=int, default=10)
+    args = parser.parse_args()
+
+    df = make_catalog(args.rows)
+    matrix, _, (ohe, tfidf), _ = process_features(df)
+    n_manual, n_onehot = len(MANUAL_FEATURE_NAMES), len(ohe.get_feature_names_out())
+    full = FeatureBlocks.from_matrix(matrix, n_manual, n_onehot, tfidf_boost=1.0)
+    del matrix
+
+    # Queries: manual/one-hot blocks of random services plus their descriptions
+    rng = np.random.default_rng(1)
+    rows = rng.integers(0, args.rows, size=args.queries)
+    queries = [(full.blocks[0][[r]], full.blocks[1][[r]], tfidf.transform([df['Description'].iloc[r]]).toarray())
+               for r in rows]
+
+    shortlist = args.top_k * 10
+
+    def run(blocks, encode, k):
+        start = time.perf_counter()
+        results = [top_k(blocks, encode(q), k) for q in queries]
+        return (time.perf_counter() - start) / len(queries) * 1000, results
+
+    full_ms, full_results = run(full, lambda q: q, args.top_k)
+    print(f"\nCatalog: {args.rows:,} services, TF-IDF width {full.widths[2]}")
+    header_agree, header_recall = f"top-{args.top_k} agree", f"in top-{shortlist}"
+    print(f"{'mode':<10} {'text MB':>9} {'ms/query':>9} {'speedup':>8} {header_agree:>13} {header_recall:>12}")
+    print(f"{'full':<10} {full.blocks[2].nbytes / 1e6:>9.1f} {full_ms:>9.2f} {1.0:>7.1f}x {100.0:>12.1f}% {100.0:>11.1f}%")
+
+    for k in args.components:
+        svd = fit_lsa(full.blocks[2], n_components=k)
+        projected = project_block(svd, full.blocks[2], np.empty((args.rows, svd.n_components)))
+        lsa = FeatureBlocks(full.blocks[0], full.blocks[1], projected)
+        encode = lambda q: (q[0], q[1], svd.transform(q[2]))
+        ms, results = run(lsa, encode, args.top_k)
+        _, wide = run(lsa, encode, shortlist)
+        agree = np.mean([len(set(a) & set(b)) / args.top_k for a, b in zip(full_results, results)]) * 100
+        # How much of the exact top-k a shortlist from the compressed path would contain
+        recall = np.mean([len(set(a) & set(b)) / args.top_k for a, b in zip(full_results, wide)]) * 100
+        print(f"{'lsa-%d' % k:<10} {projected.nbytes / 1e6:>9.1f} {ms:>9.2f} {full_ms / ms:>7.1f}x {agree:>12.1f}% {recall:>11.1f}%")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Quantized Storage Benchmark
+Compares exact scoring on the float64 blocks with scoring on int8 / PQ codes plus exact
+re-ranking of a shortlist: feature memory, per-query latency and recall@k against the exact path.
+
+Usage:
+    python benchmarks/bench_quantization.py --rows 200000 --rerank-factor 10
+"""
+
+import sys
+import os
+import time
+import argparse
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_lsa import make_catalog
+from src.preprocessing.feature_engineering import process_features, MANUAL_FEATURE_NAMES
+from src.models.feature_blocks import FeatureBlocks, DEFAULT_BLOCK_WEIGHTS
+from src.models.quantization import QuantizedBlocks, rerank_top_k
+
+def exact_top_k(blocks, user_blocks, k):
+    scores = FeatureBlocks.similarity(blocks.block_dots(user_blocks), blocks.user_sq_norms(user_blocks),
+                                      blocks.row_sq_norms(), DEFAULT_BLOCK_WEIGHTS)
+    return np.argsort(-scores, kind='stable')[:k]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--rerank-factor', type=int, default=10)
+    args = parser.parse_args()
+
+    df = make_catalog(args.rows)
+    matrix, _, (ohe, tfidf), _ = process_features(df)
+    exact = FeatureBlocks.from_matrix(matrix, len(MANUAL_FEATURE_NAMES), len(ohe.get_feature_names_out()), tfidf_boost=1.0)
+    del matrix
+
+    rng = np.random.default_rng(1)
+    rows = rng.integers(0, args.rows, size=args.queries)
+    queries = [(exact.blocks[0][[r]], exact.blocks[1][[r]], tfidf.transform([df['Description'].iloc[r]]).toarray())
+               for r in rows]
+
+    def timed(search):
+        start = time.perf_counter()
+        results = [search(q) for q in queries]
+        return (time.perf_counter() - start) / len(queries) * 1000, results
+
+    exact_ms, truth = timed(lambda q: exact_top_k(exact, q, args.top_k))
+    full_mb = sum(block.nbytes for block in exact.blocks) / 1e6
+
+    print(f"\nCatalog: {args.rows:,} services, widths {exact.widths}, top-{args.top_k}, "
+          f"shortlist {args.rerank_factor * args.top_k}")
+    print(f"{'mode':<14} {'features MB':>12} {'ms/query':>9} {'speedup':>8} {'recall@k':>9}")
+    print(f"{'float64':<14} {full_mb:>12.1f} {exact_ms:>9.2f} {1.0:>7.1f}x {100.0:>8.1f}%")
+
+    for method in ('int8', 'pq'):
+        start = time.perf_counter()
+        quantized = QuantizedBlocks.from_blocks(exact, method=method)
+        build_s = time.perf_counter() - start
+
+        def approx_only(q):
+            return exact_top_k(_ApproxView(quantized, exact), q, args.top_k)
+
+        def reranked(q):
+            return rerank_top_k(quantized, exact, q, DEFAULT_BLOCK_WEIGHTS, args.top_k,
+                                rerank_factor=args.rerank_factor)[0]
+
+        for label, search in ((f"{method}", approx_only), (f"{method}+rerank", reranked)):
+            ms, results = timed(search)
+            recall = np.mean([len(set(a) & set(b)) / args.top_k for a, b in zip(truth, results)]) * 100
+            print(f"{label:<14} {quantized.nbytes / 1e6:>12.1f} {ms:>9.2f} {exact_ms / ms:>7.1f}x {recall:>8.1f}%")
+        print(f"{'':<14} (built in {build_s:.1f}s, {full_mb * 1e6 / quantized.nbytes:.0f}x smaller)")
+
+class _ApproxView:
+    """Quantized dots with exact norms, scored without re-ranking."""
+
+    def __init__(self, quantized, exact):
+        self.block_dots = quantized.block_dots
+        self.user_sq_norms = exact.user_sq_norms
+        self.row_sq_norms = exact.row_sq_norms
+
+if __name__ == "__main__":
+    main()
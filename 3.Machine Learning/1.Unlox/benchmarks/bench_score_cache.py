@@ -0,0 +1,92 @@
+"""
+Text Score Cache Benchmark
+Simulates the Streamlit pattern of re-submitting one description with different filters.
+Each session sends a first query, then follow-ups that each change one of the budget, city
+or languages. It compares an engine without the text score cache with one using it and
+reports per-query latency of first queries (cache misses) and follow-ups (hits). It also
+checks that both engines return identical results.
+
+Usage:
+    python benchmarks/bench_score_cache.py --rows 200000 1000000 --sessions 50
+"""
+
+import sys
+import os
+import time
+import argparse
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_engine import build_artifacts, DEFAULT_CACHE_DIR
+from src.models.recommendation_engine import RecommendationEngine
+from src.utils.metrics import MetricsRegistry
+from src.utils.synthetic_catalog import generate_queries
+
+PRICES = ['Low', 'Medium', 'High', 'Premium']
+LOCATIONS = ['Remote', 'Delhi', 'Mumbai', 'Bengaluru', 'Chennai']
+LANGUAGES = [['English'], ['Hindi'], ['English', 'Hindi'], []]
+
+def make_sessions(n_sessions, follow_ups, seed):
+    """
+    Per session: a first query, then ``follow_ups`` re-submissions that each change one of
+    budget, city or languages from the previous one, as a user moving one form field does.
+    """
+    rng = np.random.default_rng(seed)
+    sessions = []
+    for query in generate_queries(n_sessions, mix='uniform', seed=seed):
+        session = [dict(query, Description=query.get('Description') or 'accounting and tax help')]
+        for _ in range(follow_ups):
+            field, values = [('Price_Category', PRICES), ('Location_Area', LOCATIONS),
+                             ('Language_Support', LANGUAGES)][rng.integers(3)]
+            session.append(dict(session[-1], **{field: values[rng.integers(len(values))]}))
+        sessions.append(session)
+    return sessions
+
+def timed(engine, query, top_k):
+    start = time.perf_counter()
+    results = engine.get_recommendations(query, top_k=top_k)
+    return (time.perf_counter() - start) * 1000, results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[200_000, 1_000_000])
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--follow-ups', type=int, default=5)
+    parser.add_argument('--cache-mb', type=float, default=256)
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args(argv)
+
+    sessions = make_sessions(args.sessions, args.follow_ups, args.seed)
+    print(f"\n{'ROWS':>10} {'QUERY':<10} {'NO CACHE p50':>13} {'CACHE p50':>10} {'SPEEDUP':>8} "
+          f"{'NO CACHE p95':>13} {'CACHE p95':>10}")
+    for rows in args.rows:
+        dirs = build_artifacts(rows, args.seed, args.cache_dir)
+        plain = RecommendationEngine(metrics=MetricsRegistry(), **dirs)
+        cached = RecommendationEngine(metrics=MetricsRegistry(), text_score_cache_mb=args.cache_mb, **dirs)
+        timings = {('first', False): [], ('first', True): [], ('follow-up', False): [], ('follow-up', True): []}
+        for session in sessions:
+            for i, query in enumerate(session):
+                kind = 'first' if i == 0 else 'follow-up'
+                plain_ms, expected = timed(plain, query, args.top_k)
+                cached_ms, results = timed(cached, query, args.top_k)
+                assert results == expected, "cached results differ"
+                timings[kind, False].append(plain_ms)
+                timings[kind, True].append(cached_ms)
+        for kind in ('first', 'follow-up'):
+            p50_plain, p95_plain = np.percentile(timings[kind, False], [50, 95])
+            p50_cached, p95_cached = np.percentile(timings[kind, True], [50, 95])
+            print(f"{rows:>10,} {kind:<10} {p50_plain:>13.2f} {p50_cached:>10.2f} {p50_plain / p50_cached:>7.1f}x "
+                  f"{p95_plain:>13.2f} {p95_cached:>10.2f}")
+        cache = cached.text_scores
+        print(f"{'':>10} cache: {cache.hits} hits, {cache.misses} misses, {len(cache)} entries, "
+              f"{cache.nbytes / 2**20:.1f} MB, {cache.rows_reused / max(cache.rows_served, 1):.0%} of the text "
+              f"scores served from the cache")
+        del plain, cached
+
+if __name__ == "__main__":
+    main()
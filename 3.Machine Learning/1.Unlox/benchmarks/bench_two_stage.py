@@ -0,0 +1,92 @@
+"""
+Two-Stage Retrieval Benchmark
+Compares exact cosine scoring of every candidate with two-stage retrieval
+(RecommendationEngine(two_stage_shortlist=N)) on synthetic catalogs, for filter
+selectivities that leave many candidates. Per shortlist size it reports per-query
+latency, the speedup, and top-k agreement with the exact results, both by row (share of
+the exact top-k rows returned) and by score (share of returned rows scoring at least the
+exact k-th score). Synthetic catalogs hold many tied rows, of which the shortlist may
+keep others than the exact path, so the score agreement is the one that measures misses.
+Queries without exact results count as agreeing.
+
+Usage:
+    python benchmarks/bench_two_stage.py --rows 200000 1000000 --shortlist 25 100 400 1600
+"""
+
+import sys
+import os
+import time
+import argparse
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_engine import build_artifacts, make_workload, DEFAULT_CACHE_DIR, SELECTIVITY
+from src.models.recommendation_engine import RecommendationEngine
+from src.utils.metrics import MetricsRegistry
+
+def run(engine, queries, top_k):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(engine.search(query, top_k=top_k))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, results
+
+def agreement(results, expected, tolerance=1e-12):
+    """Mean (row, score) agreement of each query with the exact top-k."""
+    rows, scores = [], []
+    for got, want in zip(results, expected):
+        if not want:
+            rows.append(1.0)
+            scores.append(1.0)
+            continue
+        want_rows = {row for _, row, _ in want}
+        rows.append(len({row for _, row, _ in got} & want_rows) / len(want))
+        scores.append(sum(score >= want[-1][0] - tolerance for score, _, _ in got) / len(want))
+    return float(np.mean(rows)), float(np.mean(scores))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[200_000, 1_000_000])
+    parser.add_argument('--selectivity', nargs='+', default=['none', 'location'], choices=list(SELECTIVITY))
+    parser.add_argument('--shortlist', type=int, nargs='+', default=[25, 100, 400, 1600])
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args(argv)
+
+    rows_out = []
+    for rows in args.rows:
+        dirs = build_artifacts(rows, args.seed, args.cache_dir)
+        exact = RecommendationEngine(metrics=MetricsRegistry(), **dirs)
+        metrics = MetricsRegistry()
+        staged = RecommendationEngine(metrics=metrics, two_stage_shortlist=args.shortlist[0], **dirs)
+        build_s = metrics.snapshot()['engine_load_seconds']['values'][('top_terms',)]['sum']
+        for selectivity in args.selectivity:
+            queries = make_workload(args.queries, selectivity, args.seed)
+            exact_ms, expected = run(exact, queries, args.top_k)
+            for size in args.shortlist:
+                staged.two_stage_shortlist = size
+                staged_ms, results = run(staged, queries, args.top_k)
+                row_agree, score_agree = agreement(results, expected)
+                rows_out.append({'rows': rows, 'selectivity': selectivity, 'shortlist': size,
+                                 'exact_p50': np.percentile(exact_ms, 50), 'staged_p50': np.percentile(staged_ms, 50),
+                                 'exact_mean': np.mean(exact_ms), 'staged_mean': np.mean(staged_ms),
+                                 'row_agree': row_agree, 'score_agree': score_agree,
+                                 'build_s': build_s, 'terms_mb': staged.top_terms.nbytes / 2**20})
+        del exact, staged
+
+    print(f"\n{'ROWS':>10} {'FILTERS':<9} {'SHORTLIST':>9} {'EXACT p50':>10} {'2-STAGE p50':>12} {'SPEEDUP':>8} "
+          f"{'ROW AGREE':>10} {'SCORE AGREE':>12} {'BUILD s':>8} {'TERMS MB':>9}")
+    for r in rows_out:
+        print(f"{r['rows']:>10,} {r['selectivity']:<9} {r['shortlist']:>9,} {r['exact_p50']:>10.2f} "
+              f"{r['staged_p50']:>12.2f} {r['exact_mean'] / r['staged_mean']:>7.2f}x {r['row_agree']:>10.1%} "
+              f"{r['score_agree']:>12.1%} {r['build_s']:>8.2f} {r['terms_mb']:>9.1f}")
+    return rows_out
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+"""
+Concurrent Load Replay
+Feeds a query workload (captured with src/utils/query_capture.py, or synthetic) to the
+recommendation engine concurrently and reports how it behaves under load:
+throughput, latency percentiles, errors and GIL contention indicators.
+
+Modes:
+- threads: N threads share one RecommendationEngine (as Streamlit sessions do).
+- processes: M processes, each with its own engine (one per core).
+- pool: an EngineProcessPool of M workers over shared-memory artifacts, fed by 2M client
+  threads. Reports the memory it takes: shared segment, worker-private and total PSS.
+- shards: a ShardCoordinator over N hash shards (one worker process each), fed by 2
+  client threads; every query fans out to all shards and is merged.
+
+Load:
+- closed loop (default): every worker sends its next query as soon as the last one returns.
+- open loop (--rate): queries arrive at a fixed total rate whether or not the engine keeps
+  up. Latency is measured from the scheduled arrival, so queueing delay is included.
+  Service time is reported separately.
+
+GIL indicators (threads mode):
+- cpu_cores_busy: process CPU seconds per wall second. Stuck near 1.0 while threads are
+  added means the work is serialized (GIL-bound).
+- off_cpu: share of a request's service time its thread was not running (1 - thread CPU /
+  service time). It grows when threads wait for the GIL, and also when there are more
+  workers than cores. Compare with processes mode at the same count: off-CPU time that
+  processes do not show is GIL waiting.
+- speedup: throughput relative to the first (smallest) level of the sweep.
+
+In closed loop, the saturation point is reported per mode: the level after which adding
+workers no longer adds throughput. In open loop, the levels that keep up with the rate
+are reported.
+
+Usage:
+    python benchmarks/load_replay.py --rows 20000 --threads 1 2 4 8 --duration 10
+    python benchmarks/load_replay.py --rows 20000 --processes 1 2 4 --duration 10
+    python benchmarks/load_replay.py --rows 20000 --pool 1 2 4 --duration 10
+    python benchmarks/load_replay.py --rows 200000 --shards 1 2 4 --duration 10
+    python benchmarks/load_replay.py --rows 20000 --threads 4 --rate 200 --workload logs/queries.jsonl
+"""
+
+import sys
+import os
+import json
+import time
+import queue
+import argparse
+import itertools
+import threading
+import collections
+import multiprocessing
+import numpy as np
+
+# Add project root to path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_engine import build_artifacts, DEFAULT_CACHE_DIR
+
+# A level "saturates" when it adds less than this share of throughput over the previous one
+SATURATION_GAIN = 0.10
+# Open loop: a level keeps up when it completes at least this share of the target rate
+KEEP_UP = 0.95
+
+def load_queries(workload=None, n_queries=1_000, mix='skewed', seed=42):
+    """Replay file (capture or workload) if given, else a synthetic mix."""
+    if workload:
+        from src.utils.query_capture import load_workload
+        return load_workload(workload)
+    from src.utils.synthetic_catalog import generate_queries
+    return generate_queries(n_queries, mix=mix, seed=seed)
+
+def _serve(engine, query, top_k, scheduled, samples, errors, lock):
+    """Run one query on the calling thread and record its timings."""
+    begin = time.perf_counter()
+    cpu = time.thread_time()
+    try:
+        engine.get_recommendations(query, top_k=top_k)
+    except Exception as e:
+        with lock:
+            errors[type(e).__name__] += 1
+        return
+    end = time.perf_counter()
+    samples.append((end - (scheduled if scheduled is not None else begin), end - begin, time.thread_time() - cpu))
+
+def drive(engine, queries, workers, rate=None, duration=None, requests=None, top_k=5):
+    """
+    Replay ``queries`` (cycled) against ``engine`` from ``workers`` threads.
+
+    Args:
+        engine: Object with get_recommendations(query, top_k=...).
+        queries (list): user_input dicts.
+        workers (int): Threads.
+        rate (float, optional): Open-loop arrival rate (queries/sec); closed loop when omitted.
+        duration (float, optional): Seconds to generate load.
+        requests (int, optional): Requests to send (whichever of duration/requests ends first).
+        top_k (int): Results per query.
+
+    Returns:
+        dict: Raw measurements, see ``summarize_run``.
+    """
+    if duration is None and requests is None:
+        raise ValueError("Give a duration, a request count or both.")
+    limit = requests if requests is not None else float('inf')
+    samples, errors, lock = [], collections.Counter(), threading.Lock()
+    order = itertools.count()
+    jobs = queue.Queue()
+
+    def closed_loop():
+        while True:
+            i = next(order)
+            if i >= limit or time.perf_counter() >= deadline:
+                return
+            _serve(engine, queries[i % len(queries)], top_k, None, samples, errors, lock)
+
+    def open_loop():
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            scheduled, query = job
+            _serve(engine, query, top_k, scheduled, samples, errors, lock)
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    deadline = wall + duration if duration is not None else float('inf')
+    threads = [threading.Thread(target=open_loop if rate else closed_loop, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    sent = 0
+    if rate:
+        # Dispatcher: fixed inter-arrival times on the schedule, independent of completions
+        interval = 1.0 / rate
+        while sent < limit:
+            scheduled = wall + sent * interval
+            if scheduled >= deadline:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            jobs.put((scheduled, queries[sent % len(queries)]))
+            sent += 1
+        for _ in threads:
+            jobs.put(None)
+    for thread in threads:
+        thread.join()
+    return {'samples': samples, 'errors': dict(errors), 'wall': time.perf_counter() - wall,
+            'cpu': time.process_time() - cpu}
+
+def summarize_run(raw, mode, workers, rate=None):
+    """Throughput, latency/service percentiles (ms), errors and contention indicators."""
+    samples = np.asarray(raw['samples'], dtype=np.float64).reshape(-1, 3) * 1000
+    latency, service, thread_cpu = samples[:, 0], samples[:, 1], samples[:, 2]
+    completed = len(samples)
+    errors = sum(raw['errors'].values())
+
+    def percentiles(values):
+        if len(values) == 0:
+            return {}
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {'mean': float(values.mean()), 'p50': float(p50), 'p95': float(p95), 'p99': float(p99),
+                'max': float(values.max())}
+
+    return {
+        'mode': mode, 'workers': workers, 'rate': rate,
+        'completed': completed, 'errors': errors, 'error_types': raw['errors'],
+        'wall_s': raw['wall'], 'qps': completed / raw['wall'] if raw['wall'] else 0.0,
+        'latency_ms': percentiles(latency), 'service_ms': percentiles(service),
+        'cpu_cores_busy': raw['cpu'] / raw['wall'] if raw['wall'] else 0.0,
+        'off_cpu': float(1.0 - thread_cpu.sum() / service.sum()) if completed and service.sum() else None,
+    }
+
+def _process_main(config, barrier, results):
+    """One load process: its own engine, a share of the load, raw measurements back."""
+    from src.models.recommendation_engine import RecommendationEngine
+    from src.utils.metrics import MetricsRegistry
+
+    engine = RecommendationEngine(metrics=MetricsRegistry(), **config['dirs'])
+    queries = config['queries'][config['index']::config['processes']] or config['queries']
+    for query in queries[:20]:
+        engine.get_recommendations(query, top_k=config['top_k'])
+    barrier.wait()
+    raw = drive(engine, queries, 1, rate=config['rate'], duration=config['duration'],
+                requests=config['requests'], top_k=config['top_k'])
+    results.put(raw)
+
+def run_processes(dirs, queries, processes, rate=None, duration=None, requests=None, top_k=5):
+    """
+    Replay from ``processes`` processes with one engine each (spawned, loaded before the clock starts).
+    Rate and request count are split evenly between the processes.
+    """
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(processes + 1)
+    results = context.Queue()
+    config = {'dirs': dirs, 'queries': queries, 'processes': processes, 'top_k': top_k, 'duration': duration,
+              'rate': rate / processes if rate else None,
+              'requests': -(-requests // processes) if requests is not None else None}
+    workers = [context.Process(target=_process_main, args=(dict(config, index=i), barrier, results))
+               for i in range(processes)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    raws = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    errors = collections.Counter()
+    for raw in raws:
+        errors.update(raw['errors'])
+    merged = {'samples': [s for raw in raws for s in raw['samples']], 'errors': dict(errors),
+              'wall': max(raw['wall'] for raw in raws), 'cpu': sum(raw['cpu'] for raw in raws)}
+    return summarize_run(merged, 'processes', processes, rate)
+
+def run_threads(engine, queries, threads, rate=None, duration=None, requests=None, top_k=5):
+    """Replay from ``threads`` threads sharing ``engine``."""
+    return summarize_run(drive(engine, queries, threads, rate, duration, requests, top_k), 'threads', threads, rate)
+
+def _process_cpu(pids):
+    """CPU seconds used so far by ``pids`` (Linux /proc; 0 where unavailable)."""
+    total = 0.0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            total += (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+        except (OSError, ValueError, IndexError):
+            pass
+    return total
+
+def process_memory_mb(pid):
+    """Rss, Pss and private (unique) memory of a process in MB, from /proc/<pid>/smaps_rollup."""
+    fields = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if value.strip().endswith('kB'):
+                    fields[key] = int(value.split()[0]) / 1024
+    except OSError:
+        return {}
+    return {'rss': fields.get('Rss', 0.0), 'pss': fields.get('Pss', 0.0),
+            'private': fields.get('Private_Clean', 0.0) + fields.get('Private_Dirty', 0.0)}
+
+def run_pool(dirs, queries, workers, rate=None, duration=None, requests=None, top_k=5):
+    """
+    Replay against an EngineProcessPool of ``workers`` processes from 2 * ``workers`` client
+    threads (so a request is always queued for each worker). 'cpu_cores_busy' counts the
+    workers' CPU; 'memory_mb' has the shared segment size and the workers' summed private
+    and proportional (PSS) memory.
+    """
+    from src.models.process_pool import EngineProcessPool
+
+    with EngineProcessPool(workers, **dirs) as pool:
+        for query in queries[:20 * workers]:
+            pool.get_recommendations(query, top_k=top_k)
+        pids = pool.pids
+        cpu = _process_cpu(pids)
+        raw = drive(pool, queries, 2 * workers, rate, duration, requests, top_k)
+        raw['cpu'] += _process_cpu(pids) - cpu
+        memory = [process_memory_mb(pid) for pid in pids]
+        shared_mb = pool.shared.nbytes / 2**20
+    result = summarize_run(raw, 'pool', workers, rate)
+    # Client threads only wait on the workers, so their off-CPU share says nothing here
+    result['off_cpu'] = None
+    result['memory_mb'] = {'shared': shared_mb,
+                           'workers_private': sum(m.get('private', 0.0) for m in memory),
+                           'workers_pss': sum(m.get('pss', 0.0) for m in memory)}
+    return result
+
+def run_shards(dirs, queries, n_shards, rate=None, duration=None, requests=None, top_k=5, clients=2):
+    """
+    Replay against a ShardCoordinator over ``n_shards`` hash shards of the catalog in
+    ``dirs`` (built next to the artifacts on first use). 'cpu_cores_busy' includes the shard workers.
+    """
+    from src.models.sharding import ShardCoordinator, build_shards, MANIFEST_FILE
+
+    shards_dir = os.path.join(dirs['processed_dir'], f'shards_{n_shards}')
+    if not os.path.exists(os.path.join(shards_dir, MANIFEST_FILE)):
+        build_shards(dirs['processed_dir'], dirs['cleaned_data_path'], shards_dir, n_shards)
+    with ShardCoordinator(shards_dir, models_dir=dirs['models_dir'], timeout=60) as coordinator:
+        for query in queries[:20]:
+            coordinator.get_recommendations(query, top_k=top_k)
+        pids = [pid for shard in coordinator.shards for pid in shard.pool.pids]
+        cpu = _process_cpu(pids)
+        raw = drive(coordinator, queries, clients, rate, duration, requests, top_k)
+        raw['cpu'] += _process_cpu(pids) - cpu
+    result = summarize_run(raw, 'shards', n_shards, rate)
+    result['off_cpu'] = None
+    return result
+
+def find_saturation(results):
+    """
+    Last level of a sweep (same mode, ascending workers) that still added at least
+    SATURATION_GAIN throughput; also sets each result's 'speedup'.
+    """
+    for result in results:
+        result['speedup'] = result['qps'] / results[0]['qps'] if results[0]['qps'] else None
+    for previous, result in zip(results, results[1:]):
+        if result['qps'] < previous['qps'] * (1 + SATURATION_GAIN):
+            return previous
+    return results[-1]
+
+def print_results(results):
+    print("\n" + "=" * 100)
+    print(f"{'MODE':<10} {'WORKERS':>7} {'QPS':>9} {'SPEEDUP':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'SVC p95':>9} {'ERRORS':>7} {'CPU BUSY':>9} {'OFF-CPU':>8}")
+    print("=" * 100)
+    for r in results:
+        latency, service = r['latency_ms'], r['service_ms']
+        off_cpu = f"{r['off_cpu']:.0%}" if r['off_cpu'] is not None else '-'
+        print(f"{r['mode']:<10} {r['workers']:>7} {r['qps']:>9.1f} {r.get('speedup') or 0:>8.2f} "
+              f"{latency.get('p50', 0):>9.2f} {latency.get('p95', 0):>9.2f} {latency.get('p99', 0):>9.2f} "
+              f"{service.get('p95', 0):>9.2f} {r['errors']:>7} {r['cpu_cores_busy']:>9.2f} {off_cpu:>8}")
+    for r in results:
+        if 'memory_mb' in r:
+            memory = r['memory_mb']
+            print(f"pool {r['workers']}: shared artifacts {memory['shared']:.1f} MB, workers private "
+                  f"{memory['workers_private']:.1f} MB, workers PSS {memory['workers_pss']:.1f} MB")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20_000, help="Synthetic catalog size")
+    parser.add_argument('--threads', type=int, nargs='*', default=[], help="Thread counts to sweep")
+    parser.add_argument('--processes', type=int, nargs='*', default=[], help="Process counts to sweep")
+    parser.add_argument('--pool', type=int, nargs='*', default=[], help="EngineProcessPool worker counts to sweep")
+    parser.add_argument('--shards', type=int, nargs='*', default=[], help="ShardCoordinator shard counts to sweep")
+    parser.add_argument('--rate', type=float, default=None, help="Open-loop total queries/sec (default: closed loop)")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds per level")
+    parser.add_argument('--requests', type=int, default=None, help="Requests per level (stops early)")
+    parser.add_argument('--workload', default=None, help="Query capture or workload file (default: synthetic)")
+    parser.add_argument('--mix', default='skewed', help="Synthetic query mix")
+    parser.add_argument('--queries', type=int, default=1_000, help="Synthetic workload size")
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--output', default=None, help="Write the results as JSON")
+    args = parser.parse_args(argv)
+    if not args.threads and not args.processes and not args.pool and not args.shards:
+        args.threads = [1, 2, 4, 8]
+    return args
+
+def main(argv=None):
+    from src.models.recommendation_engine import RecommendationEngine
+    from src.utils.metrics import MetricsRegistry
+
+    args = parse_args(argv)
+    dirs = build_artifacts(args.rows, args.seed, args.cache_dir)
+    queries = load_queries(args.workload, args.queries, args.mix, args.seed)
+    load = f"open loop at {args.rate:g} q/s" if args.rate else "closed loop"
+    print(f"\nReplaying {len(queries):,} queries on {args.rows:,} rows, {load}, {os.cpu_count()} CPUs, "
+          f"switch interval {sys.getswitchinterval() * 1000:g} ms")
+
+    results, saturation = [], {}
+    if args.threads:
+        engine = RecommendationEngine(metrics=MetricsRegistry(), **dirs)
+        for query in queries[:20]:
+            engine.get_recommendations(query, top_k=args.top_k)
+        sweep = [run_threads(engine, queries, n, args.rate, args.duration, args.requests, args.top_k)
+                 for n in sorted(args.threads)]
+        saturation['threads'] = find_saturation(sweep)
+        results.extend(sweep)
+    if args.processes:
+        sweep = [run_processes(dirs, queries, n, args.rate, args.duration, args.requests, args.top_k)
+                 for n in sorted(args.processes)]
+        saturation['processes'] = find_saturation(sweep)
+        results.extend(sweep)
+    if args.pool:
+        sweep = [run_pool(dirs, queries, n, args.rate, args.duration, args.requests, args.top_k)
+                 for n in sorted(args.pool)]
+        saturation['pool'] = find_saturation(sweep)
+        results.extend(sweep)
+    if args.shards:
+        sweep = [run_shards(dirs, queries, n, args.rate, args.duration, args.requests, args.top_k)
+                 for n in sorted(args.shards)]
+        saturation['shards'] = find_saturation(sweep)
+        results.extend(sweep)
+
+    print_results(results)
+    for mode, level in saturation.items():
+        if args.rate:
+            # Open loop: throughput is set by the rate; what matters is keeping up with it
+            kept_up = [r['workers'] for r in results if r['mode'] == mode and r['qps'] >= KEEP_UP * args.rate]
+            print(f"{mode}: keeps up with {args.rate:g} q/s at {kept_up or 'no'} workers")
+        else:
+            print(f"{mode}: saturates at {level['workers']} workers ({level['qps']:.1f} q/s, "
+                  f"{level['cpu_cores_busy']:.2f} cores busy)")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'cpu_count': os.cpu_count(), 'results': results,
+                       'saturation': {mode: level['workers'] for mode, level in saturation.items()}}, f, indent=2)
+        print(f"Results written to {args.output}")
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Request Micro-Batching
+Coalesces recommendation requests that arrive close together into one
+RecommendationEngine.get_recommendations_batch call, run on a thread pool so the event
+loop keeps accepting requests meanwhile.
+
+A batch starts with the first queued request and closes when it holds ``max_batch_size``
+requests or ``max_wait_ms`` has passed, whichever comes first. While a batch is being
+scored, new requests queue up and form the next one, so batches grow with the load by
+themselves. The queue is bounded: when ``max_queue`` requests are waiting, ``submit``
+raises QueueFullError at once (the HTTP layer answers 429) instead of letting latency grow
+without limit.
+
+``max_batch_size=1`` is plain one-request-per-call serving, for comparison. An engine with
+a slow-query log or a per-query scoring mode answers a batch query by query
+(RecommendationEngine.serves_per_query), so those requests are logged and scored as single
+calls are.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from src.utils.metrics import REGISTRY
+
+MAX_BATCH_SIZE = 32
+MAX_WAIT_MS = 2.0
+MAX_QUEUE = 1024
+QUEUE_BUCKETS = (0, 1, 4, 16, 64, 256, 1024, 4096)
+
+class QueueFullError(RuntimeError):
+    """The request queue is full; the caller should retry later."""
+
+class MicroBatcher:
+    """
+    Queue of recommendation requests served in batches by one engine.
+
+    Must be started (``await start()``) inside the event loop that will submit requests.
+
+    Attributes:
+        batches (int): Engine calls made.
+        batched_requests (int): Requests answered through them (their ratio is the mean batch size).
+        rejected (int): Requests refused because the queue was full.
+    """
+
+    def __init__(self, engine, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS, max_queue=MAX_QUEUE,
+                 concurrency=1, executor=None, metrics=None):
+        """
+        Args:
+            engine: RecommendationEngine (anything with get_recommendations_batch).
+            max_batch_size (int): Most requests per engine call (1 disables batching).
+            max_wait_ms (float): Longest a batch waits for more requests after its first one.
+            max_queue (int): Most requests waiting; more are rejected with QueueFullError.
+            concurrency (int): Batches scored at the same time (the engine is thread-safe).
+            executor: concurrent.futures executor for the engine calls (default: a pool of
+                ``concurrency`` threads owned by the batcher).
+            metrics: MetricsRegistry (default: the process-wide REGISTRY).
+        """
+        if max_batch_size < 1 or max_queue < 1 or concurrency < 1:
+            raise ValueError("max_batch_size, max_queue and concurrency must be at least 1.")
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self.concurrency = concurrency
+        self._own_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='unlox-batch')
+        self.batches = self.batched_requests = self.rejected = 0
+        self._queue = None
+        self._full = None
+        self._consumers = []
+
+        metrics = metrics if metrics is not None else REGISTRY
+        self._batch_size = metrics.histogram('api_batch_size', "Requests per micro-batch.",
+                                             buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+        self._queue_depth = metrics.histogram('api_queue_depth', "Requests waiting when one is queued.",
+                                              buckets=QUEUE_BUCKETS)
+        self._rejected = metrics.counter('api_rejected_total', "Requests refused because the queue was full.")
+
+    async def start(self):
+        self._queue = asyncio.Queue(self.max_queue)
+        self._full = asyncio.Event()
+        self._consumers = [asyncio.create_task(self._consume()) for _ in range(self.concurrency)]
+
+    @property
+    def queued(self):
+        """Requests waiting for a batch."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, user_input, top_k=5, block_weights=None):
+        """
+        Queue one request and wait for its results.
+
+        Returns:
+            list: What engine.get_recommendations(user_input, top_k, block_weights=...) returns.
+
+        Raises:
+            QueueFullError: ``max_queue`` requests are already waiting.
+            Exception: The query's own error.
+        """
+        if self._queue is None:
+            raise RuntimeError("The batcher is not started.")
+        future = asyncio.get_running_loop().create_future()
+        self._queue_depth.observe(self._queue.qsize())
+        try:
+            self._queue.put_nowait((user_input, top_k, block_weights, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            self._rejected.inc()
+            raise QueueFullError(f"{self.max_queue} requests are already queued.") from None
+        if self._queue.qsize() >= self.max_batch_size - 1:
+            self._full.set()
+        return await future
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            if self.max_batch_size > 1 and self.max_wait > 0 and self._queue.qsize() < self.max_batch_size - 1:
+                # Wait for the window to pass or the batch to fill up, whichever is first
+                self._full.clear()
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_wait)
+                except asyncio.TimeoutError:
+                    pass
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            self.batches += 1
+            self.batched_requests += len(batch)
+            self._batch_size.observe(len(batch))
+            try:
+                await self._run(loop, batch)
+            finally:
+                # Only left unanswered when the batcher is closed mid-batch
+                for item in batch:
+                    if not item[3].done():
+                        item[3].cancel()
+
+    async def _run(self, loop, batch):
+        # One engine call per distinct (top_k, block_weights); nearly always a single group
+        groups = {}
+        for item in batch:
+            weights = tuple(item[2]) if item[2] is not None else None
+            groups.setdefault((item[1], weights), []).append(item)
+        for (top_k, weights), items in groups.items():
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, self._score, [item[0] for item in items], top_k, weights)
+            except Exception as e:
+                results = [e] * len(items)
+            for item, result in zip(items, results):
+                future = item[3]
+                if future.done():
+                    continue  # The client went away
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _score(self, user_inputs, top_k, block_weights):
+        return self.engine.get_recommendations_batch(user_inputs, top_k=top_k, block_weights=block_weights,
+                                                     return_exceptions=True)
+
+    async def close(self):
+        """Stop taking batches (queued requests are cancelled) and release the thread pool."""
+        for consumer in self._consumers:
+            consumer.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self._consumers = []
+        if self._queue is not None:
+            while not self._queue.empty():
+                self._queue.get_nowait()[3].cancel()
+        if self._own_executor:
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,337 @@
+"""
+Recommendation HTTP API
+Asynchronous JSON API over one RecommendationEngine, built on asyncio streams (standard
+library only). Concurrent recommendation requests are coalesced into batched engine calls
+by a MicroBatcher (batching.py).
+
+Endpoints:
+    POST /recommend        {"query": {...}, "top_k": 5, "block_weights": [1, 1, 10]}
+                           -> {"results": [...]}
+    POST /recommend/batch  {"queries": [{...}, ...], "top_k": 5, "block_weights": null}
+                           -> {"results": [[...], ...]}; a failed query's entry is {"error": "..."}
+    GET  /health           -> {"status": "ok", "queued": ..., "batches": ..., ...}
+    GET  /metrics          -> Prometheus text format (engine and API metrics)
+
+Identical recommendation requests that arrive while one of them is being computed share
+its result (single flight, keyed by the canonical input, top_k and block weights).
+
+Errors are JSON {"error": "..."}: 400 for invalid requests, 404/405 for unknown routes,
+413 for oversized bodies, 429 (with Retry-After) when the request queue is full and
+500 when the engine fails. Connections are kept alive (HTTP/1.1).
+
+``--slow-query-ms`` logs slow queries (src/utils/slow_query_log.py); the engine then serves
+each query of a batch on its own, so every one is timed.
+
+Usage:
+    python -m src.api.server --port 8000 --max-batch-size 32 --max-wait-ms 2
+    curl -X POST localhost:8000/recommend -d '{"query": {"Description": "tax filing"}}'
+"""
+import sys
+import os
+import json
+import math
+import time
+import asyncio
+import argparse
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.api.batching import MicroBatcher, QueueFullError, MAX_BATCH_SIZE, MAX_WAIT_MS, MAX_QUEUE
+from src.utils.metrics import REGISTRY
+from src.utils.canonical import input_key
+from src.utils.single_flight import AsyncSingleFlight
+
+MAX_BODY_BYTES = 1 << 20
+MAX_HEADER_LINES = 100
+MAX_TOP_K = 100
+MAX_BATCH_QUERIES = 1000
+# Seconds a keep-alive connection may stay idle
+IDLE_TIMEOUT = 60
+# Suggested wait (seconds) sent with 429 responses
+RETRY_AFTER = 1
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 411: 'Length Required',
+           413: 'Payload Too Large', 429: 'Too Many Requests', 500: 'Internal Server Error',
+           501: 'Not Implemented'}
+
+class HTTPError(Exception):
+    """An error response: status code, message and optional extra headers."""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+def parse_options(body):
+    """top_k and block_weights of a request body, validated."""
+    top_k = body.get('top_k', 5)
+    if isinstance(top_k, bool) or not isinstance(top_k, int) or not 1 <= top_k <= MAX_TOP_K:
+        raise HTTPError(400, f"'top_k' must be an integer from 1 to {MAX_TOP_K}.")
+    weights = body.get('block_weights')
+    if weights is not None:
+        if (not isinstance(weights, list) or len(weights) != 3
+                or not all(isinstance(w, (int, float)) and not isinstance(w, bool) and math.isfinite(w) and w >= 0
+                           for w in weights)):
+            raise HTTPError(400, "'block_weights' must be a list of 3 non-negative numbers.")
+        weights = tuple(float(w) for w in weights)
+    return top_k, weights
+
+def parse_query(query):
+    if not isinstance(query, dict):
+        raise HTTPError(400, "A query must be a JSON object of user_input fields.")
+    return query
+
+class RecommendationServer:
+    """
+    The HTTP server. Start it inside an event loop with ``await start()``; ``port`` is
+    then the bound port (useful with port 0).
+    """
+
+    def __init__(self, engine, host='127.0.0.1', port=8000, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS,
+                 max_queue=MAX_QUEUE, concurrency=1, single_flight=True, metrics=None):
+        """
+        Args:
+            engine: RecommendationEngine to serve.
+            host / port: Address to listen on.
+            max_batch_size / max_wait_ms / max_queue / concurrency: MicroBatcher settings
+                (max_batch_size=1 serves one request per engine call).
+            single_flight (bool): Collapse identical in-flight requests into one.
+            metrics: MetricsRegistry for the API metrics and /metrics (default: the
+                process-wide REGISTRY, which the engine also records to by default).
+        """
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.metrics = metrics if metrics is not None else REGISTRY
+        self.batcher = MicroBatcher(engine, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms,
+                                    max_queue=max_queue, concurrency=concurrency, metrics=self.metrics)
+        self.flight = AsyncSingleFlight('api', self.metrics) if single_flight else None
+        self._server = None
+        self._responses = self.metrics.counter('api_responses_total', "HTTP responses.", ['route', 'status'])
+        self._latency = self.metrics.histogram('api_request_seconds', "HTTP request handling time.", ['route'])
+        self._routes = {
+            '/recommend': ('POST', self._recommend),
+            '/recommend/batch': ('POST', self._recommend_batch),
+            '/health': ('GET', self._health),
+            '/metrics': ('GET', self._metrics),
+        }
+
+    async def start(self):
+        await self.batcher.start()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                  limit=MAX_BODY_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.batcher.close()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), IDLE_TIMEOUT)
+                except HTTPError as e:
+                    # The stream position is unknown after a malformed request; answer and close
+                    await self._respond(writer, None, e.status, {'error': str(e)}, e.headers, keep_alive=False)
+                    return
+                if request is None:
+                    return
+                method, path, headers, body, keep_alive = request
+                started = time.perf_counter()
+                route = path if path in self._routes else 'other'
+                status, payload, extra = await self._dispatch(method, path, body)
+                self._latency.labels(route=route).observe(time.perf_counter() - started)
+                self._responses.labels(route=route, status=str(status)).inc()
+                await self._respond(writer, method, status, payload, extra, keep_alive)
+                if not keep_alive:
+                    return
+        except (asyncio.TimeoutError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    async def _read_request(self, reader):
+        """(method, path, headers, body, keep_alive), or None at end of stream."""
+        try:
+            line = await reader.readline()
+        except (asyncio.LimitOverrunError, ValueError):
+            raise HTTPError(400, "Request line too long.")
+        if not line:
+            return None
+        parts = line.decode('latin-1').split()
+        if len(parts) != 3 or not parts[2].startswith('HTTP/1.'):
+            raise HTTPError(400, "Malformed request line.")
+        method, target, version = parts
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            try:
+                line = await reader.readline()
+            except (asyncio.LimitOverrunError, ValueError):
+                raise HTTPError(400, "Header line too long.")
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, sep, value = line.decode('latin-1').partition(':')
+            if not sep:
+                raise HTTPError(400, "Malformed header line.")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise HTTPError(400, "Too many header lines.")
+
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            raise HTTPError(501, "Chunked request bodies are not supported; send Content-Length.")
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length.")
+        if length < 0:
+            raise HTTPError(400, "Invalid Content-Length.")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, f"Request bodies are limited to {MAX_BODY_BYTES} bytes.")
+        body = await reader.readexactly(length) if length else b''
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+        return method.upper(), target.split('?', 1)[0], headers, body, keep_alive
+
+    async def _dispatch(self, method, path, body):
+        """(status, payload, extra headers) for one request."""
+        route = self._routes.get(path)
+        try:
+            if route is None:
+                raise HTTPError(404, f"No route {path}.")
+            allowed, handler = route
+            if method != allowed and not (allowed == 'GET' and method == 'HEAD'):
+                raise HTTPError(405, f"{path} accepts {allowed} only.", {'Allow': allowed})
+            if allowed == 'POST':
+                try:
+                    body = json.loads(body or b'null')
+                except ValueError:
+                    raise HTTPError(400, "The body is not valid JSON.")
+                if not isinstance(body, dict):
+                    raise HTTPError(400, "The body must be a JSON object.")
+                return 200, await handler(body), {}
+            return 200, await handler(), {}
+        except HTTPError as e:
+            return e.status, {'error': str(e)}, e.headers
+        except QueueFullError as e:
+            return 429, {'error': str(e)}, {'Retry-After': str(RETRY_AFTER)}
+        except Exception as e:
+            return 500, {'error': f"{type(e).__name__}: {e}"}, {}
+
+    async def _recommend(self, body):
+        top_k, weights = parse_options(body)
+        query = parse_query(body.get('query'))
+        return {'results': await self._submit(query, top_k, weights)}
+
+    async def _recommend_batch(self, body):
+        top_k, weights = parse_options(body)
+        queries = body.get('queries')
+        if not isinstance(queries, list) or not 1 <= len(queries) <= MAX_BATCH_QUERIES:
+            raise HTTPError(400, f"'queries' must be a list of 1 to {MAX_BATCH_QUERIES} queries.")
+        queries = [parse_query(query) for query in queries]
+        if len(queries) > self.batcher.max_queue - self.batcher.queued:
+            raise QueueFullError(f"{len(queries)} queries do not fit in the request queue.")
+        # Queued one by one, so they are batched together with other clients' requests
+        answers = await asyncio.gather(*(self._submit(query, top_k, weights) for query in queries),
+                                       return_exceptions=True)
+        for answer in answers:
+            if isinstance(answer, QueueFullError):
+                raise answer
+        return {'results': [{'error': f"{type(a).__name__}: {a}"} if isinstance(a, Exception) else a
+                            for a in answers]}
+
+    async def _submit(self, query, top_k, weights):
+        if self.flight is None:
+            return await self.batcher.submit(query, top_k, weights)
+        results, _ = await self.flight.do((input_key(query), top_k, weights), self.batcher.submit, query, top_k, weights)
+        return results
+
+    async def _health(self):
+        batcher = self.batcher
+        return {'status': 'ok', 'queued': batcher.queued, 'batches': batcher.batches,
+                'mean_batch_size': batcher.batched_requests / batcher.batches if batcher.batches else None,
+                'rejected': batcher.rejected, 'max_batch_size': batcher.max_batch_size,
+                'single_flight_shared': self.flight.shared if self.flight is not None else None}
+
+    async def _metrics(self):
+        return self.metrics.to_prometheus()
+
+    async def _respond(self, writer, method, status, payload, headers, keep_alive):
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            body, content_type = json.dumps(payload, default=str).encode(), 'application/json'
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Type: {content_type}",
+                 f"Content-Length: {len(body)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        if method != 'HEAD':
+            writer.write(body)
+        await writer.drain()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch-size', type=int, default=MAX_BATCH_SIZE,
+                        help="Most requests per engine call (1 = no batching)")
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS,
+                        help="Longest a batch waits for more requests")
+    parser.add_argument('--max-queue', type=int, default=MAX_QUEUE, help="Queued requests before answering 429")
+    parser.add_argument('--concurrency', type=int, default=1, help="Batches scored at the same time")
+    parser.add_argument('--no-single-flight', action='store_true', help="Compute identical in-flight requests separately")
+    parser.add_argument('--ranking-method', default='cosine', choices=['cosine', 'knn'])
+    parser.add_argument('--processed-dir', default=None)
+    parser.add_argument('--cleaned-data-path', default=None)
+    parser.add_argument('--models-dir', default=None)
+    parser.add_argument('--slow-query-ms', type=float, default=None,
+                        help="Log queries slower than this (one query per engine call when set)")
+    parser.add_argument('--slow-query-log', default=os.path.join('logs', 'slow_queries.log'),
+                        help="Slow-query log file")
+    return parser.parse_args(argv)
+
+async def serve(args, ready=None):
+    """Load the engine and serve until cancelled; ``ready(port)`` is called once listening."""
+    from src.models.recommendation_engine import RecommendationEngine
+    from src.utils.slow_query_log import SlowQueryLog
+
+    slow_query_log = None
+    if args.slow_query_ms is not None:
+        slow_query_log = SlowQueryLog(args.slow_query_log, threshold_ms=args.slow_query_ms)
+    engine = RecommendationEngine(ranking_method=args.ranking_method, processed_dir=args.processed_dir,
+                                  cleaned_data_path=args.cleaned_data_path, models_dir=args.models_dir,
+                                  slow_query_log=slow_query_log)
+    server = RecommendationServer(engine, args.host, args.port, max_batch_size=args.max_batch_size,
+                                  max_wait_ms=args.max_wait_ms, max_queue=args.max_queue,
+                                  concurrency=args.concurrency, single_flight=not args.no_single_flight)
+    await server.start()
+    print(f"Serving on http://{args.host}:{server.port} (max batch {args.max_batch_size}, "
+          f"wait {args.max_wait_ms} ms, queue {args.max_queue})", flush=True)
+    if ready is not None:
+        ready(server.port)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+def main(argv=None):
+    try:
+        asyncio.run(serve(parse_args(argv)))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
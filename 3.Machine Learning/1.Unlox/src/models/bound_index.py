@@ -0,0 +1,161 @@
+"""
+Bound Index
+Groups catalog rows into small blocks with per-block upper bounds on the cosine score,
+for an exact top-k search that skips blocks that cannot reach the k-th best score
+(branch and bound, see RecommendationEngine.bound_rank).
+
+Rows are sorted by their two largest text coordinates, so a block holds services about
+the same terms and its bounds stay close to its best row. For each block and weights
+it keeps, over the rows x normalized by their weighted norm (y = x / |x|_w):
+
+- the largest and smallest value of every column of y (max-coordinate bound), and
+- the largest norm of each feature block of y (norm bound).
+
+For a query u with weighted norm |u|_w, each row's cosine is
+``sum_b w_b^2 * (u_b . y_b) / |u|_w``. Per feature block, ``u_b . y_b`` is at most
+``u_b+ . max_b + u_b- . min_b`` and at most ``|u_b| * max |y_b|`` (Cauchy-Schwarz);
+the smaller of the two, summed over the feature blocks, bounds the whole row block.
+
+The row order does not depend on the weights, the bounds do: they are built for each
+weights on first use (one pass over the catalog) and the last few are kept.
+"""
+import threading
+import collections
+import numpy as np
+
+# Rows per block: smaller blocks give tighter bounds but more of them to evaluate
+BOUND_BLOCK_ROWS = 128
+# Bound tables kept, one per block weights
+BOUND_MAX_WEIGHTS = 4
+
+def row_order(text_block, chunksize=100_000):
+    """Rows sorted by their largest text coordinate, then their second largest."""
+    n = text_block.shape[0]
+    top = np.zeros((n, 2), dtype=np.intp)
+    if text_block.shape[1] >= 2:
+        for start in range(0, n, chunksize):
+            chunk = np.asarray(text_block[start:start + chunksize])
+            pair = np.argpartition(-chunk, 1, axis=1)[:, :2]
+            # argpartition leaves the two largest in either order
+            swap = chunk[np.arange(len(chunk)), pair[:, 1]] > chunk[np.arange(len(chunk)), pair[:, 0]]
+            pair[swap] = pair[swap][:, ::-1]
+            top[start:start + chunksize] = pair
+    return np.lexsort((top[:, 1], top[:, 0]))
+
+class BoundTables:
+    """
+    Per-block bounds of the normalized rows for one set of block weights.
+
+    Attributes:
+        weights (tuple): The block weights.
+        col_max / col_min (list): Per feature block, (width x n_blocks) column maxima / minima.
+            Column-major, so a query reads only the columns it uses.
+        norm_max (numpy.ndarray): (3 x n_blocks) largest norm of each feature block.
+    """
+
+    def __init__(self, weights, col_max, col_min, norm_max):
+        self.weights = weights
+        self.col_max = col_max
+        self.col_min = col_min
+        self.norm_max = norm_max
+
+class BoundIndex:
+    """
+    Row blocks of a FeatureBlocks catalog and their score bounds.
+
+    Attributes:
+        block_rows (int): Rows per block (the last one may be shorter).
+        order (numpy.ndarray): (n_blocks x block_rows) catalog rows of each block; padding
+            slots hold ``n_rows``.
+        block_of (numpy.ndarray): Block of each catalog row.
+        n_rows / n_blocks (int): Catalog rows and blocks.
+    """
+
+    def __init__(self, blocks, block_rows=BOUND_BLOCK_ROWS, max_weights=BOUND_MAX_WEIGHTS):
+        self.blocks = blocks
+        self.block_rows = block_rows
+        self.max_weights = max_weights
+        self.n_rows = len(blocks)
+        self.n_blocks = -(-self.n_rows // block_rows)
+        order = row_order(blocks.blocks[2])
+        self.order = np.full(self.n_blocks * block_rows, self.n_rows, dtype=np.intp)
+        self.order[:self.n_rows] = order
+        self.order = self.order.reshape(self.n_blocks, block_rows)
+        self.block_of = np.empty(self.n_rows, dtype=np.int32)
+        self.block_of[order] = np.arange(self.n_rows) // block_rows
+        self.block_sizes = np.bincount(self.block_of, minlength=self.n_blocks)
+        self._tables = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        """Memory held: the row order plus the bound tables built so far."""
+        total = self.order.nbytes + self.block_of.nbytes
+        for tables in list(self._tables.values()):
+            total += tables.norm_max.nbytes + sum(m.nbytes for m in tables.col_max + tables.col_min)
+        return total
+
+    def tables(self, weights):
+        """The BoundTables for ``weights``, built on first use."""
+        weights = tuple(float(w) for w in weights)
+        with self._lock:
+            tables = self._tables.get(weights)
+            if tables is None:
+                tables = self._tables[weights] = self._build(weights)
+                while len(self._tables) > self.max_weights:
+                    self._tables.popitem(last=False)
+            else:
+                self._tables.move_to_end(weights)
+        return tables
+
+    def _build(self, weights, chunk_blocks=512):
+        """One pass over the catalog in block order, ``chunk_blocks`` row blocks at a time."""
+        w2 = np.square(np.asarray(weights, dtype=np.float64))
+        norms = np.sqrt(self.blocks.sq_norms @ w2)
+        inverse = np.zeros(self.n_rows + 1)  # padding slot scales to zero
+        np.divide(1.0, norms, out=inverse[:-1], where=norms > 0)
+        col_max = [np.empty((block.shape[1], self.n_blocks)) for block in self.blocks.blocks]
+        col_min = [np.empty((block.shape[1], self.n_blocks)) for block in self.blocks.blocks]
+        norm_max = np.empty((len(self.blocks.blocks), self.n_blocks))
+        for start in range(0, self.n_blocks, chunk_blocks):
+            order = self.order[start:start + chunk_blocks]
+            rows = order.ravel()
+            real = rows < self.n_rows
+            scale = inverse[rows][:, None]
+            for b, block in enumerate(self.blocks.blocks):
+                y = np.zeros((len(rows), block.shape[1]))
+                y[real] = block[rows[real]]
+                y *= scale
+                y = y.reshape(len(order), self.block_rows, -1)
+                # Padding rows are zero, which can only loosen a bound
+                col_max[b][:, start:start + len(order)] = y.max(axis=1).T
+                col_min[b][:, start:start + len(order)] = y.min(axis=1).T
+                norm_max[b, start:start + len(order)] = np.sqrt(np.einsum('ijk,ijk->ij', y, y).max(axis=1))
+        return BoundTables(weights, col_max, col_min, norm_max)
+
+    def upper_bounds(self, user_blocks, weights):
+        """
+        Upper bound of the cosine score of every row in each block.
+
+        Args:
+            user_blocks (tuple): Unweighted (manual, onehot, text) query blocks.
+            weights (tuple): Block weights.
+
+        Returns:
+            numpy.ndarray: (n_blocks,) bounds; all zero for an all-zero query.
+        """
+        tables = self.tables(weights)
+        w2 = np.square(np.asarray(tables.weights))
+        vectors = [np.ravel(u) for u in user_blocks]
+        user_norm = np.sqrt(sum(w2[b] * float(u @ u) for b, u in enumerate(vectors)))
+        bounds = np.zeros(self.n_blocks)
+        if user_norm == 0:
+            return bounds
+        for b, u in enumerate(vectors):
+            positive, negative = np.flatnonzero(u > 0), np.flatnonzero(u < 0)
+            if not len(positive) and not len(negative):
+                continue
+            coordinate = u[positive] @ tables.col_max[b][positive] + u[negative] @ tables.col_min[b][negative]
+            norm = tables.norm_max[b] * np.sqrt(float(u @ u))
+            bounds += w2[b] * np.minimum(coordinate, norm)
+        return bounds / user_norm
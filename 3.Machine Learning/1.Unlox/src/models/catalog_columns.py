@@ -0,0 +1,193 @@
+"""
+Catalog Columns
+Read-only NumPy view of the cleaned catalog for the query path: integer codes for the
+hard-filter columns and the raw values used to format results.
+
+Filtering with codes is a few vectorized comparisons (which release the GIL) instead of
+pandas boolean indexing, and nothing here is mutated after construction, so one instance
+can be shared by any number of threads.
+
+``state()`` flattens everything into plain NumPy arrays (strings packed as UTF-8 bytes plus
+offsets) and ``from_state`` rebuilds an instance on top of them without copying, which is
+how worker processes share one catalog through shared memory (see shared_artifacts.py).
+"""
+import numpy as np
+import pandas as pd
+
+# Budget ordering used by the strict price filter (unknown categories count as medium)
+PRICE_ORDER = {'low': 1, 'medium': 2, 'high': 3, 'premium': 4}
+DEFAULT_PRICE_RANK = 2
+# Columns matched by exact value
+CATEGORY_COLUMNS = ('Target_Business_Type', 'Location_Area')
+
+def freeze(*arrays):
+    """Mark NumPy arrays read-only (memory-mapped ones already are)."""
+    for array in arrays:
+        if isinstance(array, np.ndarray):
+            array.setflags(write=False)
+
+class StringColumn:
+    """
+    Strings packed as one UTF-8 byte array plus row offsets (no Python objects, so the
+    arrays can live in shared memory). Indexing behaves like the object array it replaces:
+    an int gives one value (NaN where missing), an index array gives an object array.
+    """
+
+    def __init__(self, data, offsets, missing):
+        self.data, self.offsets, self.missing = data, offsets, missing
+
+    @classmethod
+    def pack(cls, values):
+        """Pack an object array of strings (and NaN for missing values)."""
+        missing = np.asarray(pd.isna(values), dtype=bool)
+        encoded = [b'' if gap else value.encode('utf-8') for value, gap in zip(values, missing)]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(item) for item in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets, missing)
+
+    def arrays(self):
+        return {'data': self.data, 'offsets': self.offsets, 'missing': self.missing}
+
+    def __len__(self):
+        return len(self.missing)
+
+    def _value(self, index):
+        if self.missing[index]:
+            return np.nan
+        return self.data[self.offsets[index]:self.offsets[index + 1]].tobytes().decode('utf-8')
+
+    def __getitem__(self, index):
+        if np.ndim(index) == 0:
+            return self._value(int(index))
+        out = np.empty(len(index), dtype=object)
+        out[:] = [self._value(i) for i in index]
+        return out
+
+class NumberColumn:
+    """Numeric column whose single values come back as Python scalars, like an object array."""
+
+    def __init__(self, array):
+        self.array = array
+
+    def arrays(self):
+        return {'array': self.array}
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, index):
+        value = self.array[index]
+        return value.item() if np.ndim(index) == 0 else value
+
+class CatalogColumns:
+    """
+    Immutable per-row catalog data.
+
+    Attributes:
+        codes (dict): Column -> int32 codes (-1 for missing values).
+        categories (dict): Column -> {value: code}.
+        price_rank (numpy.ndarray): PRICE_ORDER rank of each row's Price_Category.
+        values (dict): Column -> object array of the raw values, for result rows
+            (StringColumn / NumberColumn when rebuilt with ``from_state``).
+    """
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        self.codes, self.categories = {}, {}
+        for column in CATEGORY_COLUMNS:
+            codes, uniques = pd.factorize(df[column])
+            self.codes[column] = codes.astype(np.int32)
+            self.categories[column] = {value: code for code, value in enumerate(uniques)}
+        self.price_rank = df['Price_Category'].map(PRICE_ORDER).fillna(DEFAULT_PRICE_RANK).to_numpy(np.int8)
+        # Object arrays hold Python scalars, so result fields are plain JSON-serializable values
+        self.values = {column: df[column].to_numpy(dtype=object) for column in df.columns}
+        freeze(self.price_rank, *self.codes.values(), *self.values.values())
+
+    def state(self):
+        """
+        The catalog as flat NumPy arrays plus small picklable metadata.
+
+        Returns:
+            tuple: (arrays, meta). ``arrays`` maps names like 'codes/Location_Area' or
+                'values/Description/offsets' to arrays; ``meta`` holds the row count,
+                category dictionaries and the column order and kinds.
+        """
+        arrays = {'price_rank': self.price_rank}
+        arrays.update({f'codes/{column}': codes for column, codes in self.codes.items()})
+        kinds = {}
+        for column, values in self.values.items():
+            if not isinstance(values, np.ndarray):
+                pass  # already flat (rebuilt with from_state)
+            elif pd.api.types.infer_dtype(values, skipna=True) in ('integer', 'floating'):
+                values = NumberColumn(np.asarray(values.tolist()))
+            else:
+                values = StringColumn.pack(values)
+            kinds[column] = 'number' if isinstance(values, NumberColumn) else 'string'
+            arrays.update({f'values/{column}/{part}': array for part, array in values.arrays().items()})
+        return arrays, {'n_rows': self.n_rows, 'categories': self.categories, 'columns': kinds}
+
+    @classmethod
+    def from_state(cls, arrays, meta):
+        """Rebuild a catalog on ``state()`` arrays (used as they are, e.g. shared memory views)."""
+        catalog = cls.__new__(cls)
+        catalog.n_rows = meta['n_rows']
+        catalog.categories = meta['categories']
+        catalog.codes = {column: arrays[f'codes/{column}'] for column in CATEGORY_COLUMNS}
+        catalog.price_rank = arrays['price_rank']
+        catalog.values = {}
+        for column, kind in meta['columns'].items():
+            if kind == 'number':
+                catalog.values[column] = NumberColumn(arrays[f'values/{column}/array'])
+            else:
+                catalog.values[column] = StringColumn(*(arrays[f'values/{column}/{part}']
+                                                        for part in ('data', 'offsets', 'missing')))
+        return catalog
+
+    def __len__(self):
+        return self.n_rows
+
+    def equals(self, column, value):
+        """Boolean mask of rows whose ``column`` is exactly ``value``."""
+        return self.match([self.equals_condition(column, value)])
+
+    def price_at_most(self, budget):
+        """Boolean mask of rows priced at or below the ``budget`` category."""
+        return self.match([self.price_condition(budget)])
+
+    def equals_condition(self, column, value):
+        """``equals`` as an (array, comparison, operand) condition for ``match``."""
+        # Codes are -1 or more, so a value the catalog does not have matches no row
+        return self.codes[column], np.equal, self.categories[column].get(value, -2)
+
+    def price_condition(self, budget):
+        """``price_at_most`` as an (array, comparison, operand) condition for ``match``."""
+        return self.price_rank, np.less_equal, PRICE_ORDER.get(budget, DEFAULT_PRICE_RANK)
+
+    @staticmethod
+    def match(conditions, start=0, stop=None, out=None):
+        """
+        Rows in ``[start, stop)`` meeting every condition, so filters can be applied a
+        range of rows at a time.
+
+        Args:
+            conditions (list): (array, comparison, operand) tuples, e.g. from equals_condition.
+            out (numpy.ndarray, optional): Boolean buffer of ``stop - start`` rows to write to.
+
+        Returns:
+            numpy.ndarray: Boolean mask of the range, or None without conditions (every row).
+        """
+        mask = None
+        for array, compare, operand in conditions:
+            if mask is None:
+                mask = compare(array[start:stop], operand, out=out)
+            else:
+                np.logical_and(mask, compare(array[start:stop], operand), out=mask)
+        return mask
+
+    def row(self, index):
+        """One catalog row as a dict (what the explainer and result formatting read)."""
+        return {column: values[index] for column, values in self.values.items()}
+
+    def column(self, column, rows):
+        """Values of ``column`` at ``rows`` as a Python list."""
+        return self.values[column][rows].tolist()
@@ -0,0 +1,230 @@
+"""
+Feature Blocks
+Keeps the manual, one-hot and TF-IDF features as separate unweighted segments,
+so block weights (e.g. the 10x text boost) are applied at query time.
+
+For weights w = (w_manual, w_onehot, w_tfidf), scoring a weighted query against a
+weighted row only needs per-block dot products and squared norms:
+
+    dot    = sum_b w_b^2 * (u_b . x_b)
+    |x|^2  = sum_b w_b^2 * |x_b|^2
+    cosine = dot / (|u| * |x|)
+    dist^2 = |u|^2 + |x|^2 - 2 * dot
+
+With weights (1, 1, 10) this reproduces the old baked-in feature matrix exactly.
+"""
+import os
+import numpy as np
+
+BLOCK_NAMES = ('manual', 'onehot', 'tfidf')
+DEFAULT_BLOCK_WEIGHTS = (1.0, 1.0, 10.0)
+BLOCK_FILES = {name: f'features_{name}.npy' for name in BLOCK_NAMES}
+SQ_NORMS_FILE = 'block_sq_norms.npy'
+# Optional LSA-compressed text block (see src/preprocessing/lsa_compression.py)
+LSA_BLOCK_FILE = 'features_tfidf_lsa.npy'
+# Shards only (see src/models/sharding.py): row of the full catalog for each shard row
+GLOBAL_ROWS_FILE = 'global_rows.npy'
+
+def squared_norms(matrix, chunksize=100_000):
+    """Row-wise squared L2 norms, computed in chunks so memmapped input stays out of RAM."""
+    out = np.empty(matrix.shape[0])
+    for start in range(0, matrix.shape[0], chunksize):
+        chunk = np.asarray(matrix[start:start + chunksize])
+        out[start:start + chunksize] = np.einsum('ij,ij->i', chunk, chunk)
+    return out
+
+def row_dots(matrix, vector):
+    """
+    Dot product of each row of ``matrix`` with ``vector``, summed the same way for every row.
+
+    A BLAS matrix-vector product sums the last few rows (and each thread's last few) in
+    another order than the rest, so a row's product could change in the last bit between
+    a full scan and a chunk or gathered subset, and flip the order of tied duplicate rows.
+    np.einsum sums each row independently of the others, which keeps the chunked, gathered
+    and cached scoring paths bitwise equal to a full scan.
+    """
+    return np.einsum('ij,j->i', matrix, np.ravel(vector))
+
+class FeatureBlocks:
+    """
+    Unweighted feature segments plus their cached per-row squared norms.
+
+    Attributes:
+        blocks (tuple): (manual, onehot, tfidf) matrices, one row per service.
+        sq_norms (numpy.ndarray): (n_services, 3) squared norm of each row in each block.
+    """
+
+    def __init__(self, manual, onehot, tfidf, sq_norms=None):
+        self.blocks = (manual, onehot, tfidf)
+        if sq_norms is None:
+            sq_norms = np.column_stack([squared_norms(block) for block in self.blocks])
+        self.sq_norms = sq_norms
+
+    def __len__(self):
+        return self.blocks[0].shape[0]
+
+    @property
+    def widths(self):
+        return tuple(block.shape[1] for block in self.blocks)
+
+    @classmethod
+    def from_matrix(cls, matrix, n_manual, n_onehot, tfidf_boost=DEFAULT_BLOCK_WEIGHTS[2]):
+        """Split a feature matrix into unweighted blocks (``tfidf_boost``: the text weight baked into it)."""
+        manual = np.asarray(matrix[:, :n_manual])
+        onehot = np.asarray(matrix[:, n_manual:n_manual + n_onehot])
+        tfidf = np.asarray(matrix[:, n_manual + n_onehot:]) / tfidf_boost
+        return cls(manual, onehot, tfidf)
+
+    @classmethod
+    def load(cls, processed_dir, n_manual=None, n_onehot=None, mmap_mode=None, use_lsa=False):
+        """
+        Load block segments from ``processed_dir``.
+
+        Falls back to splitting ``features.npy`` (built with the default 10x boost)
+        when the segments have not been generated yet; ``n_manual`` and ``n_onehot``
+        are required in that case.
+
+        With ``use_lsa`` the text block is the LSA projection (``features_tfidf_lsa.npy``)
+        instead of the full TF-IDF block.
+        """
+        paths = {name: os.path.join(processed_dir, BLOCK_FILES[name]) for name in BLOCK_NAMES}
+        if use_lsa:
+            paths['tfidf'] = os.path.join(processed_dir, LSA_BLOCK_FILE)
+            if not os.path.exists(paths['tfidf']):
+                raise FileNotFoundError(f"LSA block not found at {paths['tfidf']}. Run the pipeline with --lsa-components.")
+        if all(os.path.exists(path) for path in paths.values()):
+            blocks = [np.load(paths[name], mmap_mode=mmap_mode) for name in BLOCK_NAMES]
+            sq_norms_path = os.path.join(processed_dir, SQ_NORMS_FILE)
+            sq_norms = np.load(sq_norms_path) if os.path.exists(sq_norms_path) else None
+            if sq_norms is not None and use_lsa:
+                # Cached norms are for the full TF-IDF block; recompute the text column
+                sq_norms = sq_norms.copy()
+                sq_norms[:, 2] = squared_norms(blocks[2])
+            return cls(*blocks, sq_norms=sq_norms)
+
+        if n_manual is None or n_onehot is None:
+            raise FileNotFoundError(f"Feature blocks not found in {processed_dir}. Run feature_engineering.py first.")
+        return cls.from_matrix(np.load(os.path.join(processed_dir, 'features.npy'), mmap_mode='r'), n_manual, n_onehot)
+
+    def save(self, processed_dir):
+        """Write the segments and their squared norms to ``processed_dir``."""
+        os.makedirs(processed_dir, exist_ok=True)
+        for name, block in zip(BLOCK_NAMES, self.blocks):
+            np.save(os.path.join(processed_dir, BLOCK_FILES[name]), block)
+        np.save(os.path.join(processed_dir, SQ_NORMS_FILE), self.sq_norms)
+
+    def block_dots(self, user_blocks, rows=None, text_dots=None):
+        """
+        Per-block dot products between the (unweighted) query and catalog rows.
+
+        Args:
+            user_blocks (tuple): (manual, onehot, tfidf) query vectors, each 1 x width.
+            rows (array-like, optional): Row indices to score; all rows when omitted.
+            text_dots (numpy.ndarray, optional): The text block's products for every row
+                (``text_dots``), if already known; the text block is then not read.
+
+        Returns:
+            numpy.ndarray: (n_rows, 3) dot products.
+        """
+        columns = []
+        for b, (block, user_block) in enumerate(zip(self.blocks, user_blocks)):
+            if b == 2 and text_dots is not None:
+                columns.append(text_dots if rows is None else text_dots[rows])
+                continue
+            matrix = block if rows is None else block[rows]
+            columns.append(row_dots(matrix, user_block))
+        return np.column_stack(columns)
+
+    def text_dots(self, text_block):
+        """Dot products of a (1 x width) query text block with every row's text block."""
+        return row_dots(self.blocks[2], text_block)
+
+    def row_sq_norms(self, rows=None):
+        return self.sq_norms if rows is None else self.sq_norms[rows]
+
+    @staticmethod
+    def user_sq_norms(user_blocks):
+        return np.array([float(np.dot(np.ravel(b), np.ravel(b))) for b in user_blocks])
+
+    @staticmethod
+    def weighted_cosine(dots, user_sq, row_sq, weights):
+        """
+        Cosine similarity of the weighted query and rows from per-block statistics.
+
+        Rows (or a query) with zero norm score 0, as in sklearn's cosine_similarity.
+        """
+        w2 = np.square(np.asarray(weights, dtype=np.float64))
+        dot = dots @ w2
+        denom = np.sqrt(float(user_sq @ w2)) * np.sqrt(row_sq @ w2)
+        scores = np.zeros_like(dot)
+        np.divide(dot, denom, out=scores, where=denom > 0)
+        return scores
+
+    @staticmethod
+    def weighted_distance(dots, user_sq, row_sq, weights):
+        """Euclidean distance between the weighted query and rows from per-block statistics."""
+        w2 = np.square(np.asarray(weights, dtype=np.float64))
+        sq = float(user_sq @ w2) + row_sq @ w2 - 2.0 * (dots @ w2)
+        return np.sqrt(np.maximum(sq, 0.0))
+
+    @classmethod
+    def similarity(cls, dots, user_sq, row_sq, weights, ranking_method='cosine'):
+        """
+        Engine match score (higher is better): cosine similarity, or ``1 / (1 + distance)``
+        for the 'knn' ranking method.
+        """
+        if ranking_method == 'knn':
+            return 1.0 / (1.0 + cls.weighted_distance(dots, user_sq, row_sq, weights))
+        return cls.weighted_cosine(dots, user_sq, row_sq, weights)
+
+    def batch_similarity(self, batch, weights, ranking_method='cosine'):
+        """
+        Match scores of every row for several queries, with one matrix product per block
+        (one pass over the catalog for the whole batch).
+
+        Scores equal ``similarity`` up to floating-point rounding (the products are summed
+        in a different order), so exact rankings must re-score the rows that matter.
+
+        Args:
+            batch (list): Unweighted (manual, onehot, tfidf) query blocks per query.
+            weights (tuple): Block weights shared by the batch.
+
+        Returns:
+            numpy.ndarray: (n_rows, n_queries) scores.
+        """
+        w2 = np.square(np.asarray(weights, dtype=np.float64))
+        dot = None
+        for b, block in enumerate(self.blocks):
+            queries = np.vstack([np.ravel(user_blocks[b]) for user_blocks in batch])
+            term = block @ queries.T
+            term *= w2[b]
+            dot = term if dot is None else np.add(dot, term, out=dot)
+        user_sq = np.array([float(self.user_sq_norms(user_blocks) @ w2) for user_blocks in batch])
+        row_sq = self.sq_norms @ w2
+        if ranking_method == 'knn':
+            sq = np.maximum(user_sq[None, :] + row_sq[:, None] - 2.0 * dot, 0.0)
+            return 1.0 / (1.0 + np.sqrt(sq))
+        denom = np.sqrt(row_sq)[:, None] * np.sqrt(user_sq)[None, :]
+        scores = np.zeros_like(dot)
+        np.divide(dot, denom, out=scores, where=denom > 0)
+        return scores
+
+    @staticmethod
+    def block_contributions(dots, user_sq, row_sq, weights, ranking_method='cosine'):
+        """
+        Per-block breakdown of each row's match score.
+
+        For cosine these are the terms ``w_b^2 * (u_b . x_b) / (|u| * |x|)``, which sum to
+        the score. For 'knn' they are the squared weighted distances ``w_b^2 * |u_b - x_b|^2``,
+        which sum to distance^2 (the score is ``1 / (1 + distance)``).
+
+        Returns:
+            numpy.ndarray: (n_rows, 3) contributions in (manual, onehot, tfidf) order.
+        """
+        w2 = np.square(np.asarray(weights, dtype=np.float64))
+        if ranking_method == 'knn':
+            return np.maximum(user_sq + row_sq - 2.0 * dots, 0.0) * w2
+        denom = np.sqrt(float(user_sq @ w2)) * np.sqrt(row_sq @ w2)
+        contributions = np.zeros_like(dots, dtype=np.float64)
+        np.divide(dots * w2, denom[:, None], out=contributions, where=denom[:, None] > 0)
+        return contributions
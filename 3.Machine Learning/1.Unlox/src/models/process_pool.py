@@ -0,0 +1,341 @@
+"""
+Engine Process Pool
+Multi-process serving for CPU-bound scoring beyond what one interpreter's GIL allows.
+
+The parent loads the engine's artifacts once and copies them into shared memory
+(shared_artifacts.py). Worker processes attach zero-copy, so the pool holds about one copy of
+the feature blocks and catalog however many workers run. Each worker keeps only its own
+encoders and explanation generator.
+
+Requests wait in the parent's queue and go to idle workers over a pipe, one at a time per
+worker. A dispatcher thread collects the results into ``concurrent.futures.Future`` objects
+and watches the worker processes. If a worker dies, the request it was running fails with
+``WorkerCrashedError``, a replacement worker is started, and everything else carries on.
+
+Usage:
+    with EngineProcessPool(workers=4) as pool:
+        results = pool.get_recommendations(user_input, top_k=5)
+        future = pool.submit(user_input)
+        batch = pool.get_recommendations_batch([query_a, query_b])
+"""
+import os
+import time
+import threading
+import collections
+import multiprocessing
+from multiprocessing.connection import wait
+from concurrent.futures import Future
+
+from src.models.recommendation_engine import RecommendationEngine
+from src.models.shared_artifacts import SharedArtifacts, attach
+from src.utils.metrics import MetricsRegistry
+
+# Seconds a (re)started worker may take to import, attach and report ready
+START_TIMEOUT = 120
+
+class WorkerCrashedError(RuntimeError):
+    """The worker process running a request died before answering it."""
+
+def _worker_main(spec, engine_kwargs, tasks, results):
+    """
+    Worker process: attach to the shared artifacts, then answer requests until told to stop
+    (``None``) or the parent goes away.
+    """
+    artifacts = attach(spec)
+    engine = RecommendationEngine(artifacts=artifacts, **engine_kwargs)
+    results.send(('ready', os.getpid(), None))
+    try:
+        while True:
+            try:
+                task = tasks.recv()
+            except EOFError:
+                break
+            if task is None:
+                break
+            task_id, kind, payload, kwargs = task
+            try:
+                if kind == 'batch':
+                    value = engine.get_recommendations_batch(payload, **kwargs)
+                elif kind == 'search':
+                    value = engine.search(payload, **kwargs)
+                else:
+                    value = engine.get_recommendations(payload, **kwargs)
+                message = (task_id, True, value)
+            except Exception as e:
+                message = (task_id, False, e)
+            try:
+                results.send(message)
+            except Exception as e:
+                # The error itself may not pickle; send its description instead
+                results.send((task_id, False, RuntimeError(f"{type(e).__name__}: {e}")))
+    finally:
+        del engine
+        artifacts.close()
+
+class _Worker:
+    """Parent-side handle of one worker process."""
+
+    def __init__(self, context, spec, engine_kwargs):
+        task_reader, self.tasks = context.Pipe(duplex=False)
+        self.results, result_writer = context.Pipe(duplex=False)
+        self.process = context.Process(target=_worker_main, args=(spec, engine_kwargs, task_reader, result_writer),
+                                       daemon=True)
+        self.process.start()
+        # The child holds its own copies of these ends
+        task_reader.close()
+        result_writer.close()
+        self.started = time.monotonic()
+        self.ready = False
+        self.lost = False  # the pipe broke; waiting for the process sentinel
+        self.task = None  # (task_id, future) being run
+
+class EngineProcessPool:
+    """
+    RecommendationEngine served by worker processes over shared-memory artifacts.
+
+    Exposes the engine's get_recommendations (blocking) plus ``submit`` (a Future) and
+    batch variants. Requests are independent, so any worker can answer any request.
+
+    Attributes:
+        workers (int): Number of worker processes.
+        restarts (int): Workers restarted after a crash.
+        shared (SharedArtifacts): The shared memory segment (``shared.nbytes`` is its size).
+    """
+
+    def __init__(self, workers=None, start_timeout=START_TIMEOUT, **engine_kwargs):
+        """
+        Load the artifacts, share them and start the workers (returns once all are ready).
+
+        Args:
+            workers (int, optional): Worker processes (default: the number of CPUs).
+            start_timeout (float): Seconds each worker may take to start.
+            **engine_kwargs: RecommendationEngine arguments, e.g. processed_dir,
+                cleaned_data_path, models_dir, ranking_method, block_weights, use_lsa.
+                They are sent to the workers, so they must be picklable; float storage only.
+                Each worker records metrics in its own process.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.start_timeout = start_timeout
+        self.restarts = 0
+        self._engine_kwargs = engine_kwargs
+        # Loaded once in the parent, copied to shared memory, then dropped
+        engine = RecommendationEngine(metrics=MetricsRegistry(), **engine_kwargs)
+        self.shared = SharedArtifacts.from_engine(engine)
+        del engine
+
+        self._context = multiprocessing.get_context('spawn')
+        self._lock = threading.Lock()
+        self._pending = collections.deque()
+        self._task_ids = iter(range(1, 1 << 62))
+        self._closed = False
+        self._broken = None
+        self._wake_reader, self._wake_writer = self._context.Pipe(duplex=False)
+        self._workers = [self._start_worker() for _ in range(self.workers)]
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name='unlox-pool-dispatcher', daemon=True)
+        self._dispatcher.start()
+        deadline = time.monotonic() + start_timeout
+        while not all(worker.ready for worker in self._workers):
+            if self._broken is not None:
+                self.close()
+                raise RuntimeError(self._broken)
+            if time.monotonic() > deadline:
+                self.close()
+                raise RuntimeError(f"Workers did not start within {start_timeout} s.")
+            time.sleep(0.01)
+
+    def _start_worker(self):
+        return _Worker(self._context, self.shared.spec, self._engine_kwargs)
+
+    @property
+    def pids(self):
+        """Process IDs of the current workers."""
+        return [worker.process.pid for worker in self._workers]
+
+    def submit(self, user_input, **kwargs):
+        """
+        Queue get_recommendations(user_input, **kwargs) on the next idle worker.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the result list. It raises the query's
+                own error, or WorkerCrashedError if the worker died while running it.
+        """
+        return self._submit('one', user_input, kwargs)
+
+    def submit_batch(self, user_inputs, **kwargs):
+        """Queue several queries as one request (one round trip); the Future resolves to a list of result lists."""
+        return self._submit('batch', list(user_inputs), kwargs)
+
+    def submit_search(self, user_input, **kwargs):
+        """Queue RecommendationEngine.search (results with their merge keys, for scatter-gather)."""
+        return self._submit('search', user_input, kwargs)
+
+    def get_recommendations(self, user_input, **kwargs):
+        """Same arguments and results as RecommendationEngine.get_recommendations."""
+        return self.submit(user_input, **kwargs).result()
+
+    def get_recommendations_batch(self, user_inputs, **kwargs):
+        return self.submit_batch(user_inputs, **kwargs).result()
+
+    def _submit(self, kind, payload, kwargs):
+        if kwargs.get('profile'):
+            raise ValueError("Profiling is not supported by the process pool; profile on a RecommendationEngine.")
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The pool is closed.")
+            if self._broken is not None:
+                raise RuntimeError(self._broken)
+            self._pending.append((next(self._task_ids), kind, payload, kwargs, future))
+            self._dispatch()
+        return future
+
+    def _dispatch(self):
+        """Send queued requests to idle workers (caller holds the lock)."""
+        for worker in self._workers:
+            if not self._pending:
+                return
+            if not worker.ready or worker.lost or worker.task is not None:
+                continue
+            while self._pending:
+                task = self._pending.popleft()
+                future = task[-1]
+                if not future.running() and not future.set_running_or_notify_cancel():
+                    continue  # cancelled while queued
+                try:
+                    worker.tasks.send(task[:4])
+                except OSError:
+                    # The worker died; the request never reached it, so it goes to another one
+                    worker.lost = True
+                    self._pending.appendleft(task)
+                    break
+                worker.task = (task[0], future)
+                break
+
+    def _dispatch_loop(self):
+        """Collect results, detect dead workers and keep the idle workers busy."""
+        while True:
+            with self._lock:
+                if self._closed and not any(worker.task for worker in self._workers):
+                    return
+                handles = {self._wake_reader: None}
+                for worker in self._workers:
+                    handles[worker.results] = worker
+                    handles[worker.process.sentinel] = worker
+            for handle in wait(list(handles), timeout=1.0):
+                worker = handles[handle]
+                if worker is None:
+                    self._wake_reader.recv()
+                elif handle is worker.results:
+                    self._receive(worker)
+                elif not worker.process.is_alive():
+                    self._replace(worker)
+            self._check_start_timeouts()
+
+    def _receive(self, worker):
+        """Handle one message from ``worker``; False once its pipe is closed."""
+        try:
+            task_id, ok, value = worker.results.recv()
+        except (EOFError, OSError):
+            return False  # The worker is exiting; its sentinel reports it
+        done = None
+        with self._lock:
+            if task_id == 'ready':
+                worker.ready = True
+            elif worker.task is not None and worker.task[0] == task_id:
+                done, worker.task = worker.task[1], None
+            self._dispatch()
+        if done is not None:
+            if ok:
+                done.set_result(value)
+            else:
+                done.set_exception(value)
+        return True
+
+    def _replace(self, worker):
+        """A worker exited: fail its request and start a replacement."""
+        # Answers it sent before exiting are still in the pipe
+        while worker.results.poll() and self._receive(worker):
+            pass
+        worker.process.join()
+        with self._lock:
+            crashed, worker.task = worker.task, None
+            if self._closed:
+                self._workers.remove(worker)
+                replacement = None
+            elif not worker.ready:
+                # Failing before ready would fail again; stop instead of restarting in a loop
+                self._workers.remove(worker)
+                replacement = None
+                self._fail_all(f"Worker {worker.process.pid} failed to start "
+                               f"(exit code {worker.process.exitcode}).")
+            else:
+                replacement = self._start_worker()
+                self._workers[self._workers.index(worker)] = replacement
+                self.restarts += 1
+        worker.results.close()
+        worker.tasks.close()
+        if crashed is not None:
+            crashed[1].set_exception(WorkerCrashedError(
+                f"Worker {worker.process.pid} exited with code {worker.process.exitcode} while running this request."))
+
+    def _check_start_timeouts(self):
+        now = time.monotonic()
+        for worker in list(self._workers):
+            if not worker.ready and now - worker.started > self.start_timeout and worker.process.is_alive():
+                worker.process.terminate()
+
+    def _fail_all(self, reason):
+        """Mark the pool broken and fail every queued request (caller holds the lock)."""
+        self._broken = reason
+        while self._pending:
+            future = self._pending.popleft()[-1]
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError(reason))
+
+    def close(self, timeout=10.0):
+        """Finish queued and running requests, stop the workers and remove the shared memory."""
+        with self._lock:
+            if self._closed:
+                return
+            futures = [task[-1] for task in self._pending] + [w.task[1] for w in self._workers if w.task]
+        for future in futures:
+            try:
+                future.exception(timeout=timeout)
+            except Exception:
+                pass  # Cancelled or timed out; closing anyway
+        with self._lock:
+            self._closed = True
+            self._fail_all("The pool is closed.")
+            for worker in self._workers:
+                try:
+                    worker.tasks.send(None)
+                except OSError:
+                    pass
+        self._wake_writer.send(None)
+        deadline = time.monotonic() + timeout
+        for worker in list(self._workers):
+            worker.process.join(max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join()
+        self._dispatcher.join(timeout)
+        self.shared.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+if __name__ == "__main__":
+    test_input = {
+        'Target_Business_Type': 'Restaurant',
+        'Price_Category': 'Low',
+        'Language_Support': ['Hindi'],
+        'Location_Area': 'Remote',
+        'Description': 'accounting and tax help'
+    }
+    with EngineProcessPool(workers=2) as pool:
+        print(f"{pool.workers} workers on {pool.shared.nbytes / 1e6:.1f} MB of shared artifacts")
+        for r in pool.get_recommendations(test_input, top_k=3):
+            print(f"[{r['Match_Score']}%] {r['Service_Name']} ({r['Price_Category']})")
@@ -0,0 +1,334 @@
+"""
+Quantized Feature Storage
+Compressed copies of the feature blocks for large catalogs. Candidates are scored
+approximately on 8-bit codes, and a shortlist is re-ranked exactly against the
+full-precision rows (memory-mapped, so only the shortlisted rows are read).
+
+Two methods:
+- 'int8': per-dimension scalar quantization, x ~= lo + scale * code (8x smaller than float64).
+- 'pq':   product quantization of the TF-IDF block. The vector is split into sub-vectors
+          and each one is replaced by the id of its nearest of 256 centroids. A query is
+          scored with a (n_subspaces x 256) lookup table (~32x smaller with 4 dims per code).
+          The small manual and one-hot blocks use 'int8' in both modes.
+
+Only dot products are approximated; cosine denominators use the exact cached norms.
+
+Artifacts (in the processed data dir):
+- codes_<method>.npy: (n_services x code width) uint8 codes of all three blocks side by side.
+- quantizer_<method>.pkl: The fitted quantizers (a few KB).
+"""
+import os
+import pickle
+import warnings
+import numpy as np
+from src.models.feature_blocks import FeatureBlocks, BLOCK_NAMES, BLOCK_FILES
+
+QUANTIZATION_METHODS = ('int8', 'pq')
+CODES_FILE = 'codes_{method}.npy'
+QUANTIZER_FILE = 'quantizer_{method}.pkl'
+
+class ScalarQuantizer:
+    """
+    Per-dimension 8-bit quantization over the [min, max] range of each column.
+
+    Attributes:
+        lo (numpy.ndarray): Column minimums.
+        scale (numpy.ndarray): Step size per column (0 for constant columns).
+    """
+
+    def __init__(self, lo, scale):
+        self.lo = lo
+        self.scale = scale
+
+    @property
+    def code_width(self):
+        return len(self.lo)
+
+    @classmethod
+    def fit(cls, block, chunksize=100_000):
+        """Exact column ranges, computed in chunks so memmapped input stays out of RAM."""
+        lo = np.full(block.shape[1], np.inf)
+        hi = np.full(block.shape[1], -np.inf)
+        for start in range(0, block.shape[0], chunksize):
+            chunk = np.asarray(block[start:start + chunksize])
+            np.minimum(lo, chunk.min(axis=0), out=lo)
+            np.maximum(hi, chunk.max(axis=0), out=hi)
+        return cls(lo, (hi - lo) / 255.0)
+
+    def encode(self, chunk):
+        inverse = np.divide(1.0, self.scale, out=np.zeros_like(self.scale), where=self.scale > 0)
+        return np.clip(np.rint((np.asarray(chunk) - self.lo) * inverse), 0, 255).astype(np.uint8)
+
+    def decode(self, codes):
+        return self.lo + codes * self.scale
+
+    def dot(self, codes, query, chunksize=65_536):
+        """Approximate ``x . query`` for every coded row: ``query . lo + (query * scale) . code``."""
+        query = np.ravel(query)
+        weights = (query * self.scale).astype(np.float32)
+        # Text queries touch few terms: only the columns with a non-zero weight are read
+        active = np.flatnonzero(weights)
+        out = np.empty(codes.shape[0])
+        for start in range(0, codes.shape[0], chunksize):
+            out[start:start + chunksize] = codes[start:start + chunksize, active].astype(np.float32) @ weights[active]
+        out += float(query @ self.lo)
+        return out
+
+class ProductQuantizer:
+    """
+    Splits vectors into ``n_subspaces`` sub-vectors, each coded as one of up to 256 centroids.
+
+    Attributes:
+        centroids (numpy.ndarray): (n_subspaces, 256, sub_dim) codebooks. Columns are
+            zero-padded to a multiple of ``sub_dim``.
+        width (int): Original vector width.
+    """
+
+    def __init__(self, centroids, width):
+        self.centroids = centroids
+        self.width = width
+
+    @property
+    def code_width(self):
+        return self.centroids.shape[0]
+
+    @classmethod
+    def fit(cls, block, sub_dim=4, sample_size=20_000, seed=42):
+        """
+        Learn one k-means codebook per subspace on a row sample.
+
+        Subspaces with at most 256 distinct sub-vectors (common for sparse TF-IDF
+        columns) use those sub-vectors directly and are coded without loss.
+        """
+        from sklearn.cluster import KMeans
+
+        rng = np.random.default_rng(seed)
+        rows = np.arange(block.shape[0])
+        if block.shape[0] > sample_size:
+            rows = np.sort(rng.choice(block.shape[0], size=sample_size, replace=False))
+        sample = cls._split(np.asarray(block[rows]), sub_dim)
+
+        centroids = np.zeros((sample.shape[1], 256, sub_dim))
+        for j in range(sample.shape[1]):
+            distinct = np.unique(sample[:, j], axis=0)
+            if len(distinct) <= 256:
+                centroids[j, :len(distinct)] = distinct
+                # Pad with copies of the first centroid so argmin never picks an unused slot
+                centroids[j, len(distinct):] = distinct[0]
+                continue
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                kmeans = KMeans(n_clusters=256, n_init=1, max_iter=25, random_state=seed).fit(sample[:, j])
+            centroids[j] = kmeans.cluster_centers_
+        return cls(centroids, block.shape[1])
+
+    @staticmethod
+    def _split(chunk, sub_dim):
+        """(n, width) -> (n, n_subspaces, sub_dim), zero-padding the last subspace."""
+        pad = -chunk.shape[1] % sub_dim
+        if pad:
+            chunk = np.pad(chunk, ((0, 0), (0, pad)))
+        return chunk.reshape(chunk.shape[0], -1, sub_dim)
+
+    def encode(self, chunk):
+        parts = self._split(np.asarray(chunk, dtype=np.float64), self.centroids.shape[2])
+        codes = np.empty(parts.shape[:2], dtype=np.uint8)
+        centroid_sq = np.einsum('mkd,mkd->mk', self.centroids, self.centroids)
+        for j in range(parts.shape[1]):
+            # argmin |x - c|^2 == argmin |c|^2 - 2 x.c
+            codes[:, j] = np.argmin(centroid_sq[j] - 2.0 * parts[:, j] @ self.centroids[j].T, axis=1)
+        return codes
+
+    def decode(self, codes):
+        parts = self.centroids[np.arange(self.code_width), codes.astype(np.intp)]
+        return parts.reshape(codes.shape[0], -1)[:, :self.width]
+
+    def dot(self, codes, query, chunksize=65_536):
+        """Approximate ``x . query`` as the sum of per-subspace lookup table entries."""
+        query = self._split(np.ravel(query)[None, :], self.centroids.shape[2])[0]
+        table = np.einsum('mkd,md->mk', self.centroids, query).astype(np.float32)
+        # Subspaces where the query is zero contribute nothing and are skipped
+        active = np.flatnonzero(np.any(table != 0, axis=1))
+        table = table.ravel()
+        offsets = active * 256
+        out = np.empty(codes.shape[0])
+        for start in range(0, codes.shape[0], chunksize):
+            index = codes[start:start + chunksize, active].astype(np.intp)
+            index += offsets
+            out[start:start + chunksize] = table[index].sum(axis=1)
+        return out
+
+class QuantizedBlocks:
+    """
+    8-bit codes of the (manual, onehot, tfidf) blocks, with the same ``block_dots``
+    interface as FeatureBlocks (the dots are approximate).
+
+    Attributes:
+        method (str): 'int8' or 'pq'.
+        quantizers (tuple): One quantizer per block.
+        codes (numpy.ndarray): (n_services, sum of code widths) uint8 codes.
+    """
+
+    def __init__(self, method, quantizers, codes):
+        self.method = method
+        self.quantizers = tuple(quantizers)
+        self.codes = codes
+        bounds = np.cumsum([0] + [q.code_width for q in self.quantizers])
+        self.slices = [slice(a, b) for a, b in zip(bounds[:-1], bounds[1:])]
+
+    def __len__(self):
+        return self.codes.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes
+
+    @staticmethod
+    def fit_quantizers(blocks, method='int8', sub_dim=4, sample_size=20_000, seed=42):
+        """
+        Fit a quantizer per block.
+
+        Args:
+            blocks (tuple): (manual, onehot, tfidf) matrices (may be memmaps).
+            method (str): 'int8' or 'pq' (product quantization of the TF-IDF block).
+            sub_dim (int): PQ dimensions per one-byte code.
+            sample_size (int): PQ codebooks are trained on at most this many rows.
+            seed (int): Random state of the PQ sample and k-means.
+
+        Returns:
+            list: Fitted quantizers.
+        """
+        if method not in QUANTIZATION_METHODS:
+            raise ValueError(f"Unknown quantization method '{method}'. Use one of {QUANTIZATION_METHODS}.")
+        quantizers = [ScalarQuantizer.fit(block) for block in blocks[:2]]
+        if method == 'pq':
+            quantizers.append(ProductQuantizer.fit(blocks[2], sub_dim=sub_dim, sample_size=sample_size, seed=seed))
+        else:
+            quantizers.append(ScalarQuantizer.fit(blocks[2]))
+        return quantizers
+
+    @classmethod
+    def from_blocks(cls, blocks, method='int8', out=None, chunksize=50_000, **fit_kwargs):
+        """
+        Fit quantizers and encode every row.
+
+        Args:
+            blocks (FeatureBlocks or tuple): Full-precision blocks.
+            method (str): 'int8' or 'pq'.
+            out (numpy.ndarray, optional): Preallocated uint8 code array (e.g. a memmap).
+            chunksize (int): Rows encoded at once.
+            **fit_kwargs: Passed to ``fit_quantizers``.
+        """
+        blocks = blocks.blocks if isinstance(blocks, FeatureBlocks) else tuple(blocks)
+        quantizers = cls.fit_quantizers(blocks, method=method, **fit_kwargs)
+        n_rows = blocks[0].shape[0]
+        if out is None:
+            out = np.empty((n_rows, sum(q.code_width for q in quantizers)), dtype=np.uint8)
+        quantized = cls(method, quantizers, out)
+        quantized.encode_rows(blocks, chunksize=chunksize)
+        return quantized
+
+    def encode_rows(self, blocks, chunksize=50_000):
+        """Fill ``self.codes`` from full-precision blocks, ``chunksize`` rows at a time."""
+        for start in range(0, len(self), chunksize):
+            for block, quantizer, columns in zip(blocks, self.quantizers, self.slices):
+                self.codes[start:start + chunksize, columns] = quantizer.encode(block[start:start + chunksize])
+
+    def save(self, processed_dir):
+        """Write the codes and the quantizers to ``processed_dir``."""
+        os.makedirs(processed_dir, exist_ok=True)
+        np.save(os.path.join(processed_dir, CODES_FILE.format(method=self.method)), self.codes)
+        self.save_quantizers(processed_dir)
+
+    def save_quantizers(self, processed_dir):
+        with open(os.path.join(processed_dir, QUANTIZER_FILE.format(method=self.method)), 'wb') as f:
+            pickle.dump(self.quantizers, f)
+
+    @classmethod
+    def load(cls, processed_dir, method, mmap_mode=None):
+        codes_path = os.path.join(processed_dir, CODES_FILE.format(method=method))
+        quantizer_path = os.path.join(processed_dir, QUANTIZER_FILE.format(method=method))
+        if not (os.path.exists(codes_path) and os.path.exists(quantizer_path)):
+            raise FileNotFoundError(f"Quantized '{method}' features not found in {processed_dir}. "
+                                    f"Run the pipeline with --quantize {method}.")
+        with open(quantizer_path, 'rb') as f:
+            quantizers = pickle.load(f)
+        return cls(method, quantizers, np.load(codes_path, mmap_mode=mmap_mode))
+
+    def block_dots(self, user_blocks, rows=None):
+        """Approximate per-block dot products, shape (n_rows, 3); see FeatureBlocks.block_dots."""
+        codes = self.codes if rows is None else self.codes[rows]
+        return np.column_stack([quantizer.dot(codes[:, columns], user_block)
+                                for quantizer, columns, user_block in zip(self.quantizers, self.slices, user_blocks)])
+
+    def decode(self, rows=None):
+        """Reconstructed (lossy) float blocks, mainly for checking quantization error."""
+        codes = self.codes if rows is None else self.codes[rows]
+        return tuple(q.decode(codes[:, columns]) for q, columns in zip(self.quantizers, self.slices))
+
+def approximate_scores(quantized, exact, user_blocks, weights, rows=None, ranking_method='cosine'):
+    """Similarity of the query to ``rows`` from the codes (approximate dots, exact norms)."""
+    return FeatureBlocks.similarity(quantized.block_dots(user_blocks, rows), exact.user_sq_norms(user_blocks),
+                                    exact.row_sq_norms(rows), weights, ranking_method)
+
+def rerank_shortlist(approx, exact, user_blocks, weights, top_k, rows=None, rerank_factor=10,
+                     ranking_method='cosine', size=None):
+    """
+    Re-score the ``rerank_factor * top_k`` (or ``size``) best rows by ``approx`` exactly
+    and keep the top k.
+
+    Returns:
+        tuple: (positions into ``rows`` best first, exact similarity scores).
+    """
+    n_rows = len(approx)
+    size = min(n_rows, max(size or top_k * rerank_factor, top_k))
+    shortlist = np.arange(n_rows) if size >= n_rows else np.sort(np.argpartition(-approx, size - 1)[:size])
+    # Sorted positions keep the candidate order for ties and read the memmap sequentially
+    shortlist_rows = shortlist if rows is None else np.asarray(rows)[shortlist]
+
+    scores = FeatureBlocks.similarity(exact.block_dots(user_blocks, shortlist_rows), exact.user_sq_norms(user_blocks),
+                                      exact.row_sq_norms(shortlist_rows), weights, ranking_method)
+    order = np.argsort(-scores, kind='stable')[:top_k]
+    return shortlist[order], scores[order]
+
+def rerank_top_k(quantized, exact, user_blocks, weights, top_k, rows=None, rerank_factor=10,
+                 ranking_method='cosine'):
+    """
+    Two-pass search: approximate scores on the codes, exact scores on a shortlist.
+
+    Args:
+        quantized (QuantizedBlocks): Compressed blocks used to pick the shortlist.
+        exact (FeatureBlocks): Full-precision blocks (ideally memory-mapped) and exact norms.
+        user_blocks (tuple): Unweighted (manual, onehot, tfidf) query blocks.
+        weights (tuple): Block weights.
+        top_k (int): Number of results.
+        rows (array-like, optional): Candidate row indices; all rows when omitted.
+        rerank_factor (int): Shortlist size as a multiple of ``top_k``.
+        ranking_method (str): 'cosine' or 'knn'.
+
+    Returns:
+        tuple: (positions into ``rows`` best first, exact similarity scores).
+    """
+    approx = approximate_scores(quantized, exact, user_blocks, weights, rows=rows, ranking_method=ranking_method)
+    return rerank_shortlist(approx, exact, user_blocks, weights, top_k, rows=rows, rerank_factor=rerank_factor,
+                            ranking_method=ranking_method)
+
+def build_quantized_artifacts(features_dir, processed_dir, method='int8', chunksize=50_000, **fit_kwargs):
+    """
+    Quantize the block files in ``features_dir`` and write the codes into ``processed_dir``
+    through a memmap, so the full-precision blocks are never loaded at once.
+    """
+    blocks = [np.load(os.path.join(features_dir, BLOCK_FILES[name]), mmap_mode='r') for name in BLOCK_NAMES]
+    quantizers = QuantizedBlocks.fit_quantizers(blocks, method=method, **fit_kwargs)
+
+    os.makedirs(processed_dir, exist_ok=True)
+    codes = np.lib.format.open_memmap(os.path.join(processed_dir, CODES_FILE.format(method=method)), mode='w+',
+                                      dtype=np.uint8, shape=(blocks[0].shape[0], sum(q.code_width for q in quantizers)))
+    quantized = QuantizedBlocks(method, quantizers, codes)
+    quantized.encode_rows(blocks, chunksize=chunksize)
+    codes.flush()
+    quantized.save_quantizers(processed_dir)
+    full_bytes = sum(block.nbytes for block in blocks)
+    print(f"Quantized features ({method}): {full_bytes / 1e6:.1f} MB -> {codes.nbytes / 1e6:.1f} MB "
+          f"({full_bytes / max(codes.nbytes, 1):.0f}x smaller)")
+    del codes
@@ -1,10 +1,21 @@
 import numpy as np
 import pandas as pd
 import os
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.neighbors import NearestNeighbors
+import copy
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from src.models.user_encoder import UserEncoder
 from src.models.explanation_generator import ExplanationGenerator
+from src.models.feature_blocks import FeatureBlocks, DEFAULT_BLOCK_WEIGHTS, BLOCK_NAMES, GLOBAL_ROWS_FILE, row_dots
+from src.models.quantization import QuantizedBlocks, approximate_scores, rerank_shortlist
+from src.models.catalog_columns import CatalogColumns, freeze
+from src.models.score_cache import TextScoreCache
+from src.models.bound_index import BoundIndex
+from src.models.two_stage import TopTermBlocks
+from src.utils.metrics import REGISTRY
+from src.utils.canonical import input_key
+from src.utils.single_flight import SingleFlight
 
 # Paths
 # Paths
@@ -14,105 +25,820 @@ PROJECT_ROOT = os.path.dirname(os.path.dirname(current_dir))
 PROCESSED_DATA_DIR = os.path.join(PROJECT_ROOT, 'data', 'processed')
 CLEANED_DATA_PATH = os.path.join(PROJECT_ROOT, 'data', 'cleaned', 'service_recommendation_data_cleaned.csv')
 
+# Instrumented stages of get_recommendations ('format' includes 'explain', 'total' everything)
+ENGINE_STAGES = ('filter', 'encode', 'score', 'rank', 'format', 'explain', 'total')
+CANDIDATE_BUCKETS = (0, 1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+# Ranked results scoring below this are not returned
+SCORE_THRESHOLD = 0.1
+# get_recommendations_batch: queries whose candidates cover at least this share of the catalog
+# are scored together with one matrix product per block; the others one by one
+BATCH_DENSE_FRACTION = 0.1
+# Most (rows x queries) scores computed at once; larger batches are split
+BATCH_MAX_CELLS = 2_000_000
+# Batched scores differ from per-query ones by rounding only (~1e-14); every row within this
+# margin of the k-th best is re-scored exactly, which keeps rankings and ties identical
+BATCH_SHORTLIST_MARGIN = 1e-9
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+# Anytime search (time_budget_ms / deadline): candidates are scored in chunks of this many
+# rows and the deadline is checked between chunks, which bounds the overshoot
+ANYTIME_CHUNK_ROWS = 16_384
+COVERAGE_BUCKETS = (0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0)
+# Bounded search (bound_search=True): row blocks are scored in batches of candidates that
+# start at the first size and double up to the second, so a selective query stops early and
+# a broad one does not loop for long. Blocks whose bound is within the margin of the k-th
+# best score are still scored, since a bound and a score can round differently
+BOUND_BATCH_ROWS = (128, 4096)
+BOUND_MARGIN = 1e-9
+# Fused scan (fused_scan=True): filters, scores and top-k run a chunk of this many rows at a
+# time, so temporaries are bounded by the chunk instead of the candidate count. Chunks where
+# at least FUSED_DENSE_FRACTION of the rows pass the filters are scored in place (no gather)
+FUSED_CHUNK_ROWS = 65_536
+FUSED_DENSE_FRACTION = 0.5
+
+def _no_lap(stage):
+    pass
+
+def _and(mask, condition):
+    return condition if mask is None else np.logical_and(mask, condition, out=mask)
+
+def batch_shortlist(scores, top_k):
+    """
+    Positions (ascending) of every score that can be in the top ``top_k`` once re-scored
+    exactly: all scores within 2 * BATCH_SHORTLIST_MARGIN of the k-th best.
+    """
+    n = len(scores)
+    if top_k >= n:
+        return np.arange(n)
+    if top_k <= 0:
+        return np.empty(0, dtype=np.intp)
+    kth = np.partition(scores, n - top_k)[n - top_k]
+    return np.flatnonzero(scores >= kth - 2 * BATCH_SHORTLIST_MARGIN)
+
+def merge_top_k(scores, positions, top_k):
+    """
+    Best ``top_k`` of scored candidate positions (any order): highest score first, ties by
+    position, so a merge over every candidate equals top_k_positions.
+
+    Returns:
+        tuple: (positions, scores), best first.
+    """
+    n = len(scores)
+    if n > top_k > 0:
+        kth = np.partition(scores, n - top_k)[n - top_k]
+        keep = np.flatnonzero(scores >= kth)
+        scores, positions = scores[keep], positions[keep]
+    order = np.lexsort((positions, -scores))[:max(top_k, 0)]
+    return positions[order], scores[order]
+
+class RecommendationResults(list):
+    """
+    Result list of a time-budgeted get_recommendations call.
+
+    Attributes:
+        partial (bool): The budget ran out before every candidate was scored; the results
+            are the best of the candidates that were.
+        coverage (float): Share of the filtered candidates that were scored (1.0 when complete).
+    """
+
+    def __init__(self, results=(), partial=False, coverage=1.0):
+        super().__init__(results)
+        self.partial = partial
+        self.coverage = coverage
+
+def top_k_positions(scores, top_k):
+    """
+    Positions of the ``top_k`` highest scores, best first; ties keep their order in
+    ``scores``. Same result as a stable argsort, but only the rows tied with or above
+    the k-th best score are sorted.
+    """
+    n = len(scores)
+    if top_k >= n:
+        return np.argsort(-scores, kind='stable')[:top_k]
+    if top_k <= 0:
+        return np.empty(0, dtype=np.intp)
+    kth = np.partition(scores, n - top_k)[n - top_k]
+    candidates = np.flatnonzero(scores >= kth)
+    return candidates[np.argsort(-scores[candidates], kind='stable')[:top_k]]
+
 class RecommendationEngine:
-    def __init__(self, ranking_method='cosine'):
+    """
+    Thread safety: one engine can serve any number of threads. Artifacts are loaded once and
+    frozen (read-only arrays, no per-query mutation), the query path keeps all per-query
+    state in locals, and configuration (ranking_method, block_weights) is read once per
+    call. ``submit`` runs queries on a shared thread pool. Scoring and filtering are NumPy
+    operations that release the GIL, so threads overlap there.
+    """
+
+    def __init__(self, ranking_method='cosine', block_weights=DEFAULT_BLOCK_WEIGHTS,
+                 processed_dir=None, cleaned_data_path=None, models_dir=None, use_lsa=False,
+                 storage='float', rerank_factor=10, metrics=None, slow_query_log=None, capture=None,
+                 max_workers=None, artifacts=None, single_flight=False, text_score_cache_mb=0,
+                 bound_search=False, fused_scan=False, two_stage_shortlist=0):
         """
         Initialize recommendation engine.
         
         Args:
             ranking_method: 'cosine' for Cosine Similarity or 'knn' for K-Nearest Neighbors
+            block_weights: Default (manual, one-hot, TF-IDF) weights. (1, 1, 10) matches
+                the original 10x text boost. Can be changed at any time or per query.
+            processed_dir / cleaned_data_path / models_dir: Artifact locations
+                (default to the project's data/ and src/models/ folders).
+            use_lsa: Score text against the LSA-compressed TF-IDF block
+                (requires the pipeline's optional lsa step).
+            storage: 'float' scores the full-precision blocks. 'int8' or 'pq' scores
+                compressed codes (pipeline --quantize) and re-ranks a shortlist of
+                rerank_factor * top_k rows exactly against the memory-mapped blocks.
+            rerank_factor: Shortlist size multiplier for quantized storage (and two-stage
+                retrieval without a two_stage_shortlist size).
+            metrics: MetricsRegistry for stage timings and counters (default: the
+                process-wide src.utils.metrics.REGISTRY; set .enabled = False to turn off).
+            slow_query_log: Optional src.utils.slow_query_log.SlowQueryLog; calls slower
+                than its threshold are logged with stage timings and a stack profile.
+            capture: Optional src.utils.query_capture.QueryCapture; served calls are
+                recorded (sampled, in the background) for later replay.
+            max_workers: Threads of the pool behind ``submit`` (ThreadPoolExecutor default
+                when None); the pool is created on first use.
+            artifacts: Optional pre-loaded query-time artifacts with ``blocks``, ``service_ids``,
+                ``catalog`` and ``global_rows`` attributes, e.g. attached from shared memory
+                (src.models.shared_artifacts). They are used instead of the files in
+                processed_dir / cleaned_data_path, and ``feature_matrix`` and ``df`` are None.
+                Float storage only.
+            single_flight: Collapse concurrent get_recommendations calls for the same
+                canonical input, top_k, weights and ranking method into one computation
+                (``self.single_flight``, a src.utils.single_flight.SingleFlight). Every caller,
+                the one that computed included, gets its own copy of the results, or the error.
+            text_score_cache_mb: Memory for caching each description's text-block scores
+                (``self.text_scores``, src.models.score_cache); 0 disables it. Re-queries with
+                the same description then skip the TF-IDF transform and, for rows already
+                scored, the text-block scan. Each description takes 9 bytes per catalog row.
+                Float storage only.
+            bound_search: Rank cosine queries with an exact branch-and-bound search over
+                row blocks (``self.bound_index``, src.models.bound_index) instead of scoring
+                every candidate. Blocks are visited best bound first, and the search stops
+                once no block left can reach the k-th best score. Results are identical.
+                KNN queries still score every candidate. Float storage only.
+            fused_scan: Filter, score and select the top-k in one chunked pass over the
+                catalog (``fused_rank``) instead of building the candidate list, a gathered
+                copy of the candidates' rows and a score per candidate. Results are
+                identical. Float storage only; cannot be combined with bound_search.
+            two_stage_shortlist: Two-stage retrieval when > 0 (``self.top_terms``,
+                src.models.two_stage). Candidates are pre-scored on the manual and one-hot
+                blocks plus each row's top text terms, and this many are re-scored exactly.
+                Returned scores are exact; a best match can be missed if it is not
+                shortlisted. Float storage only; cannot be combined with bound_search,
+                fused_scan, the text score cache or time budgets.
         """
+        if storage != 'float' and use_lsa:
+            raise ValueError("Quantized storage and use_lsa cannot be combined.")
+        if artifacts is not None and storage != 'float':
+            raise ValueError("Pre-loaded artifacts support float storage only.")
+        if text_score_cache_mb and storage != 'float':
+            raise ValueError("The text score cache supports float storage only.")
+        if bound_search and storage != 'float':
+            raise ValueError("Bounded search supports float storage only.")
+        if fused_scan and storage != 'float':
+            raise ValueError("The fused scan supports float storage only.")
+        if fused_scan and bound_search:
+            raise ValueError("bound_search and fused_scan cannot be combined.")
+        if two_stage_shortlist and (storage != 'float' or bound_search or fused_scan or text_score_cache_mb):
+            raise ValueError("Two-stage retrieval supports float storage without bound_search, fused_scan "
+                             "or the text score cache only.")
+        processed_dir = processed_dir or PROCESSED_DATA_DIR
         self.ranking_method = ranking_method
-        self.encoder = UserEncoder()
-        self.feature_matrix = np.load(os.path.join(PROCESSED_DATA_DIR, 'features.npy'))
-        self.service_ids = np.load(os.path.join(PROCESSED_DATA_DIR, 'service_ids.npy'))
-        self.df = pd.read_csv(CLEANED_DATA_PATH)
+        self.block_weights = tuple(block_weights)
+        self.use_lsa = use_lsa
+        self.rerank_factor = rerank_factor
+        self.fused_scan = fused_scan
+        self.two_stage_shortlist = two_stage_shortlist
+        self.metrics = metrics if metrics is not None else REGISTRY
+        self.slow_query_log = slow_query_log
+        self.capture = capture
+        self.max_workers = max_workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._init_metrics()
+        self.single_flight = SingleFlight('engine', self.metrics) if single_flight else None
+        self.text_scores = (TextScoreCache(int(text_score_cache_mb * 2**20), self.metrics)
+                            if text_score_cache_mb else None)
+
+        load = self._load_seconds
+        with load.labels(artifact='encoders').time():
+            self.encoder = UserEncoder(models_dir)
         self.explainer = ExplanationGenerator()
+        self.storage = storage
+        if artifacts is not None:
+            self.blocks, self.service_ids, self.catalog = artifacts.blocks, artifacts.service_ids, artifacts.catalog
+            self.global_rows = artifacts.global_rows
+            self.quantized = self.feature_matrix = self.df = None
+            self._init_prescorer()
+            self._init_bound_index(bound_search)
+            return
+        # Unweighted feature blocks; weights are applied at query time
+        # With quantized storage the full-precision rows stay on disk and are read only for re-ranking
+        with load.labels(artifact='blocks').time():
+            self.blocks = FeatureBlocks.load(processed_dir, n_manual=self.encoder.n_manual,
+                                             n_onehot=self.encoder.n_onehot, use_lsa=use_lsa,
+                                             mmap_mode=None if storage == 'float' else 'r')
+        with load.labels(artifact='quantized').time():
+            self.quantized = None if storage == 'float' else QuantizedBlocks.load(processed_dir, storage)
+        # Legacy combined matrix (default weights) for tools that read it directly; memory-mapped, not loaded
+        # (only built with --legacy-matrix; shards do not have one)
+        with load.labels(artifact='feature_matrix').time():
+            features_path = os.path.join(processed_dir, 'features.npy')
+            self.feature_matrix = np.load(features_path, mmap_mode='r') if os.path.exists(features_path) else None
+            self.service_ids = np.load(os.path.join(processed_dir, 'service_ids.npy'), allow_pickle=True)
+        # A shard knows where its rows sit in the full catalog; None when this is the full catalog
+        global_rows_path = os.path.join(processed_dir, GLOBAL_ROWS_FILE)
+        self.global_rows = np.load(global_rows_path) if os.path.exists(global_rows_path) else None
+        with load.labels(artifact='catalog').time():
+            self.df = pd.read_csv(cleaned_data_path or CLEANED_DATA_PATH)
+            # NumPy snapshot the query path reads instead of the DataFrame
+            self.catalog = CatalogColumns(self.df)
+        # Nothing below is written after loading
+        freeze(*self.blocks.blocks, self.blocks.sq_norms)
+        if self.quantized is not None:
+            freeze(self.quantized.codes)
+        self._init_prescorer()
+        self._init_bound_index(bound_search)
+
+    def _init_prescorer(self):
+        """
+        Approximate scorer whose shortlist is re-scored exactly: the quantized codes, the
+        two-stage top terms, or None when every candidate is scored exactly.
+        """
+        self.top_terms = None
+        if self.two_stage_shortlist:
+            with self._load_seconds.labels(artifact='top_terms').time():
+                self.top_terms = TopTermBlocks(self.blocks)
+            freeze(self.top_terms.indptr, self.top_terms.rows, self.top_terms.values)
+        self.prescorer = self.quantized if self.quantized is not None else self.top_terms
+
+    def _init_bound_index(self, bound_search):
+        """Build the bounded search's row blocks and the bounds for the default weights."""
+        self.bound_index = None
+        if bound_search:
+            with self._load_seconds.labels(artifact='bound_index').time():
+                self.bound_index = BoundIndex(self.blocks)
+                self.bound_index.tables(self.block_weights)
+
+    def _init_metrics(self):
+        """Register the engine's metric families and cache the per-stage children."""
+        metrics = self.metrics
+        self._load_seconds = metrics.histogram(
+            'engine_load_seconds', "Time to load each engine artifact at initialization.", ['artifact'])
+        stage_seconds = metrics.histogram(
+            'recommendation_stage_seconds',
+            "Time spent in each stage of get_recommendations ('format' includes 'explain').", ['stage'])
+        self._stage = {stage: stage_seconds.labels(stage=stage) for stage in ENGINE_STAGES}
+        self._requests = metrics.counter('recommendation_requests_total', "Calls to get_recommendations.")
+        self._candidates = metrics.histogram(
+            'recommendation_candidates', "Candidates left after the hard filters, per request.",
+            buckets=CANDIDATE_BUCKETS)
+        self._dropped = metrics.counter(
+            'recommendation_results_dropped_total', "Ranked results dropped by the 0.1 score threshold.")
+        empty = metrics.counter('recommendation_empty_results_total', "Requests that returned no results.", ['reason'])
+        self._empty = {reason: empty.labels(reason=reason) for reason in ('no_candidates', 'below_threshold')}
+        self._batch_size = metrics.histogram(
+            'recommendation_batch_size', "Queries per get_recommendations_batch call.", buckets=BATCH_SIZE_BUCKETS)
+        self._batch_seconds = metrics.histogram(
+            'recommendation_batch_seconds', "Time of each get_recommendations_batch call.")
+        self._partial = metrics.counter(
+            'recommendation_partial_results_total', "Time-budgeted requests that ran out of time before scoring every candidate.")
+        self._coverage = metrics.histogram(
+            'recommendation_coverage', "Share of the candidates scored by time-budgeted requests.",
+            buckets=COVERAGE_BUCKETS)
+        self._bound_scored = metrics.histogram(
+            'recommendation_bound_scored_fraction', "Share of the candidates scored by the bounded search.",
+            buckets=COVERAGE_BUCKETS)
         
-    def get_recommendations(self, user_input, top_k=5, strict_filters=True):
+    def get_recommendations(self, user_input, top_k=5, strict_filters=True, block_weights=None, profile=False,
+                            time_budget_ms=None, deadline=None):
         """
         Main function to get recommendations.
         user_input: Dict with user preferences.
         top_k: Number of recommendations to return.
         strict_filters: If True, uses hard filtering (only exact matches).
+        block_weights: Optional (manual, one-hot, TF-IDF) weights for this query only.
+        profile: If True, return (results, trace) where trace explains how the ranking
+            was produced (see profile_recommendations).
+        time_budget_ms / deadline: Anytime search. Stop scoring once the budget (from this
+            call's start) or the ``time.monotonic()`` deadline passes, and return the best
+            results among the candidates scored so far. Candidates sharing a term with the
+            query's description are scored first. Returns a RecommendationResults list whose
+            ``partial`` and ``coverage`` say how much was scored. Float storage only, and
+            not with ``profile`` (a profile scores every candidate).
+
+        Runs the stages filter -> encode -> score -> rank -> format (with explanations);
+        each stage is a method so it can be timed or reused on its own. Stage timings and
+        counters are recorded in ``self.metrics``.
         """
-        
-        # 1. HARD FILTERS - Pre-filter candidates to match ALL criteria
-        filtered_df = self.df.copy()
+        if profile:
+            if time_budget_ms is not None or deadline is not None:
+                raise ValueError("profile=True scores every candidate; it cannot be combined with "
+                                 "time_budget_ms or deadline.")
+            return self.profile_recommendations(user_input, top_k, block_weights)
+        if time_budget_ms is not None:
+            budget_end = time.monotonic() + time_budget_ms / 1000
+            deadline = budget_end if deadline is None else min(deadline, budget_end)
+        if deadline is not None and self.prescorer is not None:
+            raise ValueError("Time-budgeted search supports exact float scoring only (no quantized "
+                             "storage or two-stage retrieval).")
+        # Every caller counts, including those single flight collapses into another's call
+        self._requests.inc()
+        if self.single_flight is None:
+            results = self._serve(user_input, top_k, block_weights, deadline)
+        else:
+            weights = self.block_weights if block_weights is None else tuple(block_weights)
+            key = (input_key(user_input), top_k, weights, self.ranking_method, deadline)
+            results, _ = self.single_flight.do(key, self._serve, user_input, top_k, weights, deadline)
+            # The computed results stay untouched while waiters copy them; every caller,
+            # the leader included, gets its own copy to modify
+            results = copy.deepcopy(results)
+        if self.capture is not None:
+            self.capture.record(user_input, top_k, self.ranking_method, results, block_weights)
+        return results
+
+    def _serve(self, user_input, top_k, block_weights, deadline=None):
+        if self.slow_query_log is None:
+            return self._recommend(user_input, top_k, block_weights, _no_lap, deadline=deadline)
+        with self.slow_query_log.track(user_input) as query:
+            return self._recommend(user_input, top_k, block_weights, query.lap, deadline=deadline)
+
+    def get_recommendations_batch(self, user_inputs, top_k=5, block_weights=None, return_exceptions=False):
+        """
+        get_recommendations for several queries sharing ``top_k`` and ``block_weights``.
+
+        Filters run per query. The queries are encoded together (one TF-IDF transform).
+        Those with large candidate sets (BATCH_DENSE_FRACTION) are scored together with one
+        matrix product per block, a single pass over the catalog instead of one per query.
+        Each query's shortlist is then re-scored exactly as get_recommendations scores it,
+        so the results are identical. Quantized storage scores every query on its own, and an
+        engine with a slow-query log, bound search, the fused scan or a text score cache
+        (``serves_per_query``) serves each query as get_recommendations does, so they are
+        logged and scored in that mode.
+
+        Args:
+            user_inputs (list): user_input dicts.
+            top_k / block_weights: As for get_recommendations.
+            return_exceptions (bool): Put a failing query's exception in its slot (the
+                others are still answered) instead of raising it.
+
+        Returns:
+            list: One result list (or exception) per input, in input order.
+        """
+        weights = self.block_weights if block_weights is None else tuple(block_weights)
+        ranking_method = self.ranking_method
+        with self._batch_seconds.time():
+            self._batch_size.observe(len(user_inputs))
+            self._requests.inc(len(user_inputs))
+            if self.serves_per_query:
+                results = [self._serve_or_error(user_input, top_k, weights) for user_input in user_inputs]
+            else:
+                results = self._score_batch(user_inputs, top_k, weights, ranking_method)
+
+        if self.capture is not None:
+            for user_input, result in zip(user_inputs, results):
+                if not isinstance(result, Exception):
+                    self.capture.record(user_input, top_k, ranking_method, result, block_weights)
+        if not return_exceptions:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        return results
+
+    @property
+    def serves_per_query(self):
+        """
+        True when get_recommendations_batch runs each query through get_recommendations' own
+        path: the slow-query log times one query's stages, and bound search, the fused scan
+        and the text score cache are per-query scoring modes.
+        """
+        return (self.slow_query_log is not None or self.fused_scan or self.bound_index is not None
+                or self.text_scores is not None)
+
+    def _serve_or_error(self, user_input, top_k, weights):
+        try:
+            return self._serve(user_input, top_k, weights)
+        except Exception as e:
+            return e
+
+    def _score_batch(self, user_inputs, top_k, weights, ranking_method):
+        """The batched filter -> encode -> score -> rank -> format of get_recommendations_batch."""
+        results = [None] * len(user_inputs)
+        candidates = {}
+        for i, user_input in enumerate(user_inputs):
+            try:
+                candidate_indices = self.filter_candidates(user_input)
+            except Exception as e:
+                results[i] = e
+                continue
+            self._candidates.observe(len(candidate_indices))
+            if len(candidate_indices) == 0:
+                self._empty['no_candidates'].inc()
+                results[i] = []
+            else:
+                candidates[i] = candidate_indices
+
+        dense = []
+        for i, user_blocks in zip(candidates, self.encode_queries([user_inputs[i] for i in candidates])):
+            if isinstance(user_blocks, Exception):
+                results[i] = user_blocks
+            elif self.prescorer is None and len(candidates[i]) >= BATCH_DENSE_FRACTION * len(self.blocks):
+                dense.append((i, user_blocks))
+            else:
+                similarities = self.score_candidates(user_blocks, candidates[i], weights, ranking_method)
+                positions, scores = self.rank_candidates(similarities, top_k, user_blocks, candidates[i],
+                                                         weights, ranking_method)
+                results[i] = self._format_batch_entry(user_inputs[i], candidates[i], positions, scores)
+
+        group_size = max(1, BATCH_MAX_CELLS // max(len(self.blocks), 1))
+        for start in range(0, len(dense), group_size):
+            group = dense[start:start + group_size]
+            approx = self.blocks.batch_similarity([user_blocks for _, user_blocks in group], weights, ranking_method)
+            for column, (i, user_blocks) in enumerate(group):
+                candidate_indices = candidates[i]
+                rows = self._rows(candidate_indices)
+                shortlist = batch_shortlist(approx[:, column] if rows is None else approx[rows, column], top_k)
+                exact = self.score_candidates(user_blocks, candidate_indices[shortlist], weights, ranking_method)
+                order = top_k_positions(exact, top_k)
+                results[i] = self._format_batch_entry(user_inputs[i], candidate_indices, shortlist[order],
+                                                      exact[order])
+        return results
+
+    def _format_batch_entry(self, user_input, candidate_indices, positions, scores):
+        try:
+            results = self.format_results(user_input, candidate_indices, positions, scores)
+        except Exception as e:
+            return e
+        if not results:
+            self._empty['below_threshold'].inc()
+        return results
+
+    def search(self, user_input, top_k=5, block_weights=None):
+        """
+        get_recommendations for scatter-gather (see src/models/sharding.py): the same results,
+        each with the keys a coordinator merges on.
+
+        Returns:
+            list: (score, row, result) tuples, best first. ``score`` is the unrounded match
+                score and ``row`` the position in the full catalog (``global_rows`` for a
+                shard), which breaks ties exactly as the unsharded engine does.
+        """
+        self._requests.inc()
+        return self._recommend(user_input, top_k, block_weights, _no_lap, keyed=True)
+
+    def _recommend(self, user_input, top_k, block_weights, lap, keyed=False, deadline=None):
+        """
+        The instrumented stages; ``lap(stage)`` is called as each stage ends. With a
+        ``deadline`` scoring and ranking are one anytime stage (anytime_rank).
+        """
+        stage = self._stage
+        with stage['total'].time():
+            # 1. HARD FILTERS - Pre-filter candidates to match ALL criteria
+            # (the fused scan applies them while scoring, in step 3)
+            fused = self.fused_scan and deadline is None
+            if not fused:
+                with stage['filter'].time():
+                    candidate_indices = self.filter_candidates(user_input)
+                lap('filter')
+                self._candidates.observe(len(candidate_indices))
+                
+                # Check if we have any candidates left
+                if len(candidate_indices) == 0:
+                    self._empty['no_candidates'].inc()
+                    return [] if deadline is None else RecommendationResults()  # No matches found
+            
+            # 2. Encode User Input (unweighted blocks)
+            with stage['encode'].time():
+                cached = None
+                if self.text_scores is not None:
+                    cached = self.text_scores.get(user_input.get('Description', ''))
+                user_blocks = self.encode_query(user_input, None if cached is None else cached.text_block)
+            lap('encode')
+            # Configuration is read once, so a concurrent change never mixes within a call
+            weights = self.block_weights if block_weights is None else tuple(block_weights)
+            ranking_method = self.ranking_method
+            
+            # 3. Score filtered candidates and rank by the selected method
+            if self.text_scores is not None and cached is None:
+                cached = self.text_scores.put(user_input.get('Description', ''),
+                                              self.text_scores.new_entry(user_blocks[2], len(self.blocks)))
+            if fused:
+                with stage['score'].time():
+                    candidate_indices, scores, n_candidates = self.fused_rank(user_input, user_blocks, top_k, weights,
+                                                                              ranking_method, cached)
+                lap('score')
+                self._candidates.observe(n_candidates)
+                if n_candidates == 0:
+                    self._empty['no_candidates'].inc()
+                    return []
+                # The ranked rows stand in for the candidate list
+                positions = np.arange(len(candidate_indices))
+            elif deadline is None and self.bound_index is not None and ranking_method == 'cosine':
+                # Scoring and ranking are one stage, as in anytime_rank
+                with stage['score'].time():
+                    positions, scores, scored = self.bound_rank(user_blocks, candidate_indices, top_k, weights,
+                                                                cached)
+                lap('score')
+                self._bound_scored.observe(scored)
+            elif deadline is None:
+                with stage['score'].time():
+                    similarities = self.score_candidates(user_blocks, candidate_indices, weights, ranking_method,
+                                                         cached)
+                lap('score')
+                with stage['rank'].time():
+                    positions, scores = self.rank_candidates(similarities, top_k, user_blocks, candidate_indices,
+                                                             weights, ranking_method)
+                lap('rank')
+            else:
+                with stage['score'].time():
+                    positions, scores, coverage = self.anytime_rank(user_blocks, candidate_indices, top_k, weights,
+                                                                    ranking_method, deadline, cached)
+                lap('score')
+                self._coverage.observe(coverage)
+                if coverage < 1.0:
+                    self._partial.inc()
+            
+            # 4. Format results
+            with stage['format'].time():
+                results = self.format_results(user_input, candidate_indices, positions, scores)
+            lap('format')
+            if not results:
+                self._empty['below_threshold'].inc()
+            if keyed:
+                kept = scores >= SCORE_THRESHOLD
+                rows = candidate_indices[positions[kept]]
+                if self.global_rows is not None:
+                    rows = self.global_rows[rows]
+                return list(zip(scores[kept].tolist(), rows.tolist(), results))
+            if deadline is not None:
+                return RecommendationResults(results, partial=coverage < 1.0, coverage=coverage)
+            return results
+
+    def bound_rank(self, user_blocks, candidate_indices, top_k, weights, text_scores=None):
+        """
+        Exact cosine top-k by branch and bound over the bound index's row blocks.
+
+        Row blocks holding candidates are visited in decreasing order of their score bound,
+        in batches of BOUND_BATCH_ROWS candidates, keeping a running top-k. The search stops at
+        the first block whose bound is below the k-th best score (less BOUND_MARGIN): no row
+        left can enter the top-k, nor tie with it. Rows are scored as by score_candidates,
+        so the ranking equals rank_candidates' exactly.
+
+        Returns:
+            tuple: (positions, scores, scored) - top-k positions into ``candidate_indices``
+                and their scores, best first, and the share of candidates scored.
+        """
+        index = self.bound_index
+        n = len(candidate_indices)
+        best_positions, best_scores = np.empty(0, dtype=np.intp), np.empty(0)
+        if top_k <= 0:
+            return best_positions, best_scores, 0.0
+        bounds = index.upper_bounds(user_blocks, weights)
+        if n == index.n_rows:
+            counts, is_candidate = index.block_sizes, None
+        else:
+            counts = np.bincount(index.block_of[candidate_indices], minlength=index.n_blocks)
+            is_candidate = np.zeros(index.n_rows + 1, dtype=bool)  # the last slot is padding
+            is_candidate[candidate_indices] = True
+        visit = np.flatnonzero(counts)
+        visit = visit[np.argsort(-bounds[visit], kind='stable')]
+        neg_bounds = -bounds[visit]
+        ends = np.cumsum(counts[visit])
+        done = scored = 0
+        batch_rows, max_batch_rows = BOUND_BATCH_ROWS
+        while done < len(visit):
+            kth = best_scores[-1] if len(best_scores) == top_k else -np.inf
+            reachable = np.searchsorted(neg_bounds, BOUND_MARGIN - kth, side='right')
+            if reachable <= done:
+                break
+            batch_end = np.searchsorted(ends, scored + batch_rows, side='right')
+            batch_rows = min(2 * batch_rows, max_batch_rows)
+            stop = min(reachable, max(batch_end, done + 1))
+            rows = index.order[visit[done:stop]].ravel()
+            # Catalog order, so a batch holding every row is scored without a gather too
+            rows = np.sort(rows[rows < index.n_rows] if is_candidate is None else rows[is_candidate[rows]])
+            positions = rows if is_candidate is None else np.searchsorted(candidate_indices, rows)
+            scores = self.score_candidates(user_blocks, rows, weights, 'cosine', text_scores)
+            best_positions, best_scores = merge_top_k(np.concatenate([best_scores, scores]),
+                                                      np.concatenate([best_positions, positions]), top_k)
+            scored, done = ends[stop - 1], stop
+        return best_positions, best_scores, scored / n
+
+    def fused_rank(self, user_input, user_blocks, top_k, weights, ranking_method, text_scores=None):
+        """
+        Filter, score and rank in one pass over the catalog, FUSED_CHUNK_ROWS rows at a time,
+        keeping a running top-k. Only chunk-sized temporaries are allocated: no catalog-wide
+        masks, candidate list or gathered copy of every candidate's rows. A chunk where most
+        rows pass the filters is scored in place, with one product over its contiguous rows;
+        a sparse one gathers its passing rows. Scores are those score_candidates computes,
+        so the ranking equals rank_candidates'.
+
+        Returns:
+            tuple: (rows, scores, n_candidates) - the top-k catalog rows and their scores,
+                best first, and how many rows passed the filters.
+        """
+        conditions = [condition for _, _, condition in self.filter_conditions(user_input)]
+        blocks = self.blocks
+        n = len(blocks)
+        user_sq = blocks.user_sq_norms(user_blocks)
+        mask_buffer = np.empty(min(FUSED_CHUNK_ROWS, n), dtype=bool)
+        best_rows, best_scores = np.empty(0, dtype=np.intp), np.empty(0)
+        n_candidates = 0
+        for start in range(0, n, FUSED_CHUNK_ROWS):
+            stop = min(start + FUSED_CHUNK_ROWS, n)
+            mask = self.catalog.match(conditions, start, stop, out=mask_buffer[:stop - start])
+            picked = None if mask is None else np.flatnonzero(mask)
+            count = stop - start if picked is None else len(picked)
+            n_candidates += count
+            if count == 0 or top_k <= 0:
+                continue
+            rows = np.arange(start, stop) if picked is None else start + picked
+            in_place = picked is None or count >= FUSED_DENSE_FRACTION * (stop - start)
+            columns = []
+            for b, (block, u) in enumerate(zip(blocks.blocks, user_blocks)):
+                if b == 2 and text_scores is not None:
+                    columns.append(text_scores.fill(blocks, rows)[rows])
+                elif in_place:
+                    dots = row_dots(block[start:stop], u)
+                    columns.append(dots if picked is None else dots[picked])
+                else:
+                    columns.append(row_dots(block[rows], u))
+            scores = FeatureBlocks.similarity(np.column_stack(columns), user_sq, blocks.sq_norms[rows], weights,
+                                              ranking_method)
+            if len(best_scores) == top_k:
+                # Only rows reaching the k-th best score can enter
+                keep = scores >= best_scores[-1]
+                rows, scores = rows[keep], scores[keep]
+            best_rows, best_scores = merge_top_k(np.concatenate([best_scores, scores]),
+                                                 np.concatenate([best_rows, rows]), top_k)
+        return best_rows, best_scores, n_candidates
+
+    def anytime_rank(self, user_blocks, candidate_indices, top_k, weights, ranking_method, deadline,
+                     text_scores=None):
+        """
+        Score candidates in chunks of ANYTIME_CHUNK_ROWS until ``deadline`` (time.monotonic()),
+        keeping a running top-k. Something is scored even if the deadline has already passed.
+
+        Rows with a non-zero TF-IDF value in one of the query's terms are scored first:
+        the text block carries most of the weight, so the best matches are almost always
+        among them. The remaining rows follow. With LSA there are no terms and rows go in
+        catalog order. Scores are exact, so a search that finishes ranks like get_recommendations.
+
+        Returns:
+            tuple: (positions, scores, coverage) - top-k positions into ``candidate_indices``
+                and their scores, best first, and the share of candidates scored.
+        """
+        n = len(candidate_indices)
+        terms = None if self.use_lsa else np.flatnonzero(np.ravel(user_blocks[2]))
+        text_block = self.blocks.blocks[2]
+        best_positions, best_scores = np.empty(0, dtype=np.intp), np.empty(0)
+        scored = 0
+        later = []  # positions deferred to the second pass
+
+        def score(positions):
+            nonlocal best_positions, best_scores, scored
+            scores = self.score_candidates(user_blocks, candidate_indices[positions], weights, ranking_method,
+                                           text_scores)
+            best_positions, best_scores = merge_top_k(np.concatenate([best_scores, scores]),
+                                                      np.concatenate([best_positions, positions]), top_k)
+            scored += len(positions)
+
+        for start in range(0, n, ANYTIME_CHUNK_ROWS):
+            if start and time.monotonic() >= deadline:
+                break
+            positions = np.arange(start, min(start + ANYTIME_CHUNK_ROWS, n))
+            if terms is None or len(terms) == 0:
+                score(positions)
+                continue
+            hits = np.any(text_block[np.ix_(candidate_indices[positions], terms)] != 0, axis=1)
+            later.append(positions[~hits])
+            if hits.any():
+                score(positions[hits])
+        for positions in later:
+            for start in range(0, len(positions), ANYTIME_CHUNK_ROWS):
+                if scored and time.monotonic() >= deadline:
+                    return best_positions, best_scores, scored / n
+                score(positions[start:start + ANYTIME_CHUNK_ROWS])
+        return best_positions, best_scores, scored / n
+
+    def filter_conditions(self, user_input):
+        """
+        Hard filters of a query: business type, budget (at or below) and location.
+
+        Returns:
+            list: (column, value, condition) per applied filter; ``condition`` is a
+                CatalogColumns condition and ``value`` what traces show.
+        """
+        catalog = self.catalog
+        conditions = []
         
         # Filter by Business Type (STRICT)
         if 'Target_Business_Type' in user_input and user_input['Target_Business_Type']:
             user_business = user_input['Target_Business_Type'].lower()
-            filtered_df = filtered_df[filtered_df['Target_Business_Type'] == user_business]
+            conditions.append(('Target_Business_Type', user_business,
+                               catalog.equals_condition('Target_Business_Type', user_business)))
         
         # Filter by Price (STRICT - at or below budget)
         if 'Price_Category' in user_input and user_input['Price_Category']:
-            price_order = {'low': 1, 'medium': 2, 'high': 3, 'premium': 4}
             user_budget = user_input['Price_Category'].lower()
-            user_budget_val = price_order.get(user_budget, 2)
-            
             # Only include services at or below budget
-            filtered_df = filtered_df[
-                filtered_df['Price_Category'].map(price_order).fillna(2) <= user_budget_val
-            ]
+            conditions.append(('Price_Category', f"<= {user_budget}", catalog.price_condition(user_budget)))
         
         # Filter by Location (STRICT)
         if 'Location_Area' in user_input and user_input['Location_Area']:
             user_location = user_input['Location_Area'].lower()
-            filtered_df = filtered_df[filtered_df['Location_Area'] == user_location]
-        
-        # Check if we have any candidates left
-        if len(filtered_df) == 0:
-            return []  # No matches found
-        
-        # Get indices of filtered candidates
-        candidate_indices = filtered_df.index.tolist()
-        
-        # 2. Encode User Input
-        user_vector = self.encoder.encode_user_input(user_input)
-        
-        # 3. Compute Similarity only on filtered candidates
-        candidate_matrix = self.feature_matrix[candidate_indices]
-        similarities = cosine_similarity(user_vector, candidate_matrix).flatten()
-        
-        # 4. Rank by similarity using selected method
-        if self.ranking_method == 'knn':
-            # Use KNN ranking
-            temp_knn = NearestNeighbors(
-                n_neighbors=min(top_k, len(candidate_indices)),
-                metric='euclidean',
-                algorithm='auto'
-            )
-            temp_knn.fit(candidate_matrix)
-            
-            # Find K nearest neighbors
-            distances, local_indices = temp_knn.kneighbors(user_vector)
-            
-            # Convert to similarity scores and global indices
-            scored_candidates = []
-            for dist, local_idx in zip(distances[0], local_indices[0]):
-                global_idx = candidate_indices[local_idx]
-                # Convert distance to similarity: similarity = 1 / (1 + distance)
-                similarity = 1.0 / (1.0 + dist)
-                scored_candidates.append((global_idx, similarity))
-        else:
-            # Use Cosine Similarity ranking (default)
-            scored_candidates = [(candidate_indices[i], similarities[i]) for i in range(len(similarities))]
-            # Sort by score descending
-            scored_candidates.sort(key=lambda x: x[1], reverse=True)
-            # Take top K
-            scored_candidates = scored_candidates[:top_k]
+            conditions.append(('Location_Area', user_location,
+                               catalog.equals_condition('Location_Area', user_location)))
+        return conditions
+
+    def filter_candidates(self, user_input, trace=None):
+        """
+        Hard filters: row indices (ascending) of services matching business type, budget
+        and location. If a ``trace`` list is given, one {'filter', 'value', 'candidates'}
+        entry is appended per applied filter.
+        """
+        mask = None
+        for column, value, condition in self.filter_conditions(user_input):
+            mask = _and(mask, self.catalog.match([condition]))
+            if trace is not None:
+                trace.append({'filter': column, 'value': value, 'candidates': int(np.count_nonzero(mask))})
         
-        # 5. Format results
+        return np.arange(len(self.catalog)) if mask is None else np.flatnonzero(mask)
+
+    def encode_query(self, user_input, text_block=None):
+        """
+        Unweighted (manual, one-hot, text) query blocks; the text block is projected with use_lsa.
+        A known (already projected) ``text_block`` for the description is used as is.
+        """
+        user_blocks = self.encoder.encode_user_blocks(user_input, text_block)
+        if self.use_lsa and text_block is None:
+            user_blocks = user_blocks[:2] + (self.encoder.project_text_block(user_blocks[2]),)
+        return user_blocks
+
+    def encode_queries(self, user_inputs):
+        """encode_query for several inputs (one TF-IDF transform); a failed input's exception in its place."""
+        encoded = self.encoder.encode_user_blocks_batch(user_inputs)
+        if self.use_lsa:
+            # Projected one by one, so every query's blocks equal encode_query's exactly
+            encoded = [blocks if isinstance(blocks, Exception)
+                       else blocks[:2] + (self.encoder.project_text_block(blocks[2]),) for blocks in encoded]
+        return encoded
+
+    def _rows(self, candidate_indices):
+        """Row selection for the blocks: None when every row is a candidate (no gather copy)."""
+        return None if len(candidate_indices) == len(self.blocks) else candidate_indices
+
+    def score_candidates(self, user_blocks, candidate_indices, weights, ranking_method=None, text_scores=None):
+        """
+        Similarity of every candidate: cosine, or for KNN 1 / (1 + Euclidean distance).
+        With quantized storage or two-stage retrieval the scores are approximate (the
+        prescorer's). ``text_scores`` (TextScores) supplies the text-block products, computing and
+        caching only the candidates it does not have yet.
+        """
+        ranking_method = ranking_method or self.ranking_method
+        rows = self._rows(candidate_indices)
+        if self.prescorer is not None:
+            return approximate_scores(self.prescorer, self.blocks, user_blocks, weights,
+                                      rows=rows, ranking_method=ranking_method)
+        # Per-block dot products, only on filtered candidates
+        text_dots = None if text_scores is None else text_scores.fill(self.blocks, rows)
+        dots = self.blocks.block_dots(user_blocks, rows, text_dots)
+        return FeatureBlocks.similarity(dots, self.blocks.user_sq_norms(user_blocks),
+                                        self.blocks.row_sq_norms(rows), weights, ranking_method)
+
+    def rank_candidates(self, similarities, top_k, user_blocks=None, candidate_indices=None, weights=None,
+                        ranking_method=None):
+        """
+        Top-k positions (into the candidate list) and their scores, best first.
+        With quantized storage or two-stage retrieval a shortlist is re-scored exactly,
+        which needs the query blocks, candidates and weights.
+        """
+        if self.prescorer is not None:
+            return rerank_shortlist(similarities, self.blocks, user_blocks, weights, top_k,
+                                    rows=self._rows(candidate_indices), size=self.shortlist_size(top_k),
+                                    ranking_method=ranking_method or self.ranking_method)
+        # Highest scores first (ties keep catalog order), top K only
+        positions = top_k_positions(similarities, top_k)
+        return positions, similarities[positions]
+
+    def shortlist_size(self, top_k):
+        """Rows re-scored exactly after approximate scoring: two_stage_shortlist, or rerank_factor * top_k."""
+        return max(self.two_stage_shortlist or top_k * self.rerank_factor, top_k)
+
+    def format_results(self, user_input, candidate_indices, positions, scores):
+        """Result dicts with explanations for the ranked candidates."""
         results = []
-        for global_idx, score in scored_candidates:
-            original_row = self.df.iloc[global_idx]
+        for position, score in zip(positions, scores):
+            original_row = self.catalog.row(candidate_indices[position])
             
             # Skip if score is too low (optional threshold)
-            if score < 0.1: 
+            if score < SCORE_THRESHOLD: 
+                self._dropped.inc()
                 continue
             
-            explanations = self.explainer.generate_explanation(user_input, original_row)
+            with self._stage['explain'].time():
+                explanations = self.explainer.generate_explanation(user_input, original_row)
             
             results.append({
                 'Service_ID': original_row['Service_ID'],
@@ -127,6 +853,109 @@ class RecommendationEngine:
             
         return results
 
+    def submit(self, user_input, **kwargs):
+        """
+        Run get_recommendations(user_input, **kwargs) on the engine's thread pool.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the result list (or raises the query's error).
+        """
+        executor = self._executor
+        if executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix='unlox-query')
+                executor = self._executor
+        return executor.submit(self.get_recommendations, user_input, **kwargs)
+
+    def shutdown(self, wait=True):
+        """Stop the submit() thread pool (a later submit starts a new one)."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def profile_recommendations(self, user_input, top_k=5, block_weights=None):
+        """
+        EXPLAIN ANALYZE for one query: run the same stages as get_recommendations and
+        report what each of them did. Profiled calls are not counted in the request metrics.
+
+        Returns:
+            tuple: (results, trace). trace is a dict with
+                - 'filters': candidates left after each hard filter (starting with the catalog)
+                - 'candidates': candidates that were scored
+                - 'ranking': method, storage, text block, weights and re-rank shortlist size
+                - 'timings_ms': filter / encode / score / rank / format / total durations
+                - 'ranked': per ranked candidate its Service_ID, score, kept flag and the
+                  per-block 'contributions' (see FeatureBlocks.block_contributions)
+                - 'dropped_below_threshold': ranked candidates removed by the score threshold
+                - 'candidates_below_threshold': scored candidates under the threshold
+        """
+        weights = self.block_weights if block_weights is None else tuple(block_weights)
+        ranking_method = self.ranking_method
+        shortlist = None
+        if self.prescorer is not None:
+            shortlist = self.shortlist_size(top_k)
+        trace = {
+            'filters': [{'filter': 'catalog', 'value': None, 'candidates': len(self.catalog)}],
+            'candidates': 0,
+            'ranking': {'method': ranking_method, 'storage': self.storage,
+                        'text_block': 'lsa' if self.use_lsa else 'tfidf', 'block_weights': weights,
+                        'rerank_shortlist': shortlist},
+            'timings_ms': {},
+            'ranked': [],
+            'threshold': SCORE_THRESHOLD,
+            'dropped_below_threshold': 0,
+            'candidates_below_threshold': 0,
+        }
+        timings = trace['timings_ms']
+        start = last = time.perf_counter()
+
+        def lap(stage):
+            nonlocal last
+            now = time.perf_counter()
+            timings[stage] = (now - last) * 1000
+            last = now
+
+        candidate_indices = self.filter_candidates(user_input, trace=trace['filters'])
+        lap('filter')
+        trace['candidates'] = len(candidate_indices)
+        if len(candidate_indices) == 0:
+            timings['total'] = (time.perf_counter() - start) * 1000
+            return [], trace
+
+        user_blocks = self.encode_query(user_input)
+        lap('encode')
+        similarities = self.score_candidates(user_blocks, candidate_indices, weights, ranking_method)
+        lap('score')
+        positions, scores = self.rank_candidates(similarities, top_k, user_blocks, candidate_indices, weights,
+                                                 ranking_method)
+        lap('rank')
+        results = self.format_results(user_input, candidate_indices, positions, scores)
+        lap('format')
+        timings['total'] = (last - start) * 1000
+        if shortlist is not None:
+            trace['ranking']['rerank_shortlist'] = min(shortlist, len(candidate_indices))
+
+        # Breakdown of the ranked rows only, after the timed stages
+        rows = np.asarray(candidate_indices)[positions]
+        user_sq = self.blocks.user_sq_norms(user_blocks)
+        contributions = FeatureBlocks.block_contributions(self.blocks.block_dots(user_blocks, rows), user_sq,
+                                                          self.blocks.row_sq_norms(rows), weights, ranking_method)
+        service_ids = self.catalog.column('Service_ID', rows)
+        for service_id, score, parts in zip(service_ids, scores, contributions):
+            trace['ranked'].append({
+                'Service_ID': service_id,
+                'score': float(score),
+                'kept': bool(score >= SCORE_THRESHOLD),
+                'contributions': dict(zip(BLOCK_NAMES, parts.tolist())),
+            })
+        trace['dropped_below_threshold'] = sum(not r['kept'] for r in trace['ranked'])
+        # With quantized storage or two-stage retrieval these are the approximate scores
+        trace['candidates_below_threshold'] = int(np.count_nonzero(similarities < SCORE_THRESHOLD))
+        return results, trace
+
 if __name__ == "__main__":
     # Simple Test
     engine = RecommendationEngine()
@@ -143,3 +972,13 @@ if __name__ == "__main__":
     for r in recs:
         print(f"[{r['Match_Score']}%] {r['Service_Name']} ({r['Price_Category']})")
         print(f"   -> Reasons: {r['Explanations']}")
+
+    print("\nProfile of the same query:")
+    recs, trace = engine.get_recommendations(test_input, top_k=3, profile=True)
+    for f in trace['filters']:
+        print(f"   {f['filter']:<22} {str(f['value'] or ''):<12} -> {f['candidates']} candidates")
+    print(f"   Ranking: {trace['ranking']}")
+    print("   Timings (ms): " + ', '.join(f"{k} {v:.2f}" for k, v in trace['timings_ms'].items()))
+    for r in trace['ranked']:
+        parts = ', '.join(f"{k} {v:.3f}" for k, v in r['contributions'].items())
+        print(f"   {r['Service_ID']}: score {r['score']:.3f} ({parts}){'' if r['kept'] else ' [dropped]'}")
@@ -0,0 +1,136 @@
+"""
+Text Score Cache
+Bounded LRU cache of full-catalog text-block scores, keyed by the query description.
+
+The text block (TF-IDF, or LSA) is by far the widest part of a query's score and depends
+on the description alone. A user who re-submits the same description with another budget,
+city or language only changes the filters and the narrow manual / one-hot blocks. With the
+description's text-block dot products cached, such a follow-up query skips the TF-IDF
+transform and the text-block scan: it re-applies the filters, computes the small blocks
+and reads its candidates' text scores from the cache.
+
+Each entry has room for every catalog row but is filled lazily: a query computes the
+products of its candidates that are not cached yet, so a first query costs no more than
+without the cache. The cached products are the same numbers a direct scan computes, so
+results are identical.
+"""
+import threading
+import collections
+import numpy as np
+
+from src.models.feature_blocks import row_dots
+from src.utils.metrics import REGISTRY
+
+class TextScores:
+    """
+    Cached text-block scores of one description.
+
+    Attributes:
+        text_block (numpy.ndarray): The query's (1 x width) text block, as encode_query returns it.
+        dots (numpy.ndarray): Its dot product with each catalog row's text block, where ``known``.
+        known (numpy.ndarray): Rows whose product has been computed.
+    """
+    __slots__ = ('text_block', 'dots', 'known', 'nbytes', 'cache')
+
+    def __init__(self, text_block, n_rows, cache=None):
+        self.text_block = text_block
+        self.dots = np.empty(n_rows)
+        self.known = np.zeros(n_rows, dtype=bool)
+        self.nbytes = text_block.nbytes + self.dots.nbytes + self.known.nbytes
+        self.cache = cache  # counts the rows served and computed
+
+    def fill(self, blocks, rows=None):
+        """
+        Compute the products of ``rows`` (all rows when None) that are not cached yet.
+
+        Args:
+            blocks (FeatureBlocks): The catalog's blocks.
+
+        Returns:
+            numpy.ndarray: ``dots``, valid at least for ``rows``.
+        """
+        n_rows = len(self.known) if rows is None else len(rows)
+        missing = np.flatnonzero(~self.known) if rows is None else rows[~self.known[rows]]
+        if self.cache is not None:
+            self.cache.count_rows(n_rows, n_rows - len(missing))
+        if rows is None and len(missing) == n_rows:
+            self.dots[:] = blocks.text_dots(self.text_block)
+            self.known[:] = True
+        elif len(missing):
+            # Values first, then the flags: a concurrent reader never sees a flag before its value
+            self.dots[missing] = row_dots(blocks.blocks[2][missing], self.text_block)
+            self.known[missing] = True
+        return self.dots
+
+class TextScoreCache:
+    """
+    Thread-safe LRU of TextScores bounded by memory.
+
+    Attributes:
+        max_bytes (int): Memory budget; least recently used entries are evicted beyond it.
+        nbytes (int): Memory held now.
+        hits / misses (int): Lookup counts.
+        rows_served / rows_reused (int): Text scores read by queries, and how many of them
+            were already cached (the rest were computed).
+    """
+
+    def __init__(self, max_bytes, metrics=None):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = self.misses = 0
+        self.rows_served = self.rows_reused = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        metrics = metrics if metrics is not None else REGISTRY
+        requests = metrics.counter('text_score_cache_requests_total', "Text score cache lookups by result.", ['result'])
+        self._hit, self._miss = requests.labels(result='hit'), requests.labels(result='miss')
+        rows = metrics.counter('text_score_cache_rows_total', "Text scores read from the cache or computed.",
+                               ['source'])
+        self._rows_cached, self._rows_computed = rows.labels(source='cached'), rows.labels(source='computed')
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """The entry for ``key`` (now the most recently used), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        (self._miss if entry is None else self._hit).inc()
+        return entry
+
+    def new_entry(self, text_block, n_rows):
+        """An empty TextScores counted by this cache (store it with ``put``)."""
+        return TextScores(text_block, n_rows, cache=self)
+
+    def count_rows(self, served, reused):
+        """Record ``served`` text scores read by a query, ``reused`` of them from the cache."""
+        with self._lock:
+            self.rows_served += served
+            self.rows_reused += reused
+        self._rows_cached.inc(reused)
+        self._rows_computed.inc(served - reused)
+
+    def put(self, key, entry):
+        """Store ``entry``, evicting the least recently used ones to stay within max_bytes."""
+        if entry.nbytes > self.max_bytes:
+            return entry
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous.nbytes
+            self._entries[key] = entry
+            self.nbytes += entry.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
@@ -0,0 +1,447 @@
+"""
+Sharded Scatter-Gather Search
+Splits the catalog into shards that are searched independently, and merges their answers
+into exactly the results the unsharded engine gives.
+
+Building (``build_shards``, also ``pipeline --shards N``): each shard is a processed
+directory of its own, holding:
+- the feature blocks and squared norms of its rows
+- service IDs and the cleaned catalog rows
+- ``global_rows.npy``, the position of each row in the full catalog
+
+Rows keep their catalog order. Encoders are shared with the full catalog. Rows are assigned
+either by a stable hash of Service_ID, which balances shards, or by the value of a
+hard-filter column (``Location_Area`` or ``Target_Business_Type``). With a filter column,
+queries that filter on it only go to the shards that hold that value.
+
+Serving (``ShardCoordinator``): every shard runs filter -> score -> top-k on its own rows
+(``RecommendationEngine.search``) and returns its top-k with (score, global row) keys. The
+coordinator merges the sorted lists with a heap on (-score, row), which is the unsharded
+ranking order (ties by catalog order), and keeps the first top_k. Shards run either in
+local worker processes (one EngineProcessPool per shard) or behind sockets
+(``ShardServer``), standing in for remote nodes. A shard that does not answer within the
+timeout is left out of the merge. Partial results are returned, or with allow_partial=False
+ShardTimeoutError is raised.
+
+Usage:
+    python -m src.preprocessing.pipeline --shards 4 --shard-by hash
+    python -m src.models.sharding serve --shards-dir data/processed/shards --shard 0 --port 7100
+"""
+import os
+import sys
+import json
+import heapq
+import argparse
+import itertools
+import threading
+import multiprocessing
+from multiprocessing.connection import Listener, Client
+from concurrent.futures import ThreadPoolExecutor, wait
+import numpy as np
+import pandas as pd
+
+if __package__ in (None, ''):
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.models.feature_blocks import (BLOCK_NAMES, BLOCK_FILES, SQ_NORMS_FILE, GLOBAL_ROWS_FILE,
+                                       DEFAULT_BLOCK_WEIGHTS, squared_norms)
+from src.models.process_pool import EngineProcessPool, WorkerCrashedError
+from src.utils.metrics import REGISTRY
+
+SHARDS_DIR = 'shards'
+MANIFEST_FILE = 'shards.json'
+SHARD_CATALOG_FILE = 'cleaned.csv'
+# Hard-filter columns a catalog can be partitioned by (besides 'hash')
+PARTITION_COLUMNS = ('Location_Area', 'Target_Business_Type')
+DEFAULT_TIMEOUT = 2.0
+
+class ShardTimeoutError(TimeoutError):
+    """Some shards did not answer in time and partial results were not allowed."""
+
+# --- Building -------------------------------------------------------------
+
+def hash_assignment(service_ids, n_shards):
+    """Shard of each row from a stable hash of its Service_ID (the same on every run and machine)."""
+    return (pd.util.hash_array(np.asarray(service_ids)) % np.uint64(n_shards)).astype(np.int64)
+
+def partition_assignment(values, n_shards):
+    """
+    Shard of each row from its value in a filter column. Each value goes to one shard in
+    whole; the largest values are placed first, each on the shard with the fewest rows.
+
+    Returns:
+        tuple: (assignment array, list of the values on each shard). Missing values never
+            match a filter; they are placed like any other value but not listed.
+    """
+    codes, uniques = pd.factorize(values)
+    # Slot 0 counts the missing values (code -1)
+    counts = np.bincount(codes + 1, minlength=len(uniques) + 1)
+    sizes, members = [0] * n_shards, [[] for _ in range(n_shards)]
+    shard_of = np.zeros(len(counts), dtype=np.int64)
+    for slot in np.argsort(-counts, kind='stable'):
+        shard = sizes.index(min(sizes))
+        sizes[shard] += int(counts[slot])
+        shard_of[slot] = shard
+        if slot > 0:
+            members[shard].append(str(uniques[slot - 1]))
+    return shard_of[codes + 1], members
+
+def build_shards(processed_dir, cleaned_path, out_dir, n_shards, shard_by='hash', sq_norms_path=None):
+    """
+    Write ``n_shards`` shard directories plus a manifest to ``out_dir``.
+
+    Args:
+        processed_dir (str): Directory with the feature blocks and service_ids.npy.
+        cleaned_path (str): Cleaned catalog CSV (same row order as the features).
+        out_dir (str): Output directory (``shard_000`` ... and shards.json).
+        n_shards (int): Number of shards.
+        shard_by (str): 'hash' (of Service_ID) or one of PARTITION_COLUMNS.
+        sq_norms_path (str, optional): Cached squared norms (default: processed_dir's, else computed).
+
+    Returns:
+        dict: The manifest.
+    """
+    if shard_by != 'hash' and shard_by not in PARTITION_COLUMNS:
+        raise ValueError(f"shard_by must be 'hash' or one of {PARTITION_COLUMNS}, got {shard_by!r}")
+    df = pd.read_csv(cleaned_path)
+    service_ids = np.load(os.path.join(processed_dir, 'service_ids.npy'), allow_pickle=True)
+    blocks = [np.load(os.path.join(processed_dir, BLOCK_FILES[name]), mmap_mode='r') for name in BLOCK_NAMES]
+    sq_norms_path = sq_norms_path or os.path.join(processed_dir, SQ_NORMS_FILE)
+    if os.path.exists(sq_norms_path):
+        sq_norms = np.load(sq_norms_path, mmap_mode='r')
+    else:
+        sq_norms = np.column_stack([squared_norms(block) for block in blocks])
+
+    if shard_by == 'hash':
+        assignment, members = hash_assignment(service_ids, n_shards), None
+    else:
+        assignment, members = partition_assignment(df[shard_by].to_numpy(dtype=object), n_shards)
+
+    manifest = {'n_shards': n_shards, 'shard_by': shard_by, 'n_rows': len(df), 'shards': []}
+    os.makedirs(out_dir, exist_ok=True)
+    for shard in range(n_shards):
+        name = f'shard_{shard:03d}'
+        shard_dir = os.path.join(out_dir, name)
+        os.makedirs(shard_dir, exist_ok=True)
+        rows = np.flatnonzero(assignment == shard)
+        for block_name, block in zip(BLOCK_NAMES, blocks):
+            np.save(os.path.join(shard_dir, BLOCK_FILES[block_name]), np.asarray(block[rows]))
+        np.save(os.path.join(shard_dir, SQ_NORMS_FILE), np.asarray(sq_norms[rows]))
+        np.save(os.path.join(shard_dir, 'service_ids.npy'), service_ids[rows])
+        np.save(os.path.join(shard_dir, GLOBAL_ROWS_FILE), rows)
+        df.iloc[rows].to_csv(os.path.join(shard_dir, SHARD_CATALOG_FILE), index=False)
+        entry = {'name': name, 'rows': len(rows)}
+        if members is not None:
+            entry['values'] = sorted(members[shard])
+        manifest['shards'].append(entry)
+    with open(os.path.join(out_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def load_manifest(shards_dir):
+    path = os.path.join(shards_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Shard manifest not found at {path}. Run the pipeline with --shards.")
+    with open(path) as f:
+        return json.load(f)
+
+def shard_engine_kwargs(shards_dir, name, models_dir=None):
+    """RecommendationEngine locations for one shard."""
+    shard_dir = os.path.join(shards_dir, name)
+    return {'processed_dir': shard_dir, 'cleaned_data_path': os.path.join(shard_dir, SHARD_CATALOG_FILE),
+            'models_dir': models_dir}
+
+# --- Merging --------------------------------------------------------------
+
+def merge_shard_results(shard_results, top_k):
+    """
+    Merge per-shard ``search`` lists (each sorted best first) into the global top_k.
+
+    Returns:
+        list: Result dicts, in the unsharded engine's order.
+    """
+    merged = heapq.merge(*shard_results, key=lambda entry: (-entry[0], entry[1]))
+    return [result for _, _, result in itertools.islice(merged, max(top_k, 0))]
+
+# --- Transports -----------------------------------------------------------
+
+class ProcessShard:
+    """A shard served by a local EngineProcessPool."""
+
+    def __init__(self, name, workers=1, **engine_kwargs):
+        self.name = name
+        self.pool = EngineProcessPool(workers=workers, **engine_kwargs)
+
+    def submit(self, user_input, **kwargs):
+        return self.pool.submit_search(user_input, **kwargs)
+
+    def close(self):
+        self.pool.close()
+
+class SocketShard:
+    """
+    A shard behind a ShardServer socket. Each call borrows an idle connection (or opens
+    one) and waits for the reply on the coordinator's thread pool. A connection whose reply
+    is late is closed rather than reused. Every query carries the coordinator's
+    ranking_method, which the server checks against its engine's.
+    """
+
+    def __init__(self, name, address, authkey, executor, reply_timeout, ranking_method='cosine'):
+        self.name = name
+        self.ranking_method = ranking_method
+        self.address = tuple(address)
+        self.authkey = authkey
+        self.executor = executor
+        self.reply_timeout = reply_timeout
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _call(self, user_input, kwargs):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = Client(self.address, authkey=self.authkey)
+        try:
+            conn.send((user_input, dict(kwargs, ranking_method=self.ranking_method)))
+            if not conn.poll(self.reply_timeout):
+                raise TimeoutError(f"Shard {self.name} did not reply within {self.reply_timeout} s.")
+            ok, value = conn.recv()
+        except BaseException:
+            conn.close()
+            raise
+        with self._lock:
+            self._idle.append(conn)
+        if not ok:
+            raise value
+        return value
+
+    def submit(self, user_input, **kwargs):
+        return self.executor.submit(self._call, user_input, kwargs)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+class ShardServer:
+    """
+    Serves one shard's RecommendationEngine.search over a multiprocessing.connection socket,
+    one thread per client connection (the engine is thread-safe). A query whose
+    ranking_method differs from the engine's is answered with a ValueError, since its scores
+    could not be merged with other shards'.
+    """
+
+    def __init__(self, engine, address=('127.0.0.1', 0), authkey=None):
+        self.engine = engine
+        self.listener = Listener(address, authkey=authkey)
+        self.address = self.listener.address
+
+    def serve_forever(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                return  # Listener closed
+            except Exception:
+                continue  # Failed handshake (wrong authkey)
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    user_input, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    ranking_method = kwargs.pop('ranking_method', None)
+                    if ranking_method is not None and ranking_method != self.engine.ranking_method:
+                        raise ValueError(f"Shard engine ranks by {self.engine.ranking_method!r}, "
+                                         f"the query by {ranking_method!r}.")
+                    reply = (True, self.engine.search(user_input, **kwargs))
+                except Exception as e:
+                    reply = (False, e)
+                try:
+                    conn.send(reply)
+                except (OSError, ValueError):
+                    return
+
+    def close(self):
+        self.listener.close()
+
+def _serve_shard(engine_kwargs, authkey, ready):
+    """Process target of start_local_servers: load the shard, report the port, serve."""
+    from src.models.recommendation_engine import RecommendationEngine
+    server = ShardServer(RecommendationEngine(**engine_kwargs), authkey=authkey)
+    ready.send(server.address)
+    ready.close()
+    server.serve_forever()
+
+def start_local_servers(shards_dir, models_dir=None, authkey=None, **engine_kwargs):
+    """
+    Start one ShardServer process per shard on localhost (stand-ins for remote nodes).
+
+    Returns:
+        tuple: (processes, addresses, authkey); terminate the processes when done.
+    """
+    authkey = authkey or os.urandom(16)
+    context = multiprocessing.get_context('spawn')
+    processes, readers = [], []
+    for shard in load_manifest(shards_dir)['shards']:
+        reader, writer = context.Pipe(duplex=False)
+        kwargs = dict(engine_kwargs, **shard_engine_kwargs(shards_dir, shard['name'], models_dir))
+        process = context.Process(target=_serve_shard, args=(kwargs, authkey, writer), daemon=True)
+        process.start()
+        writer.close()
+        processes.append(process)
+        readers.append(reader)
+    addresses = [reader.recv() for reader in readers]
+    return processes, addresses, authkey
+
+# --- Coordinator ----------------------------------------------------------
+
+class ShardCoordinator:
+    """
+    Fans a query out to the shards that can match it and merges their top-k lists.
+
+    Has the engine's get_recommendations signature (profiling aside). Results are
+    identical to the unsharded engine whenever every shard answers.
+    """
+
+    def __init__(self, shards_dir, models_dir=None, transport='process', addresses=None, authkey=None,
+                 timeout=DEFAULT_TIMEOUT, allow_partial=True, workers_per_shard=1, ranking_method='cosine',
+                 block_weights=DEFAULT_BLOCK_WEIGHTS, metrics=None):
+        """
+        Args:
+            shards_dir (str): Output of build_shards (manifest plus shard directories).
+            models_dir (str, optional): Encoders of the full catalog.
+            transport (str): 'process' starts an EngineProcessPool per shard; 'socket'
+                connects to ShardServers at ``addresses`` (one per shard, in manifest order).
+            authkey (bytes): Socket authentication key of the servers.
+            timeout (float): Seconds to wait for the shards of one query.
+            allow_partial (bool): Return the merge of the shards that answered when some
+                time out or fail (True), or raise ShardTimeoutError (False).
+            workers_per_shard (int): Processes per shard (process transport).
+            ranking_method / block_weights: Engine settings. Per-query block_weights can
+                still be passed to get_recommendations. Socket shards must run engines with
+                the same ranking_method; a query to one that does not raises ValueError.
+            metrics: MetricsRegistry for shard failures (default: the process-wide REGISTRY).
+        """
+        self.manifest = load_manifest(shards_dir)
+        self.timeout = timeout
+        self.allow_partial = allow_partial
+        self.transport = transport
+        self.block_weights = tuple(block_weights)
+        metrics = metrics if metrics is not None else REGISTRY
+        self._failures = metrics.counter('shard_requests_failed_total',
+                                         "Shard requests left out of a merge.", ['shard', 'reason'])
+        names = [shard['name'] for shard in self.manifest['shards']]
+        self._executor = None
+        if transport == 'process':
+            self.shards = [ProcessShard(name, workers=workers_per_shard, ranking_method=ranking_method,
+                                        block_weights=block_weights,
+                                        **shard_engine_kwargs(shards_dir, name, models_dir)) for name in names]
+        elif transport == 'socket':
+            if addresses is None or len(addresses) != len(names):
+                raise ValueError(f"The socket transport needs one address per shard ({len(names)}).")
+            self._executor = ThreadPoolExecutor(max_workers=4 * len(names), thread_name_prefix='unlox-shard')
+            # Replies later than this are given up on for good (the query itself stops waiting at timeout)
+            self.shards = [SocketShard(name, address, authkey, self._executor, reply_timeout=max(30.0, 10 * timeout),
+                                       ranking_method=ranking_method)
+                           for name, address in zip(names, addresses)]
+        else:
+            raise ValueError(f"transport must be 'process' or 'socket', got {transport!r}")
+        # Partitioned catalogs: filter value -> shards holding it
+        self._partition = None
+        if self.manifest['shard_by'] != 'hash':
+            self._partition = {}
+            for shard, entry in zip(self.shards, self.manifest['shards']):
+                for value in entry['values']:
+                    self._partition.setdefault(value, []).append(shard)
+
+    def route(self, user_input):
+        """The shards that can hold matches for ``user_input``."""
+        if self._partition is not None:
+            value = user_input.get(self.manifest['shard_by'])
+            if value:
+                # Same comparison as the engine's strict filter
+                return self._partition.get(value.lower(), [])
+        return self.shards
+
+    def gather(self, user_input, top_k=5, block_weights=None):
+        """
+        Scatter the query, wait up to ``timeout`` and merge.
+
+        Returns:
+            tuple: (results, missing) where ``missing`` names the shards left out.
+
+        Raises:
+            The query's own error (e.g. a malformed input), as the engine would.
+        """
+        weights = self.block_weights if block_weights is None else tuple(block_weights)
+        futures = {shard.submit(user_input, top_k=top_k, block_weights=weights): shard
+                   for shard in self.route(user_input)}
+        done, _ = wait(futures, timeout=self.timeout)
+        shard_results, missing = [], []
+        for future, shard in futures.items():
+            if future not in done:
+                reason = 'timeout'
+            elif isinstance(future.exception(), (WorkerCrashedError, OSError, EOFError)):
+                reason = 'unavailable'
+            elif future.exception() is not None:
+                raise future.exception()
+            else:
+                shard_results.append(future.result())
+                continue
+            future.cancel()
+            self._failures.labels(shard=shard.name, reason=reason).inc()
+            missing.append(shard.name)
+        return merge_shard_results(shard_results, top_k), missing
+
+    def get_recommendations(self, user_input, top_k=5, block_weights=None):
+        """Merged results of all shards; see ``allow_partial`` for shards that do not answer."""
+        results, missing = self.gather(user_input, top_k, block_weights)
+        if missing and not self.allow_partial:
+            raise ShardTimeoutError(f"No answer from shards {', '.join(missing)} within {self.timeout} s.")
+        return results
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve one catalog shard over a socket.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    serve = sub.add_parser('serve', help="Serve one shard (a stand-in for a remote node)")
+    serve.add_argument('--shards-dir', required=True)
+    serve.add_argument('--shard', type=int, required=True, help="Shard number in the manifest")
+    serve.add_argument('--models-dir', default=None)
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=0)
+    serve.add_argument('--ranking-method', choices=('cosine', 'knn'), default='cosine')
+    serve.add_argument('--authkey', default=os.environ.get('UNLOX_SHARD_AUTHKEY', ''),
+                       help="Shared secret (default: $UNLOX_SHARD_AUTHKEY)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    from src.models.recommendation_engine import RecommendationEngine
+
+    args = parse_args(argv)
+    name = load_manifest(args.shards_dir)['shards'][args.shard]['name']
+    engine = RecommendationEngine(ranking_method=args.ranking_method,
+                                  **shard_engine_kwargs(args.shards_dir, name, args.models_dir))
+    server = ShardServer(engine, (args.host, args.port), authkey=args.authkey.encode() or None)
+    print(f"Serving {name} ({len(engine.catalog):,} rows) on {server.address[0]}:{server.address[1]}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
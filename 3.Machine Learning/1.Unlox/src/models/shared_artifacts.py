@@ -0,0 +1,128 @@
+"""
+Shared Artifacts
+Copies an engine's query-time artifacts (feature blocks, squared norms, service IDs,
+catalog columns and, for a shard, its global row numbers) once into a single ``multiprocessing.shared_memory`` segment, so worker
+processes can attach to them zero-copy instead of each loading its own copy.
+
+The parent owns the segment (``SharedArtifacts``) and unlinks it when done; workers call
+``attach(spec)`` with the small picklable ``spec`` and get read-only NumPy views.
+
+Attaching registers the segment with the attaching process's resource tracker. Workers
+started by the owner (spawned pool workers, local shard servers) share the owner's tracker,
+so that is harmless and keeps the segment cleaned up if the owner is killed. A process with
+its own tracker would unlink the segment when it dies; it attaches with ``untrack=True``
+(``track=False`` on 3.13+, an explicit unregister before).
+"""
+import os
+import sys
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+
+from src.models.feature_blocks import FeatureBlocks, BLOCK_NAMES
+from src.models.catalog_columns import CatalogColumns, freeze
+
+# Arrays start on cache-line boundaries inside the segment
+ALIGNMENT = 64
+
+def engine_arrays(engine):
+    """Everything the query path reads, as (arrays, meta) ready to be shared."""
+    if engine.quantized is not None:
+        raise ValueError("Shared artifacts support float storage only.")
+    arrays, meta = engine.catalog.state()
+    arrays = {f'catalog/{name}': array for name, array in arrays.items()}
+    arrays.update({f'blocks/{name}': np.asarray(block) for name, block in zip(BLOCK_NAMES, engine.blocks.blocks)})
+    arrays['blocks/sq_norms'] = np.asarray(engine.blocks.sq_norms)
+    arrays['service_ids'] = np.asarray(engine.service_ids.tolist())
+    if engine.global_rows is not None:
+        arrays['global_rows'] = engine.global_rows
+    return arrays, {'catalog': meta}
+
+class SharedArtifacts:
+    """
+    Owner of the shared memory segment holding an engine's artifacts.
+
+    Attributes:
+        spec (dict): Segment name, per-array (offset, dtype, shape) layout and metadata;
+            pass it to ``attach`` in other processes.
+        nbytes (int): Size of the segment.
+    """
+
+    def __init__(self, arrays, meta):
+        layout, offset = {}, 0
+        for name, array in arrays.items():
+            layout[name] = (offset, array.dtype.str, array.shape)
+            offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+        self._shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for name, array in arrays.items():
+            _view(self._shm, *layout[name])[...] = array
+        self.nbytes = self._shm.size
+        self.spec = {'name': self._shm.name, 'layout': layout, 'meta': meta}
+
+    @classmethod
+    def from_engine(cls, engine):
+        return cls(*engine_arrays(engine))
+
+    def close(self):
+        """Release and remove the segment (workers that are still attached keep their mapping)."""
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _view(shm, offset, dtype, shape):
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+
+class AttachedArtifacts:
+    """
+    Read-only views of a shared segment, in the form RecommendationEngine(artifacts=...) takes.
+
+    Attributes:
+        blocks (FeatureBlocks): Feature blocks and squared norms.
+        service_ids (numpy.ndarray): Service ID per row.
+        catalog (CatalogColumns): Filter codes and result columns.
+        global_rows (numpy.ndarray): Full-catalog row of each row (shards), else None.
+    """
+
+    def __init__(self, spec, untrack=False):
+        if untrack and sys.version_info >= (3, 13):
+            self._shm = shared_memory.SharedMemory(name=spec['name'], track=False)
+        else:
+            self._shm = shared_memory.SharedMemory(name=spec['name'])
+            # SharedMemory(track=False) is 3.13+; before that POSIX segments are always tracked
+            if untrack and os.name == 'posix':
+                resource_tracker.unregister(self._shm._name, 'shared_memory')
+        arrays = {name: _view(self._shm, *layout) for name, layout in spec['layout'].items()}
+        freeze(*arrays.values())
+        self.blocks = FeatureBlocks(*(arrays[f'blocks/{name}'] for name in BLOCK_NAMES),
+                                    sq_norms=arrays['blocks/sq_norms'])
+        self.service_ids = arrays['service_ids']
+        self.global_rows = arrays.get('global_rows')
+        catalog_arrays = {name[len('catalog/'):]: array for name, array in arrays.items()
+                          if name.startswith('catalog/')}
+        self.catalog = CatalogColumns.from_state(catalog_arrays, spec['meta']['catalog'])
+
+    def close(self):
+        """Drop the views and unmap the segment (discard engines built on them first)."""
+        self.blocks = self.service_ids = self.catalog = self.global_rows = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+
+def attach(spec, untrack=False):
+    """
+    Map the segment described by ``spec`` (from SharedArtifacts.spec) into this process.
+
+    Args:
+        spec (dict): SharedArtifacts.spec.
+        untrack (bool): Keep the segment off this process's resource tracker. Only for
+            processes not started by the owner (they have a tracker of their own, which would
+            unlink the segment when they die); the owner's workers share its tracker and must
+            leave this off, or the segment leaks if the owner is killed.
+    """
+    return AttachedArtifacts(spec, untrack=untrack)
@@ -0,0 +1,70 @@
+"""
+Two-Stage Retrieval
+Cheap pre-scores for a shortlist that is then re-scored exactly (see
+quantization.rerank_shortlist), for queries with many candidates.
+
+Stage one scores every candidate on the narrow blocks and a sparse text signal:
+- the manual and one-hot blocks exactly (16 columns on the default schema), and
+- the text block from each row's TOP_TERMS largest coordinates only, kept as an
+  inverted index (per term: the rows that have it among their top terms, and its value).
+
+A query's text pre-score adds up the postings of its own nonzero terms only, so it reads
+a few percent of the index instead of every row's text block. Stage two computes the
+exact cosine of the shortlist, so returned scores are exact; a row that belonged in the
+top-k but missed the shortlist is what the shortlist size trades against speed.
+"""
+import numpy as np
+
+# Text coordinates kept per row for the pre-score
+TOP_TERMS = 8
+
+class TopTermBlocks:
+    """
+    Pre-score view of FeatureBlocks, with the same ``block_dots`` as QuantizedBlocks
+    (usable with quantization.approximate_scores).
+
+    Attributes:
+        blocks (FeatureBlocks): The exact blocks (manual and one-hot are read from them).
+        indptr (numpy.ndarray): (width + 1) start of each text term's postings.
+        rows (numpy.ndarray): Posting rows, ascending within a term.
+        values (numpy.ndarray): float32 text values of the postings.
+    """
+
+    def __init__(self, blocks, n_terms=TOP_TERMS, chunksize=100_000):
+        self.blocks = blocks
+        text = blocks.blocks[2]
+        self.n_rows, width = text.shape
+        n_terms = min(n_terms, width)
+        terms = np.empty((self.n_rows, n_terms), dtype=np.min_scalar_type(max(width - 1, 0)))
+        values = np.empty((self.n_rows, n_terms), dtype=np.float32)
+        for start in range(0, self.n_rows, chunksize):
+            chunk = np.asarray(text[start:start + chunksize])
+            top = np.argpartition(-np.abs(chunk), n_terms - 1, axis=1)[:, :n_terms]
+            terms[start:start + chunksize] = top
+            values[start:start + chunksize] = np.take_along_axis(chunk, top, axis=1)
+
+        # Rows with fewer nonzero terms pad their top terms with zeros; drop those
+        kept = np.flatnonzero(values.ravel())
+        by_term = kept[np.argsort(terms.ravel()[kept], kind='stable')]
+        self.indptr = np.zeros(width + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms.ravel()[kept], minlength=width), out=self.indptr[1:])
+        self.rows = (by_term // n_terms).astype(np.int32)
+        self.values = values.ravel()[by_term]
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.rows.nbytes + self.values.nbytes
+
+    def text_dots(self, text_block):
+        """Pre-score text products of every row: the query's weight on each row's top terms times their values."""
+        u = np.ravel(text_block)
+        dots = np.zeros(self.n_rows)
+        for term in np.flatnonzero(u):
+            start, stop = self.indptr[term], self.indptr[term + 1]
+            # A row appears once per term, so the fancy += does not drop repeats
+            dots[self.rows[start:stop]] += u[term] * self.values[start:stop]
+        return dots
+
+    def block_dots(self, user_blocks, rows=None):
+        """Per-block products, shape (n_rows, 3): exact manual and one-hot, pre-score text."""
+        return self.blocks.block_dots(user_blocks, rows, text_dots=self.text_dots(user_blocks[2]))
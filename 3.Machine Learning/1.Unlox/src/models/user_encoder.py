@@ -2,29 +2,131 @@ import pandas as pd
 import numpy as np
 import pickle
 import os
+from src.models.feature_blocks import DEFAULT_BLOCK_WEIGHTS
 
 # Paths (adjust as needed if running from different root)
 MODELS_DIR = os.path.dirname(os.path.abspath(__file__))
 
 class UserEncoder:
-    def __init__(self):
+    def __init__(self, models_dir=None):
+        self.models_dir = models_dir or MODELS_DIR
         self.encoders = self._load_encoders()
         self.ohe = self.encoders[0] # OneHotEncoder
         self.tfidf = self.encoders[1] # TfidfVectorizer
+        self.n_manual = 5
+        self.n_onehot = len(self.ohe.get_feature_names_out())
+        # Optional LSA projection of the TF-IDF block (see lsa_compression.py)
+        self.lsa = self._load_lsa()
+        self._onehot_columns = self._onehot_lookup()
         
     def _load_encoders(self):
-        path = os.path.join(MODELS_DIR, 'encoders.pkl')
+        path = os.path.join(self.models_dir, 'encoders.pkl')
         if not os.path.exists(path):
             raise FileNotFoundError(f"Encoders not found at {path}. Run feature_engineering.py first.")
         with open(path, 'rb') as f:
             return pickle.load(f)
 
-    def encode_user_input(self, user_input):
+    def _onehot_lookup(self):
+        """
+        {category: output column} per one-hot feature, so queries skip building a DataFrame
+        for OneHotEncoder.transform. None when the encoder's settings (dropped or infrequent
+        categories, errors on unknown values) need the full transform.
+        """
+        params = self.ohe.get_params()
+        if (params['drop'] is not None or params['handle_unknown'] != 'ignore'
+                or params['min_frequency'] is not None or params['max_categories'] is not None):
+            return None
+        lookups, offset = [], 0
+        for categories in self.ohe.categories_:
+            lookups.append({value: offset + i for i, value in enumerate(categories)})
+            offset += len(categories)
+        return lookups
+
+    def encode_onehot(self, business_type, location):
+        """1 x n_onehot one-hot block for lower-cased business type and location."""
+        if self._onehot_columns is None:
+            # Order must match training: ['Target_Business_Type', 'Location_Area']
+            frame = pd.DataFrame([[business_type, location]], columns=['Target_Business_Type', 'Location_Area'])
+            return self.ohe.transform(frame)
+        features = np.zeros((1, self.n_onehot), dtype=self.ohe.dtype)
+        for lookup, value in zip(self._onehot_columns, (business_type, location)):
+            column = lookup.get(value)
+            # Unknown values encode as all zeros (handle_unknown='ignore')
+            if column is not None:
+                features[0, column] = 1
+        return features
+
+    def _load_lsa(self):
+        path = os.path.join(self.models_dir, 'lsa.pkl')
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def project_text_block(self, tfidf_features):
+        """Project a 1xV TF-IDF block into LSA space (requires lsa.pkl)."""
+        if self.lsa is None:
+            raise FileNotFoundError(f"LSA model not found in {self.models_dir}. Run the pipeline with --lsa-components.")
+        return self.lsa.transform(tfidf_features)
+
+    def encode_user_input(self, user_input, block_weights=DEFAULT_BLOCK_WEIGHTS):
         """
         Transforms user input dict into a 1xN feature vector.
         Expected keys: 'Price_Category', 'Language_Support', 'Location_Area', 'Target_Business_Type', 'Description'
+        block_weights: Multipliers for the (manual, one-hot, TF-IDF) blocks.
+        """
+        blocks = self.encode_user_blocks(user_input)
+        return np.hstack([block * weight for block, weight in zip(blocks, block_weights)])
+
+    def encode_user_blocks(self, user_input, text_block=None):
+        """
+        Transforms user input dict into unweighted (manual, one-hot, TF-IDF) blocks,
+        each a 1xN array. Block weights are applied at scoring time.
+        A known ``text_block`` for the input's description (e.g. cached) is used as is,
+        skipping the TF-IDF transform.
         """
+        manual_features, ohe_features = self._encode_structured(user_input)
+        if text_block is not None:
+            return manual_features, ohe_features, text_block
         
+        # 3. TF-IDF
+        desc = user_input.get('Description', '')
+        tfidf_features = self.tfidf.transform([desc]).toarray()
+        
+        return manual_features, ohe_features, tfidf_features
+
+    def encode_user_blocks_batch(self, user_inputs):
+        """
+        encode_user_blocks for several inputs, with one TF-IDF transform for all descriptions.
+
+        Returns:
+            list: Per input, its (manual, one-hot, TF-IDF) 1xN blocks (row views of one
+                matrix per block), or the exception encoding it raised.
+        """
+        encoded, descriptions = [], []
+        for user_input in user_inputs:
+            try:
+                encoded.append(self._encode_structured(user_input))
+                descriptions.append(user_input.get('Description', ''))
+            except Exception as e:
+                encoded.append(e)
+        ok = [i for i, blocks in enumerate(encoded) if not isinstance(blocks, Exception)]
+        try:
+            tfidf = self.tfidf.transform(descriptions).toarray() if ok else None
+        except Exception:
+            # One bad description must not fail the others; encode them one by one
+            for i in ok:
+                try:
+                    encoded[i] = self.encode_user_blocks(user_inputs[i])
+                except Exception as e:
+                    encoded[i] = e
+            return encoded
+        for row, i in enumerate(ok):
+            encoded[i] = encoded[i] + (tfidf[row:row + 1],)
+        return encoded
+
+    def _encode_structured(self, user_input):
+        """Manual (1x5) and one-hot blocks of a user input."""
         # 1. Manual Features (5)
         # Price (Normalized 0.25-1.0)
         price_map = {'low': 0.25, 'medium': 0.50, 'high': 0.75, 'premium': 1.0}
@@ -48,20 +150,5 @@ class UserEncoder:
         manual_features = np.array([[price_score, lang_english, lang_hindi, lang_regional, is_remote]])
         
         # 2. One-Hot Encoding (Business Type, Location)
-        # We need to construct a df-like frame or just list of lists for OHE
-        # Order must match training: ['Target_Business_Type', 'Location_Area']
-        cat_input_df = pd.DataFrame(
-            [[user_input.get('Target_Business_Type', 'other').lower(), loc]], 
-            columns=['Target_Business_Type', 'Location_Area']
-        )
-        ohe_features = self.ohe.transform(cat_input_df)
-        
-        # 3. TF-IDF
-        desc = user_input.get('Description', '')
-        # Apply same boost factor (10.0)
-        tfidf_features = self.tfidf.transform([desc]).toarray() * 10.0
-        
-        # 4. Combine
-        final_vector = np.hstack([manual_features, ohe_features, tfidf_features])
-        
-        return final_vector
+        ohe_features = self.encode_onehot(user_input.get('Target_Business_Type', 'other').lower(), loc)
+        return manual_features, ohe_features
@@ -1,4 +1,5 @@
 import pandas as pd
+import numpy as np
 import os
 
 """
@@ -7,8 +8,10 @@ Data Cleaner Module
 Handles the loading, cleaning, and standardization of raw service recommendation data.
 """
 
-RAW_DATA_PATH = r"E:\Internship\ml-service-recommendation\data\raw\service_recommendation_data.csv"
-CLEANED_DATA_PATH = r"E:\Internship\ml-service-recommendation\data\cleaned\service_recommendation_data_cleaned.csv"
+# Navigate up: src/preprocessing -> src -> project_root
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+RAW_DATA_PATH = os.path.join(PROJECT_ROOT, 'data', 'raw', 'service_recommendation_data.csv')
+CLEANED_DATA_PATH = os.path.join(PROJECT_ROOT, 'data', 'cleaned', 'service_recommendation_data_cleaned.csv')
 
 def load_data(path):
     """
@@ -42,20 +45,112 @@ def clean_text(text):
         return text.strip().lower()
     return text
 
-def clean_dataset(df):
+# Two independent 16-byte keys for pandas' SipHash; together they give a 128-bit row fingerprint.
+FINGERPRINT_HASH_KEYS = ('svc-dedup-key-hi', 'svc-dedup-key-lo')
+FINGERPRINT_DTYPE = np.dtype([('hi', '<u8'), ('lo', '<u8')])
+
+def row_fingerprints(df):
     """
-    Apply cleaning transformations to the dataset.
-    
-    Operations:
-    1. Standardizes categorical columns (lowercase, stripped).
-    2. Strips whitespace from descriptions (preserving case).
-    3. Removes duplicate rows.
+    Hash every row of a dataframe into a 128-bit fingerprint.
+
+    Rows with identical values (in the same column order) always get the same
+    fingerprint, so fingerprints can stand in for full-row comparisons.
+
+    Args:
+        df (pd.DataFrame): Normalized dataframe.
+
+    Returns:
+        numpy.ndarray: Structured array of ('hi', 'lo') uint64 pairs, one per row.
+    """
+    fingerprints = np.empty(len(df), dtype=FINGERPRINT_DTYPE)
+    fingerprints['hi'] = pd.util.hash_pandas_object(df, index=False, hash_key=FINGERPRINT_HASH_KEYS[0]).to_numpy()
+    fingerprints['lo'] = pd.util.hash_pandas_object(df, index=False, hash_key=FINGERPRINT_HASH_KEYS[1]).to_numpy()
+    return fingerprints
+
+class FingerprintIndex:
+    """
+    Compact set of row fingerprints seen so far.
+
+    Fingerprints are kept in a single sorted numpy array (16 bytes per unique row),
+    so duplicates can be detected across chunks without holding earlier rows in memory.
+    """
+
+    def __init__(self, fingerprints=None):
+        if fingerprints is None:
+            fingerprints = np.empty(0, dtype=FINGERPRINT_DTYPE)
+        self.fingerprints = np.unique(fingerprints.astype(FINGERPRINT_DTYPE, copy=False))
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def add(self, fingerprints):
+        """
+        Register a batch of fingerprints.
+
+        Args:
+            fingerprints (numpy.ndarray): Fingerprints of a chunk, in row order.
+
+        Returns:
+            numpy.ndarray: Boolean mask, True for rows seen for the first time
+            (first occurrence wins inside the batch, like ``drop_duplicates``).
+        """
+        keep = np.zeros(len(fingerprints), dtype=bool)
+        if len(fingerprints) == 0:
+            return keep
+
+        # First occurrence of each fingerprint inside the batch
+        batch_unique, first_pos = np.unique(fingerprints, return_index=True)
+
+        # Drop the ones already present in the index
+        insert_at = np.searchsorted(self.fingerprints, batch_unique)
+        in_bounds = insert_at < len(self.fingerprints)
+        seen = np.zeros(len(batch_unique), dtype=bool)
+        seen[in_bounds] = self.fingerprints[insert_at[in_bounds]] == batch_unique[in_bounds]
+
+        new = ~seen
+        keep[first_pos[new]] = True
+        # Both arrays are sorted, so an insert keeps the index sorted in O(n + m)
+        self.fingerprints = np.insert(self.fingerprints, insert_at[new], batch_unique[new])
+        return keep
+
+    def save(self, path):
+        """Persist the index to a .npy file so a later run can resume from it."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.save(path, self.fingerprints)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index previously written with ``save``."""
+        return cls(np.load(path))
+
+def drop_duplicate_rows(df, index=None):
+    """
+    Remove duplicate rows using 128-bit row fingerprints.
+
+    Args:
+        df (pd.DataFrame): Normalized dataframe.
+        index (FingerprintIndex, optional): Fingerprints seen in earlier chunks.
+            Updated in place. A fresh index is used when omitted.
+
+    Returns:
+        pd.DataFrame: Rows not seen before, in their original order.
+    """
+    if index is None:
+        index = FingerprintIndex()
+    keep = index.add(row_fingerprints(df))
+    return df[keep]
+
+def normalize_dataset(df):
+    """
+    Standardize categorical columns (lowercase, stripped) and strip descriptions.
 
     Args:
         df (pd.DataFrame): Raw dataframe.
 
     Returns:
-        pd.DataFrame: Cleaned dataframe ready for processing.
+        pd.DataFrame: Normalized copy of the dataframe (duplicates not removed).
     """
     # Create a copy to avoid SettingWithCopy warnings
     df_clean = df.copy()
@@ -71,14 +166,123 @@ def clean_dataset(df):
     if 'Description' in df_clean.columns:
         df_clean['Description'] = df_clean['Description'].str.strip()
 
+    return df_clean
+
+def clean_dataset(df, index=None):
+    """
+    Apply cleaning transformations to the dataset.
+    
+    Operations:
+    1. Standardizes categorical columns (lowercase, stripped).
+    2. Strips whitespace from descriptions (preserving case).
+    3. Removes duplicate rows.
+
+    Args:
+        df (pd.DataFrame): Raw dataframe.
+        index (FingerprintIndex, optional): Fingerprints of rows already cleaned,
+            e.g. from earlier chunks. Updated in place.
+
+    Returns:
+        pd.DataFrame: Cleaned dataframe ready for processing.
+    """
+    df_clean = normalize_dataset(df)
+
     # Ensure no duplicates
     before_dedup = len(df_clean)
-    df_clean = df_clean.drop_duplicates()
+    df_clean = drop_duplicate_rows(df_clean, index)
     if len(df_clean) < before_dedup:
         print(f"Removed {before_dedup - len(df_clean)} duplicate rows.")
 
     return df_clean
 
+def save_checkpoint(path, index, rows_read, output_bytes):
+    """
+    Atomically persist the progress of ``clean_file_in_chunks``: the fingerprint index,
+    the input rows processed and the output size they produced (.npz contents).
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        np.savez(f, fingerprints=index.fingerprints, rows_read=rows_read, output_bytes=output_bytes)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+def load_checkpoint(path):
+    """
+    Load a checkpoint written with ``save_checkpoint``.
+
+    Returns:
+        tuple: (FingerprintIndex, input rows processed, output bytes written).
+    """
+    with np.load(path) as data:
+        return FingerprintIndex(data['fingerprints']), int(data['rows_read']), int(data['output_bytes'])
+
+def clean_file_in_chunks(input_path, output_path, chunksize=100_000, fingerprint_path=None):
+    """
+    Clean a large CSV chunk by chunk, removing duplicates across chunks.
+
+    Only the fingerprint index (16 bytes per unique row) is kept between chunks.
+    With ``fingerprint_path`` a checkpoint (index, input rows processed, output size) is
+    saved after every chunk, and a later run resumes from it: rows already processed are
+    skipped and new rows are appended to ``output_path``. Output written after the last
+    checkpoint (a run interrupted mid-chunk) is truncated away and its rows processed again,
+    so a crash never duplicates rows.
+
+    Args:
+        input_path (str): Raw CSV file.
+        output_path (str): Destination CSV file.
+        chunksize (int): Rows read per chunk.
+        fingerprint_path (str, optional): Checkpoint file the run resumes from and saves to.
+
+    Returns:
+        int: Number of rows written by this run.
+
+    Raises:
+        ValueError: If the output file is shorter than the checkpoint says.
+    """
+    if not os.path.exists(input_path):
+        raise FileNotFoundError(f"Input file not found at {input_path}")
+
+    resume = fingerprint_path is not None and os.path.exists(fingerprint_path)
+    index, rows_read, output_bytes = load_checkpoint(fingerprint_path) if resume else (FingerprintIndex(), 0, 0)
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    if resume:
+        if not os.path.exists(output_path) or os.path.getsize(output_path) < output_bytes:
+            raise ValueError(f"{output_path} does not match the checkpoint {fingerprint_path}.")
+        with open(output_path, 'r+b') as out:
+            out.truncate(output_bytes)
+    else:
+        open(output_path, 'w').close()
+    write_header = output_bytes == 0
+
+    total_in, total_out, position = 0, 0, 0
+    # Read everything as text so fingerprints do not depend on per-chunk dtype inference
+    for chunk in pd.read_csv(input_path, chunksize=chunksize, dtype=str):
+        # Rows processed by an earlier run are parsed but not cleaned again
+        skip = min(max(rows_read - position, 0), len(chunk))
+        position += len(chunk)
+        chunk = chunk.iloc[skip:]
+        if chunk.empty:
+            continue
+        chunk_clean = drop_duplicate_rows(normalize_dataset(chunk), index)
+        with open(output_path, 'a', newline='', encoding='utf-8') as out:
+            chunk_clean.to_csv(out, header=write_header, index=False)
+            out.flush()
+            os.fsync(out.fileno())
+        write_header = False
+        total_in += len(chunk)
+        total_out += len(chunk_clean)
+        if fingerprint_path is not None:
+            save_checkpoint(fingerprint_path, index, position, os.path.getsize(output_path))
+
+    if total_out < total_in:
+        print(f"Removed {total_in - total_out} duplicate rows.")
+    print(f"Cleaned data saved to {output_path}")
+    return total_out
+
 def save_data(df, path):
     """
     Save the cleaned dataframe to a CSV file.
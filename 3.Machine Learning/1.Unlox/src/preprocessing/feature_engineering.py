@@ -2,11 +2,19 @@ import pandas as pd
 import numpy as np
 import pickle
 import os
-from sklearn.feature_extraction.text import TfidfVectorizer
+from concurrent.futures import ThreadPoolExecutor
+from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer
 from sklearn.preprocessing import OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 
+if __package__ in (None, ''):
+    # Allow running as a script: python src/preprocessing/feature_engineering.py
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.models.feature_blocks import BLOCK_NAMES, BLOCK_FILES
+
 """
 Feature Engineering Module
 -------------------------
@@ -15,29 +23,87 @@ Handles:
 - Ordinal encoding for price categories.
 - One-hot encoding for categorical variables.
 - TF-IDF vectorization for text descriptions.
-- Feature scaling and weighting.
+- Feature scaling.
+
+Serving reads the blocks unweighted (``features_<block>.npy``) and applies block weights
+at query time. The combined ``features.npy``, with the TF-IDF block boosted by
+TFIDF_BOOST, is an optional legacy output (``--legacy-matrix``) for tools that read it.
 """
 
 # Paths
-CLEANED_DATA_PATH = r"E:\Internship\ml-service-recommendation\data\cleaned\service_recommendation_data_cleaned.csv"
-PROCESSED_DATA_DIR = r"E:\Internship\ml-service-recommendation\data\processed"
-MODELS_DIR = r"E:\Internship\ml-service-recommendation\src\models"
+# Navigate up: src/preprocessing -> src -> project_root
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CLEANED_DATA_PATH = os.path.join(PROJECT_ROOT, 'data', 'cleaned', 'service_recommendation_data_cleaned.csv')
+PROCESSED_DATA_DIR = os.path.join(PROJECT_ROOT, 'data', 'processed')
+MODELS_DIR = os.path.join(PROJECT_ROOT, 'src', 'models')
 
 def load_data(path):
     """Load cleaned data from CSV."""
     return pd.read_csv(path)
 
-def process_features(df):
+PRICE_MAP = {'low': 0.25, 'medium': 0.50, 'high': 0.75, 'premium': 1.0}
+MANUAL_FEATURE_NAMES = ['price_score', 'lang_english', 'lang_hindi', 'lang_regional', 'is_remote']
+CATEGORICAL_FEATURES = ['Target_Business_Type', 'Location_Area']
+# Text weight baked into the legacy features.npy (the engine's default block weight)
+TFIDF_BOOST = 10.0
+
+def build_manual_features(df, out):
+    """
+    Write the 5 business-logic features into ``out`` (n_rows x 5) in place.
+
+    - price_score: Price category mapped to 0.25-1.0 (unknown -> 0.5, i.e. Medium).
+    - lang_english / lang_hindi / lang_regional: Language flags ('both' sets English and Hindi).
+    - is_remote: 1 if the service is delivered remotely.
+    """
+    language = df['Language_Support']
+    out[:, 0] = df['Price_Category'].map(PRICE_MAP).fillna(0.5).to_numpy()
+    out[:, 1] = language.isin(['english', 'both']).to_numpy()
+    out[:, 2] = language.isin(['hindi', 'both']).to_numpy()
+    out[:, 3] = (language == 'regional').to_numpy()
+    out[:, 4] = (df['Location_Area'] == 'remote').to_numpy()
+
+def build_onehot_features(df, ohe, out):
+    """
+    Write the one-hot block into ``out`` in place using category-code lookups.
+
+    Produces the same columns as ``ohe.transform`` without allocating a dense copy.
+    ``out`` must be zero-initialised.
+    """
+    offset = 0
+    for col, categories in zip(CATEGORICAL_FEATURES, ohe.categories_):
+        codes = pd.Index(categories).get_indexer(df[col])
+        known = codes >= 0  # handle_unknown='ignore' -> all-zero row
+        out[np.flatnonzero(known), offset + codes[known]] = 1.0
+        offset += len(categories)
+
+def build_tfidf_features(tfidf_matrix, out, boost=1.0):
+    """
+    Scatter a sparse TF-IDF matrix (times ``boost``) into the zero-initialised ``out``.
+    """
+    tfidf_matrix = tfidf_matrix.tocsr()
+    rows = np.repeat(np.arange(tfidf_matrix.shape[0]), np.diff(tfidf_matrix.indptr))
+    out[rows, tfidf_matrix.indices] = tfidf_matrix.data * boost
+
+def process_features(df, n_jobs=None, max_features=500, boost=1.0):
     """
     Generate feature matrix from the dataframe.
 
     Logic:
     1. Business Logic Features: Manual mapping of Price (0.25-1.0) and Language support.
     2. Categorical Features: One-Hot Encoding for Business Type and Location.
-    3. Text Features: TF-IDF for descriptions (boosted by 10x to prioritize semantic matching).
+    3. Text Features: TF-IDF for descriptions (unweighted by default; the engine
+       applies the 10x text weight at query time).
+
+    The final matrix is allocated once and every block is written into its own column
+    slice, so no intermediate dense copies are made. The input dataframe is not modified.
 
     Args:
         df (pd.DataFrame): Input dataframe.
+        n_jobs (int, optional): If > 1, fit the encoders and fill the blocks with a
+            thread pool of this size.
+        max_features (int): TF-IDF vocabulary size.
+        boost (float): Multiplier applied to the TF-IDF block (TFIDF_BOOST gives the
+            legacy weighted matrix).
 
     Returns:
         tuple: 
@@ -47,89 +113,270 @@ def process_features(df):
             - all_feature_names (numpy.ndarray): Names of all generated features.
     """
     print("Starting feature engineering...")
-    
-    # 1. Price Category Encoding (Ordinal - Normalized 0.25 to 1.0)
-    price_map = {'low': 0.25, 'medium': 0.50, 'high': 0.75, 'premium': 1.0}
-    df['price_score'] = df['Price_Category'].map(price_map).fillna(0.5) # Default to Medium
-    
-    # 2. Language Support (Custom Multi-Hot Encoding)
-    # create independent flags
-    df['lang_english'] = df['Language_Support'].apply(lambda x: 1 if x in ['english', 'both'] else 0)
-    df['lang_hindi'] = df['Language_Support'].apply(lambda x: 1 if x in ['hindi', 'both'] else 0)
-    df['lang_regional'] = df['Language_Support'].apply(lambda x: 1 if x == 'regional' else 0)
-    
-    # 3. Location (One-Hot + Remote Flag)
-    df['is_remote'] = df['Location_Area'].apply(lambda x: 1 if x == 'remote' else 0)
-    
-    # 4. TF-IDF for Description
-    tfidf = TfidfVectorizer(max_features=500, stop_words='english')
-    tfidf_matrix = tfidf.fit_transform(df['Description'].fillna(''))
-    feature_names_tfidf = tfidf.get_feature_names_out()
-    
-    # 5. One-Hot Encoding for Business Type and Location
+
+    tfidf = TfidfVectorizer(max_features=max_features, stop_words='english')
     # We use sklearn's OneHotEncoder for these to easily handle user input later
     # Note: We don't include Language here because we manually handled it above
-    categorical_features = ['Target_Business_Type', 'Location_Area']
-    
     ohe = OneHotEncoder(sparse_output=False, handle_unknown='ignore')
-    ohe_matrix = ohe.fit_transform(df[categorical_features])
-    feature_names_ohe = ohe.get_feature_names_out(categorical_features)
-    
-    # 6. Combine all features
-    # Numerical/Manual features: price_score, lang_english, lang_hindi, lang_regional, is_remote
-    manual_features = df[['price_score', 'lang_english', 'lang_hindi', 'lang_regional', 'is_remote']].values
-    feature_names_manual = ['price_score', 'lang_english', 'lang_hindi', 'lang_regional', 'is_remote']
-    
-    # Concatenate: [Manual (5), OHE (N), TF-IDF (500)]
-    # BOOST TEXT RELAVANCE: Multiply TF-IDF by 10.0 (Aggressive boost to fix ranking)
-    final_feature_matrix = np.hstack([manual_features, ohe_matrix, tfidf_matrix.toarray() * 10.0])
-    
-    all_feature_names = np.concatenate([feature_names_manual, feature_names_ohe, feature_names_tfidf])
+
+    fit_tfidf = lambda: tfidf.fit_transform(df['Description'].fillna(''))
+    # Categories are the sorted unique values, so fitting on unique rows is enough
+    fit_ohe = lambda: ohe.fit(df[CATEGORICAL_FEATURES].drop_duplicates())
+
+    executor = ThreadPoolExecutor(max_workers=n_jobs) if n_jobs and n_jobs > 1 else None
+    try:
+        # 1. Fit encoders
+        if executor:
+            tfidf_future, ohe_future = executor.submit(fit_tfidf), executor.submit(fit_ohe)
+            tfidf_matrix = tfidf_future.result()
+            ohe_future.result()
+        else:
+            tfidf_matrix = fit_tfidf()
+            fit_ohe()
+
+        feature_names_tfidf = tfidf.get_feature_names_out()
+        feature_names_ohe = ohe.get_feature_names_out(CATEGORICAL_FEATURES)
+
+        # 2. Preallocate: [Manual (5), OHE (N), TF-IDF (500)]
+        n_manual, n_ohe = len(MANUAL_FEATURE_NAMES), len(feature_names_ohe)
+        final_feature_matrix = np.zeros((len(df), n_manual + n_ohe + len(feature_names_tfidf)))
+        manual_block = final_feature_matrix[:, :n_manual]
+        ohe_block = final_feature_matrix[:, n_manual:n_manual + n_ohe]
+        tfidf_block = final_feature_matrix[:, n_manual + n_ohe:]
+
+        # 3. Fill blocks in place
+        tasks = [
+            (build_manual_features, df, manual_block),
+            (build_onehot_features, df, ohe, ohe_block),
+            (build_tfidf_features, tfidf_matrix, tfidf_block, boost),
+        ]
+        if executor:
+            for future in [executor.submit(*task) for task in tasks]:
+                future.result()
+        else:
+            for func, *args in tasks:
+                func(*args)
+    finally:
+        if executor:
+            executor.shutdown()
+
+    all_feature_names = np.concatenate([MANUAL_FEATURE_NAMES, feature_names_ohe, feature_names_tfidf])
     
     print(f"Feature Matrix Shape: {final_feature_matrix.shape}")
     
     return final_feature_matrix, df['Service_ID'].values, (ohe, tfidf), all_feature_names
 
-def save_artifacts(matrix, service_ids, encoders, feature_names):
+def fit_encoders_streaming(path, chunksize=50_000, max_features=500):
+    """
+    Pass 1 of the out-of-core build: fit the encoders without loading the whole file.
+
+    Streams the CSV once, accumulating per-term corpus counts and document
+    frequencies plus the categorical values. The TfidfVectorizer is then rebuilt
+    from those statistics, selecting terms exactly as ``fit`` would (top
+    ``max_features`` by corpus frequency) with smoothed idf ``ln((1+n)/(1+df)) + 1``.
+    Memory is bounded by the chunk plus the vocabulary, not by the number of rows.
+
+    Args:
+        path (str): Cleaned CSV file.
+        chunksize (int): Rows read per chunk.
+        max_features (int): TF-IDF vocabulary size.
+
+    Returns:
+        tuple: (OneHotEncoder, TfidfVectorizer, number of rows).
+    """
+    term_counts, doc_counts = {}, {}
+    categories = {col: set() for col in CATEGORICAL_FEATURES}
+    # Missing values are a category of their own, as in the in-memory fit (NaN != NaN,
+    # so they are tracked apart from the set)
+    has_missing = {col: False for col in CATEGORICAL_FEATURES}
+    n_rows = 0
+
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        counter = CountVectorizer(stop_words='english')
+        try:
+            counts = counter.fit_transform(chunk['Description'].fillna(''))
+        except ValueError:
+            counts = None  # Chunk with no usable terms
+        if counts is not None:
+            terms = counter.get_feature_names_out()
+            chunk_tf = np.asarray(counts.sum(axis=0)).ravel()
+            chunk_df = np.bincount(counts.indices, minlength=len(terms))  # one entry per (row, term)
+            for term, tf, df_ in zip(terms, chunk_tf, chunk_df):
+                term_counts[term] = term_counts.get(term, 0) + tf
+                doc_counts[term] = doc_counts.get(term, 0) + df_
+        for col in CATEGORICAL_FEATURES:
+            categories[col].update(chunk[col].dropna().unique())
+            has_missing[col] = has_missing[col] or bool(chunk[col].isna().any())
+        n_rows += len(chunk)
+
+    # Same selection as CountVectorizer._limit_features: alphabetical vocabulary,
+    # then the top terms by corpus frequency
+    vocab = np.array(sorted(term_counts))
+    tfs = np.array([term_counts[t] for t in vocab])
+    dfs = np.array([doc_counts[t] for t in vocab])
+    if len(vocab) > max_features:
+        keep = np.zeros(len(vocab), dtype=bool)
+        keep[(-tfs).argsort()[:max_features]] = True
+        vocab, dfs = vocab[keep], dfs[keep]
+
+    tfidf = TfidfVectorizer(max_features=max_features, stop_words='english')
+    tfidf.vocabulary_ = {term: i for i, term in enumerate(vocab)}
+    tfidf.idf_ = np.log((1 + n_rows) / (1 + dfs)) + 1.0
+
+    # OneHotEncoder categories are the sorted unique values, then NaN; fit on them directly
+    values = [sorted(categories[col]) + [np.nan] * has_missing[col] for col in CATEGORICAL_FEATURES]
+    width = max(len(v) for v in values)
+    ohe = OneHotEncoder(sparse_output=False, handle_unknown='ignore')
+    # An all-missing column is float, as pandas reads it in one piece
+    ohe.fit(pd.DataFrame({col: pd.Series(v + [v[0]] * (width - len(v)), dtype=None if categories[col] else float)
+                          for col, v in zip(CATEGORICAL_FEATURES, values)}))
+
+    return ohe, tfidf, n_rows
+
+def process_features_out_of_core(path, processed_dir=None, chunksize=50_000, max_features=500):
+    """
+    Build the feature blocks without holding the dataset or the dense matrix in memory.
+
+    Pass 1 fits the encoders from streamed statistics (``fit_encoders_streaming``).
+    Pass 2 streams the file again, transforms each chunk and writes its rows straight
+    into preallocated memory-mapped block files (``features_<block>.npy``). The blocks
+    are identical to ``process_features`` and the encoders stay compatible with
+    ``UserEncoder``.
+
+    Args:
+        path (str): Cleaned CSV file.
+        processed_dir (str, optional): Output directory. Defaults to PROCESSED_DATA_DIR.
+        chunksize (int): Rows per chunk; bounds peak memory.
+        max_features (int): TF-IDF vocabulary size.
+
+    Returns:
+        tuple: As ``process_features``, except that the first item is the (manual, onehot,
+            tfidf) blocks as read-only memmaps instead of one matrix.
+    """
+    processed_dir = processed_dir or PROCESSED_DATA_DIR
+    os.makedirs(processed_dir, exist_ok=True)
+    print("Starting out-of-core feature engineering...")
+
+    ohe, tfidf, n_rows = fit_encoders_streaming(path, chunksize=chunksize, max_features=max_features)
+    feature_names_ohe = ohe.get_feature_names_out(CATEGORICAL_FEATURES)
+    all_feature_names = np.concatenate([MANUAL_FEATURE_NAMES, feature_names_ohe, tfidf.get_feature_names_out()])
+    widths = [len(MANUAL_FEATURE_NAMES), len(feature_names_ohe), len(tfidf.get_feature_names_out())]
+
+    block_paths = [os.path.join(processed_dir, BLOCK_FILES[name]) for name in BLOCK_NAMES]
+    # A fresh .npy memmap is zero-filled, which the one-hot/TF-IDF scatters rely on
+    blocks = [np.lib.format.open_memmap(block_path, mode='w+', dtype=np.float64, shape=(n_rows, width))
+              for block_path, width in zip(block_paths, widths)]
+    service_ids = []
+    start = 0
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        rows = slice(start, start + len(chunk))
+        build_manual_features(chunk, blocks[0][rows])
+        build_onehot_features(chunk, ohe, blocks[1][rows])
+        build_tfidf_features(tfidf.transform(chunk['Description'].fillna('')), blocks[2][rows])
+        service_ids.append(chunk['Service_ID'].values)
+        start += len(chunk)
+    for block in blocks:
+        block.flush()
+    del blocks
+
+    service_ids = np.concatenate(service_ids) if service_ids else np.empty(0)
+    np.save(os.path.join(processed_dir, 'service_ids.npy'), service_ids)
+    print(f"Feature Matrix Shape: {(n_rows, len(all_feature_names))}")
+
+    blocks = tuple(np.load(block_path, mmap_mode='r') for block_path in block_paths)
+    return blocks, service_ids, (ohe, tfidf), all_feature_names
+
+def save_feature_blocks(matrix, n_onehot, processed_dir):
+    """
+    Write the manual, one-hot and TF-IDF blocks of an unweighted ``matrix`` as separate
+    segments (``features_<block>.npy``).
+    """
+    n_manual = len(MANUAL_FEATURE_NAMES)
+    bounds = [0, n_manual, n_manual + n_onehot, matrix.shape[1]]
+    for i, name in enumerate(BLOCK_NAMES):
+        np.save(os.path.join(processed_dir, BLOCK_FILES[name]), matrix[:, bounds[i]:bounds[i + 1]])
+
+def save_legacy_matrix(processed_dir, boost=TFIDF_BOOST, chunksize=100_000):
+    """
+    Write the legacy combined ``features.npy`` (TF-IDF block times ``boost``) from the
+    block files in ``processed_dir``, chunk by chunk into a memmap.
+    """
+    blocks = [np.load(os.path.join(processed_dir, BLOCK_FILES[name]), mmap_mode='r') for name in BLOCK_NAMES]
+    bounds = np.cumsum([0] + [block.shape[1] for block in blocks]).tolist()
+    scales = [1.0, 1.0, boost]
+    matrix = np.lib.format.open_memmap(os.path.join(processed_dir, 'features.npy'), mode='w+',
+                                       dtype=blocks[0].dtype, shape=(len(blocks[0]), bounds[-1]))
+    for start in range(0, len(matrix), chunksize):
+        for i, block in enumerate(blocks):
+            matrix[start:start + chunksize, bounds[i]:bounds[i + 1]] = block[start:start + chunksize] * scales[i]
+    matrix.flush()
+    del matrix
+
+def save_artifacts(matrix, service_ids, encoders, feature_names, processed_dir=None, models_dir=None,
+                   legacy_matrix=False):
     """
     Save generated feature artifacts to disk.
 
     Artifacts:
-    - features.npy: The numerical feature matrix.
+    - features_manual.npy / features_onehot.npy / features_tfidf.npy: The unweighted
+      feature blocks; the engine applies block weights at query time.
+    - features.npy (with ``legacy_matrix``): The combined matrix with the 10x TF-IDF
+      boost baked in, for tools that read it directly. Serving does not use it.
     - service_ids.npy: The ordered service IDs.
     - encoders.pkl: The fitted encoders for transforming new user input.
     - feature_names.pkl: Names of the features for debugging/explanation.
 
     Args:
-        matrix (numpy.ndarray): Feature matrix.
+        matrix (numpy.ndarray): Unweighted feature matrix (``process_features`` with the
+            default boost). Pass None when the blocks were already written by
+            ``process_features_out_of_core``.
         service_ids (numpy.ndarray): Service IDs.
         encoders (tuple): Fitted encoders.
         feature_names (list): Feature names.
+        processed_dir (str, optional): Defaults to PROCESSED_DATA_DIR.
+        models_dir (str, optional): Defaults to MODELS_DIR.
+        legacy_matrix (bool): Also write the legacy ``features.npy``.
     """
-    os.makedirs(PROCESSED_DATA_DIR, exist_ok=True)
-    os.makedirs(MODELS_DIR, exist_ok=True)
+    processed_dir = processed_dir or PROCESSED_DATA_DIR
+    models_dir = models_dir or MODELS_DIR
+    os.makedirs(processed_dir, exist_ok=True)
+    os.makedirs(models_dir, exist_ok=True)
     
     # Save Matrix
-    np.save(os.path.join(PROCESSED_DATA_DIR, 'features.npy'), matrix)
-    np.save(os.path.join(PROCESSED_DATA_DIR, 'service_ids.npy'), service_ids)
+    if matrix is not None:
+        save_feature_blocks(matrix, len(encoders[0].get_feature_names_out()), processed_dir)
+        np.save(os.path.join(processed_dir, 'service_ids.npy'), service_ids)
+    if legacy_matrix:
+        save_legacy_matrix(processed_dir)
     
     # Save Encoders (Tuple of ohe, tfidf)
-    with open(os.path.join(MODELS_DIR, 'encoders.pkl'), 'wb') as f:
+    with open(os.path.join(models_dir, 'encoders.pkl'), 'wb') as f:
         pickle.dump(encoders, f)
         
     # Save Feature Names
-    with open(os.path.join(MODELS_DIR, 'feature_names.pkl'), 'wb') as f:
+    with open(os.path.join(models_dir, 'feature_names.pkl'), 'wb') as f:
         pickle.dump(feature_names, f)
         
     print("Artifacts saved successfully.")
 
-def main():
+def main(out_of_core=False, chunksize=50_000, legacy_matrix=False):
     try:
-        df = load_data(CLEANED_DATA_PATH)
-        matrix, service_ids, encoders, feature_names = process_features(df)
-        save_artifacts(matrix, service_ids, encoders, feature_names)
+        if out_of_core:
+            _, service_ids, encoders, feature_names = process_features_out_of_core(CLEANED_DATA_PATH, chunksize=chunksize)
+            save_artifacts(None, service_ids, encoders, feature_names, legacy_matrix=legacy_matrix)
+        else:
+            df = load_data(CLEANED_DATA_PATH)
+            matrix, service_ids, encoders, feature_names = process_features(df)
+            save_artifacts(matrix, service_ids, encoders, feature_names, legacy_matrix=legacy_matrix)
     except Exception as e:
         print(f"Error: {e}")
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="Build feature artifacts from the cleaned dataset.")
+    parser.add_argument('--out-of-core', action='store_true', help="Stream the CSV in chunks into memmapped block files")
+    parser.add_argument('--chunksize', type=int, default=50_000)
+    parser.add_argument('--legacy-matrix', action='store_true',
+                        help="Also write the combined features.npy with the 10x TF-IDF boost baked in")
+    args = parser.parse_args()
+    main(out_of_core=args.out_of_core, chunksize=args.chunksize, legacy_matrix=args.legacy_matrix)
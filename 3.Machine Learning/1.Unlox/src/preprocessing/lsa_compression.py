@@ -0,0 +1,80 @@
+import os
+import pickle
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+
+if __package__ in (None, ''):
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.models.feature_blocks import LSA_BLOCK_FILE
+
+"""
+LSA Compression Module
+----------------------
+Optional stage that compresses the (unweighted) TF-IDF block with a randomized
+truncated SVD. The engine can then score text against a 32-128 dim dense
+representation instead of the full vocabulary.
+
+Artifacts:
+- lsa.pkl: The fitted TruncatedSVD (projection matrix), used by UserEncoder for queries.
+- features_tfidf_lsa.npy: The projected TF-IDF block, one row per service.
+"""
+
+LSA_MODEL_FILE = 'lsa.pkl'
+
+def fit_lsa(tfidf_block, n_components=64, seed=42, sample_size=200_000):
+    """
+    Fit a randomized truncated SVD on the TF-IDF block.
+
+    Args:
+        tfidf_block (numpy.ndarray): Unweighted TF-IDF features (n_services x vocabulary).
+        n_components (int): Target dimensionality (capped below the vocabulary size).
+        seed (int): Random state of the randomized solver.
+        sample_size (int): Fit on at most this many randomly chosen rows.
+
+    Returns:
+        TruncatedSVD: Fitted model.
+    """
+    n_components = min(n_components, tfidf_block.shape[1] - 1)
+    if tfidf_block.shape[0] > sample_size:
+        rows = np.sort(np.random.default_rng(seed).choice(tfidf_block.shape[0], size=sample_size, replace=False))
+        tfidf_block = tfidf_block[rows]
+    svd = TruncatedSVD(n_components=n_components, algorithm='randomized', random_state=seed)
+    svd.fit(np.asarray(tfidf_block))
+    print(f"LSA: {tfidf_block.shape[1]} -> {n_components} dims, "
+          f"explained variance {svd.explained_variance_ratio_.sum() * 100:.1f}%")
+    return svd
+
+def project_block(svd, tfidf_block, out, chunksize=100_000):
+    """Project the TF-IDF block into LSA space chunk by chunk, writing into ``out``."""
+    for start in range(0, tfidf_block.shape[0], chunksize):
+        out[start:start + chunksize] = svd.transform(np.asarray(tfidf_block[start:start + chunksize]))
+    return out
+
+def build_lsa_artifacts(tfidf_path, processed_dir, models_dir, n_components=64, seed=42, sample_size=200_000):
+    """
+    Fit the projection on ``features_tfidf.npy`` and save ``lsa.pkl`` and the projected block.
+
+    Args:
+        tfidf_path (str): Path of the unweighted TF-IDF block.
+        processed_dir (str): Output directory of the projected block.
+        models_dir (str): Output directory of the fitted model.
+        n_components (int): Target dimensionality.
+        seed (int): Random state of the randomized solver.
+        sample_size (int): Fit on at most this many randomly chosen rows.
+    """
+    tfidf_block = np.load(tfidf_path, mmap_mode='r')
+    svd = fit_lsa(tfidf_block, n_components=n_components, seed=seed, sample_size=sample_size)
+
+    os.makedirs(processed_dir, exist_ok=True)
+    os.makedirs(models_dir, exist_ok=True)
+    projected = np.lib.format.open_memmap(os.path.join(processed_dir, LSA_BLOCK_FILE), mode='w+',
+                                          dtype=np.float64, shape=(tfidf_block.shape[0], svd.n_components))
+    project_block(svd, tfidf_block, projected)
+    projected.flush()
+    del projected
+
+    with open(os.path.join(models_dir, LSA_MODEL_FILE), 'wb') as f:
+        pickle.dump(svd, f)
+    print("LSA artifacts saved successfully.")
@@ -0,0 +1,247 @@
+import re
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+"""
+Near-Duplicate Detection Module
+-------------------------------
+Finds service listings that differ only in whitespace, punctuation or a word or two.
+Exact ``drop_duplicates`` misses these clones, which then crowd the top-k results.
+
+Pipeline:
+1. Normalize ``Service_Name`` + ``Description`` and split into word unigram/bigram shingles.
+2. MinHash every shingle set with vectorized NumPy (one signature row per listing).
+3. Banded LSH: listings sharing any band bucket become candidate pairs (roughly linear time).
+4. Candidates are verified on estimated Jaccard similarity and grouped with connected components.
+"""
+
+_NON_WORD = re.compile(r'[^\w\s]+')
+# LSH pairs each bucket member with this many following members of its bucket
+MAX_BUCKET_NEIGHBOURS = 8
+
+def normalize_text(series):
+    """Lowercase, drop punctuation and collapse whitespace for a series of strings."""
+    return (series.fillna('').astype(str).str.lower()
+            .str.replace(_NON_WORD, ' ', regex=True)
+            .str.split().str.join(' '))
+
+def build_shingles(texts):
+    """
+    Turn documents into hashed word shingles (unigrams and bigrams).
+
+    Args:
+        texts (pd.Series): Normalized documents.
+
+    Returns:
+        tuple:
+            - shingles (numpy.ndarray): uint64 shingle hashes, grouped by document.
+            - offsets (numpy.ndarray): Start position of each document's shingles.
+              Documents without tokens get a single empty-text shingle.
+    """
+    tokens = texts.str.split().explode()
+    doc_ids = tokens.index.to_numpy()
+    token_ids = pd.factorize(tokens.fillna(''))[0].astype(np.uint64) + np.uint64(1)
+
+    # Bigram of token i and i+1 when both belong to the same document
+    same_doc = doc_ids[1:] == doc_ids[:-1]
+    bigrams = (token_ids[:-1][same_doc] * np.uint64(0x9E3779B97F4A7C15)) ^ (token_ids[1:][same_doc] << np.uint64(1))
+
+    all_docs = np.concatenate([doc_ids, doc_ids[:-1][same_doc]])
+    all_shingles = np.concatenate([token_ids, bigrams])
+    order = np.argsort(all_docs, kind='stable')
+    all_docs, all_shingles = all_docs[order], all_shingles[order]
+
+    # explode() keeps empty documents as one NaN token, so every document has >= 1 shingle
+    offsets = np.flatnonzero(np.r_[True, all_docs[1:] != all_docs[:-1]])
+    return all_shingles, offsets
+
+def minhash_signatures(shingles, offsets, num_perm=128, seed=42, chunk_size=4_000_000):
+    """
+    Compute MinHash signatures with multiply-shift hashing ``(a * x + b) >> 32``.
+
+    Shingles are processed in chunks of whole documents, one permutation at a time,
+    with a single reused buffer, so memory stays at ``chunk_size`` hashes.
+
+    Args:
+        shingles (numpy.ndarray): uint64 shingle hashes grouped by document.
+        offsets (numpy.ndarray): Start of each document in ``shingles``.
+        num_perm (int): Number of hash permutations (signature length).
+        seed (int): Seed for the permutation coefficients.
+        chunk_size (int): Maximum shingles hashed at once.
+
+    Returns:
+        numpy.ndarray: (n_docs, num_perm) uint32 signature matrix.
+    """
+    rng = np.random.default_rng(seed)
+    # Odd multipliers; uint64 arithmetic wraps, which is exactly what multiply-shift needs
+    a = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64, endpoint=True) | np.uint64(1)
+    b = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64, endpoint=True)
+    # Fold shingle hashes to 32 bits
+    values = (shingles ^ (shingles >> np.uint64(32))) & np.uint64(0xFFFFFFFF)
+
+    n_docs = len(offsets)
+    bounds = np.r_[offsets, len(shingles)]
+    signatures = np.empty((n_docs, num_perm), dtype=np.uint32)
+    buffer = np.empty(min(chunk_size, len(shingles)) or 1, dtype=np.uint64)
+
+    start_doc = 0
+    while start_doc < n_docs:
+        # Take whole documents until the chunk is full
+        end_doc = np.searchsorted(bounds, bounds[start_doc] + chunk_size, side='right') - 1
+        end_doc = min(max(end_doc, start_doc + 1), n_docs)
+        lo, hi = bounds[start_doc], bounds[end_doc]
+
+        if hi - lo > len(buffer):
+            # A single document larger than the chunk
+            buffer = np.empty(hi - lo, dtype=np.uint64)
+        hashed = buffer[:hi - lo]
+        starts = bounds[start_doc:end_doc] - lo
+        for perm in range(num_perm):
+            np.multiply(values[lo:hi], a[perm], out=hashed)
+            hashed += b[perm]
+            hashed >>= np.uint64(32)
+            signatures[start_doc:end_doc, perm] = np.minimum.reduceat(hashed, starts)
+        start_doc = end_doc
+
+    return signatures
+
+def choose_bands(threshold, num_perm, min_recall=0.95):
+    """
+    Pick (bands, rows) with bands * rows == num_perm.
+
+    Chooses the most selective banding (most rows per band, so fewest candidate pairs)
+    for which a pair at exactly ``threshold`` Jaccard still becomes a candidate with
+    probability ``1 - (1 - threshold ** rows) ** bands >= min_recall``.
+    """
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    recall = lambda br: 1.0 - (1.0 - threshold ** br[1]) ** br[0]
+    good = [br for br in options if recall(br) >= min_recall]
+    if not good:
+        return max(options, key=recall)
+    return max(good, key=lambda br: br[1])
+
+def lsh_candidate_pairs(signatures, bands, rows, max_neighbours=MAX_BUCKET_NEIGHBOURS):
+    """
+    Bucket signatures band by band and return candidate pairs.
+
+    Each bucket member is paired with the next ``max_neighbours`` members of its bucket,
+    so buckets of up to ``max_neighbours + 1`` members yield every pair (the recall that
+    ``choose_bands`` assumes), while a huge bucket of identical texts is only chained.
+    The number of pairs is at most ``n_docs * bands * max_neighbours`` instead of O(n^2).
+
+    Returns:
+        numpy.ndarray: (n_pairs, 2) array of document indices.
+    """
+    # Random odd multipliers fold each band into one uint64 bucket key; the rare
+    # key collision only adds a candidate pair, which verification then rejects
+    mixers = np.random.default_rng(0).integers(0, np.iinfo(np.uint64).max, size=rows,
+                                               dtype=np.uint64, endpoint=True) | np.uint64(1)
+    pairs = []
+    for band in range(bands):
+        block = signatures[:, band * rows:(band + 1) * rows].astype(np.uint64)
+        keys = (block * mixers).sum(axis=1, dtype=np.uint64)
+        # Stable sort: members of a bucket are adjacent and in ascending position
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        for offset in range(1, max_neighbours + 1):
+            same = keys[offset:] == keys[:-offset]
+            if not same.any():
+                break  # no bucket has more than `offset` members
+            pairs.append(np.column_stack([order[:-offset][same], order[offset:][same]]))
+
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    # Same pair found in several bands: dedupe on a single int64 key
+    pairs = np.vstack(pairs)
+    keys = np.unique(pairs[:, 0].astype(np.int64) * len(signatures) + pairs[:, 1])
+    return np.column_stack([keys // len(signatures), keys % len(signatures)])
+
+def estimated_jaccard(signatures, pairs, chunk_size=500_000):
+    """Fraction of agreeing MinHash values for each candidate pair."""
+    similarity = np.empty(len(pairs), dtype=np.float64)
+    for start in range(0, len(pairs), chunk_size):
+        chunk = pairs[start:start + chunk_size]
+        similarity[start:start + chunk_size] = (signatures[chunk[:, 0]] == signatures[chunk[:, 1]]).mean(axis=1)
+    return similarity
+
+def find_near_duplicates(df, threshold=0.8, num_perm=128, bands=None, seed=42):
+    """
+    Assign a cluster label to every listing; near-duplicates share a label.
+
+    Args:
+        df (pd.DataFrame): Catalog with 'Service_Name' and 'Description' columns.
+        threshold (float): Minimum estimated Jaccard similarity for a duplicate pair.
+        num_perm (int): MinHash signature length.
+        bands (int, optional): Number of LSH bands. Chosen from ``threshold`` when omitted.
+        seed (int): Seed for the MinHash permutations.
+
+    Returns:
+        numpy.ndarray: Cluster label per row (labels are positions of the cluster's first row).
+    """
+    n_docs = len(df)
+    if n_docs == 0:
+        return np.empty(0, dtype=np.int64)
+
+    text = normalize_text(df['Service_Name'].fillna('').astype(str) + ' ' + df['Description'].fillna('').astype(str))
+    shingles, offsets = build_shingles(text.reset_index(drop=True))
+    signatures = minhash_signatures(shingles, offsets, num_perm=num_perm, seed=seed)
+
+    if bands is None:
+        bands, rows = choose_bands(threshold, num_perm)
+    else:
+        rows = num_perm // bands
+
+    pairs = lsh_candidate_pairs(signatures, bands, rows)
+    pairs = pairs[estimated_jaccard(signatures, pairs) >= threshold]
+
+    graph = coo_matrix((np.ones(len(pairs), dtype=np.int8), (pairs[:, 0], pairs[:, 1])), shape=(n_docs, n_docs))
+    _, components = connected_components(graph, directed=False)
+
+    # Label each cluster by its first row so labels are stable and readable
+    first_row = np.full(components.max() + 1, n_docs, dtype=np.int64)
+    np.minimum.at(first_row, components, np.arange(n_docs))
+    return first_row[components]
+
+def duplicate_clusters(df, labels):
+    """
+    List the clusters with more than one member.
+
+    Returns:
+        pd.DataFrame: Rows of duplicated listings with a 'Cluster_ID' column
+        (the position of the listing that is kept), sorted by cluster.
+    """
+    sizes = np.bincount(labels, minlength=len(labels))
+    mask = sizes[labels] > 1
+    clusters = df[mask].copy()
+    clusters.insert(0, 'Cluster_ID', labels[mask])
+    return clusters.sort_values('Cluster_ID', kind='stable')
+
+def collapse_catalog(df, labels):
+    """Keep only the first listing of each near-duplicate cluster."""
+    return df[labels == np.arange(len(df))]
+
+def remove_near_duplicates(df, threshold=0.8, num_perm=128, bands=None, seed=42):
+    """
+    Pipeline stage: collapse near-duplicate listings.
+
+    Returns:
+        tuple: (collapsed dataframe, duplicate clusters dataframe).
+    """
+    labels = find_near_duplicates(df, threshold=threshold, num_perm=num_perm, bands=bands, seed=seed)
+    collapsed = collapse_catalog(df, labels)
+    if len(collapsed) < len(df):
+        print(f"Collapsed {len(df) - len(collapsed)} near-duplicate rows.")
+    return collapsed, duplicate_clusters(df, labels)
+
+if __name__ == "__main__":
+    demo = pd.DataFrame({
+        'Service_Name': ['Social Media Setup', 'Social  Media Setup!', 'Tax Filing', 'GST Tax Filing'],
+        'Description': ['Facebook and Instagram profile creation.',
+                        'Facebook & Instagram profile creation',
+                        'Annual tax filing for small businesses.',
+                        'Monthly GST return submission and compliance.'],
+    })
+    collapsed, clusters = remove_near_duplicates(demo, threshold=0.7)
+    print(clusters)
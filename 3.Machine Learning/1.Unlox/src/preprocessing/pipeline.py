@@ -0,0 +1,349 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+
+"""
+Pipeline Runner
+---------------
+Runs the offline build as a small DAG of steps:
+
+    clean -> features -> index [-> lsa] [-> quantize] [-> shard] -> export
+
+Every step is keyed by a hash of its code version, its parameters and its inputs
+(file contents for source files, upstream step keys for everything else). Outputs
+live in a local content-addressed cache, so a step whose key has not changed is
+skipped and its cached outputs are reused. A no-op rebuild only stats the raw file.
+
+Usage:
+    python -m src.preprocessing.pipeline --raw data/raw/service_recommendation_data.csv
+"""
+
+if __package__ in (None, ''):
+    # Allow running as a script: python src/preprocessing/pipeline.py
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.preprocessing import data_cleaner, feature_engineering
+from src.models.feature_blocks import BLOCK_NAMES, BLOCK_FILES, SQ_NORMS_FILE, LSA_BLOCK_FILE, squared_norms
+from src.models.quantization import QUANTIZATION_METHODS, CODES_FILE, QUANTIZER_FILE
+from src.models.sharding import SHARDS_DIR, PARTITION_COLUMNS
+
+DEFAULT_CACHE_DIR = os.path.join(data_cleaner.PROJECT_ROOT, '.pipeline_cache')
+
+class PipelineStep:
+    """
+    One node of the build DAG.
+
+    Args:
+        name (str): Step name, also the cache sub-directory.
+        func (callable): ``func(inputs, out_dir, **params)``; ``inputs`` maps each
+            dependency name to its output directory (or to a file path for sources).
+            Must write its files into ``out_dir``.
+        deps (list): Names of upstream steps.
+        sources (dict): Source files read by the step, as {name: path}.
+        params (dict): Parameters that affect the outputs (part of the cache key).
+        version (str): Bump when the step's code changes its outputs.
+    """
+
+    def __init__(self, name, func, deps=(), sources=None, params=None, version='1'):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.sources = sources or {}
+        self.params = params or {}
+        self.version = version
+
+# --- Step implementations -------------------------------------------------
+
+def run_clean(inputs, out_dir, chunksize=None, near_duplicate_threshold=None):
+    """Clean the raw CSV (optionally in chunks) and optionally collapse near-duplicates."""
+    output = os.path.join(out_dir, 'cleaned.csv')
+    if chunksize:
+        data_cleaner.clean_file_in_chunks(inputs['raw'], output, chunksize=chunksize)
+        df = None
+    else:
+        df = data_cleaner.clean_dataset(data_cleaner.load_data(inputs['raw']))
+
+    if near_duplicate_threshold:
+        from src.preprocessing.near_duplicates import remove_near_duplicates
+        df = pd.read_csv(output) if df is None else df
+        df, clusters = remove_near_duplicates(df, threshold=near_duplicate_threshold)
+        clusters.to_csv(os.path.join(out_dir, 'near_duplicate_clusters.csv'), index=False)
+
+    if df is not None:
+        df.to_csv(output, index=False)
+
+def run_features(inputs, out_dir, max_features=500, legacy_matrix=False, out_of_core=False, chunksize=50_000):
+    """Build the feature blocks, service_ids.npy, encoders.pkl, feature_names.pkl and optionally features.npy."""
+    cleaned = os.path.join(inputs['clean'], 'cleaned.csv')
+    if out_of_core:
+        _, service_ids, encoders, names = feature_engineering.process_features_out_of_core(
+            cleaned, processed_dir=out_dir, chunksize=chunksize, max_features=max_features)
+        matrix = None
+    else:
+        matrix, service_ids, encoders, names = feature_engineering.process_features(
+            feature_engineering.load_data(cleaned), max_features=max_features)
+    feature_engineering.save_artifacts(matrix, service_ids, encoders, names, processed_dir=out_dir,
+                                       models_dir=out_dir, legacy_matrix=legacy_matrix)
+
+def run_index(inputs, out_dir):
+    """Precompute per-block squared row norms (the cosine denominators for any block weights)."""
+    blocks = [np.load(os.path.join(inputs['features'], BLOCK_FILES[name]), mmap_mode='r') for name in BLOCK_NAMES]
+    np.save(os.path.join(out_dir, SQ_NORMS_FILE), np.column_stack([squared_norms(block) for block in blocks]))
+
+def run_lsa(inputs, out_dir, n_components=64, seed=42):
+    """Optional: compress the TF-IDF block with a randomized truncated SVD."""
+    from src.preprocessing.lsa_compression import build_lsa_artifacts
+    build_lsa_artifacts(os.path.join(inputs['features'], BLOCK_FILES['tfidf']), out_dir, out_dir,
+                        n_components=n_components, seed=seed)
+
+def run_quantize(inputs, out_dir, methods=('int8',)):
+    """Optional: 8-bit codes of the feature blocks for quantized storage."""
+    from src.models.quantization import build_quantized_artifacts
+    for method in methods:
+        build_quantized_artifacts(inputs['features'], out_dir, method=method)
+
+def run_shard(inputs, out_dir, n_shards=4, shard_by='hash'):
+    """Optional: split the catalog into shards for scatter-gather serving (see src/models/sharding.py)."""
+    from src.models.sharding import build_shards
+    build_shards(inputs['features'], os.path.join(inputs['clean'], 'cleaned.csv'), os.path.join(out_dir, SHARDS_DIR),
+                 n_shards, shard_by=shard_by, sq_norms_path=os.path.join(inputs['index'], SQ_NORMS_FILE))
+
+# Where each cached output ends up when exported: (step, file) -> destination key
+# (a directory is exported as a whole)
+EXPORTS = [
+    ('clean', 'cleaned.csv', 'cleaned_path'),
+    ('features', 'features.npy', 'processed_dir'),
+    ('features', 'service_ids.npy', 'processed_dir'),
+    ('features', BLOCK_FILES['manual'], 'processed_dir'),
+    ('features', BLOCK_FILES['onehot'], 'processed_dir'),
+    ('features', BLOCK_FILES['tfidf'], 'processed_dir'),
+    ('features', 'encoders.pkl', 'models_dir'),
+    ('features', 'feature_names.pkl', 'models_dir'),
+    ('index', SQ_NORMS_FILE, 'processed_dir'),
+    ('lsa', LSA_BLOCK_FILE, 'processed_dir'),
+    ('lsa', 'lsa.pkl', 'models_dir'),
+    ('shard', SHARDS_DIR, 'processed_dir'),
+] + [('quantize', pattern.format(method=method), 'processed_dir')
+     for method in QUANTIZATION_METHODS for pattern in (CODES_FILE, QUANTIZER_FILE)]
+
+def build_steps(config):
+    """
+    Build the ordered list of steps for a run configuration.
+
+    Args:
+        config (dict): Output of ``parse_args`` as a dict (paths and parameters).
+
+    Returns:
+        list: PipelineStep objects in dependency order.
+    """
+    steps = [
+        PipelineStep('clean', run_clean, sources={'raw': config['raw']},
+                     params={'chunksize': config['clean_chunksize'],
+                             'near_duplicate_threshold': config['near_duplicate_threshold']}),
+        PipelineStep('features', run_features, deps=['clean'],
+                     params={'max_features': config['max_features'], 'legacy_matrix': config['legacy_matrix'],
+                             'out_of_core': config['out_of_core'], 'chunksize': config['chunksize']},
+                     version='3'),
+        PipelineStep('index', run_index, deps=['features'], version='2'),
+    ]
+    if config.get('lsa_components'):
+        steps.append(PipelineStep('lsa', run_lsa, deps=['features'], params={'n_components': config['lsa_components']}))
+    if config.get('quantize'):
+        steps.append(PipelineStep('quantize', run_quantize, deps=['features'],
+                                  params={'methods': sorted(set(config['quantize']))}))
+    if config.get('shards'):
+        steps.append(PipelineStep('shard', run_shard, deps=['clean', 'features', 'index'],
+                                  params={'n_shards': config['shards'], 'shard_by': config['shard_by']}))
+    return steps
+
+# --- Runner ---------------------------------------------------------------
+
+def file_digest(path, memo):
+    """
+    SHA-256 of a file's content, memoized on (size, mtime) so unchanged files are not re-read.
+    """
+    stat = os.stat(path)
+    entry = memo.get(os.path.abspath(path))
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        return entry['sha256']
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    memo[os.path.abspath(path)] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+    return digest.hexdigest()
+
+def step_key(step, upstream_keys, memo):
+    """Cache key of a step: hash of name, version, params, source digests and upstream keys."""
+    payload = {
+        'name': step.name,
+        'version': step.version,
+        'params': step.params,
+        'sources': {name: file_digest(path, memo) for name, path in sorted(step.sources.items())},
+        'deps': {dep: upstream_keys[dep] for dep in step.deps},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def _load_json(path):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+def _save_json(data, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+def run_pipeline(steps, cache_dir=DEFAULT_CACHE_DIR, destinations=None, force=()):
+    """
+    Run the steps, reusing cached outputs whose key is unchanged, then export.
+
+    Args:
+        steps (list): PipelineStep objects in dependency order.
+        cache_dir (str): Content-addressed cache root.
+        destinations (dict, optional): Export targets ('cleaned_path', 'processed_dir',
+            'models_dir'). Nothing is exported when omitted.
+        force (iterable): Step names to re-run even if cached.
+
+    Returns:
+        list: One dict per step/export with 'step', 'status', 'key' and 'seconds'.
+    """
+    memo_path = os.path.join(cache_dir, 'file_digests.json')
+    memo = _load_json(memo_path)
+    keys, outputs, report = {}, {}, []
+
+    for step in steps:
+        start = time.perf_counter()
+        key = step_key(step, keys, memo)
+        out_dir = os.path.join(cache_dir, step.name, key)
+        done_marker = os.path.join(out_dir, '.complete')
+
+        if os.path.exists(done_marker) and step.name not in force:
+            status = 'cached'
+        else:
+            # Build into a scratch directory so an interrupted step never looks complete
+            tmp_dir = out_dir + '.tmp'
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+            inputs = dict(step.sources)
+            inputs.update({dep: outputs[dep] for dep in step.deps})
+            step.func(inputs, tmp_dir, **step.params)
+            open(os.path.join(tmp_dir, '.complete'), 'w').close()
+            shutil.rmtree(out_dir, ignore_errors=True)
+            os.replace(tmp_dir, out_dir)
+            status = 'ran'
+
+        keys[step.name] = key
+        outputs[step.name] = out_dir
+        report.append({'step': step.name, 'status': status, 'key': key, 'seconds': time.perf_counter() - start})
+
+    _save_json(memo, memo_path)
+
+    if destinations:
+        report.append(export_outputs(outputs, keys, destinations, cache_dir))
+    return report
+
+def export_outputs(outputs, keys, destinations, cache_dir):
+    """
+    Copy cached outputs to their destinations unless the same keys were already exported.
+
+    The manifest records every exported target with the key it came from. A target it lists
+    that this run no longer produces (a step that was dropped, or an optional output such as
+    features.npy that is not built any more) is removed, so the engine never loads an
+    artifact left over from another build.
+    """
+    start = time.perf_counter()
+    manifest_path = os.path.join(cache_dir, 'exported.json')
+    manifest = _load_json(manifest_path)
+    copied = removed = 0
+
+    for step_name, filename, dest_key in EXPORTS:
+        if not destinations.get(dest_key):
+            continue
+        target = destinations[dest_key]
+        if dest_key != 'cleaned_path':
+            target = os.path.join(target, filename)
+        source = os.path.join(outputs[step_name], filename) if step_name in outputs else None
+        if source is None or not os.path.exists(source):
+            if target in manifest:
+                if os.path.isdir(target):
+                    shutil.rmtree(target)
+                elif os.path.exists(target):
+                    os.remove(target)
+                del manifest[target]
+                removed += 1
+            continue
+        if manifest.get(target) == keys[step_name] and os.path.exists(target):
+            continue
+        os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+        if os.path.isdir(source):
+            shutil.rmtree(target + '.tmp', ignore_errors=True)
+            shutil.copytree(source, target + '.tmp')
+            shutil.rmtree(target, ignore_errors=True)
+        else:
+            shutil.copyfile(source, target + '.tmp')
+        os.replace(target + '.tmp', target)
+        manifest[target] = keys[step_name]
+        copied += 1
+
+    _save_json(manifest, manifest_path)
+    status = ', '.join(f"{action} {count}" for action, count in (('copied', copied), ('removed', removed)) if count)
+    return {'step': 'export', 'status': status or 'cached', 'key': '-', 'seconds': time.perf_counter() - start}
+
+def print_report(report):
+    print("\n" + "=" * 60)
+    print(f"{'STEP':<12} {'STATUS':<12} {'KEY':<18} {'TIME':>8}")
+    print("=" * 60)
+    for row in report:
+        print(f"{row['step']:<12} {row['status']:<12} {row['key']:<18} {row['seconds']:>7.3f}s")
+    print(f"{'total':<43} {sum(r['seconds'] for r in report):>7.3f}s")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Incremental build: clean -> features -> index -> export.")
+    parser.add_argument('--raw', default=data_cleaner.RAW_DATA_PATH, help="Raw CSV file")
+    parser.add_argument('--cleaned-path', default=data_cleaner.CLEANED_DATA_PATH, help="Export path of the cleaned CSV")
+    parser.add_argument('--processed-dir', default=feature_engineering.PROCESSED_DATA_DIR, help="Export dir for .npy artifacts")
+    parser.add_argument('--models-dir', default=feature_engineering.MODELS_DIR, help="Export dir for encoders")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--max-features', type=int, default=500, help="TF-IDF vocabulary size")
+    parser.add_argument('--legacy-matrix', action='store_true',
+                        help="Also build the combined features.npy with the 10x TF-IDF boost baked in "
+                             "(serving uses the unweighted blocks and query-time block weights)")
+    parser.add_argument('--near-duplicate-threshold', type=float, default=None,
+                        help="Collapse near-duplicate listings at this Jaccard similarity")
+    parser.add_argument('--clean-chunksize', type=int, default=None, help="Clean the raw CSV in chunks")
+    parser.add_argument('--out-of-core', action='store_true', help="Stream the feature build into a memmap")
+    parser.add_argument('--chunksize', type=int, default=50_000, help="Chunk size of the out-of-core feature build")
+    parser.add_argument('--lsa-components', type=int, default=None,
+                        help="Also build an LSA-compressed TF-IDF block with this many dimensions")
+    parser.add_argument('--quantize', nargs='+', choices=QUANTIZATION_METHODS, default=None,
+                        help="Also build 8-bit codes for quantized storage (int8 and/or pq)")
+    parser.add_argument('--shards', type=int, default=None,
+                        help="Also split the catalog into this many shards for scatter-gather serving")
+    parser.add_argument('--shard-by', choices=('hash',) + PARTITION_COLUMNS, default='hash',
+                        help="Shard by a hash of Service_ID or by a hard-filter column")
+    parser.add_argument('--force', nargs='*', default=[], help="Steps to re-run even if cached")
+    parser.add_argument('--no-export', action='store_true', help="Only populate the cache")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = vars(args)
+    destinations = None if args.no_export else {
+        'cleaned_path': args.cleaned_path,
+        'processed_dir': args.processed_dir,
+        'models_dir': args.models_dir,
+    }
+    report = run_pipeline(build_steps(config), cache_dir=args.cache_dir, destinations=destinations, force=args.force)
+    print_report(report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import json
+
+"""
+Canonical Query Inputs
+----------------------
+Normalizes a user_input dict so that inputs the engine treats identically look identical:
+keys sorted, strings lower-cased, whitespace collapsed in free text, Language_Support always
+a sorted list without duplicates. The engine lower-cases every field itself, so a canonical
+input returns the same recommendations as the original.
+
+Keys are kept even when their value is empty: the engine fills an absent field with its own
+default (e.g. Target_Business_Type 'other'), which an empty value does not get, so dropping it
+would give two different queries the same key.
+
+Used to log, capture and group queries (one key per distinct query).
+"""
+
+# Fields whose value is a list of options (a bare string means a one-item list)
+LIST_FIELDS = ('Language_Support',)
+# Tokenized fields, where whitespace does not matter (categorical values are matched exactly)
+TEXT_FIELDS = ('Description',)
+
+def _canonical_text(value, collapse_whitespace=False):
+    value = str(value).lower()
+    return ' '.join(value.split()) if collapse_whitespace else value
+
+def canonicalize_input(user_input):
+    """
+    Canonical copy of a user_input dict.
+
+    Args:
+        user_input (dict): Engine input, e.g. {'Location_Area': 'Remote', 'Language_Support': 'Hindi'}.
+
+    Returns:
+        dict: e.g. {'Language_Support': ['hindi'], 'Location_Area': 'remote'}
+    """
+    canonical = {}
+    for key in sorted(user_input):
+        value = user_input[key]
+        if value is None:
+            pass
+        elif key in LIST_FIELDS or isinstance(value, (list, tuple, set)):
+            items = [value] if isinstance(value, str) else list(value)
+            value = sorted({_canonical_text(item) for item in items})
+        elif isinstance(value, str):
+            value = _canonical_text(value, collapse_whitespace=key in TEXT_FIELDS)
+        canonical[key] = value
+    return canonical
+
+def input_key(user_input):
+    """Stable string key of the canonical input (equal keys give equal recommendations)."""
+    return json.dumps(canonicalize_input(user_input), sort_keys=True, separators=(',', ':'), default=str)
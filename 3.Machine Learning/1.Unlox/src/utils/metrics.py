@@ -0,0 +1,264 @@
+import time
+import bisect
+import threading
+
+"""
+Metrics Module
+--------------
+Low-overhead in-process metrics: monotonic-clock timers feeding histograms, plus counters.
+
+- Pull API: ``registry.snapshot()`` returns plain dicts (counts, sums, estimated quantiles).
+- Export: ``registry.to_prometheus()`` renders the Prometheus text exposition format.
+- Disabling: ``registry.enabled = False`` turns every timer into a shared no-op and every
+  counter increment into a single attribute check.
+
+Usage:
+    from src.utils.metrics import REGISTRY
+    stage_seconds = REGISTRY.histogram('stage_seconds', 'Time per stage.', ['stage'])
+    with stage_seconds.labels(stage='filter').time():
+        ...
+    print(REGISTRY.to_prometheus())
+"""
+
+# Seconds; spans sub-millisecond stages up to multi-second artifact loads
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class _NullTimer:
+    """Shared no-op context manager returned by timers while metrics are disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_TIMER = _NullTimer()
+_clock = time.perf_counter
+
+class _Timing:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.start = _clock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(_clock() - self.start)
+        return False
+
+class Histogram:
+    """
+    Cumulative-bucket histogram (one label combination of a family).
+
+    Attributes:
+        buckets (tuple): Upper bounds, ascending; +Inf is implicit.
+        counts (list): Non-cumulative count per bucket, with +Inf last.
+        sum (float): Sum of observed values.
+        count (int): Number of observations.
+    """
+
+    def __init__(self, registry, buckets):
+        self.registry = registry
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        if not self.registry.enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        """Context manager observing the elapsed ``time.perf_counter`` seconds."""
+        return _Timing(self) if self.registry.enabled else NULL_TIMER
+
+    def quantile(self, q):
+        """
+        Estimate a quantile by linear interpolation inside the bucket, as PromQL's
+        ``histogram_quantile`` does. Returns None without observations.
+        """
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if total == 0:
+            return None
+        rank = q * total
+        cumulative = 0
+        for i, n in enumerate(counts):
+            if cumulative + n >= rank and n > 0:
+                if i == len(self.buckets):
+                    # Above the largest bucket: best available answer is its bound
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / n
+            cumulative += n
+        return self.buckets[-1]
+
+    def snapshot(self):
+        with self._lock:
+            counts, total, value_sum = list(self.counts), self.count, self.sum
+        cumulative, buckets = 0, []
+        for bound, n in zip(self.buckets + (float('inf'),), counts):
+            cumulative += n
+            buckets.append((bound, cumulative))
+        return {'count': total, 'sum': value_sum, 'buckets': buckets,
+                'p50': self.quantile(0.5), 'p95': self.quantile(0.95), 'p99': self.quantile(0.99)}
+
+class Counter:
+    """Monotonically increasing count (one label combination of a family)."""
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+class MetricFamily:
+    """
+    A named metric with optional labels; ``labels(**values)`` returns the child metric.
+
+    Args:
+        registry (MetricsRegistry): Owning registry (holds the enabled flag).
+        kind (str): 'histogram' or 'counter'.
+        name (str): Prometheus metric name.
+        documentation (str): HELP text.
+        label_names (tuple): Label names, in export order.
+        buckets (tuple): Histogram bucket bounds.
+    """
+
+    def __init__(self, registry, kind, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.registry = registry
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self.children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **values):
+        key = tuple(str(values[name]) for name in self.label_names)
+        child = self.children.get(key)
+        if child is None:
+            with self._lock:
+                child = self.children.get(key)
+                if child is None:
+                    child = Histogram(self.registry, self.buckets) if self.kind == 'histogram' else Counter(self.registry)
+                    self.children[key] = child
+        return child
+
+    # Unlabelled families act as their only child
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+class MetricsRegistry:
+    """
+    Collection of metric families.
+
+    Args:
+        enabled (bool): Record observations. Can be toggled at any time.
+        namespace (str): Prefix of exported metric names.
+    """
+
+    def __init__(self, enabled=True, namespace='unlox'):
+        self.enabled = enabled
+        self.namespace = namespace
+        self.families = {}
+        self._lock = threading.Lock()
+
+    def _family(self, kind, name, documentation, label_names, buckets=DEFAULT_BUCKETS):
+        with self._lock:
+            family = self.families.get(name)
+            if family is None:
+                family = MetricFamily(self, kind, name, documentation, label_names, buckets)
+                self.families[name] = family
+            elif family.kind != kind or family.label_names != tuple(label_names):
+                raise ValueError(f"Metric '{name}' already registered as a {family.kind} with labels {family.label_names}")
+            return family
+
+    def histogram(self, name, documentation='', label_names=(), buckets=DEFAULT_BUCKETS):
+        """Get or create a histogram family."""
+        return self._family('histogram', name, documentation, label_names, buckets)
+
+    def counter(self, name, documentation='', label_names=()):
+        """Get or create a counter family."""
+        return self._family('counter', name, documentation, label_names)
+
+    def reset(self):
+        """Drop all recorded values (families stay registered)."""
+        with self._lock:
+            for family in self.families.values():
+                family.children.clear()
+
+    def snapshot(self):
+        """
+        Pull API: current values of every metric.
+
+        Returns:
+            dict: {name: {'type', 'help', 'values': {label tuple: value}}}. Counter values
+            are numbers; histogram values are dicts with count, sum, cumulative buckets
+            and estimated p50/p95/p99 (seconds for timers).
+        """
+        return {name: {'type': family.kind, 'help': family.documentation,
+                       'values': {key: child.snapshot() for key, child in list(family.children.items())}}
+                for name, family in list(self.families.items())}
+
+    def to_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for name, family in sorted(self.families.items()):
+            full_name = f"{self.namespace}_{name}" if self.namespace else name
+            lines.append(f"# HELP {full_name} {_escape_help(family.documentation)}")
+            lines.append(f"# TYPE {full_name} {family.kind}")
+            for key, child in sorted(family.children.items()):
+                labels = list(zip(family.label_names, key))
+                if family.kind == 'counter':
+                    lines.append(f"{full_name}{_format_labels(labels)} {_format_value(child.value)}")
+                    continue
+                snapshot = child.snapshot()
+                for bound, cumulative in snapshot['buckets']:
+                    le = '+Inf' if bound == float('inf') else _format_value(bound)
+                    lines.append(f"{full_name}_bucket{_format_labels(labels + [('le', le)])} {cumulative}")
+                lines.append(f"{full_name}_sum{_format_labels(labels)} {_format_value(snapshot['sum'])}")
+                lines.append(f"{full_name}_count{_format_labels(labels)} {snapshot['count']}")
+        return '\n'.join(lines) + '\n'
+
+def _escape_help(text):
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (f'{name}="{value}"' if name == 'le' else
+               f'{name}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+               for name, value in labels)
+    return '{' + ','.join(escaped) + '}'
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+# Process-wide default registry (what an exporter endpoint would serve)
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,217 @@
+import os
+import sys
+import json
+import time
+import queue
+import random
+import argparse
+import threading
+from src.utils.canonical import canonicalize_input
+
+"""
+Query Capture
+-------------
+Records the queries the engine serves, so benchmarks can replay real traffic.
+
+Each captured call is one compact JSON line:
+    {"ts": 1760870000.123, "input": {...canonical...}, "top_k": 5, "method": "cosine", "ids": [1042, 1007]}
+("weights" is added when the call overrode the block weights.)
+
+The request thread samples, takes a canonical copy of the input (so a caller that reuses
+or changes its dict does not change the record) and enqueues it (a bounded queue.Queue,
+never blocking: when the queue is full the record is dropped and counted). A daemon writer
+thread serializes and appends in batches, rotating the file by size (path.1 is the newest
+backup).
+
+Usage:
+    capture = QueryCapture('logs/queries.jsonl', sample_rate=0.1)
+    engine = RecommendationEngine(capture=capture)
+    ...
+    queries = load_workload('logs/queries.jsonl')    # list of user_input dicts
+
+    python -m src.utils.query_capture logs/queries.jsonl --out data/workloads/captured.jsonl
+"""
+
+# Records written per write() call by the writer thread
+WRITE_BATCH = 1_000
+_STOP = object()
+
+class QueryCapture:
+    """
+    Background, sampled, size-rotated capture of engine queries.
+
+    Args:
+        path (str): Capture file (JSON lines).
+        sample_rate (float): Fraction of calls recorded (0-1).
+        max_queue (int): Records waiting for the writer; more are dropped.
+        max_bytes (int): Size at which the file is rotated.
+        backup_count (int): Rotated files kept.
+        seed (int, optional): Seed of the sampling RNG.
+
+    Attributes:
+        captured (int): Records written.
+        dropped (int): Records dropped because the queue was full.
+    """
+
+    def __init__(self, path, sample_rate=1.0, max_queue=10_000, max_bytes=64 * 1024 * 1024,
+                 backup_count=5, seed=None):
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError(f"sample_rate must be between 0 and 1, got {sample_rate}")
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.captured = 0
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._random = random.Random(seed).random
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        self._writer = threading.Thread(target=self._run, name='unlox-query-capture', daemon=True)
+        self._writer.start()
+
+    def record(self, user_input, top_k, ranking_method, results, block_weights=None):
+        """
+        Queue one served call (called on the request path; never blocks).
+
+        Returns:
+            bool: True if the call was queued, False if sampled out, dropped or closed.
+        """
+        if self._closed or (self.sample_rate < 1.0 and self._random() >= self.sample_rate):
+            return False
+        item = (time.time(), canonicalize_input(user_input), top_k, ranking_method,
+                [r['Service_ID'] for r in results], block_weights)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def flush(self):
+        """Block until every queued record has been written."""
+        self._queue.join()
+
+    def close(self):
+        """Write what is queued, stop the writer and close the file."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._writer.join()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < WRITE_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is _STOP for item in batch)
+            lines = [self._serialize(item) for item in batch if item is not _STOP]
+            try:
+                if lines:
+                    self._file.write(''.join(lines))
+                    self._file.flush()
+                    self.captured += len(lines)
+                    if self._file.tell() >= self.max_bytes:
+                        self._rotate()
+            except Exception as e:  # keep capturing after a failed write (e.g. disk full)
+                print(f"Query capture write failed: {e}", file=sys.stderr)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    @staticmethod
+    def _serialize(item):
+        timestamp, user_input, top_k, ranking_method, ids, block_weights = item
+        record = {'ts': round(timestamp, 3), 'input': user_input, 'top_k': top_k,
+                  'method': ranking_method, 'ids': [i.item() if hasattr(i, 'item') else i for i in ids]}
+        if block_weights is not None:
+            record['weights'] = list(block_weights)
+        return json.dumps(record, separators=(',', ':'), default=str) + '\n'
+
+    def _rotate(self):
+        self._file.close()
+        for index in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{index}"):
+                os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+def rotated_paths(path):
+    """Existing files of a rotated log, oldest first."""
+    paths = []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        paths.insert(0, f"{path}.{index}")
+        index += 1
+    if os.path.exists(path):
+        paths.append(path)
+    return paths
+
+def read_capture(path):
+    """Captured records (dicts) across rotated files, oldest first."""
+    records = []
+    for capture_path in rotated_paths(path):
+        with open(capture_path, encoding='utf-8') as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    return records
+
+def load_workload(path, with_options=False):
+    """
+    Turn a capture into a query workload (the format of synthetic_catalog.load_queries).
+    Plain workload files (one user_input per line) are read as they are, so either kind
+    of file can be replayed.
+
+    Args:
+        path (str): Capture or workload file.
+        with_options (bool): Return (user_input, top_k, block_weights) tuples instead of inputs
+            (None where a plain workload has no value).
+
+    Returns:
+        list: user_input dicts, in capture order.
+    """
+    records = [r if _is_capture_record(r) else {'input': r} for r in read_capture(path)]
+    if with_options:
+        return [(r['input'], r.get('top_k'), r.get('weights')) for r in records]
+    return [r['input'] for r in records]
+
+def _is_capture_record(record):
+    return 'ts' in record and 'input' in record
+
+def main(argv=None):
+    from src.utils.synthetic_catalog import write_queries
+
+    parser = argparse.ArgumentParser(description="Convert a query capture into a JSON-lines query workload.")
+    parser.add_argument('capture', help="Capture file (rotated backups are included)")
+    parser.add_argument('--out', required=True, help="Workload file for benchmarks/bench_engine.py --workload")
+    args = parser.parse_args(argv)
+
+    records = read_capture(args.capture)
+    write_queries(args.out, [r['input'] for r in records])
+    if records:
+        span = records[-1]['ts'] - records[0]['ts']
+        distinct = len({json.dumps(r['input'], sort_keys=True) for r in records})
+        print(f"{len(records):,} captured queries ({distinct:,} distinct) over {span / 3600:.1f} h")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Single-Flight Deduplication
+Collapses concurrent calls for the same key into one computation: the first caller (the
+leader) computes, callers that arrive while it runs wait for it and share its result, or
+its error. Nothing is cached; once the computation finishes, the next call computes again.
+
+``SingleFlight`` is for threads, ``AsyncSingleFlight`` for coroutines on one event loop.
+Both count their calls in ``single_flight_requests_total{group, outcome}``, where outcome
+is 'computed' (leaders) or 'shared' (collapsed into a leader's computation).
+
+Usage:
+    flight = SingleFlight('engine')
+    value, shared = flight.do(input_key(user_input), engine.get_recommendations, user_input)
+"""
+import copy
+import asyncio
+import threading
+
+from src.utils.metrics import REGISTRY
+
+def _counters(metrics, group):
+    family = (metrics if metrics is not None else REGISTRY).counter(
+        'single_flight_requests_total', "Calls through a single-flight group: computed (leader) or shared.",
+        ['group', 'outcome'])
+    return family.labels(group=group, outcome='computed'), family.labels(group=group, outcome='shared')
+
+def _waiter_error(error):
+    """
+    The computation's error for one waiter: a copy of it (a wrapper if it cannot be copied),
+    so waiters do not raise, and add traceback frames to, one shared exception object.
+    """
+    try:
+        return copy.copy(error)
+    except Exception:
+        return RuntimeError(f"Shared computation failed: {error!r}")
+
+class _Call:
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = self.error = None
+
+class SingleFlight:
+    """
+    Thread-safe single-flight group.
+
+    Attributes:
+        computed (int): Calls that ran the computation.
+        shared (int): Calls that got another call's result instead (collapsed).
+    """
+
+    def __init__(self, group='default', metrics=None):
+        self.group = group
+        self.computed = self.shared = 0
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._computed, self._shared = _counters(metrics, group)
+
+    @property
+    def in_flight(self):
+        """Keys being computed right now."""
+        return len(self._calls)
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        ``fn(*args, **kwargs)``, unless a call with an equal (hashable) ``key`` is already
+        running, in which case wait for that one.
+
+        Returns:
+            tuple: (value, shared). ``shared`` is True when the value came from another call;
+                it is the same object that call returned.
+
+        Raises:
+            Exception: The computation's error in the leader; a copy of it, chained to it
+                (``__cause__``), in every waiter.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            with self._lock:
+                self.shared += 1
+            self._shared.inc()
+            if call.error is not None:
+                raise _waiter_error(call.error) from call.error
+            return call.value, True
+
+        try:
+            call.value = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # Later calls start a new computation; the waiters already hold this one
+            with self._lock:
+                del self._calls[key]
+                self.computed += 1
+            self._computed.inc()
+            call.done.set()
+        return call.value, False
+
+class AsyncSingleFlight:
+    """
+    Single-flight group for coroutines; use from one event loop.
+
+    The computation runs as its own task, so a caller that is cancelled (e.g. its client
+    disconnected) does not cancel it for the others.
+
+    Attributes:
+        computed (int): Calls that started the computation.
+        shared (int): Calls that awaited another call's computation.
+    """
+
+    def __init__(self, group='default', metrics=None):
+        self.group = group
+        self.computed = self.shared = 0
+        self._tasks = {}
+        self._computed, self._shared = _counters(metrics, group)
+
+    @property
+    def in_flight(self):
+        return len(self._tasks)
+
+    async def do(self, key, coroutine_fn, *args, **kwargs):
+        """
+        Await ``coroutine_fn(*args, **kwargs)``, or the running computation for ``key``.
+
+        Returns:
+            tuple: (value, shared), as SingleFlight.do.
+
+        Raises:
+            Exception: As SingleFlight.do (waiters get a chained copy of the error).
+        """
+        task = self._tasks.get(key)
+        shared = task is not None
+        if shared:
+            self.shared += 1
+            self._shared.inc()
+        else:
+            task = asyncio.ensure_future(coroutine_fn(*args, **kwargs))
+            self._tasks[key] = task
+            self.computed += 1
+            self._computed.inc()
+            task.add_done_callback(lambda done, key=key: self._finished(key, done))
+        try:
+            value = await asyncio.shield(task)
+        except Exception as e:
+            if shared:
+                raise _waiter_error(e) from e
+            raise
+        return value, shared
+
+    def _finished(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # Retrieved here too, in case every caller was cancelled
@@ -0,0 +1,243 @@
+import os
+import io
+import sys
+import json
+import time
+import pstats
+import cProfile
+import logging
+import threading
+import collections
+from logging.handlers import RotatingFileHandler
+from src.utils.canonical import canonicalize_input
+from src.utils.query_capture import rotated_paths
+
+"""
+Slow-Query Log
+--------------
+Opt-in log of recommendation calls that exceed a latency threshold. Each entry is one JSON
+line in a rotating file with:
+- the canonical input (src/utils/canonical.py)
+- the stage timings
+- a stack profile of the slow call
+
+Profilers:
+- 'sampler' (default): one shared daemon thread that, while any tracked call is in flight,
+  reads the tracked threads' stacks every ``sample_interval`` seconds
+  (``sys._current_frames``). Samples are raw (code, line) tuples and are thrown away unless
+  the call turns out to be slow; only then are they written in the folded format of
+  flamegraph.pl / speedscope ("outer;inner;leaf": count). Works across concurrent
+  sessions, one profile per thread.
+- 'cprofile': deterministic cProfile of the calling thread; exact call counts, but it
+  slows every tracked call down noticeably.
+- None: timings only.
+
+Usage:
+    log = SlowQueryLog('logs/slow_queries.log', threshold_ms=200)
+    engine = RecommendationEngine(slow_query_log=log)
+    ...
+    for entry in read_slow_queries('logs/slow_queries.log'):
+        print(entry['elapsed_ms'], entry['input'], entry['profile']['stacks'][:3])
+"""
+
+PROFILERS = ('sampler', 'cprofile', None)
+# Deepest stack kept per sample (outermost frames are cut)
+MAX_STACK_DEPTH = 64
+# Stacks / functions written per entry
+TOP_STACKS = 25
+
+def stack_key(frame, max_depth=MAX_STACK_DEPTH):
+    """Cheap hashable snapshot of a stack: (code, line) pairs, innermost first."""
+    key = []
+    while frame is not None and len(key) < max_depth:
+        key.append((frame.f_code, frame.f_lineno))
+        frame = frame.f_back
+    return tuple(key)
+
+def folded_stack(key):
+    """'outer;...;inner' label of a ``stack_key``, innermost frame last."""
+    return ';'.join(f"{code.co_name} ({os.path.basename(code.co_filename)}:{line})" for code, line in reversed(key))
+
+class StackSampler:
+    """
+    Background thread sampling the stacks of registered threads.
+
+    The thread sleeps on a condition while nothing is registered, so idle engines pay nothing.
+
+    Args:
+        interval (float): Seconds between samples.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._active = {}
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def start(self, thread_id):
+        """Begin collecting samples for ``thread_id``."""
+        with self._cond:
+            self._active[thread_id] = collections.Counter()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='unlox-stack-sampler', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def stop(self, thread_id):
+        """Stop sampling ``thread_id``; returns its Counter of ``stack_key`` samples."""
+        with self._cond:
+            return self._active.pop(thread_id, collections.Counter())
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while True:
+            with self._cond:
+                while not self._active:
+                    self._cond.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._cond:
+                for thread_id, counts in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None and thread_id != own_id:
+                        counts[stack_key(frame)] += 1
+            del frames
+
+class SlowQuery:
+    """
+    One tracked call: start time, stage laps and its profiler state.
+
+    Attributes:
+        user_input (dict): Input as passed to the engine.
+        stages (dict): Stage name -> milliseconds, filled by ``lap``.
+    """
+    __slots__ = ('user_input', 'stages', 'start', 'last', 'thread_id', 'profiler')
+
+    def __init__(self, user_input):
+        self.user_input = user_input
+        self.stages = {}
+        self.start = self.last = time.perf_counter()
+        self.thread_id = threading.get_ident()
+        self.profiler = None
+
+    def lap(self, stage):
+        """Record the time since the previous lap (or the start) as ``stage``."""
+        now = time.perf_counter()
+        self.stages[stage] = (now - self.last) * 1000
+        self.last = now
+
+class SlowQueryLog:
+    """
+    Rotating JSON-lines log of calls slower than a threshold.
+
+    Args:
+        path (str): Log file; rotated to path.1 ... path.N.
+        threshold_ms (float): Calls taking longer are logged.
+        profiler (str): 'sampler', 'cprofile' or None (see module docstring).
+        sample_interval (float): Seconds between stack samples for the 'sampler' profiler.
+        max_bytes (int): Size at which the file is rotated.
+        backup_count (int): Rotated files kept.
+    """
+
+    def __init__(self, path, threshold_ms=500, profiler='sampler', sample_interval=0.005,
+                 max_bytes=10 * 1024 * 1024, backup_count=5):
+        if profiler not in PROFILERS:
+            raise ValueError(f"profiler must be one of {PROFILERS}, got {profiler!r}")
+        self.path = path
+        self.threshold_ms = threshold_ms
+        self.profiler = profiler
+        self.sample_interval = sample_interval
+        self.sampler = StackSampler(sample_interval) if profiler == 'sampler' else None
+        self.logged = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Dedicated non-propagating logger so entries never reach the root handlers
+        self._logger = logging.getLogger(f"{__name__}.{os.path.abspath(path)}")
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        if not self._logger.handlers:
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self._logger.addHandler(handler)
+
+    def start(self, user_input):
+        """Begin tracking a call on the current thread."""
+        query = SlowQuery(user_input)
+        if self.sampler is not None:
+            self.sampler.start(query.thread_id)
+        elif self.profiler == 'cprofile':
+            query.profiler = cProfile.Profile()
+            try:
+                query.profiler.enable()
+            except ValueError:
+                # Another profiler is already active on this thread
+                query.profiler = None
+        return query
+
+    def finish(self, query, error=None):
+        """
+        Stop tracking ``query``. Writes an entry and returns it when the call was slow;
+        returns None otherwise.
+        """
+        elapsed_ms = (time.perf_counter() - query.start) * 1000
+        stacks = self.sampler.stop(query.thread_id) if self.sampler is not None else None
+        if query.profiler is not None:
+            query.profiler.disable()
+        if elapsed_ms < self.threshold_ms:
+            return None
+
+        entry = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'elapsed_ms': round(elapsed_ms, 3),
+            'threshold_ms': self.threshold_ms,
+            'thread': threading.current_thread().name,
+            'input': canonicalize_input(query.user_input),
+            'stages': {stage: round(ms, 3) for stage, ms in query.stages.items()},
+            'profile': self._profile(stacks, query.profiler),
+        }
+        if error is not None:
+            entry['error'] = repr(error)
+        self._logger.info(json.dumps(entry, default=str))
+        self.logged += 1
+        return entry
+
+    def track(self, user_input):
+        """Context manager around one call; yields the SlowQuery for stage laps."""
+        return _Tracking(self, user_input)
+
+    def _profile(self, stacks, profiler):
+        if stacks is not None:
+            return {'type': 'sampler', 'interval_ms': self.sample_interval * 1000,
+                    'samples': sum(stacks.values()),
+                    'stacks': [{'stack': folded_stack(key), 'count': n} for key, n in stacks.most_common(TOP_STACKS)]}
+        if profiler is not None:
+            stats = pstats.Stats(profiler, stream=io.StringIO())
+            rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_STACKS]
+            return {'type': 'cprofile',
+                    'functions': [{'function': f"{name} ({os.path.basename(filename)}:{line})", 'calls': calls,
+                                   'tottime_ms': round(tottime * 1000, 3), 'cumtime_ms': round(cumtime * 1000, 3)}
+                                  for (filename, line, name), (_, calls, tottime, cumtime, _) in rows]}
+        return None
+
+class _Tracking:
+    __slots__ = ('log', 'user_input', 'query')
+
+    def __init__(self, log, user_input):
+        self.log = log
+        self.user_input = user_input
+
+    def __enter__(self):
+        self.query = self.log.start(self.user_input)
+        return self.query
+
+    def __exit__(self, exc_type, exc, tb):
+        self.log.finish(self.query, error=exc)
+        return False
+
+def read_slow_queries(path):
+    """Entries of a slow-query log (oldest rotated file first)."""
+    entries = []
+    for log_path in rotated_paths(path):
+        with open(log_path, encoding='utf-8') as f:
+            entries.extend(json.loads(line) for line in f if line.strip())
+    return entries
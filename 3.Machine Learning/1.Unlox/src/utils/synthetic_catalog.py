@@ -0,0 +1,271 @@
+import os
+import json
+import argparse
+import numpy as np
+import pandas as pd
+
+"""
+Synthetic Catalog Generator
+---------------------------
+Scales the service dataset to millions of rows for benchmarking, with the real schema:
+Service_ID, Service_Name, Description, Target_Business_Type, Price_Category,
+Language_Support, Location_Area, Match_Quality.
+
+Descriptions follow the 12 service templates of the real catalog. Their mix is
+calibrated on the document frequencies stored in the shipped TF-IDF encoder
+(1000 services): every description term occurs in the same fraction of rows,
+and about 9% of rows name their business type ("... for retail"). The encoders
+do not record category frequencies, so categorical columns are uniform over the
+observed values unless ``weights`` is passed.
+
+Output is deterministic for a given seed and row count. Rows are generated in
+fixed blocks (each with its own seeded RNG) and streamed to disk, so memory
+stays flat from 10k to 10M rows.
+
+Usage:
+    python -m src.utils.synthetic_catalog --rows 1000000 --out data/raw/synthetic_1m.csv \\
+        --queries 10000 --query-mix skewed --queries-out data/raw/queries_skewed.jsonl
+"""
+
+# (Service_Name, Description, share of the real catalog)
+SERVICE_TEMPLATES = [
+    ('Digital Marketing Strategy', 'Online marketing plan and advertisement development for one month', 69),
+    ('Contract Review', 'Standard vendor and client contracts drafting, agreements and legal review', 73),
+    ('Advanced Tax Filing', 'Comprehensive annual tax planning, financial compliance and submission', 74),
+    ('Payroll Processing', 'Monthly salary calculation, employee disbursement and reporting', 78),
+    ('CRM Implementation', 'Modern customer relationship management with CRM ticketing implementation', 85),
+    ('Social Media Setup', 'Initial Facebook and Instagram profiles creation with social media strategy', 86),
+    ('SEO Optimization', 'Advanced search engine optimization implementation for product ranking and visibility', 86),
+    ('Business Registration', 'Complete guidance on establishing a new business entity and filing', 87),
+    ('Financial Audit', 'Independent financial statement verification and annual compliance check', 87),
+    ('Inventory Tracking', 'Cloud based inventory tracking, supply chain and products stack integration', 88),
+    ('Basic Accounting', 'Simple monthly bookkeeping and tax preparation', 90),
+    ('Website Development', 'Single page website design with core functionality and contact form', 97),
+]
+
+# Raw (un-normalized) category values, as in data/raw
+CATEGORY_VALUES = {
+    'Target_Business_Type': ['Clinic', 'E-commerce', 'Freelancer', 'Restaurant', 'Retail', 'Tech Startup'],
+    'Price_Category': ['Low', 'Medium', 'High', 'Premium'],
+    'Language_Support': ['English', 'Hindi', 'Both', 'Regional'],
+    'Location_Area': ['Bengaluru', 'Chennai', 'Delhi', 'Mumbai', 'Remote'],
+    'Match_Quality': ['High', 'Medium', 'Low'],
+}
+
+# Share of rows whose description ends with "for <business type>", per business type
+BUSINESS_SUFFIX_RATE = {'Clinic': 0.078, 'E-commerce': 0.066, 'Freelancer': 0.114,
+                        'Restaurant': 0.078, 'Retail': 0.138, 'Tech Startup': 0.066}
+
+FIRST_SERVICE_ID = 1001
+BLOCK_ROWS = 100_000
+
+# Query workload mixes: Zipf exponent for popular services/segments (0 = uniform)
+# and the share of queries that match nothing under the hard filters
+QUERY_MIXES = {
+    'uniform': {'zipf': 0.0, 'zero_result_rate': 0.0},
+    'skewed': {'zipf': 1.1, 'zero_result_rate': 0.02},
+    'zero_heavy': {'zipf': 0.0, 'zero_result_rate': 0.5},
+}
+# Values that no catalog row has, so the strict filters return nothing
+ZERO_RESULT_VALUES = {'Target_Business_Type': ['Bakery', 'Logistics', 'Salon'], 'Location_Area': ['Pune', 'Jaipur']}
+
+def _generate_block(rng, start, n_rows, weights):
+    template_shares = np.array([share for _, _, share in SERVICE_TEMPLATES], dtype=np.float64)
+    templates = rng.choice(len(SERVICE_TEMPLATES), size=n_rows, p=template_shares / template_shares.sum())
+    names = np.array([name for name, _, _ in SERVICE_TEMPLATES], dtype=object)
+    descriptions = np.array([desc for _, desc, _ in SERVICE_TEMPLATES], dtype=object)
+
+    columns = {}
+    for column, values in CATEGORY_VALUES.items():
+        p = weights.get(column)
+        columns[column] = np.array(values, dtype=object)[rng.choice(len(values), size=n_rows, p=p)]
+
+    business = columns['Target_Business_Type']
+    suffix_rate = pd.Series(business).map(BUSINESS_SUFFIX_RATE).fillna(0.0).to_numpy()
+    with_suffix = rng.random(n_rows) < suffix_rate
+    text = descriptions[templates]
+    text[with_suffix] = text[with_suffix] + ' for ' + pd.Series(business[with_suffix]).str.lower().to_numpy()
+
+    return pd.DataFrame({
+        'Service_ID': np.arange(start + FIRST_SERVICE_ID, start + FIRST_SERVICE_ID + n_rows),
+        'Service_Name': names[templates],
+        'Description': text,
+        'Target_Business_Type': business,
+        'Price_Category': columns['Price_Category'],
+        'Language_Support': columns['Language_Support'],
+        'Location_Area': columns['Location_Area'],
+        'Match_Quality': columns['Match_Quality'],
+    })
+
+def iter_catalog(n_rows, seed=42, weights=None):
+    """
+    Yield the synthetic catalog in blocks of ``BLOCK_ROWS`` rows.
+
+    Args:
+        n_rows (int): Total number of services.
+        seed (int): Base seed; block ``i`` uses the RNG seeded with ``[seed, i]``, so
+            the first N rows are the same for any ``n_rows >= N``.
+        weights (dict, optional): Probabilities per categorical column, aligned with
+            ``CATEGORY_VALUES[column]`` (uniform when omitted).
+
+    Yields:
+        pd.DataFrame: Consecutive blocks with the raw catalog schema.
+    """
+    weights = weights or {}
+    for block, start in enumerate(range(0, n_rows, BLOCK_ROWS)):
+        rng = np.random.default_rng([seed, block])
+        # Always draw a full block, so a smaller catalog is a prefix of a larger one
+        frame = _generate_block(rng, start, BLOCK_ROWS, weights)
+        yield frame.iloc[:n_rows - start] if n_rows - start < BLOCK_ROWS else frame
+
+def generate_catalog(n_rows, seed=42, weights=None):
+    """Whole synthetic catalog as one dataframe (see ``iter_catalog``)."""
+    return pd.concat(iter_catalog(n_rows, seed=seed, weights=weights), ignore_index=True)
+
+def write_catalog(path, n_rows, seed=42, weights=None, fmt=None):
+    """
+    Stream the synthetic catalog to a CSV or Parquet file.
+
+    Args:
+        path (str): Output file. The format follows the extension unless ``fmt`` is given.
+        n_rows (int): Total number of services.
+        seed (int): Base seed.
+        weights (dict, optional): Categorical probabilities (see ``iter_catalog``).
+        fmt (str, optional): 'csv' or 'parquet'. Parquet requires pyarrow.
+
+    Returns:
+        int: Number of rows written.
+    """
+    fmt = fmt or ('parquet' if path.endswith('.parquet') else 'csv')
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    writer = None
+    written = 0
+
+    if fmt == 'parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow); use a .csv path instead.")
+
+    try:
+        for block in iter_catalog(n_rows, seed=seed, weights=weights):
+            if fmt == 'parquet':
+                table = pa.Table.from_pandas(block, preserve_index=False)
+                writer = writer or pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+            else:
+                block.to_csv(path, mode='w' if written == 0 else 'a', header=written == 0, index=False)
+            written += len(block)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    print(f"Wrote {written:,} synthetic services to {path}")
+    return written
+
+def _zipf_choice(rng, n_values, size, exponent):
+    """Indices in [0, n_values) with P(i) ~ 1 / (i + 1) ** exponent (uniform for exponent 0)."""
+    p = 1.0 / np.arange(1, n_values + 1) ** exponent
+    return rng.choice(n_values, size=size, p=p / p.sum())
+
+def generate_queries(n_queries, mix='uniform', seed=0, zipf=None, zero_result_rate=None):
+    """
+    Generate user queries in the ``RecommendationEngine.get_recommendations`` input format.
+
+    Descriptions are 3-6 word fragments of the service templates, occasionally with
+    the business type appended, as a user would type them.
+
+    Args:
+        n_queries (int): Number of queries.
+        mix (str): One of ``QUERY_MIXES``: 'uniform', 'skewed' (Zipf-popular services
+            and segments, so some queries repeat exactly) or 'zero_heavy'.
+        seed (int): Random seed.
+        zipf (float, optional): Override the mix's Zipf exponent.
+        zero_result_rate (float, optional): Override the mix's share of queries with
+            a business type or location absent from the catalog.
+
+    Returns:
+        list: Query dicts with Target_Business_Type, Price_Category, Language_Support,
+        Location_Area and Description.
+    """
+    if mix not in QUERY_MIXES:
+        raise ValueError(f"Unknown query mix '{mix}'. Use one of {sorted(QUERY_MIXES)}.")
+    settings = dict(QUERY_MIXES[mix])
+    if zipf is not None:
+        settings['zipf'] = zipf
+    if zero_result_rate is not None:
+        settings['zero_result_rate'] = zero_result_rate
+
+    rng = np.random.default_rng(seed)
+    exponent = settings['zipf']
+    # A fixed random popularity order, so "popular" is not just the first list entry
+    popularity = {column: rng.permutation(len(values)) for column, values in CATEGORY_VALUES.items()}
+    template_order = rng.permutation(len(SERVICE_TEMPLATES))
+
+    def pick(column):
+        return [CATEGORY_VALUES[column][popularity[column][i]]
+                for i in _zipf_choice(rng, len(CATEGORY_VALUES[column]), n_queries, exponent)]
+
+    business, price, location = pick('Target_Business_Type'), pick('Price_Category'), pick('Location_Area')
+    language = pick('Language_Support')
+    templates = template_order[_zipf_choice(rng, len(SERVICE_TEMPLATES), n_queries, exponent)]
+    # Skewed workloads repeat whole queries: reuse a small set of fragments per template
+    variants = _zipf_choice(rng, 4, n_queries, exponent) if exponent else rng.integers(0, 1 << 30, size=n_queries)
+
+    queries = []
+    zero_result = rng.random(n_queries) < settings['zero_result_rate']
+    for i in range(n_queries):
+        words = SERVICE_TEMPLATES[templates[i]][1].replace(',', '').split()
+        fragment_rng = np.random.default_rng([seed, int(templates[i]), int(variants[i])])
+        length = int(fragment_rng.integers(3, min(6, len(words)) + 1))
+        start = int(fragment_rng.integers(0, len(words) - length + 1))
+        description = ' '.join(words[start:start + length])
+        if fragment_rng.random() < 0.2:
+            description += ' for ' + business[i].lower()
+
+        query = {
+            'Target_Business_Type': business[i],
+            'Price_Category': price[i],
+            'Language_Support': [language[i]],
+            'Location_Area': location[i],
+            'Description': description,
+        }
+        if zero_result[i]:
+            column = 'Target_Business_Type' if rng.random() < 0.5 else 'Location_Area'
+            query[column] = str(rng.choice(ZERO_RESULT_VALUES[column]))
+        queries.append(query)
+    return queries
+
+def write_queries(path, queries):
+    """Write queries as JSON lines (one query dict per line)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        for query in queries:
+            f.write(json.dumps(query) + '\n')
+    print(f"Wrote {len(queries):,} queries to {path}")
+
+def load_queries(path):
+    """Read a JSON-lines query workload written by ``write_queries``."""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic service catalog and query workload.")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Number of services")
+    parser.add_argument('--out', required=True, help="Output .csv or .parquet file")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--queries', type=int, default=0, help="Also generate this many queries")
+    parser.add_argument('--query-mix', default='uniform', choices=sorted(QUERY_MIXES))
+    parser.add_argument('--queries-out', default=None, help="Query workload file (JSON lines)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    write_catalog(args.out, args.rows, seed=args.seed)
+    if args.queries:
+        queries_out = args.queries_out or os.path.splitext(args.out)[0] + f'_queries_{args.query_mix}.jsonl'
+        write_queries(queries_out, generate_queries(args.queries, mix=args.query_mix, seed=args.seed))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Shared fixtures: a small synthetic catalog built into a temporary artifact directory,
+so engine tests can run without the real dataset.
+"""
+
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.preprocessing.data_cleaner import clean_dataset
+from src.preprocessing.feature_engineering import process_features, save_artifacts
+
+SERVICES = {
+    'Social Media Setup': 'Facebook and Instagram business profile creation and page setup',
+    'SEO Optimization': 'Search engine optimization and ranking for your website',
+    'Tax Filing': 'Annual tax filing, preparation and compliance submission',
+    'Payroll Processing': 'Monthly salary calculation, payroll and employee disbursement',
+    'Website Development': 'Modern website design and development with online functionality',
+    'Inventory Tracking': 'Retail inventory management and supply chain tracking',
+    'Legal Contracts': 'Vendor agreements, contracts drafting and legal review',
+    'Cloud Setup': 'Cloud infrastructure and tech stack setup for startups',
+}
+
+def make_catalog(n_rows=400, seed=7):
+    """Random raw catalog with the real schema."""
+    rng = np.random.default_rng(seed)
+    names = rng.choice(list(SERVICES), size=n_rows)
+    return pd.DataFrame({
+        'Service_ID': np.arange(1, n_rows + 1),
+        'Service_Name': names,
+        'Description': [SERVICES[n] + ' ' + ' '.join(rng.choice(['basic', 'premium', 'plan', 'support', 'monthly'], size=2))
+                        for n in names],
+        'Target_Business_Type': rng.choice(['E-commerce', 'Restaurant', 'Tech Startup', 'Retail', 'Freelancer', 'Clinic'], size=n_rows),
+        'Price_Category': rng.choice(['Low', 'Medium', 'High', 'Premium'], size=n_rows),
+        'Language_Support': rng.choice(['English', 'Hindi', 'Both', 'Regional'], size=n_rows),
+        'Location_Area': rng.choice(['Remote', 'Delhi', 'Mumbai', 'Bengaluru', 'Chennai'], size=n_rows, p=[0.4, 0.15, 0.15, 0.15, 0.15]),
+        'Match_Quality': rng.choice(['High', 'Medium'], size=n_rows),
+    })
+
+@pytest.fixture(scope='session')
+def artifact_dirs(tmp_path_factory):
+    """Build cleaned CSV, feature blocks and encoders for the synthetic catalog once per session."""
+    root = tmp_path_factory.mktemp('artifacts')
+    cleaned = clean_dataset(make_catalog()).reset_index(drop=True)
+    cleaned_path = str(root / 'cleaned.csv')
+    cleaned.to_csv(cleaned_path, index=False)
+
+    matrix, service_ids, encoders, names = process_features(cleaned)
+    save_artifacts(matrix, service_ids, encoders, names, processed_dir=str(root), models_dir=str(root),
+                   legacy_matrix=True)
+    return {'processed_dir': str(root), 'cleaned_data_path': cleaned_path, 'models_dir': str(root)}
@@ -0,0 +1,62 @@
+"""
+Anytime Search Tests
+A time-budgeted query that finishes ranks exactly like an unbudgeted one; one that runs out
+of time returns the best of what it scored, flagged partial with its coverage
+"""
+
+import sys
+import os
+import time
+import numpy as np
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import recommendation_engine
+from src.models.recommendation_engine import RecommendationEngine, RecommendationResults, merge_top_k
+from src.utils.synthetic_catalog import generate_queries
+from src.utils.metrics import MetricsRegistry
+
+def test_complete_budget_is_exact(artifact_dirs, monkeypatch):
+    """With time to spare, budgeted results equal the unbudgeted ones, in several chunks"""
+    print("\n=== Test: Anytime Search ===")
+    monkeypatch.setattr(recommendation_engine, 'ANYTIME_CHUNK_ROWS', 37)
+    engine = RecommendationEngine(metrics=MetricsRegistry(), **artifact_dirs)
+    queries = generate_queries(40, mix='uniform', seed=31) + [{'Description': 'tax filing and payroll'}, {}]
+    for method in ('cosine', 'knn'):
+        engine.ranking_method = method
+        for query in queries:
+            for top_k in (3, 50):
+                results = engine.get_recommendations(query, top_k=top_k, time_budget_ms=60_000)
+                assert isinstance(results, RecommendationResults)
+                assert results == engine.get_recommendations(query, top_k=top_k)
+                assert not results.partial and results.coverage == 1.0
+    assert isinstance(engine.get_recommendations({'Location_Area': 'Atlantis'}, deadline=time.monotonic() + 1),
+                      RecommendationResults)
+    # A profile scores everything, so it refuses a budget rather than ignoring it
+    for budget in ({'time_budget_ms': 10}, {'deadline': time.monotonic() + 1}):
+        with pytest.raises(ValueError):
+            engine.get_recommendations(queries[0], profile=True, **budget)
+    print(f"✓ {len(queries)} budgeted queries identical to the full search")
+
+    # Ties resolve by position, as in top_k_positions
+    positions, scores = merge_top_k(np.array([0.5, 0.9, 0.5, 0.9]), np.array([7, 3, 2, 1]), 3)
+    assert positions.tolist() == [1, 3, 2] and scores.tolist() == [0.9, 0.9, 0.5]
+
+def test_expired_budget_is_partial(artifact_dirs, monkeypatch):
+    """Out of time: rows sharing a query term in the first chunk are scored, the rest skipped"""
+    monkeypatch.setattr(recommendation_engine, 'ANYTIME_CHUNK_ROWS', 50)
+    metrics = MetricsRegistry()
+    engine = RecommendationEngine(metrics=metrics, **artifact_dirs)
+    query = {'Description': 'tax filing and payroll'}
+    results = engine.get_recommendations(query, top_k=3, deadline=time.monotonic() - 1)
+    assert results.partial and 0 < results.coverage < 50 / len(engine.blocks)
+    first_chunk = set(engine.catalog.row(row)['Service_ID'] for row in range(50))
+    assert results and {r['Service_ID'] for r in results} <= first_chunk
+    assert all(a['Match_Score'] >= b['Match_Score'] for a, b in zip(results, results[1:]))
+
+    snapshot = metrics.snapshot()
+    assert snapshot['recommendation_partial_results_total']['values'][()] == 1
+    assert snapshot['recommendation_coverage']['values'][()]['count'] == 1
+    print(f"✓ partial results from {results.coverage:.1%} of the candidates")
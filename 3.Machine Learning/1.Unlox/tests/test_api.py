@@ -0,0 +1,145 @@
+"""
+HTTP API Tests
+Batched engine calls return exactly what single calls return, the micro-batcher coalesces
+concurrent requests and pushes back when its queue is full, and the HTTP endpoints answer
+(and fail) as documented
+"""
+
+import sys
+import os
+import json
+import time
+import asyncio
+import threading
+import http.client
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.recommendation_engine import RecommendationEngine
+from src.api.batching import MicroBatcher, QueueFullError
+from src.api.server import RecommendationServer
+from src.utils.synthetic_catalog import generate_queries
+from src.utils.metrics import MetricsRegistry
+
+class ServerThread:
+    """A RecommendationServer on its own event loop thread."""
+
+    def __init__(self, engine, **kwargs):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.server = RecommendationServer(engine, port=0, **kwargs)
+        asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result()
+
+    def request(self, method, path, payload=None, raw=None):
+        connection = http.client.HTTPConnection('127.0.0.1', self.server.port, timeout=30)
+        body = raw if raw is not None else (json.dumps(payload) if payload is not None else None)
+        connection.request(method, path, body)
+        response = connection.getresponse()
+        data = response.read()
+        connection.close()
+        if response.getheader('Content-Type') == 'application/json':
+            data = json.loads(data)
+        return response.status, data, response
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.server.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+class SlowEngine:
+    def __init__(self, engine, delay):
+        self.engine, self.delay = engine, delay
+
+    def get_recommendations_batch(self, *args, **kwargs):
+        time.sleep(self.delay)
+        return self.engine.get_recommendations_batch(*args, **kwargs)
+
+def test_batch_identical_to_single(artifact_dirs):
+    """get_recommendations_batch gives exactly the per-query results, errors in place"""
+    print("\n=== Test: Batched Scoring ===")
+    engine = RecommendationEngine(metrics=MetricsRegistry(), **artifact_dirs)
+    # Unfiltered queries take the batched matrix-product path, filtered ones the per-query path
+    queries = generate_queries(60, mix='uniform', seed=21) + [{'Description': 'tax filing and payroll'}, {}]
+    for method in ('cosine', 'knn'):
+        engine.ranking_method = method
+        for top_k, weights in [(1, None), (5, None), (40, (1, 1, 2)), (500, (0, 1, 10))]:
+            expected = [engine.get_recommendations(q, top_k=top_k, block_weights=weights) for q in queries]
+            assert engine.get_recommendations_batch(queries, top_k=top_k, block_weights=weights) == expected
+    print(f"✓ {len(queries)} queries identical in one batch")
+
+    mixed = engine.get_recommendations_batch([{'Price_Category': 3}, queries[-2]], return_exceptions=True)
+    assert isinstance(mixed[0], AttributeError) and mixed[1] == engine.get_recommendations(queries[-2])
+    with pytest.raises(AttributeError):
+        engine.get_recommendations_batch([{'Price_Category': 3}, queries[-2]])
+    assert engine.get_recommendations_batch([]) == []
+
+def test_micro_batcher(artifact_dirs):
+    """Concurrent submits share engine calls; a full queue is refused at once"""
+    engine = RecommendationEngine(metrics=MetricsRegistry(), **artifact_dirs)
+    queries = generate_queries(24, mix='uniform', seed=22)
+    expected = [engine.get_recommendations(q, top_k=3) for q in queries]
+
+    async def scenario():
+        batcher = MicroBatcher(SlowEngine(engine, 0.05), max_batch_size=8, max_wait_ms=20,
+                               metrics=MetricsRegistry())
+        await batcher.start()
+        results = await asyncio.gather(*(batcher.submit(q, top_k=3) for q in queries))
+        batches = batcher.batches
+        await batcher.close()
+
+        small = MicroBatcher(SlowEngine(engine, 0.2), max_batch_size=2, max_queue=2, metrics=MetricsRegistry())
+        await small.start()
+        answers = await asyncio.gather(*(small.submit(q, top_k=3) for q in queries[:10]), return_exceptions=True)
+        await small.close()
+        return results, batches, answers, small.rejected
+
+    results, batches, answers, rejected = asyncio.run(scenario())
+    assert results == expected and batches <= 4
+    assert rejected == sum(isinstance(a, QueueFullError) for a in answers) > 0
+    assert all(a == e for a, e in zip(answers, expected[:10]) if not isinstance(a, Exception))
+    print(f"✓ {len(queries)} requests in {batches} batches; {rejected} of 10 rejected by a 2-slot queue")
+
+def test_http_endpoints(artifact_dirs):
+    """Recommend, batch, health and metrics endpoints; 400/404/405/413/429/500 errors"""
+    print("\n=== Test: HTTP API ===")
+    metrics = MetricsRegistry()
+    engine = RecommendationEngine(metrics=metrics, **artifact_dirs)
+    queries = generate_queries(8, mix='uniform', seed=23)
+    server = ServerThread(engine, max_batch_size=16, max_wait_ms=5, max_queue=16, metrics=metrics)
+    try:
+        status, body, _ = server.request('POST', '/recommend', {'query': queries[0], 'top_k': 3})
+        assert status == 200 and body['results'] == engine.get_recommendations(queries[0], top_k=3)
+        status, body, _ = server.request('POST', '/recommend/batch', {'queries': queries + [{'Price_Category': 3}],
+                                                                      'block_weights': [1, 1, 2]})
+        assert status == 200
+        assert body['results'][:-1] == [engine.get_recommendations(q, block_weights=(1, 1, 2)) for q in queries]
+        assert 'AttributeError' in body['results'][-1]['error']
+
+        status, body, _ = server.request('GET', '/health')
+        assert status == 200 and body['status'] == 'ok' and body['batches'] >= 1
+        status, text, _ = server.request('GET', '/metrics')
+        assert status == 200 and b'unlox_api_batch_size_count' in text and b'unlox_recommendation_batch_size' in text
+
+        assert server.request('POST', '/recommend', {'query': queries[0], 'top_k': 0})[0] == 400
+        assert server.request('POST', '/recommend', {'query': 'tax'})[0] == 400
+        assert server.request('POST', '/recommend', raw='{not json')[0] == 400
+        assert server.request('POST', '/recommend', {'query': {'Price_Category': 3}})[0] == 500
+        assert server.request('GET', '/nowhere')[0] == 404
+        status, _, response = server.request('GET', '/recommend')
+        assert status == 405 and response.getheader('Allow') == 'POST'
+
+        connection = http.client.HTTPConnection('127.0.0.1', server.server.port, timeout=30)
+        connection.putrequest('POST', '/recommend')
+        connection.putheader('Content-Length', str(2 << 20))
+        connection.endheaders()
+        assert connection.getresponse().status == 413
+        connection.close()
+
+        status, _, response = server.request('POST', '/recommend/batch', {'queries': [queries[0]] * 17})
+        assert status == 429 and response.getheader('Retry-After')
+    finally:
+        server.close()
+    print("✓ endpoints answer and fail as documented")
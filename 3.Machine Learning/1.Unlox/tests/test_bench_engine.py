@@ -0,0 +1,42 @@
+"""
+Engine Benchmark Suite Tests
+A tiny offline sweep writes per-stage percentiles, and the baseline comparison flags regressions
+"""
+
+import sys
+import os
+import json
+import copy
+
+# Add project root and benchmarks to path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, 'benchmarks'))
+
+from bench_engine import main, compare_results, STAGES
+
+def test_small_sweep_and_comparison(tmp_path):
+    """Sweep 2 selectivities x 2 methods on a 300-row catalog, then compare with itself"""
+    print("\n=== Test: Engine Benchmark Suite ===")
+    output = tmp_path / 'result.json'
+    assert main(['--rows', '300', '--queries', '8', '--warmup', '1', '--top-k', '3',
+                 '--selectivity', 'none', 'full', '--cache-dir', str(tmp_path / 'cache'),
+                 '--output', str(output)]) == 0
+
+    with open(output) as f:
+        result = json.load(f)
+    assert len(result['results']) == 4
+    assert result['init'][0]['catalog_rows'] == 300 and result['init'][0]['peak_rss_mb'] > 0
+    unfiltered = next(r for r in result['results'] if r['selectivity'] == 'none')
+    assert set(unfiltered['stages']) == set(STAGES)
+    assert unfiltered['mean_candidates'] == 300
+    total = unfiltered['stages']['total']
+    assert total['count'] == 8 and total['p50_ms'] <= total['p95_ms'] <= total['p99_ms']
+
+    assert not any(row['regression'] for row in compare_results(result, result))
+    slower = copy.deepcopy(result)
+    for r in slower['results']:
+        r['stages']['total']['p95_ms'] *= 2
+    assert all(row['regression'] for row in compare_results(slower, result))
+    assert main(['--compare', str(output), str(output)]) == 0
+    print(f"✓ {len(result['results'])} combinations, p50 {total['p50_ms']:.2f} ms unfiltered")
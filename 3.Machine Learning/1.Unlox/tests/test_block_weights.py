@@ -0,0 +1,70 @@
+"""
+Block Weight Tests
+Query-time block weights must reproduce the old baked-in 10x TF-IDF boost
+and allow re-weighting without rebuilding or reloading artifacts
+"""
+
+import sys
+import os
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.recommendation_engine import RecommendationEngine
+
+QUERY = {
+    'Target_Business_Type': 'E-commerce',
+    'Price_Category': 'High',
+    'Location_Area': 'remote',
+    'Language_Support': ['English'],
+    'Description': 'Social media marketing and Instagram page setup',
+}
+
+def test_default_weights_match_baked_matrix(artifact_dirs):
+    """Weights (1, 1, 10) give the same scores as cosine on the old features.npy"""
+    print("\n=== Test: Default Block Weights ===")
+    engine = RecommendationEngine(**artifact_dirs)
+
+    user_vector = engine.encoder.encode_user_input(QUERY)
+    expected = cosine_similarity(user_vector, np.asarray(engine.feature_matrix)).ravel()
+
+    blocks = engine.encoder.encode_user_blocks(QUERY)
+    dots = engine.blocks.block_dots(blocks)
+    scores = engine.blocks.weighted_cosine(dots, engine.blocks.user_sq_norms(blocks),
+                                           engine.blocks.row_sq_norms(), (1, 1, 10))
+    assert np.allclose(scores, expected)
+
+    results = engine.get_recommendations(QUERY, top_k=5)
+    assert results
+    for r in results:
+        row = engine.df.index[engine.df['Service_ID'] == r['Service_ID']][0]
+        assert abs(r['Match_Score'] - round(expected[row] * 100, 2)) < 0.011
+    print(f"✓ {len(results)} results match the baked-in scores")
+
+def test_knn_distances_match_baked_matrix(artifact_dirs):
+    """KNN ranking on block statistics matches Euclidean distance on features.npy"""
+    engine = RecommendationEngine(ranking_method='knn', **artifact_dirs)
+    results = engine.get_recommendations(QUERY, top_k=3)
+
+    user_vector = engine.encoder.encode_user_input(QUERY)
+    for r in results:
+        row = engine.df.index[engine.df['Service_ID'] == r['Service_ID']][0]
+        distance = np.linalg.norm(np.asarray(engine.feature_matrix[row]) - user_vector)
+        assert abs(r['Match_Score'] - round(100.0 / (1.0 + distance), 2)) < 0.011
+
+def test_reweighting_without_reload(artifact_dirs):
+    """Per-query and per-engine weights change scores on the same loaded artifacts"""
+    print("\n=== Test: Query-Time Re-weighting ===")
+    engine = RecommendationEngine(**artifact_dirs)
+    blocks_before = engine.blocks
+
+    text_heavy = engine.get_recommendations(QUERY, top_k=5)
+    no_text = engine.get_recommendations(QUERY, top_k=5, block_weights=(1, 1, 0))
+    assert [r['Match_Score'] for r in text_heavy] != [r['Match_Score'] for r in no_text]
+
+    engine.block_weights = (1, 1, 0)
+    assert engine.get_recommendations(QUERY, top_k=5) == no_text
+    assert engine.blocks is blocks_before
+    print("✓ Scores changed with weights, artifacts untouched")
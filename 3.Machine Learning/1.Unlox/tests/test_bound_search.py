@@ -0,0 +1,61 @@
+"""
+Bounded Search Tests
+The branch-and-bound search ranks exactly like scoring every candidate, while skipping
+row blocks whose bound is below the k-th best score
+"""
+
+import sys
+import os
+import numpy as np
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import recommendation_engine
+from src.models.recommendation_engine import RecommendationEngine
+from src.models.bound_index import BoundIndex
+from src.utils.synthetic_catalog import generate_queries
+from src.utils.metrics import MetricsRegistry
+
+def test_bound_search_is_exact(artifact_dirs, monkeypatch):
+    """Same results as the exhaustive path for any top_k and weights, in several batches"""
+    print("\n=== Test: Bounded Search ===")
+    monkeypatch.setattr(recommendation_engine, 'BOUND_BATCH_ROWS', (4, 16))
+    plain = RecommendationEngine(metrics=MetricsRegistry(), **artifact_dirs)
+    metrics = MetricsRegistry()
+    bounded = RecommendationEngine(metrics=metrics, bound_search=True, text_score_cache_mb=4, **artifact_dirs)
+    bounded.bound_index = BoundIndex(bounded.blocks, block_rows=8)
+    queries = generate_queries(60, mix='uniform', seed=17) + [{'Description': 'tax filing and payroll'}, {}]
+    for query in queries:
+        for top_k in (1, 3, 50, 1000):
+            assert bounded.get_recommendations(query, top_k=top_k) == plain.get_recommendations(query, top_k=top_k)
+        weights = (2.0, 0.5, 3.0)
+        assert (bounded.get_recommendations(query, top_k=3, block_weights=weights)
+                == plain.get_recommendations(query, top_k=3, block_weights=weights))
+        assert bounded.search(query, top_k=5) == plain.search(query, top_k=5)
+
+    scored = metrics.snapshot()['recommendation_bound_scored_fraction']['values'][()]
+    assert scored['count'] and scored['sum'] / scored['count'] < 1.0
+    print(f"✓ {len(queries)} queries identical; {scored['sum'] / scored['count']:.0%} of candidates scored")
+
+    # KNN scores every candidate, as before
+    plain.ranking_method = bounded.ranking_method = 'knn'
+    for query in queries[:10]:
+        assert bounded.get_recommendations(query, top_k=3) == plain.get_recommendations(query, top_k=3)
+    with pytest.raises(ValueError):
+        RecommendationEngine(storage='int8', bound_search=True, **artifact_dirs)
+
+def test_block_bounds_hold(artifact_dirs):
+    """No row scores above its block's bound"""
+    engine = RecommendationEngine(metrics=MetricsRegistry(), **artifact_dirs)
+    index = BoundIndex(engine.blocks, block_rows=16)
+    assert sorted(index.order[index.order < index.n_rows].tolist()) == list(range(index.n_rows))
+    rows = np.arange(len(engine.blocks))
+    for query in generate_queries(30, mix='uniform', seed=4):
+        user_blocks = engine.encode_query(query)
+        for weights in ((1.0, 1.0, 10.0), (3.0, 1.0, 0.5)):
+            scores = engine.score_candidates(user_blocks, rows, weights, 'cosine')
+            bounds = index.upper_bounds(user_blocks, weights)
+            assert np.all(scores <= bounds[index.block_of] + 1e-9)
+    print(f"✓ bounds hold over {index.n_blocks} blocks")
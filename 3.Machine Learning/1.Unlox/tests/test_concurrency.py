@@ -0,0 +1,71 @@
+"""
+Concurrency Tests
+One shared engine answers concurrent queries exactly as it answers them serially;
+its artifacts are read-only and the NumPy filters match the pandas ones
+"""
+
+import sys
+import os
+import numpy as np
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.recommendation_engine import RecommendationEngine, top_k_positions
+from src.models.catalog_columns import PRICE_ORDER
+from src.utils.synthetic_catalog import generate_queries
+from src.utils.metrics import MetricsRegistry
+
+def pandas_filter(df, user_input):
+    """The engine's original DataFrame filters."""
+    if user_input.get('Target_Business_Type'):
+        df = df[df['Target_Business_Type'] == user_input['Target_Business_Type'].lower()]
+    if user_input.get('Price_Category'):
+        budget = PRICE_ORDER.get(user_input['Price_Category'].lower(), 2)
+        df = df[df['Price_Category'].map(PRICE_ORDER).fillna(2) <= budget]
+    if user_input.get('Location_Area'):
+        df = df[df['Location_Area'] == user_input['Location_Area'].lower()]
+    return df.index.tolist()
+
+@pytest.fixture(scope='module')
+def engine(artifact_dirs):
+    engine = RecommendationEngine(metrics=MetricsRegistry(), max_workers=8, **artifact_dirs)
+    yield engine
+    engine.shutdown()
+
+def test_concurrent_matches_serial(engine):
+    """submit() futures and raw threads give the serial answers"""
+    print("\n=== Test: Concurrent Queries ===")
+    queries = generate_queries(60, mix='uniform', seed=3)
+    calls = [(q, {'top_k': k, 'block_weights': w}) for q in queries for k, w in [(3, None), (10, (1, 1, 2))]]
+    serial = [engine.get_recommendations(q, **kwargs) for q, kwargs in calls]
+
+    futures = [engine.submit(q, **kwargs) for q, kwargs in calls]
+    assert [f.result() for f in futures] == serial
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        for _ in range(3):
+            assert list(pool.map(lambda call: engine.get_recommendations(call[0], **call[1]), calls)) == serial
+
+    with pytest.raises(AttributeError):
+        engine.submit({'Price_Category': 3}).result()
+    print(f"✓ {len(calls)} calls x 4 rounds identical to serial")
+
+def test_frozen_artifacts_and_filters(engine):
+    """Artifacts are read-only; NumPy filters select the same rows as pandas"""
+    for array in (*engine.blocks.blocks, engine.blocks.sq_norms, engine.catalog.price_rank,
+                  *engine.catalog.codes.values(), *engine.catalog.values.values()):
+        assert not array.flags.writeable
+
+    for query in generate_queries(100, mix='uniform', seed=4) + [{}, {'Location_Area': 'Atlantis'}]:
+        assert engine.filter_candidates(query).tolist() == pandas_filter(engine.df, query)
+
+def test_top_k_positions_is_stable():
+    """Partial selection keeps the stable-argsort order, ties included"""
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        scores = rng.integers(0, 5, size=rng.integers(1, 40)).astype(float)
+        for k in (0, 1, 3, 10, 50):
+            expected = np.argsort(-scores, kind='stable')[:k]
+            assert top_k_positions(scores, k).tolist() == expected.tolist()
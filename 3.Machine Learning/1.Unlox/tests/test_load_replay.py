@@ -0,0 +1,50 @@
+"""
+Load Replay Tests
+Threads and processes replay a workload against the engine and report throughput,
+latency, errors and contention indicators
+"""
+
+import sys
+import os
+
+# Add project root and benchmarks to path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, 'benchmarks'))
+
+from load_replay import run_threads, run_processes, run_pool, find_saturation, load_queries
+from src.models.recommendation_engine import RecommendationEngine
+from src.utils.metrics import MetricsRegistry
+
+def test_thread_replay(artifact_dirs):
+    """Closed and open loop replays complete every request and count failures"""
+    print("\n=== Test: Load Replay (threads) ===")
+    engine = RecommendationEngine(metrics=MetricsRegistry(), **artifact_dirs)
+    queries = load_queries(n_queries=50, seed=1)
+    # A malformed input (Price_Category must be a string) fails in the engine
+    queries[3] = dict(queries[3], Price_Category=3)
+
+    closed = run_threads(engine, queries, 3, requests=100)
+    assert closed['completed'] + closed['errors'] == 100
+    assert closed['errors'] == 2 and list(closed['error_types']) == ['AttributeError']
+    latency = closed['latency_ms']
+    assert latency['p50'] <= latency['p95'] <= latency['p99'] <= latency['max']
+    assert closed['service_ms'] == latency and 0 <= closed['off_cpu'] <= 1
+
+    opened = run_threads(engine, queries[4:], 2, rate=400, requests=40)
+    assert opened['completed'] == 40 and opened['errors'] == 0
+    # Open-loop latency includes the wait for a free worker
+    assert opened['latency_ms']['mean'] >= opened['service_ms']['mean']
+    print(f"✓ closed {closed['qps']:.0f} q/s, open p95 {opened['latency_ms']['p95']:.2f} ms")
+
+def test_process_replay_and_saturation(artifact_dirs):
+    """Each process loads its own engine (or attaches to the pool's); the request count is split between them"""
+    result = run_processes(artifact_dirs, load_queries(n_queries=20, seed=2), 2, requests=30)
+    assert result['completed'] == 30 and result['errors'] == 0 and result['mode'] == 'processes'
+
+    pooled = run_pool(artifact_dirs, load_queries(n_queries=20, seed=2), 1, requests=30)
+    assert pooled['completed'] == 30 and pooled['mode'] == 'pool' and pooled['memory_mb']['shared'] > 0
+
+    sweep = [{'workers': n, 'qps': qps} for n, qps in [(1, 100.0), (2, 190.0), (4, 200.0), (8, 150.0)]]
+    assert find_saturation(sweep)['workers'] == 2
+    assert [r['speedup'] for r in sweep] == [1.0, 1.9, 2.0, 1.5]
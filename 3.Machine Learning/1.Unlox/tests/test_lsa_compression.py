@@ -0,0 +1,42 @@
+"""
+LSA Compression Tests
+The engine can score text against the truncated-SVD projection of the TF-IDF block
+"""
+
+import sys
+import os
+import shutil
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.preprocessing.lsa_compression import build_lsa_artifacts
+from src.models.recommendation_engine import RecommendationEngine
+
+QUERY = {
+    'Target_Business_Type': 'Retail',
+    'Price_Category': 'Premium',
+    'Location_Area': 'remote',
+    'Language_Support': ['English'],
+    'Description': 'Annual tax filing and compliance',
+}
+
+def test_lsa_engine_tracks_full_engine(artifact_dirs, tmp_path):
+    """With enough components the compressed path ranks like the full path"""
+    print("\n=== Test: LSA Engine ===")
+    root = tmp_path / 'artifacts'
+    shutil.copytree(artifact_dirs['processed_dir'], root)
+    dirs = {'processed_dir': str(root), 'models_dir': str(root), 'cleaned_data_path': str(root / 'cleaned.csv')}
+
+    vocabulary = np.load(root / 'features_tfidf.npy').shape[1]
+    build_lsa_artifacts(str(root / 'features_tfidf.npy'), str(root), str(root), n_components=vocabulary - 1)
+
+    full = RecommendationEngine(**dirs).get_recommendations(QUERY, top_k=5)
+    compressed_engine = RecommendationEngine(use_lsa=True, **dirs)
+    compressed = compressed_engine.get_recommendations(QUERY, top_k=5)
+
+    assert compressed_engine.blocks.widths[2] == vocabulary - 1
+    assert compressed[0]['Service_Name'] == full[0]['Service_Name']
+    assert np.allclose([r['Match_Score'] for r in compressed], [r['Match_Score'] for r in full], atol=2.0)
+    print(f"✓ Top result '{full[0]['Service_Name']}' preserved with {vocabulary - 1} LSA dims")
@@ -0,0 +1,87 @@
+"""
+Metrics Tests
+Histograms and counters record what they are given, export in the Prometheus text format,
+and the engine fills its stage timings and request counters
+"""
+
+import sys
+import os
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.metrics import MetricsRegistry, NULL_TIMER
+from src.utils.synthetic_catalog import generate_queries
+from src.models.recommendation_engine import RecommendationEngine, ENGINE_STAGES
+
+QUERY = {
+    'Target_Business_Type': 'Retail',
+    'Location_Area': 'Remote',
+    'Description': 'Monthly payroll and salary disbursement support',
+}
+
+def test_histogram_counter_and_export():
+    """Bucket counts, interpolated quantiles, disabled no-ops and the exposition format"""
+    print("\n=== Test: Metrics Registry ===")
+    registry = MetricsRegistry()
+    stage = registry.histogram('stage_seconds', 'Time per "stage".', ['stage'], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        stage.labels(stage='filter').observe(value)
+    requests = registry.counter('requests_total', 'Requests.')
+    requests.inc()
+    requests.inc(2)
+
+    snapshot = registry.snapshot()
+    filter_seconds = snapshot['stage_seconds']['values'][('filter',)]
+    assert filter_seconds['count'] == 4 and filter_seconds['sum'] == pytest.approx(6.05)
+    assert filter_seconds['buckets'] == [(0.1, 1), (1.0, 3), (float('inf'), 4)]
+    # Median rank 2 lies halfway through the (0.1, 1.0] bucket
+    assert filter_seconds['p50'] == pytest.approx(0.55)
+    assert filter_seconds['p99'] == 1.0
+    assert snapshot['requests_total']['values'][()] == 3
+
+    with pytest.raises(ValueError):
+        registry.counter('stage_seconds')
+
+    text = registry.to_prometheus()
+    assert '# TYPE unlox_stage_seconds histogram' in text
+    assert '# HELP unlox_stage_seconds Time per "stage".' in text
+    assert 'unlox_stage_seconds_bucket{stage="filter",le="0.1"} 1' in text
+    assert 'unlox_stage_seconds_bucket{stage="filter",le="+Inf"} 4' in text
+    assert 'unlox_stage_seconds_count{stage="filter"} 4' in text
+    assert 'unlox_requests_total 3' in text
+
+    registry.enabled = False
+    assert stage.labels(stage='filter').time() is NULL_TIMER
+    requests.inc()
+    stage.labels(stage='filter').observe(1.0)
+    assert registry.snapshot()['requests_total']['values'][()] == 3
+    assert registry.snapshot()['stage_seconds']['values'][('filter',)]['count'] == 4
+    print(f"✓ p50 {filter_seconds['p50']:.3f} s, {len(text.splitlines())} exported lines")
+
+def test_engine_records_stages(artifact_dirs):
+    """Every stage is timed per request; empty answers are counted by reason"""
+    print("\n=== Test: Engine Instrumentation ===")
+    registry = MetricsRegistry()
+    engine = RecommendationEngine(metrics=registry, **artifact_dirs)
+    assert engine.get_recommendations(QUERY, top_k=3)
+    for query in generate_queries(2, mix='uniform', seed=2, zero_result_rate=1.0):
+        assert engine.get_recommendations(query) == []
+
+    snapshot = registry.snapshot()
+    assert snapshot['recommendation_requests_total']['values'][()] == 3
+    assert snapshot['recommendation_empty_results_total']['values'][('no_candidates',)] == 2
+    assert snapshot['recommendation_candidates']['values'][()]['count'] == 3
+    stages = snapshot['recommendation_stage_seconds']['values']
+    assert stages[('total',)]['count'] == 3 and stages[('filter',)]['count'] == 3
+    assert set(stages) == {(stage,) for stage in ENGINE_STAGES}
+    assert stages[('explain',)]['count'] >= 1
+    assert stages[('total',)]['sum'] >= stages[('score',)]['sum'] + stages[('rank',)]['sum']
+    assert set(snapshot['engine_load_seconds']['values']) >= {('encoders',), ('catalog',)}
+
+    registry.reset()
+    registry.enabled = False
+    engine.get_recommendations(QUERY, top_k=3)
+    assert registry.snapshot()['recommendation_stage_seconds']['values'] == {}
+    print(f"✓ total {stages[('total',)]['sum'] * 1000:.2f} ms over 3 requests")
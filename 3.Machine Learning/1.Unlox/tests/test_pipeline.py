@@ -0,0 +1,90 @@
+"""
+Pipeline Runner Tests
+Checks that unchanged steps are served from the cache and changed parameters re-run
+only the affected steps
+"""
+
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.preprocessing.pipeline import build_steps, run_pipeline, parse_args
+
+def make_raw_csv(path, n_rows=60):
+    rng = np.random.default_rng(1)
+    words = ['tax', 'filing', 'social', 'media', 'payroll', 'website', 'seo', 'legal', 'cloud']
+    pd.DataFrame({
+        'Service_ID': np.arange(n_rows),
+        'Service_Name': [f"Service {i}" for i in range(n_rows)],
+        'Description': [' '.join(rng.choice(words, size=5)) for _ in range(n_rows)],
+        'Target_Business_Type': rng.choice(['Clinic', 'Retail'], size=n_rows),
+        'Price_Category': rng.choice(['Low', 'High'], size=n_rows),
+        'Language_Support': rng.choice(['English', 'Both'], size=n_rows),
+        'Location_Area': rng.choice(['Delhi', 'Remote'], size=n_rows),
+        'Match_Quality': 'High',
+    }).to_csv(path, index=False)
+
+def run(tmp_path, *extra):
+    args = parse_args(['--raw', str(tmp_path / 'raw.csv'), '--cache-dir', str(tmp_path / 'cache'),
+                       '--cleaned-path', str(tmp_path / 'out' / 'cleaned.csv'),
+                       '--processed-dir', str(tmp_path / 'out'), '--models-dir', str(tmp_path / 'out'), *extra])
+    destinations = {'cleaned_path': args.cleaned_path, 'processed_dir': args.processed_dir, 'models_dir': args.models_dir}
+    report = run_pipeline(build_steps(vars(args)), cache_dir=args.cache_dir, destinations=destinations)
+    return {row['step']: row for row in report}
+
+def test_incremental_rebuild(tmp_path):
+    """Second run is fully cached; a parameter change re-runs downstream steps only"""
+    print("\n=== Test: Incremental Pipeline ===")
+    make_raw_csv(tmp_path / 'raw.csv')
+
+    first = run(tmp_path, '--legacy-matrix')
+    assert all(first[s]['status'] == 'ran' for s in ('clean', 'features', 'index'))
+    features = np.load(tmp_path / 'out' / 'features.npy')
+    tfidf = np.load(tmp_path / 'out' / 'features_tfidf.npy')
+    sq_norms = np.load(tmp_path / 'out' / 'block_sq_norms.npy')
+    assert np.array_equal(tfidf * 10.0, features[:, -tfidf.shape[1]:])
+    assert np.allclose(sq_norms @ [1.0, 1.0, 100.0], np.square(np.linalg.norm(features, axis=1)))
+
+    second = run(tmp_path, '--legacy-matrix')
+    assert all(row['status'] == 'cached' for row in second.values())
+    total = sum(row['seconds'] for row in second.values())
+    assert total < 1.0, f"No-op rebuild took {total:.3f}s"
+    print(f"✓ No-op rebuild in {total * 1000:.1f} ms")
+
+    third = run(tmp_path, '--legacy-matrix', '--max-features', '3')
+    assert third['clean']['status'] == 'cached'
+    assert third['features']['status'] == 'ran'
+    assert third['index']['status'] == 'ran'
+    assert np.load(tmp_path / 'out' / 'features_tfidf.npy').shape[1] < tfidf.shape[1]
+    print("✓ Parameter change re-ran features and index only")
+
+    # Without --legacy-matrix only the unweighted blocks are built
+    fourth = run(tmp_path, '--max-features', '3')
+    assert fourth['features']['status'] == 'ran'
+    built = tmp_path / 'cache' / 'features' / fourth['features']['key']
+    assert (built / 'features_tfidf.npy').exists() and not (built / 'features.npy').exists()
+    assert not (tmp_path / 'out' / 'features.npy').exists()
+    print("✓ features.npy no longer built or exported")
+
+def test_export_removes_dropped_outputs(tmp_path):
+    """Outputs of steps dropped from the build are removed from the export destinations"""
+    print("\n=== Test: Export Removes Stale Outputs ===")
+    make_raw_csv(tmp_path / 'raw.csv')
+    out = tmp_path / 'out'
+    (out).mkdir()
+    (out / 'notes.txt').write_text('not a pipeline output')
+
+    run(tmp_path, '--lsa-components', '2', '--quantize', 'int8', '--shards', '2')
+    optional = ['lsa.pkl', 'features_tfidf_lsa.npy', 'codes_int8.npy', 'quantizer_int8.pkl', 'shards']
+    assert all((out / name).exists() for name in optional)
+
+    rebuilt = run(tmp_path, '--max-features', '3')
+    assert rebuilt['export']['status'] == f"copied 7, removed {len(optional)}"
+    assert not any((out / name).exists() for name in optional)
+    assert (out / 'features_tfidf.npy').exists() and (out / 'notes.txt').exists()
+    assert run(tmp_path, '--max-features', '3')['export']['status'] == 'cached'
+    print(f"✓ removed {len(optional)} stale outputs, kept unrelated files")
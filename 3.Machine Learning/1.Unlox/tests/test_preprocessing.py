@@ -0,0 +1,242 @@
+"""
+Preprocessing Tests
+Validates data cleaning on small in-memory datasets (no artifacts needed)
+"""
+
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.preprocessing import data_cleaner
+from src.preprocessing.data_cleaner import (
+    clean_dataset, normalize_dataset, clean_file_in_chunks, FingerprintIndex, row_fingerprints
+)
+
+def make_raw_df():
+    return pd.DataFrame({
+        'Service_ID': [1, 2, 2, 3, 4, 1],
+        'Service_Name': ['Tax Filing', 'SEO Audit', 'SEO Audit', 'Payroll', 'Tax Filing', 'Tax Filing'],
+        'Description': ['File taxes ', 'Rank higher', 'Rank higher', 'Monthly payroll', 'File taxes', ' File taxes'],
+        'Target_Business_Type': ['Retail', 'E-commerce', ' e-commerce', 'Clinic', 'Retail', 'retail'],
+        'Price_Category': ['Low', 'High', 'high', 'Medium', 'Low', 'LOW'],
+        'Language_Support': ['English', 'Both', 'both', 'Hindi', 'English', 'english'],
+        'Location_Area': ['Delhi', 'Remote', 'remote', 'Mumbai', 'Delhi', 'delhi'],
+        'Match_Quality': ['High', 'Medium', 'medium', 'Low', 'High', 'high'],
+    })
+
+def test_fingerprint_dedup_matches_drop_duplicates():
+    """Fingerprint deduplication keeps exactly the rows drop_duplicates keeps"""
+    print("\n=== Test: Fingerprint Deduplication ===")
+    raw = make_raw_df()
+    cleaned = clean_dataset(raw)
+    expected = normalize_dataset(raw).drop_duplicates()
+
+    assert cleaned.index.tolist() == expected.index.tolist()
+    print(f"✓ Kept {len(cleaned)} of {len(raw)} rows")
+
+def test_index_persists_across_chunks(tmp_path):
+    """A saved index resumes deduplication in a later run"""
+    print("\n=== Test: Cross-Chunk Index ===")
+    raw = make_raw_df()
+    index = FingerprintIndex()
+    first = clean_dataset(raw.iloc[:3], index)
+    path = str(tmp_path / 'fingerprints.npy')
+    index.save(path)
+
+    resumed = FingerprintIndex.load(path)
+    second = clean_dataset(raw.iloc[3:], resumed)
+
+    assert len(first) + len(second) == len(clean_dataset(raw))
+    assert resumed.fingerprints.nbytes == 16 * len(resumed)
+    print(f"✓ {len(resumed)} unique fingerprints, {resumed.fingerprints.nbytes} bytes")
+
+def test_chunked_file_cleaning(tmp_path, capsys):
+    """Streaming the CSV in chunks reports the same duplicate count as one pass"""
+    print("\n=== Test: Chunked File Cleaning ===")
+    raw_path = tmp_path / 'raw.csv'
+    out_path = tmp_path / 'cleaned.csv'
+    make_raw_df().to_csv(raw_path, index=False)
+    capsys.readouterr()
+
+    clean_dataset(pd.read_csv(raw_path, dtype=str))
+    single_pass = capsys.readouterr().out.splitlines()[0]
+
+    written = clean_file_in_chunks(str(raw_path), str(out_path), chunksize=2,
+                                   fingerprint_path=str(tmp_path / 'fp.npy'))
+    chunked = capsys.readouterr().out.splitlines()[0]
+
+    assert chunked == single_pass
+    assert len(pd.read_csv(out_path)) == written
+
+    # Re-running on the same input finds nothing new
+    assert clean_file_in_chunks(str(raw_path), str(out_path), chunksize=2,
+                                fingerprint_path=str(tmp_path / 'fp.npy')) == 0
+    assert len(pd.read_csv(out_path)) == written
+    print(f"✓ {single_pass}")
+
+def test_chunked_cleaning_resumes_after_crash(tmp_path, monkeypatch, capsys):
+    """A run killed between writing a chunk and its checkpoint resumes without duplicates"""
+    print("\n=== Test: Crash-Safe Resume ===")
+    raw_path, out_path, checkpoint = tmp_path / 'raw.csv', tmp_path / 'cleaned.csv', str(tmp_path / 'fp.npz')
+    make_raw_df().to_csv(raw_path, index=False)
+    reference = tmp_path / 'reference.csv'
+    expected = clean_file_in_chunks(str(raw_path), str(reference), chunksize=2)
+
+    save_checkpoint = data_cleaner.save_checkpoint
+    saves = []
+
+    def crash_on_second(*args):
+        saves.append(args)
+        if len(saves) == 2:
+            raise KeyboardInterrupt
+        save_checkpoint(*args)
+
+    monkeypatch.setattr(data_cleaner, 'save_checkpoint', crash_on_second)
+    with pytest.raises(KeyboardInterrupt):
+        clean_file_in_chunks(str(raw_path), str(out_path), chunksize=2, fingerprint_path=checkpoint)
+    monkeypatch.setattr(data_cleaner, 'save_checkpoint', save_checkpoint)
+    capsys.readouterr()
+
+    # Only the rows after the checkpoint are processed; chunk 2 and 3 hold 2 duplicates
+    written = clean_file_in_chunks(str(raw_path), str(out_path), chunksize=2, fingerprint_path=checkpoint)
+    assert capsys.readouterr().out.splitlines()[0] == "Removed 2 duplicate rows."
+    assert out_path.read_text() == reference.read_text()
+    assert len(pd.read_csv(out_path)) == expected == written + 2
+    print(f"✓ resumed after a crash: {len(pd.read_csv(out_path))} rows, no duplicates")
+
+def test_fingerprints_are_deterministic():
+    """Identical rows hash to identical 128-bit fingerprints"""
+    df = pd.DataFrame({'a': ['x', 'x', 'y'], 'b': [1, 1, 1]})
+    fps = row_fingerprints(df)
+    assert fps[0] == fps[1]
+    assert fps[0] != fps[2]
+
+def test_near_duplicates_are_clustered():
+    """Listings differing in case, punctuation or one word share a cluster"""
+    print("\n=== Test: Near-Duplicate Clusters ===")
+    from src.preprocessing.near_duplicates import remove_near_duplicates
+
+    catalog = pd.DataFrame({
+        'Service_Name': ['Social Media Setup', 'SOCIAL MEDIA SETUP!!', 'Social Media Setup', 'Payroll Processing'],
+        'Description': [
+            'Facebook and Instagram business profile creation with monthly content planning',
+            'Facebook and Instagram business profile creation, with monthly content planning.',
+            'Facebook and Instagram business profile creation with weekly content planning',
+            'Monthly salary calculation, payslips and statutory compliance filing',
+        ],
+    })
+    collapsed, clusters = remove_near_duplicates(catalog, threshold=0.7)
+
+    assert collapsed.index.tolist() == [0, 3]
+    assert clusters['Cluster_ID'].tolist() == [0, 0, 0]
+    print(f"✓ Collapsed {len(catalog)} listings into {len(collapsed)}")
+
+def test_lsh_pairs_every_member_of_a_bucket():
+    """Bucket members are paired with each other, not only with the bucket's first member"""
+    from src.preprocessing.near_duplicates import lsh_candidate_pairs
+
+    # One band: rows 0, 2, 3 share a bucket, row 1 is alone
+    signatures = np.array([[1, 1], [2, 2], [1, 1], [1, 1]], dtype=np.uint32)
+    pairs = lsh_candidate_pairs(signatures, bands=1, rows=2)
+    assert sorted(map(tuple, pairs.tolist())) == [(0, 2), (0, 3), (2, 3)]
+
+    # Larger buckets are chained through a window of following members
+    signatures = np.ones((10, 2), dtype=np.uint32)
+    pairs = lsh_candidate_pairs(signatures, bands=1, rows=2, max_neighbours=2)
+    assert sorted(map(tuple, pairs.tolist())) == sorted([(i, i + 1) for i in range(9)] + [(i, i + 2) for i in range(8)])
+
+def test_process_features_layout():
+    """Feature blocks match the encoders and the input frame is left untouched"""
+    print("\n=== Test: Feature Matrix Layout ===")
+    from src.preprocessing.feature_engineering import process_features
+
+    cleaned = clean_dataset(make_raw_df())
+    before = cleaned.copy()
+    matrix, service_ids, (ohe, tfidf), names = process_features(cleaned)
+    threaded, _, _, _ = process_features(cleaned, n_jobs=3)
+
+    pd.testing.assert_frame_equal(cleaned, before)
+    assert np.array_equal(matrix, threaded)
+    assert matrix.shape == (len(cleaned), len(names))
+
+    n_ohe = len(ohe.get_feature_names_out())
+    assert np.array_equal(matrix[:, 5:5 + n_ohe], ohe.transform(cleaned[['Target_Business_Type', 'Location_Area']]))
+    # Unweighted: the text boost is a query-time block weight
+    assert np.array_equal(matrix[:, 5 + n_ohe:], tfidf.transform(cleaned['Description']).toarray())
+
+    lang = cleaned['Language_Support'].tolist()
+    assert matrix[:, 1].tolist() == [1.0 if l in ('english', 'both') else 0.0 for l in lang]
+    assert matrix[:, 4].tolist() == [1.0 if l == 'remote' else 0.0 for l in cleaned['Location_Area']]
+    print(f"✓ Feature matrix {matrix.shape}")
+
+def test_out_of_core_build_matches_in_memory(tmp_path):
+    """Chunked memmap build produces the same blocks and equivalent encoders"""
+    print("\n=== Test: Out-of-Core Feature Build ===")
+    from src.preprocessing.feature_engineering import process_features, process_features_out_of_core
+
+    rng = np.random.default_rng(0)
+    n_rows = 300
+    # More distinct terms than max_features so vocabulary selection is exercised
+    descriptions = [' '.join(f"term{t}" for t in rng.integers(0, 700, size=8)) + ' tax filing' for _ in range(n_rows)]
+    cleaned = pd.DataFrame({
+        'Service_ID': np.arange(n_rows),
+        'Description': descriptions,
+        'Target_Business_Type': rng.choice(['clinic', 'retail', 'e-commerce'], size=n_rows),
+        'Price_Category': rng.choice(['low', 'medium', 'high', 'premium'], size=n_rows),
+        'Language_Support': rng.choice(['english', 'hindi', 'both', 'regional'], size=n_rows),
+        'Location_Area': rng.choice(['delhi', 'remote'], size=n_rows),
+    })
+    path = tmp_path / 'cleaned.csv'
+    cleaned.to_csv(path, index=False)
+
+    expected, expected_ids, (ohe, tfidf), expected_names = process_features(pd.read_csv(path))
+    blocks, service_ids, (ohe_ooc, tfidf_ooc), names = process_features_out_of_core(
+        str(path), processed_dir=str(tmp_path / 'processed'), chunksize=37)
+    matrix = np.hstack(blocks)
+
+    assert all(isinstance(block, np.memmap) for block in blocks)
+    assert np.array_equal(names, expected_names)
+    assert np.array_equal(service_ids, expected_ids)
+    assert np.allclose(matrix, expected)
+    assert np.allclose(np.load(tmp_path / 'processed' / 'features_tfidf.npy'), expected[:, -blocks[2].shape[1]:])
+    assert not os.path.exists(tmp_path / 'processed' / 'features.npy')
+
+    # Encoders behave the same on unseen user input
+    query = ['tax filing for term5 and term600']
+    assert np.allclose(tfidf_ooc.transform(query).toarray(), tfidf.transform(query).toarray())
+    assert [list(c) for c in ohe_ooc.categories_] == [list(c) for c in ohe.categories_]
+    print(f"✓ Out-of-core matrix {matrix.shape} matches in-memory build")
+
+def test_out_of_core_build_keeps_missing_categories(tmp_path):
+    """Missing categorical values are a one-hot column in both builds, even when a column is all missing"""
+    print("\n=== Test: Out-of-Core Build With Missing Categories ===")
+    from src.preprocessing.feature_engineering import process_features, process_features_out_of_core
+
+    n_rows = 120
+    cleaned = pd.DataFrame({
+        'Service_ID': np.arange(n_rows),
+        'Description': ['tax filing and payroll'] * n_rows,
+        'Target_Business_Type': ['clinic', 'retail', 'e-commerce'] * (n_rows // 3),
+        'Price_Category': ['low'] * n_rows,
+        'Language_Support': ['english'] * n_rows,
+        'Location_Area': ['delhi', 'remote'] * (n_rows // 2),
+    })
+    cleaned.loc[100, 'Location_Area'] = np.nan  # in the last chunk only
+    all_missing = cleaned.assign(Target_Business_Type=np.nan)
+
+    for name, frame in [('one_missing', cleaned), ('all_missing', all_missing)]:
+        path = tmp_path / f'{name}.csv'
+        frame.to_csv(path, index=False)
+        expected, _, (ohe, _), expected_names = process_features(pd.read_csv(path))
+        blocks, _, (ohe_ooc, _), names = process_features_out_of_core(
+            str(path), processed_dir=str(tmp_path / name), chunksize=37)
+
+        assert np.array_equal(names, expected_names)
+        assert np.allclose(np.hstack(blocks), expected)
+        assert all(pd.Index(a).equals(pd.Index(b)) for a, b in zip(ohe_ooc.categories_, ohe.categories_))
+        print(f"✓ {name}: {len(names)} columns in both builds")
@@ -0,0 +1,153 @@
+"""
+Process Pool Tests
+Artifacts shared through shared memory give the same recommendations as a loaded engine,
+and the process pool answers requests, reports errors and survives worker crashes
+"""
+
+import sys
+import os
+import time
+import signal
+import pickle
+import subprocess
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.recommendation_engine import RecommendationEngine
+from src.models.shared_artifacts import SharedArtifacts, attach
+from src.models.process_pool import EngineProcessPool, WorkerCrashedError
+from src.utils.synthetic_catalog import generate_queries
+from src.utils.metrics import MetricsRegistry
+
+def test_shared_artifacts_round_trip(artifact_dirs):
+    """An engine on attached shared-memory views ranks exactly like the loaded one"""
+    print("\n=== Test: Shared Artifacts ===")
+    engine = RecommendationEngine(metrics=MetricsRegistry(), **artifact_dirs)
+    queries = generate_queries(40, mix='uniform', seed=8)
+    with SharedArtifacts.from_engine(engine) as shared:
+        attached = attach(shared.spec)
+        shared_engine = RecommendationEngine(metrics=MetricsRegistry(), artifacts=attached,
+                                             models_dir=artifact_dirs['models_dir'])
+        assert shared_engine.df is None and not attached.blocks.blocks[2].flags.writeable
+        for query in queries:
+            for method in ('cosine', 'knn'):
+                engine.ranking_method = shared_engine.ranking_method = method
+                assert shared_engine.get_recommendations(query, top_k=5) == engine.get_recommendations(query, top_k=5)
+        query = {'Description': 'tax filing and payroll'}
+        assert (shared_engine.get_recommendations(query, profile=True)[1]['ranked']
+                == engine.get_recommendations(query, profile=True)[1]['ranked'])
+        del shared_engine
+        attached.close()
+        print(f"✓ {len(queries)} queries identical on {shared.nbytes / 1e3:.0f} kB of shared memory")
+
+    with pytest.raises(FileNotFoundError):
+        attach(shared.spec)
+    with pytest.raises(ValueError):
+        RecommendationEngine(artifacts=attached, storage='int8', **artifact_dirs)
+
+# A worker with its own resource tracker (not spawned from the owner): attach, answer, wait
+ATTACH_WORKER = """
+import pickle, sys, time
+from src.models.recommendation_engine import RecommendationEngine
+from src.models.shared_artifacts import attach
+from src.utils.metrics import MetricsRegistry
+spec, dirs, query = pickle.load(sys.stdin.buffer)
+artifacts = attach(spec, untrack=True)
+engine = RecommendationEngine(metrics=MetricsRegistry(), artifacts=artifacts, **dirs)
+print(engine.get_recommendations(query, top_k=3)[0]['Service_Name'], flush=True)
+time.sleep(60)
+"""
+
+def test_killed_worker_leaves_segment(artifact_dirs):
+    """A killed worker does not unlink the segment, so its replacement can still attach"""
+    print("\n=== Test: Killed Worker Keeps Shared Segment ===")
+    engine = RecommendationEngine(metrics=MetricsRegistry(), **artifact_dirs)
+    query = generate_queries(1, mix='uniform', seed=3)[0]
+    expected = engine.get_recommendations(query, top_k=3)[0]['Service_Name']
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    with SharedArtifacts.from_engine(engine) as shared:
+        for _ in range(2):
+            worker = subprocess.Popen([sys.executable, '-c', ATTACH_WORKER], cwd=root,
+                                      stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            worker.stdin.write(pickle.dumps((shared.spec, artifact_dirs, query)))
+            worker.stdin.close()
+            assert worker.stdout.readline().decode().strip() == expected
+            worker.send_signal(signal.SIGKILL)
+            worker.wait(timeout=30)
+            # The dead worker's resource tracker exits with it; give it time to clean up
+            time.sleep(0.5)
+        attached = attach(shared.spec)
+        assert attached.service_ids.tolist() == engine.service_ids.tolist()
+        attached.close()
+    print(f"✓ segment outlived 2 killed workers (Python {sys.version_info.major}.{sys.version_info.minor})")
+
+# An owner whose pool workers attach to its segment, killed while they are attached
+POOL_OWNER = """
+import pickle, sys, time
+from src.models.process_pool import EngineProcessPool
+dirs = pickle.load(sys.stdin.buffer)
+pool = EngineProcessPool(workers=1, **dirs)
+print(pool.shared.spec['name'], flush=True)
+time.sleep(60)
+"""
+
+def test_killed_owner_removes_segment(artifact_dirs):
+    """Pool workers leave the segment on the owner's resource tracker, which removes it if the owner is killed"""
+    print("\n=== Test: Killed Owner Removes Shared Segment ===")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    owner = subprocess.Popen([sys.executable, '-c', POOL_OWNER], cwd=root,
+                             stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    owner.stdin.write(pickle.dumps(artifact_dirs))
+    owner.stdin.close()
+    name = owner.stdout.readline().decode().strip()
+    assert name and os.path.exists(f'/dev/shm/{name}')
+    owner.send_signal(signal.SIGKILL)
+    owner.wait(timeout=30)
+    # The worker exits once the owner is gone, then the tracker unlinks what is registered
+    deadline = time.monotonic() + 60
+    while os.path.exists(f'/dev/shm/{name}') and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert not os.path.exists(f'/dev/shm/{name}')
+    print("✓ segment removed after the owner was killed")
+
+def test_process_pool(artifact_dirs):
+    """Workers answer like the engine; a killed worker fails at most its own request and is replaced"""
+    print("\n=== Test: Process Pool ===")
+    engine = RecommendationEngine(metrics=MetricsRegistry(), **artifact_dirs)
+    queries = generate_queries(60, mix='uniform', seed=9)
+    expected = [engine.get_recommendations(query, top_k=3) for query in queries]
+
+    with EngineProcessPool(workers=2, **artifact_dirs) as pool:
+        assert [f.result() for f in [pool.submit(q, top_k=3) for q in queries]] == expected
+        assert pool.get_recommendations_batch(queries[:10], top_k=3) == expected[:10]
+        with pytest.raises(AttributeError):
+            pool.get_recommendations({'Price_Category': 3})
+        with pytest.raises(ValueError):
+            pool.submit(queries[0], profile=True)
+
+        victim = pool.pids[0]
+        futures = [pool.submit(q, top_k=3) for q in queries]
+        os.kill(victim, signal.SIGKILL)
+        crashed = 0
+        for future, results in zip(futures, expected):
+            try:
+                assert future.result(timeout=60) == results
+            except WorkerCrashedError:
+                crashed += 1
+        assert crashed <= 1
+        deadline = time.monotonic() + 60
+        while pool.restarts < 1 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert pool.restarts == 1 and victim not in pool.pids
+        assert pool.get_recommendations(queries[0], top_k=3) == expected[0]
+        spec = pool.shared.spec
+    print(f"✓ crash failed {crashed} request(s), worker restarted")
+
+    # Closing removes the shared segment
+    with pytest.raises(FileNotFoundError):
+        attach(spec)
+    with pytest.raises(RuntimeError):
+        pool.submit(queries[0])
@@ -0,0 +1,60 @@
+"""
+Query Profile Tests
+profile=True returns the normal results plus a trace whose filter counts, block
+contributions and threshold drops are consistent with them
+"""
+
+import sys
+import os
+import numpy as np
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.recommendation_engine import RecommendationEngine, SCORE_THRESHOLD
+from src.utils.metrics import MetricsRegistry
+
+QUERY = {
+    'Target_Business_Type': 'E-commerce',
+    'Price_Category': 'High',
+    'Location_Area': 'remote',
+    'Language_Support': ['English'],
+    'Description': 'Social media marketing and Instagram page setup',
+}
+
+@pytest.mark.parametrize('ranking_method', ['cosine', 'knn'])
+def test_trace_matches_results(artifact_dirs, ranking_method):
+    """Same results as the normal path; contributions reproduce each score"""
+    print(f"\n=== Test: Query Profile ({ranking_method}) ===")
+    engine = RecommendationEngine(ranking_method=ranking_method, metrics=MetricsRegistry(), **artifact_dirs)
+    expected = engine.get_recommendations(QUERY, top_k=20)
+    results, trace = engine.get_recommendations(QUERY, top_k=20, profile=True)
+    assert results == expected
+
+    counts = [f['candidates'] for f in trace['filters']]
+    assert [f['filter'] for f in trace['filters']] == ['catalog', 'Target_Business_Type', 'Price_Category', 'Location_Area']
+    assert counts == sorted(counts, reverse=True) and counts[-1] == trace['candidates']
+    assert trace['ranking']['method'] == ranking_method and trace['ranking']['rerank_shortlist'] is None
+    assert set(trace['timings_ms']) == {'filter', 'encode', 'score', 'rank', 'format', 'total'}
+
+    ranked = trace['ranked']
+    assert len(ranked) == min(20, trace['candidates'])
+    assert [r['Service_ID'] for r in ranked if r['kept']] == [r['Service_ID'] for r in results]
+    assert trace['dropped_below_threshold'] == len(ranked) - len(results)
+    for r in ranked:
+        total = sum(r['contributions'].values())
+        score = total if ranking_method == 'cosine' else 1.0 / (1.0 + np.sqrt(total))
+        assert score == pytest.approx(r['score'])
+        assert r['kept'] == (r['score'] >= SCORE_THRESHOLD)
+    print(f"✓ {trace['candidates']} candidates, {len(results)} kept, {trace['dropped_below_threshold']} dropped")
+
+def test_empty_trace_and_metrics(artifact_dirs):
+    """Zero candidates stop after the filters; profiled calls skip the request metrics"""
+    registry = MetricsRegistry()
+    engine = RecommendationEngine(metrics=registry, **artifact_dirs)
+    results, trace = engine.get_recommendations({'Location_Area': 'Atlantis'}, profile=True)
+    assert results == [] and trace['candidates'] == 0 and trace['ranked'] == []
+    assert trace['filters'][-1] == {'filter': 'Location_Area', 'value': 'atlantis', 'candidates': 0}
+    assert 'total' in trace['timings_ms'] and 'score' not in trace['timings_ms']
+    assert registry.snapshot()['recommendation_requests_total']['values'] == {}
@@ -0,0 +1,67 @@
+"""
+Quantized Storage Tests
+8-bit codes approximate the feature blocks, and shortlist re-ranking restores the exact ranking
+"""
+
+import sys
+import os
+import shutil
+import numpy as np
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.feature_blocks import FeatureBlocks
+from src.models.quantization import ScalarQuantizer, ProductQuantizer, QuantizedBlocks, build_quantized_artifacts
+from src.models.recommendation_engine import RecommendationEngine
+
+# No hard filters, so every service is a candidate and the shortlist is a real cut
+QUERY = {
+    'Price_Category': 'Medium',
+    'Language_Support': ['Hindi'],
+    'Description': 'Monthly payroll and salary disbursement support',
+}
+
+def test_quantizer_error_bounds():
+    """Scalar codes are within half a step; PQ is lossless for few distinct sub-vectors"""
+    rng = np.random.default_rng(0)
+    block = rng.random((500, 12))
+    scalar = ScalarQuantizer.fit(block, chunksize=64)
+    assert np.all(np.abs(scalar.decode(scalar.encode(block)) - block) <= scalar.scale / 2 + 1e-12)
+
+    query = rng.random(12)
+    assert np.allclose(scalar.dot(scalar.encode(block), query), block @ query, atol=np.abs(query) @ scalar.scale)
+
+    sparse = rng.choice([0.0, 0.5, 1.0], size=(500, 10), p=[0.8, 0.1, 0.1])
+    pq = ProductQuantizer.fit(sparse, sub_dim=2)
+    codes = pq.encode(sparse)
+    assert codes.shape == (500, 5)
+    assert np.allclose(pq.decode(codes), sparse)
+    assert np.allclose(pq.dot(codes, query[:10]), sparse @ query[:10])
+
+@pytest.mark.parametrize('method', ['int8', 'pq'])
+def test_quantized_engine_matches_exact(artifact_dirs, tmp_path, method):
+    """Re-ranked results equal the full-precision results"""
+    print(f"\n=== Test: Quantized Storage ({method}) ===")
+    root = tmp_path / 'artifacts'
+    shutil.copytree(artifact_dirs['processed_dir'], root)
+    dirs = {'processed_dir': str(root), 'models_dir': str(root), 'cleaned_data_path': str(root / 'cleaned.csv')}
+    build_quantized_artifacts(str(root), str(root), method=method)
+
+    for ranking_method in ('cosine', 'knn'):
+        exact = RecommendationEngine(ranking_method=ranking_method, **dirs).get_recommendations(QUERY, top_k=5)
+        engine = RecommendationEngine(ranking_method=ranking_method, storage=method, **dirs)
+        assert isinstance(engine.blocks.blocks[2], np.memmap)
+        assert engine.get_recommendations(QUERY, top_k=5) == exact
+
+    full = FeatureBlocks.load(str(root))
+    assert engine.quantized.nbytes * 8 <= sum(block.nbytes for block in full.blocks)
+    print(f"✓ {method}: {engine.quantized.nbytes} bytes of codes, top-5 identical to exact")
+
+def test_in_memory_codes_match_built_artifacts(artifact_dirs, tmp_path):
+    """QuantizedBlocks.from_blocks produces the same codes as the memmapped build"""
+    blocks = FeatureBlocks.load(artifact_dirs['processed_dir'])
+    quantized = QuantizedBlocks.from_blocks(blocks, method='int8', chunksize=64)
+    build_quantized_artifacts(artifact_dirs['processed_dir'], str(tmp_path), method='int8', chunksize=37)
+    assert np.array_equal(quantized.codes, QuantizedBlocks.load(str(tmp_path), 'int8').codes)
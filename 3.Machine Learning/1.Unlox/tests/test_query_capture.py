@@ -0,0 +1,106 @@
+"""
+Query Capture Tests
+Served queries are captured off the request path, sampled, bounded and rotated,
+and a capture replays into the same recommendations
+"""
+
+import sys
+import os
+import time
+import queue
+import threading
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.canonical import canonicalize_input
+from src.utils.query_capture import QueryCapture, read_capture, load_workload
+from src.utils.synthetic_catalog import generate_queries, write_queries
+from src.models.recommendation_engine import RecommendationEngine
+from src.utils.metrics import MetricsRegistry
+
+def test_capture_and_replay(artifact_dirs, tmp_path):
+    """Every served call is recorded and replaying the capture gives the same results"""
+    print("\n=== Test: Query Capture ===")
+    path = str(tmp_path / 'queries.jsonl')
+    queries = generate_queries(30, mix='skewed', seed=5)
+    with QueryCapture(path) as capture:
+        engine = RecommendationEngine(metrics=MetricsRegistry(), capture=capture, **artifact_dirs)
+        served = [engine.get_recommendations(q, top_k=3) for q in queries]
+        engine.get_recommendations(queries[0], top_k=2, block_weights=(1, 1, 1))
+    assert capture.captured == 31 and capture.dropped == 0
+
+    records = read_capture(path)
+    assert [r['input'] for r in records[:30]] == [canonicalize_input(q) for q in queries]
+    assert [r['ids'] for r in records[:30]] == [[r['Service_ID'] for r in results] for results in served]
+    assert records[0]['method'] == 'cosine' and records[0]['top_k'] == 3 and 'weights' not in records[0]
+    assert records[-1]['weights'] == [1, 1, 1]
+
+    replay = RecommendationEngine(metrics=MetricsRegistry(), **artifact_dirs)
+    for (user_input, top_k, weights), record in zip(load_workload(path, with_options=True), records):
+        results = replay.get_recommendations(user_input, top_k=top_k, block_weights=weights)
+        assert [r['Service_ID'] for r in results] == record['ids']
+
+    # Generated workloads load through the same reader
+    write_queries(str(tmp_path / 'plain.jsonl'), queries)
+    assert load_workload(str(tmp_path / 'plain.jsonl')) == queries
+    print(f"✓ {len(records)} captured, replayed identically")
+
+def test_sampling_and_full_queue(tmp_path):
+    """Sampling keeps about the requested share; a full queue drops without blocking"""
+    with QueryCapture(str(tmp_path / 'sampled.jsonl'), sample_rate=0.25, seed=1) as capture:
+        kept = sum(capture.record({'Description': str(i)}, 5, 'cosine', []) for i in range(2_000))
+    assert 400 < kept < 600 and capture.captured == kept
+
+    release = threading.Event()
+    capture = QueryCapture(str(tmp_path / 'blocked.jsonl'), max_queue=10)
+    serialize = capture._serialize
+    capture._serialize = lambda item: release.wait() and serialize(item)
+    start = time.perf_counter()
+    queued = [capture.record({'Description': str(i)}, 5, 'cosine', []) for i in range(100)]
+    assert time.perf_counter() - start < 0.5
+    assert capture.dropped > 0 and queued.count(False) == capture.dropped
+    release.set()
+    capture.close()
+    assert capture.captured == queued.count(True)
+    assert not capture.record({'Description': 'late'}, 5, 'cosine', [])
+
+def test_record_copies_input_and_counts_drops(tmp_path):
+    """A caller changing its input after record() does not change the capture; concurrent drops all count"""
+    release = threading.Event()
+    capture = QueryCapture(str(tmp_path / 'copied.jsonl'))
+    serialize = capture._serialize
+    capture._serialize = lambda item: release.wait() and serialize(item)
+    user_input = {'Description': 'Tax Filing', 'Language_Support': ['Hindi']}
+    assert capture.record(user_input, 5, 'cosine', [])
+    user_input['Language_Support'].append('English')
+    user_input['Description'] = 'payroll'
+    release.set()
+    capture.close()
+    assert read_capture(str(tmp_path / 'copied.jsonl'))[0]['input'] == {'Description': 'tax filing',
+                                                                        'Language_Support': ['hindi']}
+
+    capture = QueryCapture(str(tmp_path / 'full.jsonl'))
+    def full(item):
+        raise queue.Full
+    capture._queue.put_nowait = full
+    threads = [threading.Thread(target=lambda: [capture.record({}, 5, 'cosine', []) for _ in range(2_000)])
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    capture.close()
+    assert capture.dropped == 16_000
+
+def test_rotation(tmp_path):
+    """Rotated files are read back oldest first"""
+    path = str(tmp_path / 'rotating.jsonl')
+    with QueryCapture(path, max_bytes=1_000, backup_count=50) as capture:
+        for i in range(200):
+            capture.record({'Description': f'query {i}'}, 5, 'knn', [{'Service_ID': 1001 + i}])
+            if i % 20 == 0:
+                capture.flush()
+    assert os.path.exists(path + '.2')
+    records = read_capture(path)
+    assert [r['ids'][0] for r in records] == list(range(1001, 1201))
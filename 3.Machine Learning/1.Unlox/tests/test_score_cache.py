@@ -0,0 +1,81 @@
+"""
+Text Score Cache Tests
+Re-querying a description with other filters reuses its cached text-block scores and ranks
+exactly as without the cache; the cache stays within its memory budget
+"""
+
+import sys
+import os
+import time
+import shutil
+import numpy as np
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.preprocessing.lsa_compression import build_lsa_artifacts
+from src.models.recommendation_engine import RecommendationEngine
+from src.models.score_cache import TextScoreCache, TextScores
+from src.utils.synthetic_catalog import generate_queries
+from src.utils.metrics import MetricsRegistry
+
+FOLLOW_UPS = [{}, {'Price_Category': 'Low'}, {'Location_Area': 'Remote'}, {'Language_Support': ['Hindi']},
+              {'Price_Category': 'Premium', 'Location_Area': 'Delhi'}]
+
+def sessions(n, seed):
+    """Each query followed by re-submissions of its description with other filters"""
+    return [dict(query, **change) for query in generate_queries(n, mix='uniform', seed=seed) for change in FOLLOW_UPS]
+
+def test_cached_results_are_identical(artifact_dirs):
+    """Cosine, KNN and budgeted queries rank the same with and without the cache"""
+    print("\n=== Test: Text Score Cache ===")
+    metrics = MetricsRegistry()
+    plain = RecommendationEngine(metrics=MetricsRegistry(), **artifact_dirs)
+    cached = RecommendationEngine(metrics=metrics, text_score_cache_mb=16, **artifact_dirs)
+    queries = sessions(12, seed=5) + [{}, {'Description': 'tax filing and payroll'}]
+    for method in ('cosine', 'knn'):
+        plain.ranking_method = cached.ranking_method = method
+        for query in queries:
+            assert cached.get_recommendations(query, top_k=5) == plain.get_recommendations(query, top_k=5)
+            assert (cached.get_recommendations(query, top_k=5, deadline=time.monotonic() + 60)
+                    == plain.get_recommendations(query, top_k=5))
+
+    cache = cached.text_scores
+    # One miss per description; queries that filter out every row never look it up
+    assert cache.misses <= len({q.get('Description', '') for q in queries}) < cache.hits
+    assert 0 < cache.rows_reused < cache.rows_served
+    values = metrics.snapshot()['text_score_cache_requests_total']['values']
+    assert values[('hit',)] == cache.hits and values[('miss',)] == cache.misses
+    print(f"✓ {len(queries)} queries identical; {cache.rows_reused / cache.rows_served:.0%} of text scores reused")
+
+def test_cached_lsa_results_are_identical(artifact_dirs, tmp_path):
+    """With use_lsa the cache holds the projected text block"""
+    root = tmp_path / 'artifacts'
+    shutil.copytree(artifact_dirs['processed_dir'], root)
+    dirs = {'processed_dir': str(root), 'models_dir': str(root), 'cleaned_data_path': str(root / 'cleaned.csv')}
+    build_lsa_artifacts(str(root / 'features_tfidf.npy'), str(root), str(root), n_components=16)
+
+    plain = RecommendationEngine(use_lsa=True, metrics=MetricsRegistry(), **dirs)
+    cached = RecommendationEngine(use_lsa=True, metrics=MetricsRegistry(), text_score_cache_mb=16, **dirs)
+    for query in sessions(6, seed=9):
+        assert cached.get_recommendations(query, top_k=5) == plain.get_recommendations(query, top_k=5)
+    assert cached.text_scores.hits and cached.text_scores.rows_reused
+    print("✓ LSA queries identical with the cache")
+
+def test_cache_evicts_by_memory(artifact_dirs):
+    """Least recently used descriptions are evicted beyond the budget; quantized storage is refused"""
+    entry_bytes = TextScores(np.zeros((1, 8)), 1000).nbytes
+    cache = TextScoreCache(3 * entry_bytes, metrics=MetricsRegistry())
+    for key in 'abc':
+        cache.put(key, cache.new_entry(np.zeros((1, 8)), 1000))
+    assert cache.get('a') is not None  # 'b' is now the least recently used
+    cache.put('d', cache.new_entry(np.zeros((1, 8)), 1000))
+    assert len(cache) == 3 and cache.nbytes == 3 * entry_bytes
+    assert cache.get('b') is None and cache.get('a') is not None
+    cache.put('huge', cache.new_entry(np.zeros((1, 8)), 10_000))
+    assert cache.get('huge') is None and len(cache) == 3
+
+    with pytest.raises(ValueError):
+        RecommendationEngine(storage='int8', text_score_cache_mb=16, **artifact_dirs)
+    print(f"✓ cache held {len(cache)} entries in {cache.nbytes} bytes")
@@ -0,0 +1,130 @@
+"""
+Sharding Tests
+Shards built from the catalog and searched scatter-gather give exactly the unsharded
+engine's results, over worker processes and sockets, and slow shards are left out
+"""
+
+import sys
+import os
+import time
+import threading
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.recommendation_engine import RecommendationEngine
+from src.models.sharding import (build_shards, ShardCoordinator, ShardTimeoutError, ShardServer,
+                                 start_local_servers, shard_engine_kwargs, merge_shard_results)
+from src.utils.synthetic_catalog import generate_queries
+from src.utils.metrics import MetricsRegistry
+from test_pipeline import make_raw_csv, run
+
+def check_identical(coordinator, engine, queries):
+    for query in queries:
+        for top_k, weights in [(5, None), (40, (1, 1, 2))]:
+            assert coordinator.get_recommendations(query, top_k=top_k, block_weights=weights) == \
+                engine.get_recommendations(query, top_k=top_k, block_weights=weights)
+
+def test_build_and_merge(artifact_dirs, tmp_path):
+    """Hash shards cover every row once; partitions keep each filter value on one shard"""
+    print("\n=== Test: Shard Build ===")
+    manifest = build_shards(artifact_dirs['processed_dir'], artifact_dirs['cleaned_data_path'],
+                            str(tmp_path / 'hash'), 3)
+    assert sum(shard['rows'] for shard in manifest['shards']) == manifest['n_rows']
+    partitioned = build_shards(artifact_dirs['processed_dir'], artifact_dirs['cleaned_data_path'],
+                               str(tmp_path / 'location'), 3, shard_by='Location_Area')
+    values = [value for shard in partitioned['shards'] for value in shard['values']]
+    assert sorted(values) == sorted(set(values)) == ['bengaluru', 'chennai', 'delhi', 'mumbai', 'remote']
+
+    # Shard engines return full-catalog rows as merge keys
+    engine = RecommendationEngine(metrics=MetricsRegistry(), **artifact_dirs)
+    shard = RecommendationEngine(metrics=MetricsRegistry(), **shard_engine_kwargs(
+        str(tmp_path / 'hash'), 'shard_001', artifact_dirs['models_dir']))
+    query = {'Description': 'tax filing and payroll'}
+    for score, row, result in shard.search(query, top_k=10):
+        assert engine.catalog.row(row)['Service_ID'] == result['Service_ID']
+    assert merge_shard_results([[(0.9, 4, 'a'), (0.5, 1, 'c')], [(0.9, 2, 'b'), (0.2, 0, 'd')]], 3) == ['b', 'a', 'c']
+
+    with pytest.raises(ValueError):
+        build_shards(artifact_dirs['processed_dir'], artifact_dirs['cleaned_data_path'], str(tmp_path / 'x'), 2,
+                     shard_by='Price_Category')
+
+def test_process_coordinator(artifact_dirs, tmp_path):
+    """Process-pool shards: identical results, routing by partition, errors like the engine"""
+    engine = RecommendationEngine(metrics=MetricsRegistry(), **artifact_dirs)
+    queries = generate_queries(25, mix='uniform', seed=11) + [{'Description': 'website design'}]
+    build_shards(artifact_dirs['processed_dir'], artifact_dirs['cleaned_data_path'], str(tmp_path / 'location'), 2,
+                 shard_by='Location_Area')
+    with ShardCoordinator(str(tmp_path / 'location'), models_dir=artifact_dirs['models_dir'], timeout=30,
+                          metrics=MetricsRegistry()) as coordinator:
+        check_identical(coordinator, engine, queries)
+        assert len(coordinator.route({'Location_Area': 'Delhi'})) == 1
+        assert coordinator.route({'Location_Area': 'Atlantis'}) == []
+        with pytest.raises(AttributeError):
+            coordinator.get_recommendations({'Price_Category': 3})
+    print(f"✓ {len(queries)} queries identical across partitioned shards")
+
+def test_socket_coordinator_and_timeouts(artifact_dirs, tmp_path):
+    """Socket shards give identical results; a shard that stalls is left out or raises"""
+    engine = RecommendationEngine(metrics=MetricsRegistry(), **artifact_dirs)
+    queries = generate_queries(25, mix='uniform', seed=12)
+    shards_dir = str(tmp_path / 'hash')
+    build_shards(artifact_dirs['processed_dir'], artifact_dirs['cleaned_data_path'], shards_dir, 2)
+    processes, addresses, authkey = start_local_servers(shards_dir, models_dir=artifact_dirs['models_dir'])
+    try:
+        with ShardCoordinator(shards_dir, transport='socket', addresses=addresses, authkey=authkey, timeout=30,
+                              metrics=MetricsRegistry()) as coordinator:
+            check_identical(coordinator, engine, queries)
+    finally:
+        for process in processes:
+            process.terminate()
+
+    # One in-process server answers, the other stalls past the timeout
+    class Slow:
+        def __init__(self, engine, delay):
+            self.engine, self.delay = engine, delay
+            self.ranking_method = engine.ranking_method
+
+        def search(self, *args, **kwargs):
+            time.sleep(self.delay)
+            return self.engine.search(*args, **kwargs)
+
+    servers = []
+    for name, delay in [('shard_000', 0.0), ('shard_001', 1.0)]:
+        shard = RecommendationEngine(metrics=MetricsRegistry(), **shard_engine_kwargs(
+            shards_dir, name, artifact_dirs['models_dir']))
+        servers.append(ShardServer(Slow(shard, delay), authkey=b'test'))
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    metrics = MetricsRegistry()
+    addresses = [server.address for server in servers]
+    query = {'Description': 'tax filing and payroll'}
+    with ShardCoordinator(shards_dir, transport='socket', addresses=addresses, authkey=b'test', timeout=0.3,
+                          metrics=metrics) as coordinator:
+        results, missing = coordinator.gather(query, top_k=10)
+        assert missing == ['shard_001'] and results
+        assert results == [result for _, _, result in servers[0].engine.engine.search(query, top_k=10)]
+        coordinator.allow_partial = False
+        with pytest.raises(ShardTimeoutError):
+            coordinator.get_recommendations(query)
+    failures = metrics.snapshot()['shard_requests_failed_total']['values']
+    assert failures == {('shard_001', 'timeout'): 2}
+
+    # Shards ranking differently from the coordinator refuse the query instead of merging
+    with ShardCoordinator(shards_dir, transport='socket', addresses=addresses, authkey=b'test', timeout=5,
+                          ranking_method='knn', metrics=MetricsRegistry()) as coordinator:
+        with pytest.raises(ValueError, match='ranks by'):
+            coordinator.get_recommendations(query)
+    for server in servers:
+        server.close()
+    print("✓ socket shards identical; stalled shard left out; mismatched ranking refused")
+
+def test_pipeline_shard_step(tmp_path):
+    """--shards adds a cached shard step whose directory is exported next to the artifacts"""
+    make_raw_csv(tmp_path / 'raw.csv')
+    first = run(tmp_path, '--shards', '2')
+    assert first['shard']['status'] == 'ran'
+    assert os.path.exists(tmp_path / 'out' / 'shards' / 'shards.json')
+    assert os.path.exists(tmp_path / 'out' / 'shards' / 'shard_001' / 'global_rows.npy')
+    assert run(tmp_path, '--shards', '2')['shard']['status'] == 'cached'
@@ -0,0 +1,165 @@
+"""
+Single-Flight Tests
+Concurrent identical queries are computed once and share the result (or the error), in
+threads, in the engine and in the asyncio HTTP server
+"""
+
+import sys
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.recommendation_engine import RecommendationEngine
+from src.utils.single_flight import SingleFlight, AsyncSingleFlight
+from src.utils.metrics import MetricsRegistry
+from test_api import ServerThread, SlowEngine
+
+def test_thread_single_flight():
+    """One computation per key while it runs; errors reach every waiter; nothing is cached"""
+    print("\n=== Test: Single Flight (threads) ===")
+    metrics = MetricsRegistry()
+    flight = SingleFlight('test', metrics)
+    calls = []
+    release = threading.Event()
+
+    def compute(value):
+        calls.append(value)
+        release.wait(5)
+        if value == 'boom':
+            raise ValueError(value)
+        return [value]
+
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(flight.do, 'k', compute, 'a') for _ in range(8)]
+        while flight.in_flight == 0 or len(calls) == 0:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        release.set()
+        answers = [f.result() for f in futures]
+    assert calls == ['a'] and all(value is answers[0][0] for value, _ in answers)
+    assert sorted(shared for _, shared in answers) == [False] + [True] * 7
+    assert metrics.snapshot()['single_flight_requests_total']['values'] == {('test', 'computed'): 1,
+                                                                             ('test', 'shared'): 7}
+    assert flight.do('k', compute, 'b') == (['b'], False) and flight.in_flight == 0
+
+    release.clear()
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(flight.do, 'e', compute, 'boom') for _ in range(4)]
+        while flight.in_flight == 0:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        release.set()
+        errors = []
+        for future in futures:
+            with pytest.raises(ValueError) as info:
+                future.result()
+            errors.append(info.value)
+    # The leader raises the error; each waiter its own copy, chained to it
+    leader_error, = [e for e in errors if e.__cause__ is None]
+    assert len({id(e) for e in errors}) == 4
+    assert all(e.__cause__ is leader_error and e.args == ('boom',) for e in errors if e is not leader_error)
+    print(f"✓ {flight.computed} computations, {flight.shared} shared")
+
+def test_engine_single_flight(artifact_dirs):
+    """Equivalent inputs in flight together are computed once; every caller gets its own copy"""
+    metrics = MetricsRegistry()
+    engine = RecommendationEngine(metrics=metrics, single_flight=True, **artifact_dirs)
+    plain = RecommendationEngine(metrics=MetricsRegistry(), **artifact_dirs)
+    query = {'Location_Area': 'Remote', 'Description': 'tax filing  and payroll'}
+    variant = {'Description': 'Tax filing and payroll', 'Location_Area': 'remote'}
+    recommend = engine._recommend
+
+    def slow_recommend(*args, **kwargs):
+        time.sleep(0.3)
+        return recommend(*args, **kwargs)
+
+    engine._recommend = slow_recommend
+    with ThreadPoolExecutor(6) as pool:
+        futures = [pool.submit(engine.get_recommendations, q, top_k=3) for q in [query, variant] * 3]
+        results = [f.result() for f in futures]
+    assert engine.single_flight.computed == 1 and engine.single_flight.shared == 5
+    # Every caller is a request, though only one computed
+    assert metrics.snapshot()['recommendation_requests_total']['values'][()] == 6
+    assert all(r == plain.get_recommendations(query, top_k=3) for r in results)
+    results[0][0]['Service_Name'] = 'changed'
+    assert results[1][0]['Service_Name'] != 'changed'
+
+    # The leader changing its results while waiters are still copying theirs
+    expected = plain.get_recommendations(query, top_k=3)
+    flight_do = engine.single_flight.do
+    leader_done = threading.Event()
+
+    def late_waiters(*args, **kwargs):
+        value, shared = flight_do(*args, **kwargs)
+        if shared:
+            leader_done.wait(5)
+        return value, shared
+
+    def leader_mutates():
+        results = engine.get_recommendations(query, top_k=3)
+        results[0]['Service_Name'] = 'changed'
+        results.clear()
+        leader_done.set()
+        return results
+
+    engine.single_flight.do = late_waiters
+    with ThreadPoolExecutor(4) as pool:
+        leader = pool.submit(leader_mutates)
+        while engine.single_flight.in_flight == 0:
+            time.sleep(0.01)
+        waiters = [pool.submit(engine.get_recommendations, query, top_k=3) for _ in range(3)]
+        assert leader.result() == [] and all(w.result() == expected for w in waiters)
+    engine.single_flight.do = flight_do
+    assert engine.single_flight.computed == 2 and engine.single_flight.shared == 8
+
+    # Different top_k or weights are different computations
+    with ThreadPoolExecutor(2) as pool:
+        list(pool.map(lambda k: engine.get_recommendations(query, top_k=k), [3, 4]))
+    assert engine.single_flight.computed == 4
+    print("✓ 6 concurrent equivalent queries computed once")
+
+def test_async_single_flight_and_server(artifact_dirs):
+    """Asyncio group shares results and errors, survives a cancelled caller; the server collapses requests"""
+    async def scenario():
+        flight = AsyncSingleFlight('test', MetricsRegistry())
+        runs = []
+
+        async def compute(value):
+            runs.append(value)
+            await asyncio.sleep(0.05)
+            if value == 'boom':
+                raise ValueError(value)
+            return value
+
+        first = asyncio.ensure_future(flight.do('k', compute, 'a'))
+        await asyncio.sleep(0)
+        others = [asyncio.ensure_future(flight.do('k', compute, 'a')) for _ in range(3)]
+        first.cancel()
+        answers = await asyncio.gather(*others)
+        errors = await asyncio.gather(*(flight.do('e', compute, 'boom') for _ in range(3)), return_exceptions=True)
+        return runs, answers, errors, flight
+
+    runs, answers, errors, flight = asyncio.run(scenario())
+    assert runs == ['a', 'boom'] and answers == [('a', True)] * 3
+    assert all(isinstance(e, ValueError) for e in errors) and flight.in_flight == 0
+    assert errors[1] is not errors[2] and errors[1].__cause__ is errors[0] and errors[2].__cause__ is errors[0]
+
+    engine = RecommendationEngine(metrics=MetricsRegistry(), **artifact_dirs)
+    server = ServerThread(SlowEngine(engine, 0.3), max_batch_size=1, metrics=MetricsRegistry())
+    query = {'Description': 'website design', 'Location_Area': 'Delhi'}
+    try:
+        with ThreadPoolExecutor(5) as pool:
+            responses = list(pool.map(lambda _: server.request('POST', '/recommend', {'query': query}), range(5)))
+        assert all(status == 200 and body['results'] == engine.get_recommendations(query)
+                   for status, body, _ in responses)
+        health = server.request('GET', '/health')[1]
+        assert health['single_flight_shared'] >= 3 and health['batches'] <= 2
+    finally:
+        server.close()
+    print(f"✓ server answered 5 identical requests with {health['batches']} engine call(s)")
@@ -0,0 +1,123 @@
+"""
+Slow-Query Log Tests
+Canonical inputs rank identically; slow calls are logged with stage timings and a
+stack profile, fast calls are not, and the log rotates
+"""
+
+import sys
+import os
+import time
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.canonical import canonicalize_input, input_key
+from src.utils.slow_query_log import SlowQueryLog, read_slow_queries
+from src.models.recommendation_engine import RecommendationEngine
+from src.utils.metrics import MetricsRegistry
+
+QUERY = {
+    'Target_Business_Type': 'E-commerce',
+    'Price_Category': 'HIGH',
+    'Location_Area': 'remote',
+    'Language_Support': ['English', 'english'],
+    'Description': 'Social media   marketing and Instagram page setup',
+    'City': '',
+}
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+def test_canonical_input(artifact_dirs):
+    """Canonical form is order/case/whitespace independent and ranks the same"""
+    canonical = canonicalize_input(QUERY)
+    assert canonical == {
+        'City': '',
+        'Description': 'social media marketing and instagram page setup',
+        'Language_Support': ['english'],
+        'Location_Area': 'remote',
+        'Price_Category': 'high',
+        'Target_Business_Type': 'e-commerce',
+    }
+    shuffled = dict(reversed(list(QUERY.items())), Language_Support='English')
+    assert input_key(shuffled) == input_key(QUERY)
+
+    engine = RecommendationEngine(metrics=MetricsRegistry(), **artifact_dirs)
+    assert engine.get_recommendations(canonical) == engine.get_recommendations(QUERY)
+
+    # An empty value is not an absent one: the engine defaults only absent fields
+    absent = {key: value for key, value in QUERY.items() if key != 'Target_Business_Type'}
+    for empty in ('', None, []):
+        assert input_key(dict(absent, Target_Business_Type=empty)) != input_key(absent)
+    assert input_key(dict(QUERY, Language_Support=[])) != input_key(dict(QUERY, Language_Support=None))
+
+def test_engine_logs_only_slow_calls(artifact_dirs, tmp_path):
+    """Threshold 0 logs every call with its stages; a high threshold logs nothing"""
+    print("\n=== Test: Slow-Query Log ===")
+    path = str(tmp_path / 'slow.log')
+    log = SlowQueryLog(path, threshold_ms=0, sample_interval=0.001)
+    engine = RecommendationEngine(metrics=MetricsRegistry(), slow_query_log=log, **artifact_dirs)
+    results = engine.get_recommendations(QUERY)
+    engine.get_recommendations({'Location_Area': 'Atlantis'})
+
+    entries = read_slow_queries(path)
+    assert len(entries) == 2 and log.logged == 2
+    assert entries[0]['input'] == canonicalize_input(QUERY)
+    assert list(entries[0]['stages']) == ['filter', 'encode', 'score', 'rank', 'format']
+    assert entries[0]['elapsed_ms'] >= sum(entries[0]['stages'].values())
+    assert entries[0]['profile']['type'] == 'sampler'
+    assert list(entries[1]['stages']) == ['filter']
+
+    log.threshold_ms = 60_000
+    assert engine.get_recommendations(QUERY) == results
+    assert len(read_slow_queries(path)) == 2
+    print(f"✓ {entries[0]['elapsed_ms']:.2f} ms entry with stages {list(entries[0]['stages'])}")
+
+def test_batches_are_logged_per_query(artifact_dirs, tmp_path):
+    """get_recommendations_batch (the API's path) logs every slow query, errors in place"""
+    path = str(tmp_path / 'slow.log')
+    engine = RecommendationEngine(metrics=MetricsRegistry(), slow_query_log=SlowQueryLog(path, threshold_ms=0),
+                                  **artifact_dirs)
+    plain = RecommendationEngine(metrics=MetricsRegistry(), **artifact_dirs)
+    queries = [QUERY, {'Location_Area': 'Atlantis'}, {'Price_Category': 3}, {'Description': 'tax filing'}]
+    results = engine.get_recommendations_batch(queries, return_exceptions=True)
+    expected = plain.get_recommendations_batch(queries, return_exceptions=True)
+    assert results[:2] + results[3:] == expected[:2] + expected[3:]
+    assert isinstance(results[2], AttributeError)
+
+    entries = read_slow_queries(path)
+    assert [entry['input'] for entry in entries] == [canonicalize_input(q) for q in queries]
+    assert 'AttributeError' in entries[2]['error'] and 'error' not in entries[3]
+
+@pytest.mark.parametrize('profiler', ['sampler', 'cprofile'])
+def test_profile_points_at_hot_function(tmp_path, profiler):
+    """The profile of a slow call names the function it spent its time in"""
+    log = SlowQueryLog(str(tmp_path / 'slow.log'), threshold_ms=20, profiler=profiler, sample_interval=0.001)
+    with log.track({'Description': 'x'}) as query:
+        busy_wait(0.1)
+        query.lap('busy')
+    entry = read_slow_queries(log.path)[0]
+    assert entry['stages']['busy'] >= 100 * 0.9
+    if profiler == 'sampler':
+        assert entry['profile']['samples'] > 0
+        assert 'busy_wait' in entry['profile']['stacks'][0]['stack']
+    else:
+        assert any('busy_wait' in f['function'] for f in entry['profile']['functions'])
+
+def test_errors_and_rotation(tmp_path):
+    """Failed slow calls record the error; old entries move to rotated files"""
+    path = str(tmp_path / 'slow.log')
+    log = SlowQueryLog(path, threshold_ms=0, profiler=None, max_bytes=2_000, backup_count=10)
+    with pytest.raises(KeyError):
+        with log.track({'Description': 'boom'}):
+            raise KeyError('missing')
+    for i in range(40):
+        with log.track({'Description': f'query {i}'}):
+            pass
+    entries = read_slow_queries(path)
+    assert os.path.exists(path + '.1')
+    assert entries[0]['error'] == "KeyError('missing')" and entries[0]['profile'] is None
+    assert [e['input']['Description'] for e in entries[1:]] == [f'query {i}' for i in range(40)]
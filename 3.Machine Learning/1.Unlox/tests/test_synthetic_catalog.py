@@ -0,0 +1,96 @@
+"""
+Synthetic Catalog Tests
+The generator is deterministic, matches the real schema and description vocabulary,
+and produces query workloads the engine accepts
+"""
+
+import sys
+import os
+import pickle
+import warnings
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import synthetic_catalog
+from src.utils.synthetic_catalog import generate_catalog, generate_queries, write_catalog, write_queries, load_queries
+from src.preprocessing.data_cleaner import clean_dataset
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA = ['Service_ID', 'Service_Name', 'Description', 'Target_Business_Type', 'Price_Category',
+          'Language_Support', 'Location_Area', 'Match_Quality']
+
+def test_catalog_is_deterministic_and_streams(tmp_path, monkeypatch):
+    """Same seed gives the same rows; the streamed CSV equals the in-memory catalog"""
+    print("\n=== Test: Deterministic Catalog ===")
+    monkeypatch.setattr(synthetic_catalog, 'BLOCK_ROWS', 1_000)
+    df = generate_catalog(2_500, seed=3)
+
+    assert list(df.columns) == SCHEMA
+    assert df['Service_ID'].is_unique and df['Service_ID'].iloc[0] == 1001
+    pd.testing.assert_frame_equal(df, generate_catalog(2_500, seed=3))
+    assert not df.equals(generate_catalog(2_500, seed=4))
+    # A longer catalog starts with the shorter one
+    pd.testing.assert_frame_equal(generate_catalog(3_000, seed=3).iloc[:2_500], df)
+
+    path = tmp_path / 'catalog.csv'
+    assert write_catalog(str(path), 2_500, seed=3) == 2_500
+    pd.testing.assert_frame_equal(pd.read_csv(path), df)
+    assert len(clean_dataset(pd.read_csv(path))) <= len(df)
+    print(f"✓ {len(df)} rows, {df['Service_Name'].nunique()} services")
+
+def test_vocabulary_matches_real_encoder():
+    """Description terms occur in the same share of rows as in the real catalog"""
+    print("\n=== Test: Vocabulary Calibration ===")
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # encoders.pkl may come from another sklearn version
+        with open(os.path.join(PROJECT_ROOT, 'src', 'models', 'encoders.pkl'), 'rb') as f:
+            ohe, real = pickle.load(f)
+
+    df = generate_catalog(50_000)
+    tfidf = TfidfVectorizer(stop_words='english').fit(df['Description'])
+    assert set(tfidf.vocabulary_) == set(real.vocabulary_)
+
+    # idf = ln((1 + n) / (1 + df)) + 1 with n = 1000 real services
+    real_share = (1001.0 / np.exp(real.idf_ - 1.0) - 1.0) / 1000.0
+    terms = sorted(real.vocabulary_, key=real.vocabulary_.get)
+    share = (tfidf.transform(df['Description']) > 0).mean(axis=0).A1[[tfidf.vocabulary_[t] for t in terms]]
+    assert np.max(np.abs(share - real_share)) < 0.01
+
+    cleaned = clean_dataset(df.head(2_000))
+    assert set(cleaned['Target_Business_Type']) == set(ohe.categories_[0])
+    assert set(cleaned['Location_Area']) == set(ohe.categories_[1])
+    print(f"✓ {len(terms)} terms, max share error {np.max(np.abs(share - real_share)):.4f}")
+
+def test_query_mixes(artifact_dirs, tmp_path):
+    """Skewed mixes repeat queries; zero-result queries return nothing from the engine"""
+    print("\n=== Test: Query Workloads ===")
+    from src.models.recommendation_engine import RecommendationEngine
+
+    uniform = generate_queries(200, mix='uniform', seed=1)
+    skewed = generate_queries(200, mix='skewed', seed=1)
+    assert uniform == generate_queries(200, mix='uniform', seed=1)
+    distinct = lambda queries: len({str(q) for q in queries})
+    assert distinct(skewed) < distinct(uniform)
+
+    path = tmp_path / 'queries.jsonl'
+    write_queries(str(path), skewed)
+    assert load_queries(str(path)) == skewed
+
+    engine = RecommendationEngine(**artifact_dirs)
+    zero = generate_queries(20, mix='uniform', seed=2, zero_result_rate=1.0)
+    assert all(engine.get_recommendations(q) == [] for q in zero)
+    answered = sum(bool(engine.get_recommendations(q)) for q in uniform[:20])
+    assert answered > 0
+    print(f"✓ {distinct(skewed)} distinct skewed queries, {answered}/20 uniform queries answered")
+
+def test_parquet_output(tmp_path):
+    """Columnar output has the same rows as the CSV"""
+    pytest.importorskip('pyarrow')
+    path = tmp_path / 'catalog.parquet'
+    write_catalog(str(path), 500, seed=3)
+    pd.testing.assert_frame_equal(pd.read_parquet(path), generate_catalog(500, seed=3))
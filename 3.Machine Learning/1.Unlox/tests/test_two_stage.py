@@ -0,0 +1,78 @@
+"""
+Two-Stage Retrieval Tests
+Candidates are pre-scored on the narrow blocks and each row's top text terms, then a
+shortlist is re-scored exactly
+"""
+
+import sys
+import os
+import numpy as np
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.recommendation_engine import RecommendationEngine
+from src.models.two_stage import TopTermBlocks
+from src.utils.synthetic_catalog import generate_queries
+from src.utils.metrics import MetricsRegistry
+
+def test_two_stage_shortlist(artifact_dirs):
+    """A shortlist holding every candidate is exact; small ones keep exact scores and most of the top-k"""
+    print("\n=== Test: Two-Stage Retrieval ===")
+    exact = RecommendationEngine(metrics=MetricsRegistry(), **artifact_dirs)
+    full = RecommendationEngine(metrics=MetricsRegistry(), two_stage_shortlist=len(exact.blocks), **artifact_dirs)
+    short = RecommendationEngine(metrics=MetricsRegistry(), two_stage_shortlist=20, **artifact_dirs)
+    queries = generate_queries(60, mix='uniform', seed=23) + [{'Description': 'tax filing and payroll'}, {}]
+
+    overlap = []
+    for query in queries:
+        expected = exact.get_recommendations(query, top_k=5)
+        assert full.get_recommendations(query, top_k=5) == expected
+        assert short.get_recommendations(query, top_k=5) == [result for _, _, result in short.search(query, top_k=5)]
+        results = short.search(query, top_k=5)
+        assert len(results) <= len(expected)  # shortlisted rows can fall below the score threshold
+        # Returned rows carry their exact scores, best first
+        exact_scores = {row: score for score, row, _ in exact.search(query, top_k=len(exact.blocks))}
+        assert all(score == exact_scores[row] for score, row, _ in results)
+        assert [score for score, _, _ in results] == sorted((score for score, _, _ in results), reverse=True)
+        if expected:
+            rows = {row for _, row, _ in exact.search(query, top_k=5)}
+            overlap.append(len({row for _, row, _ in results} & rows) / len(expected))
+    assert np.mean(overlap) > 0.8
+    print(f"✓ {len(queries)} queries; top-5 agreement with a 20-row shortlist {np.mean(overlap):.0%}")
+
+    for options in ({'storage': 'int8'}, {'bound_search': True}, {'fused_scan': True}, {'text_score_cache_mb': 4}):
+        with pytest.raises(ValueError):
+            RecommendationEngine(two_stage_shortlist=20, **options, **artifact_dirs)
+    with pytest.raises(ValueError):
+        short.get_recommendations(queries[0], top_k=5, time_budget_ms=50)
+
+def test_top_term_dots(artifact_dirs):
+    """Pre-score products: exact on the narrow blocks, each row's top text terms otherwise"""
+    engine = RecommendationEngine(metrics=MetricsRegistry(), **artifact_dirs)
+    text = np.asarray(engine.blocks.blocks[2])
+    top_terms = TopTermBlocks(engine.blocks, n_terms=2)
+
+    # The index holds, per row, at most two of its coordinates and none smaller than those left out
+    kept = np.zeros_like(text)
+    terms = np.repeat(np.arange(text.shape[1]), np.diff(top_terms.indptr))
+    kept[top_terms.rows, terms] = top_terms.values
+    np.testing.assert_allclose(kept[kept != 0], text[kept != 0], rtol=1e-6)
+    assert np.all((kept != 0).sum(axis=1) <= 2)
+    smallest_kept = np.where(kept != 0, np.abs(kept), np.inf).min(axis=1)
+    largest_dropped = np.where(kept == 0, np.abs(text), 0).max(axis=1)
+    assert np.all(largest_dropped <= smallest_kept + 1e-6)
+
+    rows = np.arange(0, len(engine.blocks), 3)
+    everything = TopTermBlocks(engine.blocks, n_terms=text.shape[1])
+    for query in generate_queries(10, mix='uniform', seed=5):
+        user_blocks = engine.encode_query(query)
+        dots = top_terms.block_dots(user_blocks, rows)
+        assert dots.shape == (len(rows), 3)
+        exact = engine.blocks.block_dots(user_blocks, rows)
+        np.testing.assert_allclose(dots[:, :2], exact[:, :2])
+        np.testing.assert_allclose(dots[:, 2], (kept @ np.ravel(user_blocks[2]))[rows], rtol=1e-6, atol=1e-7)
+        # Keeping every term gives the exact products
+        np.testing.assert_allclose(everything.block_dots(user_blocks, rows), exact, rtol=1e-6, atol=1e-7)
+    print(f"✓ top-term products; {top_terms.nbytes / len(engine.blocks):.0f} bytes per row")